@@ -45,7 +45,7 @@ Provided by Honeybee 0.0.63
         simulationOutputs_: A list of the outputs that you would like EnergyPlus to write into the result CSV file.  This can be any set of any outputs that you would like from EnergyPlus, writen as a list of text that will be written into the IDF.  It is recommended that, if you are not expereinced with writing EnergyPlus outputs, you should use the "Honeybee_Write EP Result Parameters" component to request certain types of common outputs.  If no value is input here, this component will automatically request outputs of heating, cooling, lighting, and equipment energy use.
         +++++++++++++++: ...
         _writeIdf: Set to "True" to have the component take your HBZones and other inputs and write them into an IDF file.  The file path of the resulting file will appear in the idfFileAddress output of this component.  Note that only setting this to "True" and not setting the output below to "True" will not automatically run the IDF through EnergyPlus for you.
-        runEnergyPlus_: Set to "True" to have the component run your IDF through EnergyPlus once it has finished writing it.  This will ensure that a CSV result file appears in the resultFileAddress output. Set to 2 if you want the analysis to run in background. This option is useful for parametric runs when you don't want to see command shells.
+        runEnergyPlus_: Set to "True" to have the component run your IDF through EnergyPlus once it has finished writing it.  This will ensure that a CSV result file appears in the resultFileAddress output. Set to 2 if you want the analysis to run in background. This option is useful for parametric runs when you don't want to see command shells.  If the idf, the weather file and the EnergyPlus version are identical to a previous successful run, the results are copied from the simulation cache in Honeybee default folder instead of running EnergyPlus again.
         +++++++++++++++: ...
         _workingDir_: An optional working directory to a folder on your system, into which your IDF and result files will be written.  NOTE THAT DIRECTORIES INPUT HERE SHOULD NOT HAVE ANY SPACES OR UNDERSCORES IN THE FILE PATH.
         _idfFileName_: Optional text which will be used to name your IDF and result files.  Change this to aviod over-writing results of previous energy simulations.
@@ -82,6 +82,7 @@ import shutil
 import collections
 import subprocess
 import copy
+import time
 
 rc.Runtime.HostUtils.DisplayOleAlerts(False)
 
@@ -1079,6 +1080,18 @@ class WriteIDF(object):
         '\t' + sensibleHeatFraction + ',!- Sensible Heat Fraction\n' + \
         '\t' + activityScheduleName + ';!- Activity Level Schedule Name\n'
     
+    @staticmethod
+    def libraryFingerprint(objectType, name, libraryNames):
+        """A hashable key with the name and the library data of a material, construction or schedule.
+        
+        Returns None if the object is not in the libraries so the missing object is reported.
+        """
+        for libraryName in libraryNames:
+            library = sc.sticky[libraryName]
+            if name in library:
+                return (objectType, name, repr(library[name]))
+        return None
+    
     def EPMaterialStr(self, materialName):
         materialData = None
         materialName = materialName.strip()
@@ -1138,62 +1151,28 @@ class WriteIDF(object):
         if scheduleName.lower().endswith(".csv"):
             # check if the schedule is already created
             if scheduleName.upper() in self.fileBasedSchedules.keys(): return "\n"
-            # set up default values
-            schTypeLimitStr = "\n"
-            schTypeLimitName = "Fraction"
-            numOfHours = 8760
             
             # create schedule object based on file
             # find file name and use it as schedule name
             scheduleFileName = os.path.basename(scheduleName)
             scheduleObjectName = "_".join(scheduleFileName.split(".")[:-1])
             
-            # copy schedule file into working dir
+            # copy schedule file into working dir if it has changed since the last run
             scheduleNewAddress = os.path.join(self.workingDir, scheduleFileName)
-            shutil.copyfile(scheduleName, scheduleNewAddress)
+            scheduleStat = os.stat(scheduleName)
+            if not os.path.isfile(scheduleNewAddress) or \
+                os.path.getsize(scheduleNewAddress) != scheduleStat.st_size or \
+                os.path.getmtime(scheduleNewAddress) != scheduleStat.st_mtime:
+                shutil.copy2(scheduleName, scheduleNewAddress)
             
             # put them as key, value so I can find the new name when write schedule
             self.fileBasedSchedules[scheduleName.upper()] = scheduleObjectName
             
-            # get the inputs if the schedule is generated by Honeybee
-            with open(scheduleName, "r") as schFile:
-                for lineCount, line in enumerate(schFile):
-                    if lineCount == 3: break
-                    elif lineCount == 0:
-                        # try to collect information related to type limit
-                        lineSeg = line.split(",")
-                        if not lineSeg[0].startswith("Honeybee"): break
-                        lowerLimit, upperLimit, numericType, unitType = lineSeg[1:5]
-                        
-                        # prepare the schedulTypeLimitObject
-                        schTypeLimitName = os.path.basename(scheduleName).lower(). \
-                                           replace(".", "").split("csv")[0] + "TypeLimit"
-                        
-                        schTypeLimitStr = "ScheduleTypeLimits,\t!Schedule Type\n" + \
-                                          schTypeLimitName + ",\t! Name\n" + \
-                                          lowerLimit.strip() + ",\t!- Lower Limit Value\n" + \
-                                          upperLimit.strip() + ",\t!- Upper Limit Value\n" + \
-                                          numericType.strip() + ",\t!- Numeric Type\n" + \
-                                          unitType.strip() + ";\t!- Unit Type\n\n"
-                    elif lineCount == 2:
-                        # check timestep
-                        try: numOfHours *= int(line.split(",")[0])
-                        except: pass
-            
-            # scheduleStr writes the section Schedule:File in the EnergyPlus file
-            # for custom schedules.
-            scheduleStr = schTypeLimitStr + \
-                          "Schedule:File,\n" + \
-                          scheduleObjectName + ",\t!- Name\n" + \
-                          schTypeLimitName + ",\t!- Schedule Type Limits Name\n" + \
-                          scheduleNewAddress + ",\t!- File Name\n" + \
-                          "5,\t!- Column Number\n" + \
-                          "4,\t!- Rows To Skip\n" + \
-                          str(int(numOfHours)) + ",\t!- Hours of Data\n" + \
-                          "Comma;\t!- Column Separator\n"
-
-            return scheduleStr
-            
+            # the header of the file is only read again if the file has changed
+            fingerprint = ('Schedule:File', scheduleName, scheduleStat.st_size, scheduleStat.st_mtime, scheduleNewAddress)
+            return sc.sticky["honeybee_IDFFragmentCache"].get(fingerprint, self.EPSCHFileStr, scheduleName, \
+                                                              scheduleObjectName, scheduleNewAddress)
+        
         if scheduleName in sc.sticky ["honeybee_ScheduleLib"].keys():
             scheduleData = sc.sticky ["honeybee_ScheduleLib"][scheduleName]
         elif scheduleName in sc.sticky ["honeybee_ScheduleTypeLimitsLib"].keys():
@@ -1214,6 +1193,52 @@ class WriteIDF(object):
                     scheduleStr =  scheduleStr + "  " + str(scheduleData[layer][0]) + ";   !- " +  scheduleData[layer][1] + "\n\n"
             return scheduleStr
     
+    def EPSCHFileStr(self, scheduleName, scheduleObjectName, scheduleNewAddress):
+        """Create the Schedule:File object for a csv schedule that is copied to scheduleNewAddress."""
+        # set up default values
+        schTypeLimitStr = "\n"
+        schTypeLimitName = "Fraction"
+        numOfHours = 8760
+        
+        # get the inputs if the schedule is generated by Honeybee
+        with open(scheduleName, "r") as schFile:
+            for lineCount, line in enumerate(schFile):
+                if lineCount == 3: break
+                elif lineCount == 0:
+                    # try to collect information related to type limit
+                    lineSeg = line.split(",")
+                    if not lineSeg[0].startswith("Honeybee"): break
+                    lowerLimit, upperLimit, numericType, unitType = lineSeg[1:5]
+                    
+                    # prepare the schedulTypeLimitObject
+                    schTypeLimitName = os.path.basename(scheduleName).lower(). \
+                                       replace(".", "").split("csv")[0] + "TypeLimit"
+                    
+                    schTypeLimitStr = "ScheduleTypeLimits,\t!Schedule Type\n" + \
+                                      schTypeLimitName + ",\t! Name\n" + \
+                                      lowerLimit.strip() + ",\t!- Lower Limit Value\n" + \
+                                      upperLimit.strip() + ",\t!- Upper Limit Value\n" + \
+                                      numericType.strip() + ",\t!- Numeric Type\n" + \
+                                      unitType.strip() + ";\t!- Unit Type\n\n"
+                elif lineCount == 2:
+                    # check timestep
+                    try: numOfHours *= int(line.split(",")[0])
+                    except: pass
+        
+        # scheduleStr writes the section Schedule:File in the EnergyPlus file
+        # for custom schedules.
+        scheduleStr = schTypeLimitStr + \
+                      "Schedule:File,\n" + \
+                      scheduleObjectName + ",\t!- Name\n" + \
+                      schTypeLimitName + ",\t!- Schedule Type Limits Name\n" + \
+                      scheduleNewAddress + ",\t!- File Name\n" + \
+                      "5,\t!- Column Number\n" + \
+                      "4,\t!- Rows To Skip\n" + \
+                      str(int(numOfHours)) + ",\t!- Hours of Data\n" + \
+                      "Comma;\t!- Column Separator\n"
+
+        return scheduleStr
+    
     def requestSrfeio(self):
         return '\nOutput:Surfaces:List,\n' + \
         '\t' + 'Details;                 !- Report Type' + '\n'
@@ -1221,6 +1246,10 @@ class WriteIDF(object):
     def requestVarDict(self):
         return '\nOutput:VariableDictionary,\n' + \
         '\t' + 'regular;                 !- Key Field' + '\n'
+    
+    def requestSQLite(self):
+        return '\nOutput:SQLite,\n' + \
+        '\t' + 'SimpleAndTabular;        !- Option Type' + '\n'
         
     def EarthTube(self,zone):
         if zone.ETschedule.upper().endswith('CSV'):
@@ -1541,11 +1570,65 @@ class RunIDF(object):
         batchFileAddress.replace("\\", "/")		
         p = subprocess.Popen(["cmd /c ", batchFileAddress], shell=shellKey, stdout=subprocess.PIPE, stderr=subprocess.PIPE)		
         out, err = p.communicate()
+    
+    def isSuccessful(self, workingDir, shIdfFileName):
+        """Check that the result file is written and there is no fatal error in the err file."""
+        if not os.path.isfile(os.path.join(workingDir, shIdfFileName + '.csv')): return False
+        try:
+            with open(os.path.join(workingDir, shIdfFileName + '.err'), 'r') as errFile:
+                for line in errFile:
+                    if "**  Fatal  **" in line: return False
+        except IOError:
+            return False
+        return True
+
+
+class IDFFragmentCache(object):
+    """Keep the rendered idf strings between runs keyed by the fingerprint of the objects.
+    
+    Only the fragments that are used in the latest write are kept so the size of
+    the cache is limited to the size of the last model.
+    """
+    def __init__(self):
+        self.fragments = {}
+        self.usedKeys = set()
+        self.hits = 0
+        self.misses = 0
+    
+    def startWrite(self):
+        self.usedKeys = set()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, fingerprint, renderFunc, *args):
+        """Return the cached string for the fingerprint or render and cache it."""
+        if fingerprint is None:
+            self.misses += 1
+            return renderFunc(*args)
+        
+        try:
+            fragment = self.fragments[fingerprint]
+            self.hits += 1
+        except KeyError:
+            fragment = renderFunc(*args)
+            self.fragments[fingerprint] = fragment
+            self.misses += 1
+        
+        self.usedKeys.add(fingerprint)
+        return fragment
+    
+    def endWrite(self):
+        for fingerprint in self.fragments.keys():
+            if fingerprint not in self.usedKeys:
+                del self.fragments[fingerprint]
 
 
 sc.sticky["honeybee_WriteIDF"] = WriteIDF
 sc.sticky["honeybee_RunIDF"] = RunIDF
 
+if "honeybee_IDFFragmentCache" not in sc.sticky:
+    sc.sticky["honeybee_IDFFragmentCache"] = IDFFragmentCache()
+
 
 def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext,
          simulationOutputs, writeIdf, runEnergyPlus, workingDir, idfFileName,
@@ -1742,11 +1825,17 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
         for count, hol in enumerate(holidays):
             idfFile.write(hb_writeIDF.EPHoliday(hol, count))
     
+    # materials, constructions and schedules are reused from the previous run if their data hasn't changed
+    hb_fragments = sc.sticky["honeybee_IDFFragmentCache"]
+    hb_fragments.startWrite()
+    
     # for now I write all the type limits but it can be cleaner
     scheduleTypeLimits = set([key.upper() for key in sc.sticky["honeybee_ScheduleTypeLimitsLib"].keys()])
     
     for scheduleTypeLimit in scheduleTypeLimits:
-        try: idfFile.write(hb_writeIDF.EPSCHStr(scheduleTypeLimit))
+        try: idfFile.write(hb_fragments.get(hb_writeIDF.libraryFingerprint('ScheduleTypeLimits', scheduleTypeLimit, \
+                                            ("honeybee_ScheduleLib", "honeybee_ScheduleTypeLimitsLib")), \
+                                            hb_writeIDF.EPSCHStr, scheduleTypeLimit))
         except: pass
     
     # Geometry rules
@@ -1903,6 +1992,7 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
                 #Write the internal mass into the IDF
                 idfFile.write(hb_writeIDF.EPInternalMass(zone, massName, zone.internalMassSrfAreas[massCount], zone.internalMassConstructions[massCount]))
     
+    
     ########### Generators - Electric load center ###########
     
     # This section was created by Anton Szilasi 
@@ -2150,21 +2240,26 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
     ################ Construction #####################
     print "[5 of 8] Writing materials and constructions..."
     
+    materialLibs = ("honeybee_windowMaterialLib", "honeybee_materialLib")
+    
     # Write any materials that are outside constructions.
     for mat in EPMaterialCollection:
-        materialStr = hb_writeIDF.EPMaterialStr(mat.upper())
+        materialStr = hb_fragments.get(hb_writeIDF.libraryFingerprint('Material', mat.upper().strip(), materialLibs), \
+                                       hb_writeIDF.EPMaterialStr, mat.upper())
         if materialStr:
             idfFile.write(materialStr)
     
     # Write constructions
     for cnstr in EPConstructionsCollection:
-        constructionStr, materials = hb_writeIDF.EPConstructionStr(cnstr)
+        constructionStr, materials = hb_fragments.get(hb_writeIDF.libraryFingerprint('Construction', cnstr, ("honeybee_constructionLib",)), \
+                                                      hb_writeIDF.EPConstructionStr, cnstr)
         if constructionStr:
             idfFile.write(constructionStr)
             #Check for materials.
             for mat in materials:
                 if not mat.upper() in EPMaterialCollection:
-                    materialStr = hb_writeIDF.EPMaterialStr(mat.upper())
+                    materialStr = hb_fragments.get(hb_writeIDF.libraryFingerprint('Material', mat.upper().strip(), materialLibs), \
+                                                   hb_writeIDF.EPMaterialStr, mat.upper())
                     if materialStr:
                         idfFile.write(materialStr)
                         EPMaterialCollection.append(mat.upper())
@@ -2216,7 +2311,9 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
             pass
             
         elif scheduleValues!=None:
-            idfFile.write(hb_writeIDF.EPSCHStr(schedule))
+            idfFile.write(hb_fragments.get(hb_writeIDF.libraryFingerprint('Schedule', schedule.upper(), \
+                                           ("honeybee_ScheduleLib", "honeybee_ScheduleTypeLimitsLib")), \
+                                           hb_writeIDF.EPSCHStr, schedule))
             
             if scheduleValues[0].lower() == "schedule:year":
                 numOfWeeklySchedules = int((len(scheduleValues)-2)/5)
@@ -2232,6 +2329,10 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
                     if value not in EPScheduleCollection:
                         EPScheduleCollection.append(value)
     
+    hb_fragments.endWrite()
+    print "%d materials, constructions and schedules are reused from the last run and %d are written." % \
+          (hb_fragments.hits, hb_fragments.misses)
+    
     print "[7 of 8] Writing loads and ideal air system..."
     listCount = 0
     listName = None
@@ -2330,6 +2431,10 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
     # request an output variable dictionary.
     idfFile.write(hb_writeIDF.requestVarDict())
     
+    # request an sql file so results can be queried without parsing the csv file.
+    if hb_EPPar.readSQLOutput(EPParameters):
+        idfFile.write(hb_writeIDF.requestSQLite())
+    
     # write the outputs requested by the user.
     if simulationOutputs:
         print "[8 of 8] Writing outputs..."
@@ -2367,9 +2472,31 @@ def main(north, epwFileAddress, EPParameters, analysisPeriod, HBZones, HBContext
     eioFileFullName = None
     rddFileName = None
     if runEnergyPlus:
-        print "Analysis is running!..."
-        # write the batch file
-        hb_runIDF.writeBatchFile(workingDir, idfFileName, epwFileAddress, sc.sticky["honeybee_folders"]["EPPath"], runEnergyPlus > 1)
+        # check if the same simulation has already been run
+        hb_simCache = sc.sticky["honeybee_SimulationCache"]()
+        shIdfFileName = idfFileName.replace('.idf', '')
+        scheduleFiles = [os.path.join(workingDir, os.path.basename(schFile)) for schFile in hb_writeIDF.fileBasedSchedules.keys()]
+        try:
+            cacheKey = hb_simCache.key(idfFileFullName, epwFileAddress, sc.sticky["honeybee_folders"]["EPVersion"], scheduleFiles)
+        except (IOError, OSError):
+            cacheKey = None
+        
+        if cacheKey and hb_simCache.get(cacheKey, workingDir, shIdfFileName):
+            print "The inputs are identical to a previous simulation. Results are loaded from the cache."
+        else:
+            print "Analysis is running!..."
+            # write the batch file
+            startTime = time.time() - 2
+            # remove the sql file of an older simulation so it won't be read instead of the new csv file
+            if not hb_EPPar.readSQLOutput(EPParameters):
+                oldSQLFile = os.path.join(workingDir, shIdfFileName + '.sql')
+                try:
+                    if os.path.isfile(oldSQLFile): os.remove(oldSQLFile)
+                except OSError:
+                    pass
+            hb_runIDF.writeBatchFile(workingDir, idfFileName, epwFileAddress, sc.sticky["honeybee_folders"]["EPPath"], runEnergyPlus > 1)
+            if cacheKey and hb_runIDF.isSuccessful(workingDir, shIdfFileName):
+                hb_simCache.put(cacheKey, workingDir, shIdfFileName, startTime)
         resultFileFullName = idfFileFullName.replace('.idf', '.csv')
         eioFileFullName = idfFileFullName.replace('.idf', '.eio')
         performanceSummaryReport = idfFileFullName.replace('.idf', 'Table.html');
@@ -32,6 +32,7 @@ Provided by Honeybee 0.0.63
         ptsVectors_: Point vectors
         _radParameters_: Radiance parameters
         _DSParameters_: Daysim parameters
+        useDCMatrix_: Set to True to calculate the annual illuminance from a daylight coefficient matrix (rcontrib) and a sky matrix of the weather file instead of running Daysim. The results can be recalculated for a new weather file or analysis period without a new ray-tracing run. Annual glare and dynamic shadings still need Daysim. Default is False.
     Returns:
         analysisRecipe: Recipe for annual climate based daylighting simulation
 """
@@ -91,6 +92,7 @@ def main():
     
     analysisRecipe = DLAnalysisRecipe(2, _epwWeatherFile, _testPoints, ptsVectors_,
                                       _radParameters_, _DSParameters_, testMesh_, math.degrees(northAngle), ghenv.Component)
+    analysisRecipe.useDCMatrix = bool(useDCMatrix_)
                                       
     if (_testPoints.DataCount==0 or isAllNone(_testPoints.AllData())) \
         and not (_DSParameters_ and _DSParameters_.runAnnualGlare \
@@ -121,6 +123,10 @@ def main():
     return analysisRecipe
 
 
+#useDCMatrix_ is a new input that older versions of the userObject don't have.
+try: useDCMatrix_
+except NameError: useDCMatrix_ = False
+
 if _epwWeatherFile and _testPoints:
     _testPoints.SimplifyPaths()
     ptsVectors_.SimplifyPaths()
@@ -42,9 +42,12 @@ Provided by Ladybug 0.0.57
         customHol_: Connect a list of DOYs (from 1 to 365) or a list of strings (example: DEC 25).
             -
             These will be added to any holidays in the epwFile holidays (if connected).
+        timestep_: An optional integer for the number of values per hour (from 1 to 60).  The default is set to 1 for hourly values.
+            -
+            Values for Until: times that are not on a timestep boundary follow the Interpolate to Timestep field of the schedule.  If the timestep is larger than 1 the output has values for a full year and the holiday schedule is used for the holidays.
     Returns:
         readMe!: ...
-        values: Hourly values that define the schedule.
+        values: Hourly values that define the schedule (or values for each timestep if timestep_ is set).
         holidays: Holidays that have been incorporated into the hourly values of the schedule.  Connect these to the 'holidays' output of the "Honeybee_Energy Simulation Par" component to have them factored into the simulation.
 """
 
@@ -176,7 +179,7 @@ def getNationalHols(country, weekStartWith):
     
     return countries[country]
 
-def addHolidays(startVals, holidayValues, weekStartWith, epwFile, customHolidays, lb_preparation):
+def getHolidayDOYs(weekStartWith, epwFile, customHolidays, lb_preparation):
     holidayDOYs = []
     if epwFile:
         #get the base code from EPW
@@ -232,6 +235,20 @@ def addHolidays(startVals, holidayValues, weekStartWith, epwFile, customHolidays
             if item-1 not in holidayDOYs:
                 holidayDOYs.append(item-1)
     
+    return holidayDOYs
+
+def fromDayToDate(day):
+    monthsDict = {'01':'JAN', '02':'FEB', '03':'MAR', '04':'APR', '05':'MAY', '06':'JUN',
+    '07':'JUL', '08':'AUG', '09':'SEP', '10':'OCT', '11':'NOV', '12':'DEC'}
+    dateDay = date.fromordinal(date(2015, 1, 1).toordinal() + day) # 2015 is not leap year
+    month, day = str(dateDay).split('-')[1:]
+    monthsDate = monthsDict[month]
+    dateFromDay = monthsDate + ' ' + day
+    return dateFromDay
+
+def addHolidays(startVals, holidayValues, weekStartWith, epwFile, customHolidays, lb_preparation):
+    holidayDOYs = getHolidayDOYs(weekStartWith, epwFile, customHolidays, lb_preparation)
+    
     # Edit the list of schedule values.
     for day in holidayDOYs:
         for interval in holidayValues:
@@ -239,21 +256,15 @@ def addHolidays(startVals, holidayValues, weekStartWith, epwFile, customHolidays
                 startVals[day] = interval[2]
     
     # Build up a list of holidays
-    def fromDayToDate(day, months):
-        dateDay = date.fromordinal(date(2015, 1, 1).toordinal() + day) # 2015 is not leap year
-        month, day = str(dateDay).split('-')[1:]
-        monthsDate = months[month]
-        dateFromDay = monthsDate + ' ' + day
-        return dateFromDay
     holidayDates = []
     for day in holidayDOYs:
-        holidayDates.append(fromDayToDate(day, monthsDict))
+        holidayDates.append(fromDayToDate(day))
     
     return startVals, holidayDates
 
 
 
-def main(schName, startDayOfTheWeek, epwFile, customHol):
+def main(schName, startDayOfTheWeek, epwFile, customHol, timestep):
     # Check the start day of the week.
     daysOfWeek = {'sun':0, 'mon':1, 'tue':2, 'wed':3, 'thu':4, 'fri':5, 'sat':6,
     'sunday':0, 'monday':1, 'tuesday':2, 'wednesday':3, 'thursday':4, 'friday':5, 'saturday':6}
@@ -272,6 +283,14 @@ def main(schName, startDayOfTheWeek, epwFile, customHol):
     else:
         startDayOfTheWeek = 0
     
+    try: timestep = int(timestep) if timestep != None else 1
+    except: timestep = 0
+    if timestep < 1 or timestep > 60 or 60 % timestep != 0:
+        warning = 'Input for timestep_ should be a divisor of 60 between 1 and 60.'
+        print warning
+        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, warning)
+        return -1
+    
     lb_preparation = sc.sticky["ladybug_Preparation"]()
     readSchedules = sc.sticky["honeybee_ReadSchedules"](schName, startDayOfTheWeek)
     
@@ -313,6 +332,21 @@ def main(schName, startDayOfTheWeek, epwFile, customHol):
             print msg
             ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
             return -1
+        elif timestep > 1:
+            holidayDOYs = []
+            if epwFile or customHol != []:
+                holidayDOYs = getHolidayDOYs(startDayOfTheWeek, epwFile, customHol, lb_preparation)
+                holidays = [fromDayToDate(day) for day in holidayDOYs]
+            schValues, comments = sc.sticky["honeybee_EPScheduleAUX"]().getScheduleDataByName(schName.upper())
+            readSchedules.schType = schValues[0].lower()
+            if not readSchedules.schType.startswith("schedule:week"):
+                readSchedules.getScheduleTypeLimitsData(schValues[1])
+            values = list(readSchedules.getScheduleArray(holidays = [day + 1 for day in holidayDOYs], timestep = timestep))
+            
+            strToBeFound = 'key:location/dataType/units/frequency/startsAt/endsAt'
+            header = [strToBeFound, readSchedules.schType, readSchedules.schName, \
+                      readSchedules.unit, '%d Timesteps per Hour' % timestep, (1, 1, 1), (12, 31, 24)]
+            return header + values, holidays
         else:
             dataGotten = True
             values = readSchedules.getScheduleValues()
@@ -381,7 +415,11 @@ else:
         "into canvas and try again."
         ghenv.Component.AddRuntimeMessage(w, warning)
 
+#timestep_ is a new input that older versions of the userObject don't have.
+try: timestep_
+except NameError: timestep_ = None
+
 if _schName != None:
-    result = main(_schName, _weekStartDay_, epwFileForHol_, customHol_)
+    result = main(_schName, _weekStartDay_, epwFileForHol_, customHol_, timestep_)
     if result != -1:
         values, holidays = result
@@ -65,6 +65,7 @@ Provided by Honeybee 0.0.63
             2 = Country: open, with scattered objects generally less than 10m high.
             3 = Ocean: Flat, unobstructed areas exposed to wind flowing over a large water body (no more than 500m inland).
         monthlyGrndTemps_: An optional list of 12 monthly ground temperatures to be used by those surfaces in contact with the ground in the simulation.  Please note that the EPW values out of the Import Ground Temp component are usually too extreme for a conditioned building.  If no values are input here, the model will attempt to estimate a reasonable starting base temperature from these results by using a value of 18C in cases of monthly ground temperatures below 18C, 24C in cases of monthly ground temperatures above 24C, and the actual ground temperature if the monthly average falls in between 18C and 24C.  Usually, ground temperatures will be about 2C lower than the overage indoor air temperature for a given month.
+        writeSQL_: Set to True to also write the results of the simulation into an SQLite file (Output:SQLite) next to the csv result file.  The "Read EP" components will read the results from this file when it exists, which is much faster than parsing the csv file for large models.  Reading the sql file needs sqlite3 which is not available in every version of IronPython. Without it the csv file, which is always written, will be used.  The default is set to False.
     Returns:
         energySimPar: Energy simulation parameters that can be plugged into the "Honeybee_ Run Energy Simulation" component.
 """
@@ -82,7 +83,7 @@ except: pass
 
 import Grasshopper.Kernel as gh
 
-def main(timestep, shadowCalcPar, solarDistribution, simulationControls, ddyFile, terrain, monthlyGrndTemps, holidays, startDayOfWeek, heatingSizingFactor, coolingSizingFactor):
+def main(timestep, shadowCalcPar, solarDistribution, simulationControls, ddyFile, terrain, monthlyGrndTemps, holidays, startDayOfWeek, heatingSizingFactor, coolingSizingFactor, writeSQL):
     solarDist = {
                 "0" : "MinimalShadowing",
                 "1" : "FullExterior",
@@ -141,9 +142,18 @@ def main(timestep, shadowCalcPar, solarDistribution, simulationControls, ddyFile
         heatingSizingFactor = 1.25
     if coolingSizingFactor == None:
         coolingSizingFactor = 1.15
+    if writeSQL == None:
+        writeSQL = False
+    if writeSQL:
+        try: import sqlite3
+        except ImportError:
+            warning = 'Reading the sql file needs sqlite3 which is not available in this version of IronPython.\n' + \
+                      'The sql file will be written but the "Read EP" components will read the results from the csv file.'
+            print warning
+            ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, warning)
     
     if (monthlyGrndTemps == [] or len(monthlyGrndTemps) == 12):
-        return [timestep] + shadowCalcPar + [solarDistribution] + simulationControls + [ddyFile] + [terrain] + [monthlyGrndTemps] + [holidays]  + [startDayOfWeek] + [heatingSizingFactor] + [coolingSizingFactor]
+        return [timestep] + shadowCalcPar + [solarDistribution] + simulationControls + [ddyFile] + [terrain] + [monthlyGrndTemps] + [holidays]  + [startDayOfWeek] + [heatingSizingFactor] + [coolingSizingFactor] + [writeSQL]
     else:
         if monthlyGrndTemps != [] and len(monthlyGrndTemps) != 12:
             warning = 'monthlyGrndTemps_ must either be left blank or contain 12 values representing the average ground temperature for each month.'
@@ -151,6 +161,10 @@ def main(timestep, shadowCalcPar, solarDistribution, simulationControls, ddyFile
         ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, warning)
         return None
 
+#writeSQL_ is a new input that older versions of the userObject don't have.
+try: writeSQL_
+except NameError: writeSQL_ = False
+
 energySimPar = main(timestep_, shadowCalcPar_, solarDistribution_, simulationControls_,
                    ddyFile_, terrain_, monthlyGrndTemps_, holidays_, startDayOfWeek_,
-                   heatingSizingFactor_, coolingSizingFactor_)
\ No newline at end of file
+                   heatingSizingFactor_, coolingSizingFactor_, writeSQL_)
\ No newline at end of file
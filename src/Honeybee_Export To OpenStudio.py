@@ -616,10 +616,10 @@ class WriteOPS(object):
         
         numberOfDaySch = int((len(values) - 3) /2)
 
+        parseUntilTime = sc.sticky["honeybee_EPScheduleEngine"].parseUntilTime
         for i in range(numberOfDaySch):
-            untilTime = map(int, values[2 * i + 3].split(":"))
-            fractionalTime = untilTime[0] +  untilTime[1]/60
-            osUntilTime = ops.Time(fractionalTime/24)
+            untilMinutes = parseUntilTime(values[2 * i + 3])
+            osUntilTime = ops.Time(0, untilMinutes // 60, untilMinutes % 60)
             scheduleDay.addValue(osUntilTime, float(values[2 * i + 4]))
             
         return scheduleDay
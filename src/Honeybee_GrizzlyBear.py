@@ -548,8 +548,6 @@ class WritegbXML(object):
                         gb.DaySchedule[ct] = dysch
                         dysch.id = scheduleName.replace(" ","_")
                         #dysch.Name = scheduleName
-                        startime = 0
-                        timecount = 0
                         schv = gbx.BasicSerialization.setScheduleValuesArray(24)
                         dysch.ScheduleValue = schv
                         for layer in range(1, numberOfLayers):
@@ -564,23 +562,14 @@ class WritegbXML(object):
                                     stype = scheduleData[layer][0]
                                 stype = stype.strip()
                                 dysch.type = wgb.assignScheduleTypes(stype)
-                                
-                            elif (re.match("(Time)(.*)",d)):
-                                logging.info('found time in hb object for day schedule')
-                                startdate = scheduleData[layer][0]
-                                #this works fine for this particular convention
-                                val = scheduleData[layer+1][0]
-                                t = re.match('(\d+)(:)(\d+)',startdate)
-                                if t:
-                                    curtime = int(t.group(1))
-                                   
-                                    timecount = curtime - startime
-                                    for i in range(0,timecount):
-                                        tim = i+startime
-                                        sv = gbx.ScheduleValue()
-                                        sv.value = float(val)
-                                        schv[tim] = sv
-                                    startime = curtime
+                        
+                        logging.info('found time in hb object for day schedule')
+                        #hourly values of the day schedule
+                        dayValues = sc.sticky["honeybee_EPScheduleEngine"].dayValues(scheduleName)
+                        for tim, val in enumerate(dayValues):
+                            sv = gbx.ScheduleValue()
+                            sv.value = float(val)
+                            schv[tim] = sv
                                 
                         
                     else:
@@ -82,6 +82,18 @@ import uuid
 import re
 import random
 import zipfile
+import array
+import operator
+import threading
+import Queue
+import hashlib
+import struct
+import shlex
+import zlib
+try: import sqlite3
+except ImportError: sqlite3 = None
+try: import mmap
+except ImportError: mmap = None
 
 PI = math.pi
 
@@ -374,6 +386,130 @@ class hb_findFolders():
         return None, None
 
 
+class hb_StartupTimer(object):
+    """Collect the time that each step of loading Honeybee takes."""
+    
+    def __init__(self):
+        self.times = []
+        self.stepStartTime = time.time()
+    
+    def step(self, name):
+        """Record the time since the last step."""
+        now = time.time()
+        self.times.append((name, now - self.stepStartTime))
+        self.stepStartTime = now
+    
+    def add(self, name, seconds):
+        self.times.append((name, seconds))
+    
+    def report(self):
+        lines = ["%s: %.2f seconds" % (name, seconds) for name, seconds in self.times]
+        return "\n".join(lines)
+
+
+class hb_LazyLoader(object):
+    """Run a loading function once, the first time that its result is needed.
+    
+    Args:
+        name: Name of what is loaded to be used in the report.
+        loadFunc: A function with no arguments that loads the data.
+        timer: Optional hb_StartupTimer to record the loading time.
+    """
+    
+    def __init__(self, name, loadFunc, timer = None):
+        self.name = name
+        self.loadFunc = loadFunc
+        self.timer = timer
+        self.loaded = False
+        self.loading = False
+    
+    def load(self):
+        # the libraries are filled by the function so they don't load again while it runs
+        if self.loaded or self.loading: return
+        self.loading = True
+        startTime = time.time()
+        try:
+            self.loadFunc()
+        except Exception, e:
+            msg = "Failed to load %s:\n%s" % (self.name, e)
+            print msg
+            try: ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, msg)
+            except: pass
+            return
+        finally:
+            self.loading = False
+        self.loaded = True
+        elapsed = time.time() - startTime
+        if self.timer: self.timer.add(self.name + " (on first use)", elapsed)
+        print "%s loaded in %.2f seconds." % (self.name, elapsed)
+
+
+class hb_LazyLibrary(object):
+    """A dictionary-like library that is filled by a hb_LazyLoader the first time it is used.
+    
+    Libraries in sc.sticky (e.g. honeybee_materialLib) are replaced with this class
+    so the library files are only parsed when a component needs them. Every access
+    goes through the mapping methods below and loads the library first. The class
+    doesn't subclass dict on purpose so dict(lib), dict.update(d, lib), copy and
+    **lib can't read the library before it is loaded.
+    
+    Args:
+        loader: hb_LazyLoader that fills the library.
+        items: Optional dictionary of the items that are already in the library.
+    """
+    
+    def __init__(self, loader, items = None):
+        self.loader = loader
+        # keep the items of a library from the last time honeybee flew without loading it
+        if isinstance(items, hb_LazyLibrary): items = items.library
+        # the items of the library. use it directly only from the loader.
+        self.library = dict(items or {})
+    
+    def load(self):
+        self.loader.load()
+        return self.library
+    
+    def __getitem__(self, key): return self.load()[key]
+    def __setitem__(self, key, value): self.load()[key] = value
+    def __delitem__(self, key): del self.load()[key]
+    def __contains__(self, key): return key in self.load()
+    def __iter__(self): return iter(self.load())
+    def __len__(self): return len(self.load())
+    def __nonzero__(self): return len(self.load()) != 0
+    def __repr__(self): return repr(self.load())
+    
+    def __eq__(self, other):
+        if isinstance(other, hb_LazyLibrary): other = other.load()
+        return self.load() == other
+    
+    def __ne__(self, other): return not self == other
+    
+    # a copy of a library is a normal dictionary
+    def __copy__(self): return self.copy()
+    def __deepcopy__(self, memo): return copy.deepcopy(self.load(), memo)
+    def copy(self): return self.load().copy()
+    
+    def keys(self): return self.load().keys()
+    def values(self): return self.load().values()
+    def items(self): return self.load().items()
+    def iterkeys(self): return self.load().iterkeys()
+    def itervalues(self): return self.load().itervalues()
+    def iteritems(self): return self.load().iteritems()
+    def has_key(self, key): return key in self.load()
+    def get(self, key, default = None): return self.load().get(key, default)
+    def pop(self, key, *default): return self.load().pop(key, *default)
+    def popitem(self): return self.load().popitem()
+    def setdefault(self, key, default = None): return self.load().setdefault(key, default)
+    def clear(self): self.load().clear()
+    
+    def update(self, *args, **kwargs):
+        library = self.load()
+        for other in args:
+            if isinstance(other, hb_LazyLibrary): other = other.load()
+            library.update(other)
+        library.update(kwargs)
+
+
 class PrepareTemplateEPLibFiles(object):
     """
     Download Template files and check for available libraries for EnergyPlus
@@ -529,8 +665,56 @@ class PrepareTemplateEPLibFiles(object):
         return libFilePaths
 
 
+class EPLibraryObject(object):
+    """A compact EnergyPlus library object.
+    
+    Args:
+        objClass: EnergyPlus class (e.g. Material:NoMass).
+        name: Object name in upper case.
+        fields: Tuple of (value, comment) for the fields after the name. Fields
+            that couldn't be read are None.
+    """
+    __slots__ = ('objClass', 'name', 'fields')
+    
+    def __init__(self, objClass, name, fields):
+        self.objClass = objClass
+        self.name = name
+        self.fields = fields
+    
+    @property
+    def shortKey(self):
+        return self.objClass.split(":")[0]
+    
+    @property
+    def comments(self):
+        return tuple(field[1] if field else None for field in self.fields)
+    
+    def toTuple(self):
+        return self.objClass, self.name, self.fields
+    
+    def toLibraryDict(self):
+        """Convert the object to the dictionary format of Honeybee libraries.
+        
+        {0: objClass, 1: (value, comment), 2: (value, comment), ...}
+        """
+        objDict = {0: self.objClass}
+        for count, field in enumerate(self.fields):
+            if field is not None:
+                objDict[count + 1] = field
+        return objDict
+    
+    def __repr__(self):
+        return "%s: %s" % (self.objClass, self.name)
+
+
 class HB_GetEPLibraries:
     
+    libraryKeys = ("Material", "WindowMaterial", "Construction", "Schedule", "ScheduleTypeLimits",
+                   "WindowProperty", "MaterialProperty")
+    
+    # change this if the format of the cached library changes
+    cacheVersion = 1
+    
     def __init__(self):
         self.libraries = {
             "Material": {},
@@ -567,14 +751,14 @@ class HB_GetEPLibraries:
     def getTHERMMaterials(self):
         return self.libraries["ThermMaterial"]
     
-    def importEPLibrariesFromFile(self, EPfile, isMatFile, cleanCurrentLib = True, report = True):
+    def importEPLibrariesFromFile(self, EPfile, isMatFile, cleanCurrentLib = True, report = True, useCache = False):
         if not os.path.isfile(EPfile):
             raise Exception("Can't find EP library! at %s"%EPfile)
         
         if isMatFile == False:
             print "Loading EP materials, constructions, schedules and material properties from %s"%EPfile
-            EPObjects = self.getEnergyPlusObjectsFromFile(EPfile)
-            self.loadEPConstructionsMaterialsAndSchedules(EPObjects, cleanCurrentLib)
+            EPObjects = self.readEPLibraryObjects(EPfile, useCache)
+            self.loadEPLibraryObjects(EPObjects, cleanCurrentLib)
         else:
             print "Loading THERM materials from %s"%EPfile
             self.getThermObjectsFromFile(EPfile)
@@ -594,72 +778,194 @@ class HB_GetEPLibraries:
             "MaterialProperty": {}
             }
             
-    # TODO: Support parsing for files with no next line
-    # TODO: Check if keys can be case insensitive
-    # TODO: Create EPObjects and not dictionaries
     def loadEPConstructionsMaterialsAndSchedules(self, EPObjectsString, cleanCurrentLib = True):
+        EPObjects = (self.parseEPObjectLines(EPObjectStr.strip().split("\n")) \
+                     for EPObjectStr in EPObjectsString)
+        self.loadEPLibraryObjects(EPObjects, cleanCurrentLib)
+    
+    def loadEPLibraryObjects(self, EPObjects, cleanCurrentLib = True):
+        """Add EPLibraryObjects to the libraries."""
         if cleanCurrentLib: self.cleanHBLibs()
         
-        for EPObjectStr in EPObjectsString:
-            rawLines = EPObjectStr.strip().split("\n")
-            lines = []
-            for line in rawLines:
-                if line.strip() == '' or line.startswith('!'): continue
-                lines.append(line)
+        for EPObject in EPObjects:
+            if EPObject is None: continue
+            shortKey = EPObject.shortKey
+            if shortKey in self.libraries:
+                self.libraries[shortKey][EPObject.name] = EPObject.toLibraryDict()
+    
+    # TODO: Check if keys can be case insensitive
+    def parseEPObjectLines(self, rawLines):
+        """Create an EPLibraryObject from the lines of an EnergyPlus object.
+        
+        The first field of each line is the value of the field and the text after
+        ! is the comment. Returns None if the object is not a library object.
+        
+        Args:
+            rawLines: Lines of the object. The first line should start with the class name.
+        """
+        lines = [line for line in rawLines if line.strip() != '' and not line.startswith('!')]
+        
+        if not lines:
+            return None
+        
+        if lines[0].startswith('MaterialProperty:GlazingSpectralData'):
+            # spectral data have several values in each line. keep the line as one field.
+            fields = []
+            for line in lines[2:]:
+                objValue = line.split("!")[0].strip()
+                try: objDescription = line.split("!")[1].strip()
+                except:  objDescription = ""
+                if objValue.endswith(",") or objValue.endswith(";"):
+                    fields.append((objValue[:-1], objDescription))
+                else:
+                    fields.append(None)
             
-            if not lines:
+            if len(lines) < 2: return None
+            objClass = lines[0].split("!")[0].strip()[:-1]
+            name = lines[1].split(",")[0].strip().upper()
+            return EPLibraryObject(objClass, name, tuple(fields))
+        
+        if len(lines) < 2: return None
+        
+        objClass = lines[0].split(",")[0].strip()
+        if objClass.isupper(): objClass = objClass.title()
+        
+        if objClass.split(":")[0] not in self.libraryKeys: return None
+        
+        values = lines[2:]
+        if values:
+            name = lines[1].split(",")[0].strip().upper()
+        else:
+            # it's a two line object such as Any Number scheduleTypeLimit
+            name = lines[1].split(";")[0].strip().upper() # name is the last input
+        
+        fields = []
+        lastCount = len(values) - 1
+        for count, value in enumerate(values):
+            delimiter = ";" if count == lastCount else ","
+            v = value.split(delimiter)[0].strip() # find the  value
+            if value.find("!")!= -1:
+                c = value.split("!")[-1].rstrip() # find the  comment
+            else:
+                c = ""
+            fields.append((v, c))
+        
+        return EPLibraryObject(objClass, name, tuple(fields))
+    
+    @staticmethod
+    def iterEPObjectLines(lines):
+        """Split the lines of an EnergyPlus file into objects in one pass.
+        
+        Objects are separated by ; and the text after the ; on the same line
+        (usually the comment of the last field) is the start of the next object.
+        
+        Args:
+            lines: An iterable of lines (e.g. an open file).
+        
+        Returns:
+            A generator of lists. Each list has the lines of one object. Leading white
+            spaces are removed from the first line.
+        """
+        objLines = []
+        for line in lines:
+            if line.endswith("\n"): line = line[:-1]
+            if ";" not in line:
+                if objLines or line.strip():
+                    objLines.append(line)
                 continue
             
-            if lines[0].startswith('MaterialProperty:GlazingSpectralData'):
-                key = 'MaterialProperty:GlazingSpectralData'
-                shortKey = 'MaterialProperty'
-                name = lines[1].split(",")[0].strip().upper()
-                self.libraries[shortKey][name] = dict() # create an empty dictonary
-                self.libraries[shortKey][name][0] = key
-                # store the data into the dictionary
-                for lineCount, line in enumerate(lines):
-                    objValue = line.split("!")[0].strip()
-                    try: objDescription = line.split("!")[1].strip()
-                    except:  objDescription = ""
-                    if lineCount == 0:
-                        self.libraries[shortKey][name][lineCount] = objValue[:-1]
-                    elif lineCount == 1:
-                        pass # name is already there as the key
-                    elif objValue.endswith(","):
-                        self.libraries[shortKey][name][lineCount-1] = objValue[:-1], objDescription
-                    elif objValue.endswith(";"):
-                        self.libraries[shortKey][name][lineCount-1] = objValue[:-1], objDescription
-            else:
-                if len(lines) < 2: continue
+            parts = line.split(";")
+            current = parts[0]
+            for part in parts[1:]:
+                if not objLines and not current:
+                    # an empty object. ; is the start of the next object
+                    current = ";" + part
+                    continue
+                objLines.append(current + ";")
+                objLines[0] = objLines[0].lstrip()
+                yield objLines
+                objLines = []
+                current = part
+            
+            if objLines or current.strip():
+                objLines.append(current)
+    
+    def readEPLibraryObjects(self, epFilePath, useCache = False):
+        """Read library objects from an EnergyPlus file.
+        
+        Args:
+            epFilePath: Path to EnergyPlus file.
+            useCache: Set to True to save the parsed objects in a binary file in
+                Honeybee default folder and reuse it while the file is not changed.
+        
+        Returns:
+            A list of EPLibraryObjects.
+        """
+        if not os.path.isfile(epFilePath):
+            raise ValueError("Can't find %s."%epFilePath)
+        
+        if useCache:
+            EPObjects = self.readEPLibraryCache(epFilePath)
+            if EPObjects is not None: return EPObjects
+        
+        with open(epFilePath, "r") as epFile:
+            EPObjects = [self.parseEPObjectLines(objLines) \
+                         for objLines in self.iterEPObjectLines(epFile)]
+        EPObjects = [EPObject for EPObject in EPObjects if EPObject is not None]
+        
+        if useCache:
+            self.writeEPLibraryCache(epFilePath, EPObjects)
+        
+        return EPObjects
+    
+    @staticmethod
+    def fileHash(filePath):
+        md5 = hashlib.md5()
+        with open(filePath, "rb") as inf:
+            while True:
+                block = inf.read(1048576)
+                if not block: break
+                md5.update(block)
+        return md5.hexdigest()
+    
+    def libraryCacheFile(self, epFilePath):
+        cacheFolder = os.path.join(sc.sticky["Honeybee_DefaultFolder"], "libraryCache")
+        pathHash = hashlib.md5(os.path.abspath(epFilePath).lower()).hexdigest()[:8]
+        return os.path.join(cacheFolder, "%s_%s.pkl" % (os.path.basename(epFilePath), pathHash))
+    
+    def readEPLibraryCache(self, epFilePath):
+        """Return cached EPLibraryObjects for the file or None if the cache is not valid."""
+        cacheFile = self.libraryCacheFile(epFilePath)
+        if not os.path.isfile(cacheFile): return None
+        
+        try:
+            with open(cacheFile, "rb") as inf:
+                header = pickle.load(inf)
+                if header["version"] != self.cacheVersion: return None
                 
-                if lines[0].split(",")[0].strip().isupper():
-                    key = lines[0].split(",")[0].strip().title()
-                else:
-                    key = lines[0].split(",")[0].strip()
-                shortKey = key.split(":")[0]
-                
-                name = lines[1].split(",")[0].strip().upper()
-                values = lines[2:]
-                # it's a two line object such as Any Number scheduleTypeLimit
-                if values == []:
-                    name = lines[1].split(";")[0].strip().upper() # name is the last input
-                    
-                if shortKey in self.libraries:
-                    self.libraries[shortKey][name] = dict() # create an empty dictonary
-                    self.libraries[shortKey][name][0] = key
-                    
-                    count = 1
-                    delimiter = ","
-                    for value in values:
-                        if not len(value.strip()): continue #pass empty lines
-                        if count==len(values): delimiter = ";"
-                        v = value.split(delimiter)[0].strip() # find the  value
-                        if value.find("!")!= -1:
-                            c = value.split("!")[-1].rstrip() # find the  value
-                        else:
-                            c = ""
-                        self.libraries[shortKey][name][count] = v, c
-                        count += 1
+                fileStat = os.stat(epFilePath)
+                if (header["mtime"], header["size"]) != (fileStat.st_mtime, fileStat.st_size):
+                    # the file is touched. check if the content is changed
+                    if header["hash"] != self.fileHash(epFilePath): return None
+                
+                return [EPLibraryObject(*objTuple) for objTuple in pickle.load(inf)]
+        except Exception, e:
+            print "Failed to load the library cache %s:\n%s" % (cacheFile, e)
+            return None
+    
+    def writeEPLibraryCache(self, epFilePath, EPObjects):
+        cacheFile = self.libraryCacheFile(epFilePath)
+        fileStat = os.stat(epFilePath)
+        header = {"version": self.cacheVersion, "mtime": fileStat.st_mtime,
+                  "size": fileStat.st_size, "hash": self.fileHash(epFilePath)}
+        try:
+            if not os.path.isdir(os.path.dirname(cacheFile)):
+                os.makedirs(os.path.dirname(cacheFile))
+            with open(cacheFile, "wb") as outf:
+                pickle.dump(header, outf, 2)
+                pickle.dump([EPObject.toTuple() for EPObject in EPObjects], outf, 2)
+        except Exception, e:
+            print "Failed to write the library cache %s:\n%s" % (cacheFile, e)
     
     def report(self): 
         # Report findings
@@ -815,53 +1121,56 @@ class RADMaterialAux(object):
         self.radMatTypes = ["plastic", "glass", "trans", "metal", "mirror", "texfunc", "mixedfunc", "dielectric", "transdata", "light", "glow"]
         
         if reloadRADMaterial:
-                        
-            defaultMaterial = {
-                'Context_Material'  : {'type' : 'plastic', 'value': 0.35},
-                'Interior_Ceiling'  : {'type' : 'plastic', 'value': 0.80},
-                'Interior_Floor'    : {'type' : 'plastic', 'value': 0.20},
-                'Exterior_Floor'    : {'type' : 'plastic', 'value': 0.20},
-                'Exterior_Roof'     : {'type' : 'plastic', 'value': 0.80},
-                'Exterior_Wall'     : {'type' : 'plastic', 'value': 0.50},
-                'Interior_Wall'     : {'type' : 'plastic', 'value': 0.50},
-                'Interior_Window'     : {'type' : 'glass'  , 'value': 0.60},
-                'Exterior_Window'     : {'type' : 'glass'  , 'value': 0.60}
-                }
-            
-            for materialName, materialData in defaultMaterial.items():
-                radMaterial = self.RadianceMaterial(materialName, materialData['type'])
-                value = materialData['value']
-                
-                # add values to material
-                # first two lines are empty
-                radMaterial.addValues(0, [])
-                radMaterial.addValues(1, [])
-                if radMaterial.type == 'glass':
-                    value = self.getTransmissivity(value)
-                    radMaterial.addValues(2, 3 * ['%.3f'%value]) # leave roughness specularity to 0
-                else:
-                    radMaterial.addValues(2, 3 * ['%.3f'%value] + ['0', '0']) # leave roughness specularity to 0
-            
-                # add default materials to the library
-                self.addMaterialToDocumentLibrary(radMaterial)
-            
-            # import user defined RAD library
-            RADLibraryFile = self.getUserDefinedRadianceLibraryPath()
+            self.loadRADMaterials()
+    
+    def loadRADMaterials(self):
+        """Add default materials and the materials in user's library to the library."""
+        defaultMaterial = {
+            'Context_Material'  : {'type' : 'plastic', 'value': 0.35},
+            'Interior_Ceiling'  : {'type' : 'plastic', 'value': 0.80},
+            'Interior_Floor'    : {'type' : 'plastic', 'value': 0.20},
+            'Exterior_Floor'    : {'type' : 'plastic', 'value': 0.20},
+            'Exterior_Roof'     : {'type' : 'plastic', 'value': 0.80},
+            'Exterior_Wall'     : {'type' : 'plastic', 'value': 0.50},
+            'Interior_Wall'     : {'type' : 'plastic', 'value': 0.50},
+            'Interior_Window'     : {'type' : 'glass'  , 'value': 0.60},
+            'Exterior_Window'     : {'type' : 'glass'  , 'value': 0.60}
+            }
+        
+        for materialName, materialData in defaultMaterial.items():
+            radMaterial = self.RadianceMaterial(materialName, materialData['type'])
+            value = materialData['value']
             
-            if os.path.isfile(RADLibraryFile):
-                self.importRADMaterialsFromFile(RADLibraryFile)
+            # add values to material
+            # first two lines are empty
+            radMaterial.addValues(0, [])
+            radMaterial.addValues(1, [])
+            if radMaterial.type == 'glass':
+                value = self.getTransmissivity(value)
+                radMaterial.addValues(2, 3 * ['%.3f'%value]) # leave roughness specularity to 0
             else:
-                # This is only happening the first time
-                # that user lets the Honeybee fly on their system
-                # or changes the default folder
-                if not os.path.isdir(self.HoneybeeFolder):
-                    os.mkdir(self.HoneybeeFolder)
-                with open(RADLibraryFile, "w") as outf:
-                    outf.write("#Honeybee Radiance Material Library\n")
-            
-            
-            print "Loading RAD default materials..." + \
-                  `len(self.radMaterialLibrary)` + " RAD materials are loaded\n"
+                radMaterial.addValues(2, 3 * ['%.3f'%value] + ['0', '0']) # leave roughness specularity to 0
+        
+            # add default materials to the library
+            self.addMaterialToDocumentLibrary(radMaterial)
+        
+        # import user defined RAD library
+        RADLibraryFile = self.getUserDefinedRadianceLibraryPath()
+        
+        if os.path.isfile(RADLibraryFile):
+            self.importRADMaterialsFromFile(RADLibraryFile)
+        else:
+            # This is only happening the first time
+            # that user lets the Honeybee fly on their system
+            # or changes the default folder
+            if not os.path.isdir(self.HoneybeeFolder):
+                os.mkdir(self.HoneybeeFolder)
+            with open(RADLibraryFile, "w") as outf:
+                outf.write("#Honeybee Radiance Material Library\n")
+        
+        
+        print "Loading RAD default materials..." + \
+              `len(self.radMaterialLibrary)` + " RAD materials are loaded\n"
             
     def duplicateMaterialWarning(self, materialName, newMaterialString):
         returnYN = {'YES': True, 'NO': False}
@@ -1299,6 +1608,8 @@ class DLAnalysisRecipe:
             self.sectionPlane = arg[7]
             self.backupImages =  arg[8]
             self.studyFolder = "\\imageBasedSimulation\\"
+            # render a quick preview and then the final image in tiles
+            self.progressive = False
             
         elif type == 1:
             self.skyFile = arg[0]
@@ -1320,6 +1631,9 @@ class DLAnalysisRecipe:
             self.testMesh = self.convertTreeToLists(arg[5])
             self.northDegrees = arg[6]
             self.studyFolder = "\\annualSimulation\\"
+            # use rcontrib and a sky matrix instead of Daysim
+            self.useDCMatrix = False
+            self.skyDensity = 1
         
         elif type == 3:
             self.skyFile = arg[0]
@@ -1390,6 +1704,97 @@ class DLAnalysisRecipe:
     def __repr__(self):
         return "Honybee.Recipe.%s"%self.studyFolder.replace("\\", "")
 
+class hb_RADWriter(object):
+    """Buffered writer for Radiance and OBJ geometry files.
+    
+    The geometry is rendered into a list of strings with one format operation for
+    each vertex and the list is written to the file in large blocks instead of one
+    write for each vertex.
+    
+    Usage:
+        with hb_RADWriter(radFilePath) as writer:
+            writer.write(hb_RADWriter.polygonStr("glass", "window_0", points))
+    """
+    coordinateFormat = "%.4f  %.4f  %.4f\n"
+    
+    def __init__(self, filePath, mode = "w", bufferSize = 1048576):
+        self.file = open(filePath, mode)
+        self.bufferSize = bufferSize
+        self.buffer = []
+        self.bufferedSize = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def write(self, text):
+        self.buffer.append(text)
+        self.bufferedSize += len(text)
+        if self.bufferedSize >= self.bufferSize: self.flush()
+    
+    def writelines(self, lines):
+        for line in lines:
+            self.buffer.append(line)
+            self.bufferedSize += len(line)
+        if self.bufferedSize >= self.bufferSize: self.flush()
+    
+    def flush(self):
+        if self.buffer:
+            self.file.write("".join(self.buffer))
+            self.buffer = []
+            self.bufferedSize = 0
+    
+    def close(self):
+        self.flush()
+        self.file.close()
+    
+    # format strings for polygons by number of vertices
+    polygonFormats = {}
+    
+    @classmethod
+    def coordinatesStr(cls, points):
+        return "".join([cls.coordinateFormat % (pt.X, pt.Y, pt.Z) for pt in points])
+    
+    @classmethod
+    def polygonStr(cls, modifier, name, points):
+        numOfPoints = len(points)
+        try:
+            polygonFormat = cls.polygonFormats[numOfPoints]
+        except KeyError:
+            polygonFormat = "%s polygon %s\n0\n0\n" + str(numOfPoints * 3) + "\n" + \
+                            cls.coordinateFormat * numOfPoints + "\n"
+            cls.polygonFormats[numOfPoints] = polygonFormat
+        
+        values = [modifier, name]
+        for pt in points:
+            values.extend((pt.X, pt.Y, pt.Z))
+        return polygonFormat % tuple(values)
+    
+    def objMesh(self, mesh, objectName, matName, vertexOffset = 0, hasTexture = False):
+        """Write a Rhino mesh as an OBJ object.
+        
+        vertexOffset is the number of vertices that are already written to the file.
+        """
+        self.write("o " + objectName + "\n" + "usemtl " + matName + "\n")
+        self.writelines(["v %s %s %s\n" % (v.X, v.Y, v.Z) for v in mesh.Vertices])
+        self.writelines(["vt %s %s\n" % (vt.X, vt.Y) for vt in mesh.TextureCoordinates])
+        self.writelines(["vn %s %s %s\n" % (vn.X, vn.Y, vn.Z) for vn in mesh.Normals])
+        
+        # the same index is used for vertex, texture and normal
+        if hasTexture:
+            triangleFormat = "f %(a)d/%(a)d/%(a)d %(b)d/%(b)d/%(b)d %(c)d/%(c)d/%(c)d\n"
+            quadFormat = "f %(a)d/%(a)d/%(a)d %(b)d/%(b)d/%(b)d %(c)d/%(c)d/%(c)d %(d)d/%(d)d/%(d)d\n"
+        else:
+            triangleFormat = "f %(a)d//%(a)d %(b)d//%(b)d %(c)d//%(c)d\n"
+            quadFormat = "f %(a)d//%(a)d %(b)d//%(b)d %(c)d//%(c)d %(d)d//%(d)d\n"
+        
+        offset = vertexOffset + 1
+        self.writelines([(quadFormat if face.IsQuad else triangleFormat) % \
+                         {"a": face.A + offset, "b": face.B + offset, "c": face.C + offset, "d": face.D + offset} \
+                         for face in mesh.Faces])
+
 class hb_MSHToRAD(object):
     
     def __init__(self, mesh, fileName = None, workingDir = None, bitmap = None, radMaterial = None):
@@ -1410,6 +1815,9 @@ class hb_MSHToRAD(object):
         
         self.RadianceFolder = sc.sticky["honeybee_folders"]["RADPath"]
          
+        # warnings of the export to be shown by the component
+        self.warnings = []
+        
         self.pattern = bitmap
         if self.pattern != None:
             # create material name based on bitmap
@@ -1437,83 +1845,24 @@ class hb_MSHToRAD(object):
     def meshToObj(self):
         objFilePath = os.path.join(self.workingDir, self.name + ".obj")
         
-        with open(objFilePath, "w") as outfile:
+        with hb_RADWriter(objFilePath) as outfile:
             
-            # objTxt = "# OBJ file written by TurtlePyMesh\n\n"
             outfile.write("# OBJ file written by TurtlePyMesh\n\n")
             
             # add material file name
             mtlFile = self.name + ".mtl"
-            #objTxt += "mtllib " + mtlFile + "\n"
             outfile.write("mtllib " + mtlFile + "\n")
             
+            # vertices number is global so the number should be added together
+            fCounter = 0
             for count, Tmesh in enumerate(self.mesh):
-                # add object name - for this version I keep it all as a single object
-                #objTxt += "o object_" + str(count + 1) + "\n"
-                outfile.write("o object_" + str(count + 1) + "\n")
-                
-                # add material name - for now brick as test
-                #objTxt += "usemtl " + matName + "\n"
-                outfile.write("usemtl " + self.matName + "\n")
-                
                 if Tmesh.Normals.Count == 0:
                     Tmesh.Normals.ComputeNormals()
-                    
-                # add vertices
-                for v in Tmesh.Vertices:
-                    XYZ = v.X, v.Y, v.Z
-                    XYZ = map(str, XYZ)
-                    vString = " ".join(XYZ)
-                    #objTxt += "v "  + vString + "\n"
-                    outfile.write("v "  + vString + "\n")
-                # add texture vertices
-                for vt in Tmesh.TextureCoordinates:
-                    XY = vt.X, vt.Y
-                    XY = map(str, XY)
-                    vtString = " ".join(XY)
-                    #objTxt += "vt "  + vtString + "\n"
-                    outfile.write("vt "  + vtString + "\n")
-                # add normals
-                for vn in Tmesh.Normals:
-                    XYZ = vn.X, vn.Y, vn.Z
-                    XYZ = map(str, XYZ)
-                    vnString = " ".join(XYZ)
-                    # objTxt += "vn "  + vnString + "\n"
-                    outfile.write("vn "  + vnString + "\n")
-                # add faces
-                # vertices number is global so the number should be added together
-                fCounter = 0
-                
-                if count > 0:
-                    for meshCount in range(count):
-                        fCounter += self.mesh[meshCount].Vertices.Count
-                
-                # print fCounter
-                if self.pattern != None:
-                    for face in Tmesh.Faces:
-                        # objTxt += "f " + "/".join(3*[`face.A  + fCounter + 1`]) + " " + "/".join(3*[`face.B + fCounter + 1`]) + " " + "/".join(3*[`face.C + fCounter + 1`])
-                        outfile.write("f " + "/".join(3*[`face.A  + fCounter + 1`]) + " " + "/".join(3*[`face.B + fCounter + 1`]) + " " + "/".join(3*[`face.C + fCounter + 1`]))
-                        if face.IsQuad:
-                            #objTxt += " " + "/".join(3*[`face.D + fCounter + 1`])
-                            outfile.write(" " + "/".join(3*[`face.D + fCounter + 1`]))
-                            
-                        #objTxt += "\n"
-                        outfile.write("\n")
-                else:
-                    for face in Tmesh.Faces:
-                        outfile.write("f " + "//".join(2 * [`face.A  + fCounter + 1`]) + \
-                                      " " + "//".join(2 * [`face.B + fCounter + 1`]) + \
-                                      " " + "//".join(2 * [`face.C + fCounter + 1`]))
-                        
-                        if face.IsQuad:
-                            outfile.write(" " + "//".join( 2 * [`face.D + fCounter + 1`]))
-                            
-                        #objTxt += "\n"
-                        outfile.write("\n")
-                        
-        # This method happened to be so slow!
-        #    with open(objFile, "w") as outfile:
-        #        outfile.writelines(objTxt)
+                
+                # for this version I keep it all as a single material
+                outfile.objMesh(Tmesh, "object_" + str(count + 1), self.matName, fCounter, \
+                                self.pattern != None)
+                fCounter += Tmesh.Vertices.Count
         
         return objFilePath
     
@@ -1525,7 +1874,13 @@ class hb_MSHToRAD(object):
                     Y, YSize, X, XSize = line.split(" ")
                     return XSize, YSize
     
-    def objToRAD(self, objFile):
+    def objToRAD(self, objFile, meshPrimitive = False):
+        """Convert the .obj file to Radiance and return the material and rad files.
+        
+        Meshes with a texture and meshes with meshPrimitive set to True are compiled
+        by obj2mesh into a Radiance mesh with shared vertices. The compiled meshes are
+        cached by content. Otherwise obj2rad writes a polygon for each face.
+        """
         # prepare file names
         radFile = objFile.replace(".obj", ".rad")
         mshFile = objFile.replace(".obj", ".msh")
@@ -1570,17 +1925,25 @@ class hb_MSHToRAD(object):
             outfile.write(materialStr)
         
         # create rad file
-        
-        if self.pattern != None:
-            cmd = self.RadianceFolder + "\\obj2mesh -a " + matFile + " " + objFile + " > " +  mshFile
-            
-            with open(batFile, "w") as outfile:
-                outfile.write(cmd)
-                #outfile.write("\npause")
-                
-            os.system(batFile)
-            
-            radStr = "void mesh painting\n" + \
+        meshCompiled = False
+        if self.pattern != None or meshPrimitive:
+            meshCache = hb_RADMeshCache()
+            meshCompiled = meshCache.compile(objFile, matFile, mshFile, self.RadianceFolder)
+            if not meshCompiled:
+                warning = "Failed to compile %s into a Radiance mesh. " % os.path.basename(objFile) + \
+                          "The mesh is exported as polygons instead."
+                if self.pattern != None:
+                    warning += " The texture can only be mapped on a Radiance mesh and is ignored."
+                    # polygons have no uv coordinates for the pattern
+                    with open(matFile, "w") as outfile:
+                        outfile.write("void "  + materialType + " " + self.matName + "\n" + materialTale)
+                if meshCache.error: warning += "\n" + meshCache.error
+                print warning
+                self.warnings.append(warning)
+        
+        if meshCompiled:
+            meshName = "painting" if self.pattern != None else self.name
+            radStr = "void mesh " + meshName + "\n" + \
                      "1 " + mshFile + "\n" + \
                      "0\n" + \
                      "0\n"
@@ -1624,10 +1987,46 @@ class hb_MSHToRAD(object):
 
 class hb_WriteRAD(object):
     
+    # grid-based studies are split into smaller chunks of test points that
+    # will be picked up by the CPUs as soon as they are free
+    chunksPerCPU = 4
+    minPointsPerChunk = 100
+    
+    # progressive image-based studies render a quick preview and then split
+    # each view into this many tiles per CPU
+    tilesPerCPU = 4
+    
+    # reuse the octree of the static scene between the runs
+    useOctreeCache = True
+    
+    # reuse the ambient values of the scene between the runs
+    useAmbientCache = True
+    
+    # write the test points and the results of rtrace as binary values
+    # (binaryFiles_ input of Run Daylight Simulation)
+    # binaryFormat is "f" for float32 or "d" for float64
+    binaryResults = False
+    binaryTestPoints = False
+    binaryFormat = "f"
+    
     def __init__(self, component = ghenv.Component):
         
         self.component = component
         
+        # number of parallel runs and point ranges for chunked grid-based studies
+        self.numOfWorkers = None
+        self.chunkRanges = []
+        self.pointWeightsFile = None
+        
+        # files of an annual study that uses daylight coefficient matrices
+        self.DCMatrixStudy = None
+        
+        # tiles and preview files of a progressive image-based study
+        self.imageTiles = None
+        
+        self.octreeCache = None
+        self.ambientCache = None
+        
         self.hb_writeRADAUX = sc.sticky["honeybee_WriteRADAUX"]()
         self.hb_RADMaterialAUX = sc.sticky["honeybee_RADMaterialAUX"]
         self.lb_preparation = sc.sticky["ladybug_Preparation"]()
@@ -1667,7 +2066,7 @@ class hb_WriteRAD(object):
         hb_hive = sc.sticky["honeybee_Hive"]()
         HBObjects = hb_hive.callFromHoneybeeHive(originalHBObjects)
         
-        geoRadFile = open(radFileFullName, 'w')
+        geoRadFile = hb_RADWriter(radFileFullName)
         geoRadFile.write("#GENERATED BY HONEYBEE\n")
         customRADMat = {} # dictionary to collect the custom material names
         customMixFunRadMat = {} # dictionary to collect the custom mixfunc material names
@@ -1947,27 +2346,48 @@ class hb_WriteRAD(object):
         numOfPoints = len(flattenTestPoints)
     
         if numOfCPUs > numOfPoints: numOfCPUs = numOfPoints
-
-        if numOfCPUs > 1:
-            ptsEachCpu = int(numOfPoints/(numOfCPUs))
-            remainder = numOfPoints%numOfCPUs
-        else:		
-            ptsEachCpu = numOfPoints		
-            remainder = 0
-    
-        lenOfPts = []
         
-        for cpuCount in range(numOfCPUs):		
-            if cpuCount < remainder:		
-                lenOfPts.append(ptsEachCpu+1)		
-            else:		
-                lenOfPts.append(ptsEachCpu)
+        if analysisRecipe.type == 2:
+            # Daysim needs a heading file for each part so keep one part per CPU
+            lenOfPts = self.partitionPoints(numOfPoints, numOfCPUs)
+        else:
+            self.numOfWorkers = numOfCPUs
+            self.pointWeightsFile = self.getPointWeightsFile(subWorkingDir, radFileName)
+            weights = self.readPointWeights(self.pointWeightsFile, numOfPoints)
+            
+            numOfChunks = min(numOfCPUs * self.chunksPerCPU, \
+                              max(numOfPoints // self.minPointsPerChunk, numOfCPUs))
+            lenOfPts = self.partitionPoints(numOfPoints, numOfChunks, weights)
+            numOfCPUs = len(lenOfPts)
+            
+            self.chunkRanges = []
+            for length in lenOfPts:
+                start = self.chunkRanges[-1][1] if self.chunkRanges else 0
+                self.chunkRanges.append((start, start + length))
+            
+            # add the size of the chunks to the pattern file
+            with open(ptnFileName, "a") as ptnFile:
+                ptnFile.write("\n" + ", ".join(map(str, lenOfPts)) + ", ")
         
         testPtsEachCPU = []
         
+        # Daysim only reads text files
+        binaryTestPoints = self.binaryTestPoints and analysisRecipe.type != 2
+        
         for cpuCount in range(numOfCPUs):
             # write pts file
             ptsForThisCPU = []
+            
+            if binaryTestPoints:
+                start = sum(lenOfPts[:cpuCount])
+                ptsForThisCPU = flattenTestPoints[start:start + lenOfPts[cpuCount]]
+                ptsFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.bpts')
+                self.hb_writeRADAUX.writeBinaryTestPts(ptsFileName, ptsForThisCPU, \
+                                                       flattenPtsNormals[start:start + lenOfPts[cpuCount]], \
+                                                       self.binaryFormat)
+                testPtsEachCPU.append(ptsForThisCPU)
+                continue
+            
             ptsFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.pts')
             
             ptsFile = open(ptsFileName, "w")
@@ -1982,6 +2402,87 @@ class hb_WriteRAD(object):
             
         return testPtsEachCPU, lenOfPts
     
+    @staticmethod
+    def partitionPoints(numOfPoints, numOfParts, weights = None):
+        """Split the points into contiguous parts and return the number of points in each part.
+        
+        If the weights are provided the parts will have about the same total weight
+        instead of the same number of points.
+        """
+        numOfParts = max(min(numOfParts, numOfPoints), 1)
+        
+        if not weights:
+            ptsEachPart, remainder = divmod(numOfPoints, numOfParts)
+            return [ptsEachPart + 1 if count < remainder else ptsEachPart \
+                    for count in range(numOfParts)]
+        
+        totalWeight = float(sum(weights))
+        lenOfPts = []
+        start = 0
+        cumWeight = 0
+        for ptCount, weight in enumerate(weights):
+            cumWeight += weight
+            partsLeft = numOfParts - len(lenOfPts)
+            pointsLeft = numOfPoints - ptCount - 1
+            if partsLeft == 1: break
+            # close the part once it reaches its share of the weight but leave
+            # at least one point for each one of the remaining parts
+            if cumWeight >= totalWeight * (len(lenOfPts) + 1) / numOfParts or \
+                pointsLeft < partsLeft:
+                lenOfPts.append(ptCount + 1 - start)
+                start = ptCount + 1
+        
+        lenOfPts.append(numOfPoints - start)
+        return lenOfPts
+    
+    @staticmethod
+    def getPointWeightsFile(subWorkingDir, radFileName):
+        # the study folder will be cleaned before each run so keep the file in the parent folder
+        studyFolder = os.path.normpath(subWorkingDir)
+        return os.path.join(os.path.dirname(studyFolder), \
+                            radFileName + "_" + os.path.basename(studyFolder) + ".ptw")
+    
+    @staticmethod
+    def readPointWeights(pointWeightsFile, numOfPoints):
+        """Read the calculation time for each test point from the previous run.
+        
+        Returns None if the file doesn't exist or it is for a different set of points.
+        """
+        if not pointWeightsFile or not os.path.isfile(pointWeightsFile): return None
+        try:
+            with open(pointWeightsFile, "r") as weightsFile:
+                weights = [float(line) for line in weightsFile if line.strip()]
+        except (IOError, ValueError):
+            return None
+        
+        if len(weights) != numOfPoints or sum(weights) <= 0: return None
+        return weights
+    
+    def savePointWeights(self, results):
+        """Save the calculation time for each test point based on the time of the chunks.
+        
+        The time of each chunk is divided between its points and is averaged with the
+        weights from the previous run so the partitioning improves after each run.
+        """
+        if not self.chunkRanges or not self.pointWeightsFile: return
+        if len(results) != len(self.chunkRanges): return
+        if not all(result is not None and result.success for result in results): return
+        
+        numOfPoints = self.chunkRanges[-1][1]
+        weights = []
+        for (start, end), result in zip(self.chunkRanges, results):
+            weights.extend([result.elapsed / (end - start)] * (end - start))
+        
+        previousWeights = self.readPointWeights(self.pointWeightsFile, numOfPoints)
+        if previousWeights:
+            weights = [(w + pw) / 2 for w, pw in zip(weights, previousWeights)]
+        
+        try:
+            with open(self.pointWeightsFile, "w") as weightsFile:
+                weightsFile.write("\n".join("%.6g" % w for w in weights) + "\n")
+        except IOError, e:
+            print "Failed to save the calculation time for test points: %s" % e
+    
     def writeBatchFiles(self, subWorkingDir, radFileName, radSkyFileName, \
                         radFileFullName, materialFileName, \
                         numOfCPUs, testPtsEachCPU, \
@@ -2001,6 +2502,12 @@ class hb_WriteRAD(object):
                 #print key + " is set to " + str(hb_radParDict[key][quality])
                 analysisRecipe.radParameters[key] = self.hb_radParDict[key][quality]
         
+        if analysisRecipe.type == 2 and getattr(analysisRecipe, "useDCMatrix", False):
+            if self.canUseDCMatrix(analysisRecipe):
+                return self.writeDCMatrixBatchFiles(subWorkingDir, radFileName, radFileFullName, \
+                                                    materialFileName, numOfCPUs, analysisRecipe, \
+                                                    additionalRadFiles)
+        
         if analysisRecipe.type == 2: # annual daylight analysis - Daysim
             # read parameters
             runAnnualGlare = analysisRecipe.DSParameters.runAnnualGlare
@@ -2187,8 +2694,14 @@ class hb_WriteRAD(object):
                     if additionalFile!=None:
                         sceneRadFiles.append(additionalFile)
                 
-            OCTLine = self.hb_writeRADAUX.oconvLine(OCTFileName, sceneRadFiles)
-            if readyOCTFile ==None: batchFile.write(OCTLine)
+            if readyOCTFile ==None:
+                # the sky is the only layer that is not static
+                staticLayers = [[materialFileName], [radFileFullName] + sceneRadFiles[3:]]
+                batchFile.write(self.oconvLines(OCTFileName, sceneRadFiles, staticLayers, [radSkyFileName]))
+            
+            if readyOCTFile == None: sceneFiles = sceneRadFiles
+            else: sceneFiles = [readyOCTFile]
+            ambientCacheHit = self.prepareAmbientCache(subWorkingDir, OCTFileName, sceneFiles, analysisRecipe.radParameters)
             
             if analysisRecipe.type == 0:
                 # add overture line in case it is an image-based analysis
@@ -2198,24 +2711,36 @@ class hb_WriteRAD(object):
                         
                 # write rpict lines
                 overtureLine = self.hb_writeRADAUX.overtureLine(viewLine, OCTFileName, view, analysisRecipe.radParameters, int(analysisRecipe.type))
-                if runOverture: batchFile.write(overtureLine)
+                # the overture is not needed if the ambient values are already calculated
+                if runOverture and not ambientCacheHit: batchFile.write(overtureLine)
             
         if analysisRecipe.type == 0:
             # write view files
             if len(self.rhinoViewNames)==0:
                 self.rhinoViewNames = [sc.doc.Views.ActiveView.ActiveViewport.Name]
             
+            # progressive studies render more tiles than CPUs so the pieces of the
+            # image are ready one after another
+            progressive = getattr(analysisRecipe, "progressive", False)
+            if progressive:
+                numOfTiles = numOfCPUs * self.tilesPerCPU
+                self.numOfWorkers = numOfCPUs
+            else:
+                numOfTiles = numOfCPUs
+            
             #recalculate vh and vv
-            nXDiv = int(math.sqrt(numOfCPUs))
+            nXDiv = int(math.sqrt(numOfTiles))
 
-            while numOfCPUs%nXDiv !=0 and nXDiv < numOfCPUs:
+            while numOfTiles%nXDiv !=0 and nXDiv < numOfTiles:
                 nXDiv += 1
             
-            nYDiv = numOfCPUs/nXDiv
+            nYDiv = numOfTiles/nXDiv
 
             fileNames = []
+            previewBatchFiles = []
             HDRPieces = {}
-            for cpuCount in range(numOfCPUs):
+            previewParameters = self.hb_writeRADAUX.previewParameters(analysisRecipe.radParameters)
+            for cpuCount in range(numOfTiles):
                 # create a batch file
                 batchFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '_IMG.bat')
                 batchFiles.append(batchFileName)
@@ -2227,12 +2752,17 @@ class hb_WriteRAD(object):
                 batchFile.write(os.path.splitdrive(subWorkingDir)[0] + "\n")
                 batchFile.write("cd " + subWorkingDir + "\n")
                 
-                # calculate vs and vl for thi cpu
-                try: vs = (((cpuCount%nXDiv)/(nXDiv-1)) - 0.5) * (nXDiv - 1)
-                except: vs = 0
-                    
-                try: vl = ((int(cpuCount/nXDiv)/(nYDiv-1)) - 0.5) * (nYDiv - 1)
-                except: vl = 0
+                if progressive:
+                    previewBatchFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '_PREVIEW.bat')
+                    previewBatchFiles.append(previewBatchFileName)
+                    previewBatchFile = open(previewBatchFileName, "w")
+                    previewBatchFile.write(pathStr)
+                    previewBatchFile.write(os.path.splitdrive(subWorkingDir)[0] + "\n")
+                    previewBatchFile.write("cd " + subWorkingDir + "\n")
+                
+                # calculate vs and vl for this piece
+                vs = (cpuCount%nXDiv) - (nXDiv - 1) / 2.0
+                vl = int(cpuCount/nXDiv) - (nYDiv - 1) / 2.0
                 
                 # print vs, vl
                 for view in self.rhinoViewNames:
@@ -2250,35 +2780,48 @@ class hb_WriteRAD(object):
                                                               nXDiv, nYDiv, vs, vl)
                     
                     # write rpict lines
-                    RPICTLines = self.hb_writeRADAUX.rpictLine(viewLine, OCTFileName, view, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount)
+                    if self.ambientCache: ambFile = self.ambientCache.workerFile()
+                    else: ambFile = None
+                    RPICTLines = self.hb_writeRADAUX.rpictLine(viewLine, OCTFileName, view, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount, \
+                                                               ambFile = ambFile)
                     batchFile.write(RPICTLines)                    
                     
+                    if progressive:
+                        previewBatchFile.write(self.hb_writeRADAUX.rpictLine(viewLine, OCTFileName, view, previewParameters, \
+                                                                             int(analysisRecipe.simulationType), cpuCount, \
+                                                                             suffix = "_preview", useAmbientFile = False))
+                    
                 # close the file
                 batchFile.close()
-                
-                # PCOMP to merge images into a single HDR
-                pcompFileName = os.path.join(subWorkingDir, radFileName + '_PCOMP.bat')
-                                
-                with open(pcompFileName, "w") as pcompFile:
-                    
-                    # write path files
-                    pcompFile.write(pathStr)
-                    pcompFile.write(os.path.splitdrive(subWorkingDir)[0] + "\n")
-                    pcompFile.write("cd " + subWorkingDir + "\n")
-                    
-                    for mergedName, pieces in HDRPieces.items():
-                        
-                        pcomposLine = "pcompos -a " + `nXDiv` + " "
-                        # pieces.reverse()
-                        for piece in pieces:
-                            pcomposLine += piece.replace('.HDR', '.unf') + " "
-                        pcomposLine += " > " + mergedName.replace('.HDR', '_temp.HDR') + "\n"
-                        
-                        pcompFile.write(pcomposLine)
-                    
-                        pfiltLine = "pfilt -r .6 -x /2 -y /2 {} > {}\n" \
-                            .format(mergedName.replace('.HDR', '_temp.HDR'), mergedName)
-                        pcompFile.write(pfiltLine)
+                if progressive: previewBatchFile.close()
+            
+            # PCOMP to merge images into a single HDR
+            pcompFileName = os.path.join(subWorkingDir, radFileName + '_PCOMP.bat')
+            mergedPieces = [(mergedName, [piece.replace('.HDR', '.unf') for piece in pieces]) \
+                            for mergedName, pieces in HDRPieces.items()]
+            self.writePcompFile(pcompFileName, pathStr, subWorkingDir, nXDiv, mergedPieces)
+            
+            if progressive:
+                previewPcompFileName = os.path.join(subWorkingDir, radFileName + '_PREVIEWPCOMP.bat')
+                mergedPieces = [(mergedName.replace('.HDR', '_preview.HDR'), \
+                                 [piece.replace('.HDR', '_preview.unf') for piece in pieces]) \
+                                for mergedName, pieces in HDRPieces.items()]
+                self.writePcompFile(previewPcompFileName, pathStr, subWorkingDir, nXDiv, mergedPieces)
+                
+                self.imageTiles = {"subWorkingDir": subWorkingDir,
+                                   "pathStr": pathStr,
+                                   "nXDiv": nXDiv,
+                                   "HDRPieces": HDRPieces,
+                                   "previewBatchFiles": previewBatchFiles,
+                                   "previewPcompFile": previewPcompFileName,
+                                   "progressPcompFile": os.path.join(subWorkingDir, radFileName + '_PROGRESS.bat'),
+                                   "tileIndex": dict((os.path.basename(fileName), count) \
+                                                     for count, fileName in enumerate(batchFiles)),
+                                   "finishedTiles": set(),
+                                   "progressJob": None,
+                                   "progressCount": 0,
+                                   "progressOutdated": False,
+                                   "lock": threading.Lock()}
             
             return initBatchFileName, batchFiles, fileNames, pcompFileName, HDRFileAddress
                         
@@ -2300,7 +2843,10 @@ class hb_WriteRAD(object):
                 batchFile.write("cd " + subWorkingDir + "\n")
                 
                 # 3.4. add rtrace lin
-                RTRACELine = self.hb_writeRADAUX.rtraceLine(radFileName, OCTFileName, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount)
+                if self.ambientCache: ambFile = self.ambientCache.workerFile()
+                else: ambFile = None
+                RTRACELine = self.hb_writeRADAUX.rtraceLine(radFileName, OCTFileName, analysisRecipe.radParameters, int(analysisRecipe.simulationType), cpuCount, \
+                                                            self.binaryResults, self.binaryTestPoints, self.binaryFormat, ambFile)
                 batchFile.write(RTRACELine)
                 
                 # close the file
@@ -2309,70 +2855,317 @@ class hb_WriteRAD(object):
             
             return initBatchFileName, batchFiles, fileNames, pcompFileName, RADResultFilesAddress
         
-    def executeBatchFiles(self, batchFileNames, maxPRuns = None, shell = False, waitingTime = 0.5):
-    
-        """Run a number of batch files in parallel and
-            wait to end of the analysis.
-    
-            Args:
-                batchFileNames: List of batch files
-                maxPRuns: max number of files to be ran in parallel (default = 0)
-                shell: set to True if you do NOT want to see the cmd window while the analysis is runnig
+    def oconvLines(self, octFileName, sceneRadFiles, staticLayers, dynamicFiles):
+        """Return the oconv lines for a scene.
+        
+        The octree of the static layers is reused from the octree cache if the content
+        of the layers hasn't changed. Otherwise the octree is built from all the files.
         """
-    
-        if not maxPRuns : maxPRuns = 1
-        maxPRuns = int(maxPRuns)
-        total = len(batchFileNames)
+        if self.useOctreeCache:
+            try:
+                if self.octreeCache is None: self.octreeCache = hb_OctreeCache()
+                return self.octreeCache.oconvLines(octFileName, staticLayers, dynamicFiles)
+            except (IOError, OSError), e:
+                print "Failed to use the octree cache: %s" % e
         
-        if maxPRuns < 1: maxPRuns = 1
-        if maxPRuns > total: maxPRuns = total
+        return self.hb_writeRADAUX.oconvLine(octFileName, sceneRadFiles)
+    
+    def prepareAmbientCache(self, subWorkingDir, octFileName, sceneFiles, radParameters):
+        """Copy the cached ambient file of the scene to the study folder.
         
-        running = 0
-        done = False
-        jobs = []
-        pid = 0
+        Returns:
+            True if the ambient values of the scene are found in the cache.
+        """
+        self.ambientCache = None
+        if not self.useAmbientCache or int(radParameters["_ab_"]) == 0: return False
         
         try:
-            while not done:
-                if running < maxPRuns and pid < total:
-                    # execute the files
-                    jobs.append(subprocess.Popen(batchFileNames[pid].replace("\\", "/") , shell = shell))
-                    pid+=1
-                    time.sleep(waitingTime)
-                
-                # count how many jobs are running and how many are done
-                running = 0
-                finished = 0
-                for job in jobs:
-                    if job.poll() is None:
-                        #one job is still running
-                        running += 1
-                    else:
-                        finished += 1
-        
-                if running == maxPRuns:
-                    # wait for half a second
-                    #print "waiting..."
-                    time.sleep(waitingTime)
-        
-                if finished ==  total:
-                    done = True
+            ambientCache = hb_AmbientCache()
+            hit = ambientCache.prepare(os.path.join(subWorkingDir, octFileName + ".amb"), sceneFiles, radParameters)
+        except (IOError, OSError), e:
+            print "Failed to use the ambient cache: %s" % e
+            return False
         
-        except Exception, e:
-            print "Something went wrong: %s"%str(e) 
+        self.ambientCache = ambientCache
+        if hit: print "The ambient values of the scene are loaded from the cache."
+        return hit
+    
+    def canUseDCMatrix(self, analysisRecipe):
+        """Check if an annual study can be calculated with daylight coefficient matrices."""
+        DSParameters = analysisRecipe.DSParameters
+        msg = None
+        if DSParameters.runAnnualGlare:
+            msg = "Annual glare analysis needs Daysim."
+        elif DSParameters.numOfIll != 1:
+            msg = "Dynamic shadings need Daysim."
+        
+        if msg:
+            msg += " The study will run with Daysim instead of the daylight coefficient matrix."
+            print msg
+            self.component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Remark, msg)
+            return False
+        return True
     
-    def runBatchFiles(self, initBatchFileName, batchFileNames, fileNames, \
-                      pcompBatchFile, waitingTime, runInBackground = False):
+    def writeDCMatrixBatchFiles(self, subWorkingDir, radFileName, radFileFullName, \
+                                materialFileName, numOfCPUs, analysisRecipe, additionalRadFiles):
+        """Write the batch files for an annual study with daylight coefficient matrices.
         
-        self.executeBatchFiles([initBatchFileName], maxPRuns = 1, shell = runInBackground, waitingTime = waitingTime)
-        self.executeBatchFiles(batchFileNames, maxPRuns = len(batchFileNames), shell = runInBackground, waitingTime = waitingTime)
-        
-        if pcompBatchFile!="":
-            os.system(pcompBatchFile) # put all the files together
+        The init batch file converts the weather file to a sky matrix and creates the
+        octree of the scene with a glowing sky. Each CPU calculates the daylight
+        coefficients of its test points with rcontrib. The .ill files are calculated
+        from the matrices in collectResults.
+        """
+        engine = hb_DCMatrixEngine(getattr(analysisRecipe, "skyDensity", 1))
+        northAngleRotation = analysisRecipe.northDegrees
+        
+        pathStr = "SET RAYPATH=.;" + self.hb_RADLibPath + "\nPATH=" + self.hb_RADPath + ";" + \
+                  self.hb_DSPath + ";$PATH\n"
+        dirStr = os.path.splitdrive(subWorkingDir)[0] + "\n" + "cd " + subWorkingDir + "\n"
+        
+        # copy .epw file to sub-directory
+        epwFileName = os.path.join(subWorkingDir, radFileName + '.epw')
+        self.lb_preparation.copyFile(analysisRecipe.weatherFile, epwFileName)
+        weaFileName = os.path.join(subWorkingDir, radFileName + '.wea')
+        skyMatrixFileName = os.path.join(subWorkingDir, radFileName + '.smx')
+        skyGlowFileName = engine.writeSkyGlowFile(os.path.join(subWorkingDir, radFileName + '_skyglow.rad'))
+        OCTFileName = radFileName + '_DC'
+        
+        sceneRadFiles = [materialFileName, radFileFullName]
+        xformCmds = []
+        if additionalRadFiles:
+            for adfile in additionalRadFiles:
+                if adfile == None: continue
+                if northAngleRotation != 0:
+                    # rotate additional radiance files the same way as the scene
+                    target = adfile[:-4] + '_' + str(northAngleRotation) + adfile[-4:]
+                    xformCmds.append('xform -rz -%f %s > %s\n' % (northAngleRotation, adfile, target))
+                    adfile = target
+                sceneRadFiles.append(adfile)
+        sceneRadFiles.append(skyGlowFileName)
         
-    def collectResults(self, subWorkingDir, radFileName, numOfCPUs, analysisRecipe, expectedResultFiles):
+        initBatchFileName = os.path.join(subWorkingDir, radFileName + '_DCInit.bat')
+        with open(initBatchFileName, "w") as batchFile:
+            batchFile.write(pathStr)
+            batchFile.write(dirStr)
+            batchFile.write("epw2wea " + epwFileName + " " + weaFileName + "\n")
+            batchFile.write(engine.gendaymtxLine(weaFileName, skyMatrixFileName))
+            batchFile.write("".join(xformCmds))
+            if xformCmds:
+                # the rotated files don't exist yet
+                batchFile.write(self.hb_writeRADAUX.oconvLine(OCTFileName, sceneRadFiles))
+            else:
+                batchFile.write(self.oconvLines(OCTFileName, sceneRadFiles, [[materialFileName], sceneRadFiles[1:-1]], \
+                                                [skyGlowFileName]))
         
-        if analysisRecipe.type == 2:
+        batchFiles = []
+        fileNames = []
+        DCMatrixFiles = []
+        illMatrixFiles = []
+        illFiles = []
+        for cpuCount in range(numOfCPUs):
+            DCMatrixFiles.append(os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.dcm'))
+            illMatrixFiles.append(os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.ilm'))
+            illFiles.append(os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '.ill'))
+            
+            batchFileName = os.path.join(subWorkingDir, radFileName + '_' + `cpuCount` + '_DC.bat')
+            batchFiles.append(batchFileName)
+            fileNames.append(batchFileName.split("\\")[-1])
+            
+            with open(batchFileName, "w") as batchFile:
+                batchFile.write(pathStr)
+                batchFile.write(dirStr)
+                batchFile.write(engine.rcontribLine(radFileName + '_' + `cpuCount` + '.pts', OCTFileName, \
+                                                    analysisRecipe.radParameters, os.path.basename(DCMatrixFiles[-1])))
+                batchFile.write(engine.dctimestepLine(os.path.basename(DCMatrixFiles[-1]), \
+                                                      os.path.basename(skyMatrixFileName), \
+                                                      os.path.basename(illMatrixFiles[-1])))
+        
+        self.DCMatrixStudy = {"engine": engine, "weaFile": weaFileName, "skyMatrixFile": skyMatrixFileName,
+                              "DCMatrixFiles": DCMatrixFiles, "illMatrixFiles": illMatrixFiles, "illFiles": illFiles}
+        
+        return initBatchFileName, batchFiles, fileNames, "", illFiles
+    
+    def calculateDCMatrixResults(self):
+        """Calculate the .ill files of a study with daylight coefficient matrices."""
+        study = self.DCMatrixStudy
+        missingFiles = [fileName for fileName in study["DCMatrixFiles"] + [study["skyMatrixFile"], study["weaFile"]] \
+                        if not os.path.isfile(fileName)]
+        if missingFiles:
+            print "Can't find the results for the study: " + ", ".join(missingFiles)
+            return []
+        
+        startTime = time.time()
+        try:
+            illFiles = study["engine"].calculate(study["DCMatrixFiles"], study["skyMatrixFile"], \
+                                                 study["weaFile"], study["illFiles"], \
+                                                 illMatrixFiles = study["illMatrixFiles"])
+        except (ValueError, EOFError), e:
+            print "Failed to calculate the annual illuminance: %s" % e
+            return []
+        
+        print "Annual illuminance is calculated in %.1f seconds." % (time.time() - startTime)
+        return illFiles
+    
+    def executeBatchFiles(self, batchFileNames, maxPRuns = None, shell = False, waitingTime = 0.5, \
+                          progressCallback = None):
+    
+        """Run a number of batch files in parallel and
+            wait to end of the analysis.
+    
+            Args:
+                batchFileNames: List of batch files
+                maxPRuns: max number of files to be ran in parallel (default = 0)
+                shell: set to True if you do NOT want to see the cmd window while the analysis is runnig
+                waitingTime: Not used. The next file starts as soon as one of the files is finished.
+                progressCallback: Optional function that will be called with (result, finishedCount, totalCount)
+                    after each file is finished.
+            
+            Returns:
+                A list of hb_JobResult for the batch files.
+        """
+        return hb_JobScheduler.runBatchFiles(batchFileNames, maxPRuns, shell, progressCallback)
+    
+    def writePcompFile(self, pcompFileName, pathStr, subWorkingDir, nXDiv, mergedPieces):
+        """Write a batch file to merge the pieces of the images into HDR files.
+        
+        Args:
+            mergedPieces: List of (merged HDR file name, list of .unf pieces).
+        """
+        with open(pcompFileName, "w") as pcompFile:
+            
+            # write path files
+            pcompFile.write(pathStr)
+            pcompFile.write(os.path.splitdrive(subWorkingDir)[0] + "\n")
+            pcompFile.write("cd " + subWorkingDir + "\n")
+            
+            for mergedName, pieces in mergedPieces:
+                
+                pcomposLine = "pcompos -a " + `nXDiv` + " "
+                for piece in pieces:
+                    pcomposLine += piece + " "
+                pcomposLine += " > " + mergedName.replace('.HDR', '_temp.HDR') + "\n"
+                
+                pcompFile.write(pcomposLine)
+            
+                pfiltLine = "pfilt -r .6 -x /2 -y /2 {} > {}\n" \
+                    .format(mergedName.replace('.HDR', '_temp.HDR'), mergedName)
+                pcompFile.write(pfiltLine)
+        
+        return pcompFileName
+    
+    def writeProgressImages(self, result, finishedCount, totalCount):
+        """Merge the finished tiles and the preview of the rest into _progress.HDR files.
+        
+        This is the progress callback of a progressive image-based study. It returns the
+        job that merges the images so the scheduler runs it on the next free worker. Only
+        one merge is queued at a time and it is repeated if more tiles are finished meanwhile.
+        """
+        tiles = self.imageTiles
+        numOfTiles = len(tiles["tileIndex"])
+        
+        with tiles["lock"]:
+            if result.job is tiles["progressJob"]:
+                tiles["progressJob"] = None
+                if result.success:
+                    print "%d of %d tiles are rendered: %s" % \
+                          (tiles["progressCount"], numOfTiles, \
+                           ", ".join(mergedName.replace('.HDR', '_progress.HDR') for mergedName in tiles["HDRPieces"]))
+                if not tiles["progressOutdated"]: return
+            elif not result.success or result.name not in tiles["tileIndex"]:
+                return
+            else:
+                tiles["finishedTiles"].add(tiles["tileIndex"][result.name])
+            
+            if len(tiles["finishedTiles"]) == numOfTiles: return
+            if tiles["progressJob"] is not None:
+                # merge the new tiles once the current merge is finished
+                tiles["progressOutdated"] = True
+                return
+            
+            mergedPieces = []
+            for mergedName, pieces in tiles["HDRPieces"].items():
+                progressPieces = []
+                for count, piece in enumerate(pieces):
+                    if count in tiles["finishedTiles"]:
+                        progressPieces.append(piece.replace('.HDR', '.unf'))
+                    else:
+                        progressPieces.append(piece.replace('.HDR', '_preview.unf'))
+                mergedPieces.append((mergedName.replace('.HDR', '_progress.HDR'), progressPieces))
+            
+            self.writePcompFile(tiles["progressPcompFile"], tiles["pathStr"], tiles["subWorkingDir"], \
+                                tiles["nXDiv"], mergedPieces)
+            
+            tiles["progressJob"] = hb_JobScheduler.batchFileJob(tiles["progressPcompFile"])
+            tiles["progressCount"] = len(tiles["finishedTiles"])
+            tiles["progressOutdated"] = False
+            return tiles["progressJob"]
+    
+    def runPreview(self, runInBackground = False):
+        """Render and merge the quick preview of a progressive image-based study.
+        
+        Returns:
+            True if the preview images are ready.
+        """
+        tiles = self.imageTiles
+        results = self.executeBatchFiles(tiles["previewBatchFiles"], maxPRuns = self.numOfWorkers, \
+                                         shell = runInBackground)
+        
+        if not all(result is not None and result.success for result in results):
+            print "Failed to render the preview. The images will be ready at the end of the study."
+            return False
+        
+        pcompResults = self.executeBatchFiles([tiles["previewPcompFile"]], maxPRuns = 1, shell = runInBackground)
+        if not pcompResults[0].success: return False
+        
+        print "Preview images are ready:\n" + \
+              "\n".join(os.path.join(tiles["subWorkingDir"], mergedName.replace('.HDR', '_preview.HDR')) \
+                        for mergedName in tiles["HDRPieces"])
+        return True
+    
+    def runBatchFiles(self, initBatchFileName, batchFileNames, fileNames, \
+                      pcompBatchFile, waitingTime, runInBackground = False):
+        
+        initResults = self.executeBatchFiles([initBatchFileName], maxPRuns = 1, shell = runInBackground, waitingTime = waitingTime)
+        initSuccess = bool(initResults) and all(result is not None and result.success for result in initResults)
+        
+        if self.octreeCache is not None:
+            self.octreeCache.commit(initSuccess)
+        
+        # grid-based and progressive image-based studies have more chunks than CPUs
+        maxPRuns = self.numOfWorkers or len(batchFileNames)
+        
+        if self.ambientCache is not None:
+            try:
+                self.ambientCache.seedWorkers(min(hb_JobScheduler.workerCount(maxPRuns), len(batchFileNames)))
+            except (IOError, OSError), e:
+                print "Failed to copy the ambient file: %s" % e
+        
+        progressCallback = None
+        if self.imageTiles and self.runPreview(runInBackground):
+            # update the progress images as the tiles are rendered
+            progressCallback = self.writeProgressImages
+        
+        results = self.executeBatchFiles(batchFileNames, maxPRuns = maxPRuns, shell = runInBackground, waitingTime = waitingTime, \
+                                         progressCallback = progressCallback)
+        
+        if self.chunkRanges and len(batchFileNames) == len(self.chunkRanges):
+            self.savePointWeights(results)
+        
+        if self.ambientCache is not None:
+            self.ambientCache.commit(initSuccess and \
+                                     all(result is not None and result.success for result in results))
+        
+        if pcompBatchFile!="":
+            # put all the files together
+            self.executeBatchFiles([pcompBatchFile], maxPRuns = 1, shell = runInBackground)
+        
+    def collectResults(self, subWorkingDir, radFileName, numOfCPUs, analysisRecipe, expectedResultFiles):
+        
+        if analysisRecipe.type == 2 and self.DCMatrixStudy:
+            # annual simulation with daylight coefficient matrices
+            return self.calculateDCMatrixResults(), {}
+        
+        elif analysisRecipe.type == 2:
             #annual simulation
             runAnnualGlare = analysisRecipe.DSParameters.runAnnualGlare
             onlyAnnualGlare = analysisRecipe.DSParameters.onlyAnnualGlare
@@ -2460,16 +3253,6 @@ class hb_WriteRAD(object):
             #assign the construction based on type
             surface.construction = surface.cnstrSet[surface.type]
             
-        srfStr =  surface.construction.replace(" ", "_") + " polygon " + surface.name.strip() + '_' + `count` + "\n" + \
-            "0\n" + \
-            "0\n" + \
-            `(len(coordinates)*3)` + "\n"
-            
-        ptStr = ''
-        for  pt in coordinates:
-            ptStr = ptStr + '%.4f'%pt.X + '  ' + '%.4f'%pt.Y + '  ' + '%.4f'%pt.Z + '\n'
-        ptStr = ptStr + '\n'
-        
         # check for polygons with only two points.
         # Yes! it is possible. Import a model from REVIT/SketchUp and create some breps out of it
         # and you will get some!
@@ -2477,7 +3260,8 @@ class hb_WriteRAD(object):
             comment = " Polygon " + surface.name + " has less than 3 vertices and is removed by Honeybee.\n"
             return "#" + comment
         
-        return srfStr + ptStr
+        return hb_RADWriter.polygonStr(surface.construction.replace(" ", "_"), \
+                                       surface.name.strip() + '_' + `count`, coordinates)
 
     def RADSurface(self, surface):
         fullStr = []
@@ -3026,7 +3810,7 @@ class hb_WriteRADAUX(object):
             
             # recalculate vh and vv
             if nXDiv != 1:
-                viewHA = (2.*180./PI)*math.atan(((PI/180./2.) * viewHA)/nXDiv)
+                viewHA = (2.*180./PI)*math.atan(math.tan((PI/180./2.)*viewHA)/nXDiv)
                 viewHSize = viewHSize/nXDiv
             if nYDiv != 1:
                 viewVA = (2.*180./PI)*math.atan(math.tan((PI/180./2.)*viewVA)/nYDiv)
@@ -3114,11 +3898,13 @@ class hb_WriteRADAUX(object):
         
         return line0 + line1_1 + line1_2 + line1_3 + line2
 
-    def rpictLine(self, view, projectName, viewName, radParameters, analysisType = 0, cpuCount = 0):
+    def rpictLine(self, view, projectName, viewName, radParameters, analysisType = 0, cpuCount = 0, \
+                  suffix = "", useAmbientFile = True, ambFile = None):
         octFile = projectName + ".oct"
-        ambFile = projectName + ".amb" #amb file is view independent and can be used globally
-        unfFile = projectName + "_" + viewName + "_" + `cpuCount` + ".unf" 
-        outputFile = projectName + "_" + viewName + "_" + `cpuCount` + ".HDR"
+        if ambFile is None:
+            ambFile = projectName + ".amb" #amb file is view independent and can be used globally
+        unfFile = projectName + "_" + viewName + "_" + `cpuCount` + suffix + ".unf" 
+        outputFile = projectName + "_" + viewName + "_" + `cpuCount` + suffix + ".HDR"
         
         if analysisType==0:
             # illuminance (lux)
@@ -3130,8 +3916,12 @@ class hb_WriteRADAUX(object):
             # radiation analysis
             line0 = "rpict -i "
         
+        # the preview pass doesn't write to the ambient file of the final images
+        if useAmbientFile: ambLine = " -af " + ambFile +  " "
+        else: ambLine = " "
+        
         line1_1 = "-t 10 "+ \
-                view + " -af " + ambFile +  " " + \
+                view + ambLine + \
                 " -ps " + str(radParameters["_ps_"]) + " -pt " + str(radParameters["_pt_"]) + \
                 " -pj " + str(radParameters["_pj_"]) + " -dj " + str(radParameters["_dj_"]) + \
                 " -ds " + str(radParameters["_ds_"]) + " -dt " + str(radParameters["_dt_"]) + \
@@ -3152,14 +3942,40 @@ class hb_WriteRADAUX(object):
         return line0 + line1_1 + line1_2 + line1_3
         
         
+    @staticmethod
+    def previewParameters(radParameters):
+        """Radiance parameters for a quick preview of an image-based study.
+        
+        The number of ambient bounces and the sampling are reduced to a level that
+        renders in seconds. The image size is not changed so the pieces of the
+        preview can replace the pieces of the final image that are not ready yet.
+        """
+        parameters = dict(radParameters)
+        parameters["_ab_"] = min(int(radParameters["_ab_"]), 1)
+        parameters["_ad_"] = min(int(radParameters["_ad_"]), 256)
+        parameters["_as_"] = min(int(radParameters["_as_"]), 32)
+        parameters["_ar_"] = min(int(radParameters["_ar_"]), 16)
+        parameters["_aa_"] = max(float(radParameters["_aa_"]), 0.3)
+        parameters["_ps_"] = max(int(radParameters["_ps_"]), 8)
+        parameters["_pt_"] = max(float(radParameters["_pt_"]), 0.15)
+        parameters["_dj_"] = 0
+        parameters["_ds_"] = 0
+        parameters["_dr_"] = min(int(radParameters["_dr_"]), 1)
+        parameters["_dp_"] = min(int(radParameters["_dp_"]), 64)
+        parameters["_lr_"] = min(int(radParameters["_lr_"]), 4)
+        parameters["_lw_"] = max(float(radParameters["_lw_"]), 0.01)
+        return parameters
+    
     def falsecolorLine(self, projectName, viewName):
         line = "c:\python27\python c:\honeybee\\falsecolor2.py -i " + projectName + "_RAD_" + viewName + "_RadStudy.pic -s auto -n 10 -mask 0.1 -l kWhm-2 -z > " + projectName + "_" + viewName + "_FalseColored.pic\n" + \
            "ra_tiff " + projectName + "_" + viewName + "_FalseColored.pic " + projectName + "_" + viewName + "_FalseColored.tif\n" + \
            "ra_gif " + projectName + "_" + viewName + "_FalseColored.pic " + projectName + "_" + viewName + "_FalseColored.gif\n"
         return line
 
-    def rtraceLine(self, projectName, octFileName, radParameters, simulationType = 0, cpuCount = 0):
-        ptsFile = projectName + "_" + str(cpuCount) + ".pts"
+    def rtraceLine(self, projectName, octFileName, radParameters, simulationType = 0, cpuCount = 0, \
+                   binaryOutput = False, binaryInput = False, binaryFormat = "f", ambFile = None):
+        if binaryInput: ptsFile = projectName + "_" + str(cpuCount) + ".bpts"
+        else: ptsFile = projectName + "_" + str(cpuCount) + ".pts"
         outputFile = projectName + "_" + str(cpuCount) + ".res"
         if simulationType == 0:
             line0 = "rtrace -I "
@@ -3168,8 +3984,14 @@ class hb_WriteRADAUX(object):
         else:
             # print "Fix this for radiation analysis"
             line0 = "rtrace -I "
-            
-        line1_1 = " -h -dp " + str(radParameters["_dp_"]) + \
+        
+        # binary results keep the header so the readers can find the format
+        inputFormat = binaryFormat if binaryInput else "a"
+        outputFormat = binaryFormat if binaryOutput else "a"
+        if inputFormat != "a" or outputFormat != "a": line0 += " -f" + inputFormat + outputFormat
+        if outputFormat == "a": line0 += " -h"
+        
+        line1_1 = " -dp " + str(radParameters["_dp_"]) + \
                 " -ds " + str(radParameters["_ds_"]) + " -dt " + str(radParameters["_dt_"]) + \
                 " -dc " + str(radParameters["_dc_"]) + " -dr " + str(radParameters["_dr_"]) + \
                 " -st " + str(radParameters["_st_"]) + " -lr " + str(radParameters["_lr_"]) + \
@@ -3177,6 +3999,8 @@ class hb_WriteRADAUX(object):
                 " -ad " + str(radParameters["_ad_"]) + " -as " + str(radParameters["_as_"]) + \
                 " -ar " + str(radParameters["_ar_"]) + " -aa " + str(radParameters["_aa_"])
         
+        if ambFile: line1_1 += " -af " + ambFile
+        
         line1_2 = " "
         if radParameters.has_key("additional"):
             for par in radParameters["additional"]:
@@ -3196,19 +4020,33 @@ class hb_WriteRADAUX(object):
                 '%.4f'%ptsNormal.Z + '\n'
         
 
+    @staticmethod
+    def writeBinaryTestPts(ptsFileName, testPoints, ptsNormals, binaryFormat = "f"):
+        """Write the test points as binary values for the rtrace -ff or -fd input.
+        
+        Each point is written as six float32 (binaryFormat = "f") or float64 ("d") values.
+        """
+        values = array.array(binaryFormat)
+        for testPoint, ptsNormal in itertools.izip(testPoints, ptsNormals):
+            values.extend((testPoint.X, testPoint.Y, testPoint.Z, ptsNormal.X, ptsNormal.Y, ptsNormal.Z))
+        with open(ptsFileName, "wb") as ptsFile:
+            values.tofile(ptsFile)
+    
+    @staticmethod
+    def readBinaryTestPts(ptsFileName, binaryFormat = "f"):
+        """Read a binary test points file and return a list of (x, y, z, dx, dy, dz)."""
+        values = array.array(binaryFormat)
+        with open(ptsFileName, "rb") as ptsFile:
+            data = ptsFile.read()
+        values.fromstring(data[:len(data) - len(data) % values.itemsize])
+        return zip(*[iter(values)] * 6)
+    
     def readRadiationResult(self, resultFile):
-        result = []
-        resultFile = open(resultFile,"r")
-        for line in resultFile: result.append(float(line.split('	')[0])*179)
-        return result
+        R, G, B = CalculateGridBasedDLAnalysisResults.readRGBResult(resultFile)
+        return [r * 179 for r in R]
     
     def readDLResult(self, resultFile):
-        result = []
-        resultFile = open(resultFile,"r")
-        for line in resultFile:
-            R, G, B = line.split('	')[0:3]
-            result.append( 179 * (.265 * float(R) + .67 * float(G) + .065 * float(B)))
-        return result
+        return CalculateGridBasedDLAnalysisResults.illuminance(*CalculateGridBasedDLAnalysisResults.readRGBResult(resultFile))
     
     def isSrfAirWall(self, HBSrf):
         # This can be tricky since some of interior walls may or may not be air walls
@@ -3501,140 +4339,2245 @@ class hb_WriteDS(object):
                 'direct_sunlight_file ' + projectName  + '_' + `cpuCount` + '.dir\n' + \
                 'thermal_simulation ' + projectName  + '_' + `cpuCount` + '_intgain.csv\n'
 
-class hb_ReadAnnualResultsAux(object):
-    
-    def sortIllFiles(self, illFilesTemp):
+class hb_ReadAnnualResultsAux(object):
+    
+    def sortIllFiles(self, illFilesTemp):
+        """
+        This function sorts a list of *.ill for an annual study
+        and put them in different branches based on shading groups and blind states
+        ---------------------------------------------------------------------------
+        {0}
+        .ill files with no dynamic blinds. When there is no dynamic blinds or when
+        there are advanced dynamic blind these files should look like:
+            workingDir + ProjectName + "_" + CPUCount + ".ill"
+        and should be sorted based on CPUCount.
+        In case of conceptualBlinds the files will look like:
+            workingDir + ProjectName + "_" + CPUCount + "_up.ill"
+            
+        {1,0}
+         Branches with two numbers contain .ill files for shading groups with different
+         states. First number represents the shading group (which starts from 1) and
+         second number represents the state. For instance {1,0} includes .ill files
+         for first shading group and the first state of the blinds which is the most
+         open state. In case of simple blinds the file should look like:
+            workingDir + ProjectName + "_" + CPUCount + "_down.ill"
+         for advanced dynamic blinds the file should looks like:
+             workingDir + ProjectName + "_" shadingGroupName + "_state_" + stateCount+ "_" + CPUCount + ".ill"
+        """
+        
+        # check if there are multiple ill files in the folder for different shading groups
+        illFilesDict = {}
+        
+        for fullPath in illFilesTemp:
+            fileName = os.path.basename(fullPath)
+            
+            if fileName.split("_")[:-1]!= []:
+                if fileName.endswith("_down.ill") or fileName.endswith("_up.ill"):
+                    # conceptual blind
+                    stateName = "_".join(fileName.split("_")[:-2]) + "_" + fileName.split("_")[-1]
+                    if fileName.endswith("_up.ill"):
+                        groupName = -1
+                        stateName = "up"
+                        stateNumber = 0
+                    else:
+                        groupName = "conceptualBlinds"
+                        stateName = "down"
+                        stateNumber = 0
+                        
+                elif fileName.Contains("_state_"):
+                    # dynamic blinds with several states
+                    groupName = "_".join(fileName.split("_")[:-3])
+                    stateName = "_".join(fileName.split("_")[-3:-1])
+                    stateNumber = fileName.split("_")[-2]
+                else:
+                    groupName = -1
+                    stateName = "_".join(fileName.split("_")[:-1])
+                    stateNumber = -1 # no states
+            else:
+                groupName = -1
+                stateName = fileName
+                stateNumber = -1 # no states
+            
+            # create an empty dictionary
+            if groupName not in illFilesDict.keys():
+                illFilesDict[groupName] = {}
+            
+            # create an empty dictionary for each state
+            if stateName not in illFilesDict[groupName].keys():
+                illFilesDict[groupName][stateName] = []
+            
+            # append the file to the list
+            illFilesDict[groupName][stateName].append(fullPath)
+        
+        # sort the keys
+        illFiles = DataTree[System.Object]()
+        shadingGroupCount = 0
+        
+        for key, fileListDict in illFilesDict.items():
+            stateCount = 0
+            shadingGroupCount+=1
+            for state, fileList in fileListDict.items():
+                if key== -1:
+                    p = GH_Path(0)
+                    shadingGroupCount-=1
+                else:
+                    p = GH_Path(shadingGroupCount, stateCount)
+                    stateCount+=1
+                    
+                try:
+                    if fileName.endswith("_down.ill") or fileName.endswith("_up.ill"):
+                        # conceptual blind
+                        if fileList[0].endswith("_down.ill"):
+                            p = GH_Path(1,0)
+                        else:
+                            p = GH_Path(0)
+                        
+                        illFiles.AddRange(sorted(fileList, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-2])), p)
+                    else:
+                        illFiles.AddRange(sorted(fileList, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-1])), p)
+                        
+                except Exception, e:
+                    # failed to sort!
+                    illFiles.AddRange(fileList, p)
+        
+        return illFiles
+
+class hb_AnnualIlluminanceMatrix(object):
+    """Annual illuminance values of a Daysim study in a binary matrix.
+    
+    The .ill files of a study are written once into a single file with a float32
+    matrix of hours x points for each shading state. The file starts with 'HBILLMTX',
+    the length of a json header as uint32 and the json header. The header includes
+    the number of points and hours, point groups, shading states, timestamps and
+    the source .ill files that are used to check if the matrix is up to date.
+    
+    The file is memory-mapped when mmap is available so reading the values for
+    one point only reads the values of that point.
+    
+    Usage:
+        matrix = hb_AnnualIlluminanceMatrix.fromIllFiles(illFileSets)
+        values = matrix.getPointValues(ptIndex, stateIndex = matrix.getStateIndex(1, 0))
+        matrix.close()
+    """
+    
+    magic = "HBILLMTX"
+    version = 1
+    
+    def __init__(self, matrixFile):
+        self.matrixFile = matrixFile
+        self.header, self.dataStart = self.readHeader(matrixFile)
+        self.numOfPoints = self.header["numOfPoints"]
+        self.numOfHours = self.header["numOfHours"]
+        self.pointGroups = self.header["pointGroups"]
+        self.shadingStates = [tuple(state) for state in self.header["shadingStates"]]
+        self.timestamps = self.header["timestamps"]
+        
+        self.file = open(matrixFile, "rb")
+        self.map = None
+        if mmap is not None:
+            try:
+                self.map = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+            except Exception:
+                # fall back to reading from the file
+                self.map = None
+    
+    @classmethod
+    def readHeader(cls, matrixFile):
+        """Return the json header of a matrix file and the position of the first value."""
+        with open(matrixFile, "rb") as inf:
+            if inf.read(len(cls.magic)) != cls.magic:
+                raise ValueError("%s is not an annual illuminance matrix." % matrixFile)
+            headerLength = struct.unpack("<I", inf.read(4))[0]
+            header = json.loads(inf.read(headerLength))
+        return header, len(cls.magic) + 4 + headerLength
+    
+    @staticmethod
+    def sourceFiles(illFileSets):
+        """Return the .ill files for each shading state sorted by shading group."""
+        states = []
+        for shadingGroup in sorted(illFileSets.keys()):
+            for stateCount, illFiles in enumerate(illFileSets[shadingGroup]):
+                states.append(((shadingGroup, stateCount), list(illFiles)))
+        return states
+    
+    @staticmethod
+    def fileStamps(illFiles):
+        return [[os.path.normcase(illFile), os.path.getsize(illFile), int(os.path.getmtime(illFile))] \
+                for illFile in illFiles]
+    
+    @classmethod
+    def isUpToDate(cls, matrixFile, illFileSets):
+        if not os.path.isfile(matrixFile): return False
+        try:
+            header, dataStart = cls.readHeader(matrixFile)
+            sources = [cls.fileStamps(illFiles) for state, illFiles in cls.sourceFiles(illFileSets)]
+            return header["version"] == cls.version and header["sources"] == sources
+        except Exception:
+            return False
+    
+    @staticmethod
+    def defaultMatrixFile(illFileSets):
+        firstIllFile = illFileSets[sorted(illFileSets.keys())[0]][0][0]
+        return os.path.splitext(firstIllFile)[0] + ".ilm"
+    
+    @classmethod
+    def fromIllFiles(cls, illFileSets, matrixFile = None, pointGroups = None):
+        """Return the matrix for a set of .ill files and write it if it is missing or out of date.
+        
+        Args:
+            illFileSets: A dictionary of shading groups. Each value is a list of lists of
+                .ill files (one file for each cpu) for each shading state. 0 is the
+                shading group with no dynamic shadings.
+            matrixFile: Path to the matrix file. By default the matrix is written
+                next to the first .ill file with .ilm extension.
+            pointGroups: Optional list of number of points in each point group.
+        """
+        if not matrixFile: matrixFile = cls.defaultMatrixFile(illFileSets)
+        if not cls.isUpToDate(matrixFile, illFileSets):
+            cls.write(illFileSets, matrixFile, pointGroups)
+        return cls(matrixFile)
+    
+    @staticmethod
+    def parseIllLine(line):
+        # the date is followed by two spaces so the values start from the 5th item
+        return line.strip().split(" ")
+    
+    @classmethod
+    def write(cls, illFileSets, matrixFile, pointGroups = None):
+        """Write the .ill files into a matrix file."""
+        states = cls.sourceFiles(illFileSets)
+        firstStateFiles = states[0][1]
+        
+        # collect the timestamps and number of points from the first shading state
+        timestamps = []
+        with open(firstStateFiles[0], "r") as inf:
+            for line in inf:
+                if line.startswith("#") or not line.strip(): continue
+                month, day, hour = cls.parseIllLine(line)[:3]
+                timestamps.append([int(month), int(day), float(hour)])
+        
+        numOfPoints = 0
+        for illFile in firstStateFiles:
+            with open(illFile, "r") as inf:
+                for line in inf:
+                    if not line.startswith("#"):
+                        numOfPoints += len(cls.parseIllLine(line)) - 4
+                        break
+        
+        header = {"version": cls.version,
+                  "numOfPoints": numOfPoints,
+                  "numOfHours": len(timestamps),
+                  "order": "hours x points",
+                  "dataType": "float32",
+                  "pointGroups": list(pointGroups) if pointGroups else [numOfPoints],
+                  "shadingStates": [list(state) for state, illFiles in states],
+                  "timestamps": timestamps,
+                  "sources": [cls.fileStamps(illFiles) for state, illFiles in states]}
+        
+        headerStr = json.dumps(header)
+        # pad the header so the values are aligned to 4 bytes
+        headerStr += " " * (-(len(cls.magic) + 4 + len(headerStr)) % 4)
+        
+        tempFile = matrixFile + ".tmp"
+        with open(tempFile, "wb") as outf:
+            outf.write(cls.magic)
+            outf.write(struct.pack("<I", len(headerStr)))
+            outf.write(headerStr)
+            
+            for state, illFiles in states:
+                sourceFiles = [open(illFile, "r") for illFile in illFiles]
+                try:
+                    hourCount = 0
+                    for lines in itertools.izip(*sourceFiles):
+                        if lines[0].startswith("#") or not lines[0].strip(): continue
+                        values = array.array("f")
+                        for line in lines:
+                            values.extend(map(float, cls.parseIllLine(line)[4:]))
+                        if len(values) != numOfPoints:
+                            raise ValueError("Number of values in %s doesn't match the number of points." % illFiles[0])
+                        values.tofile(outf)
+                        hourCount += 1
+                finally:
+                    for sourceFile in sourceFiles: sourceFile.close()
+                
+                if hourCount != len(timestamps):
+                    raise ValueError("Number of hours in %s doesn't match the first shading state." % illFiles[0])
+        
+        if os.path.isfile(matrixFile): os.remove(matrixFile)
+        os.rename(tempFile, matrixFile)
+        return matrixFile
+    
+    def getStateIndex(self, shadingGroup = 0, state = 0):
+        """Return the index of a shading state in the matrix."""
+        return self.shadingStates.index((shadingGroup, state))
+    
+    def getPointGroupRange(self, groupIndex):
+        """Return the index of the first and the last (excluded) point of a point group."""
+        start = sum(self.pointGroups[:groupIndex])
+        return start, start + self.pointGroups[groupIndex]
+    
+    def readBytes(self, position, length):
+        if self.map is not None:
+            return self.map[position: position + length]
+        self.file.seek(position)
+        return self.file.read(length)
+    
+    def valuePosition(self, stateIndex, hour, ptIndex):
+        return self.dataStart + 4 * ((stateIndex * self.numOfHours + hour) * self.numOfPoints + ptIndex)
+    
+    def getHourValues(self, hour, stateIndex = 0, startPoint = 0, endPoint = None):
+        """Return an array of values for one hour of the year (0-8759) for a range of points."""
+        if endPoint is None: endPoint = self.numOfPoints
+        values = array.array("f")
+        values.fromstring(self.readBytes(self.valuePosition(stateIndex, hour, startPoint), 4 * (endPoint - startPoint)))
+        return values
+    
+    def getHourRangeValues(self, startHour = 0, endHour = None, stateIndex = 0):
+        """Return an array of values for all the points for a range of hours.
+        
+        Values are sorted by hour and then by point.
+        """
+        if endHour is None: endHour = self.numOfHours
+        values = array.array("f")
+        values.fromstring(self.readBytes(self.valuePosition(stateIndex, startHour, 0), \
+                                         4 * (endHour - startHour) * self.numOfPoints))
+        return values
+    
+    def getPointValues(self, ptIndex, stateIndex = 0, startHour = 0, endHour = None):
+        """Return a list of values for one point for a range of hours."""
+        if endHour is None: endHour = self.numOfHours
+        stride = 4 * self.numOfPoints
+        position = self.valuePosition(stateIndex, startHour, ptIndex)
+        if self.map is not None:
+            return [struct.unpack_from("<f", self.map, position + stride * count)[0] \
+                    for count in range(endHour - startHour)]
+        
+        values = []
+        for count in range(endHour - startHour):
+            self.file.seek(position + stride * count)
+            values.append(struct.unpack("<f", self.file.read(4))[0])
+        return values
+    
+    def close(self):
+        if self.map is not None: self.map.close()
+        self.file.close()
+    
+
+class hb_ComfortMatrix(object):
+    """Hourly result matrix of a microclimate map in a binary file.
+    
+    A comfort matrix is a header string followed by a list of point values for each
+    hour of the analysis. The file starts with 'HBCMFMTX', the length of a json header
+    as uint32 and the json header with the matrix header, the number of hours and
+    points and whether the rows are compressed. The values follow as one float32 row
+    for each hour. Compressed rows are zlib blocks with an index of their position
+    and length at the end of the file.
+    
+    An open matrix can be used in place of a python matrix. matrix[0] is the header
+    string and matrix[count] only reads the values of that hour from the file.
+    
+    Usage:
+        writer = hb_ComfortMatrix.writer(matrixFile, mtxHeader, numOfHours, numOfPoints)
+        writer.writeRow(values)
+        writer.close()
+        
+        matrix = hb_ComfortMatrix(matrixFile)
+        values = matrix[stepOfSimulation]
+        matrix.close()
+    """
+    
+    magic = "HBCMFMTX"
+    version = 1
+    extension = ".hbmtx"
+    
+    def __init__(self, matrixFile):
+        self.matrixFile = matrixFile
+        header, self.dataStart = self.readHeader(matrixFile)
+        self.mtxHeader = header["header"]
+        self.numOfHours = header["numOfHours"]
+        self.numOfPoints = header["numOfPoints"]
+        self.compressed = header["compressed"]
+        
+        self.file = open(matrixFile, "rb")
+        self.map = None
+        if mmap is not None:
+            try:
+                self.map = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+            except Exception:
+                # fall back to reading from the file
+                self.map = None
+        
+        self.rowIndex = None
+        if self.compressed:
+            self.file.seek(-8, 2)
+            indexPosition = struct.unpack("<Q", self.file.read(8))[0]
+            index = struct.unpack("<" + "QI" * self.numOfHours, self.readBytes(indexPosition, 12 * self.numOfHours))
+            self.rowIndex = zip(index[::2], index[1::2])
+        
+        # the last row that was read as the components read one hour point by point
+        self.lastRow = (None, None)
+    
+    @classmethod
+    def readHeader(cls, matrixFile):
+        """Return the json header of a matrix file and the position of the first value."""
+        with open(matrixFile, "rb") as inf:
+            if inf.read(len(cls.magic)) != cls.magic:
+                raise ValueError("%s is not a comfort matrix." % matrixFile)
+            headerLength = struct.unpack("<I", inf.read(4))[0]
+            header = json.loads(inf.read(headerLength))
+        return header, len(cls.magic) + 4 + headerLength
+    
+    @classmethod
+    def isMatrixFile(cls, matrixFile):
+        """Check if a file address is a comfort matrix file."""
+        try:
+            if not os.path.isfile(matrixFile): return False
+            with open(matrixFile, "rb") as inf:
+                return inf.read(len(cls.magic)) == cls.magic
+        except Exception:
+            return False
+    
+    @classmethod
+    def writer(cls, matrixFile, mtxHeader, numOfHours, numOfPoints, compress = False):
+        """Return a writer to stream the rows of a matrix into a matrix file."""
+        return hb_ComfortMatrixWriter(matrixFile, mtxHeader, numOfHours, numOfPoints, compress)
+    
+    @classmethod
+    def write(cls, matrixFile, matrix, compress = False):
+        """Write a python matrix into a matrix file.
+        
+        Args:
+            matrixFile: Path to the matrix file.
+            matrix: A list with a header string followed by a list of values for each hour.
+            compress: Set to True to compress the rows of the matrix with zlib.
+        """
+        numOfPoints = len(matrix[-1]) if len(matrix) > 1 else 0
+        writer = cls.writer(matrixFile, matrix[0], len(matrix) - 1, numOfPoints, compress)
+        for values in matrix[1:]:
+            writer.writeRow(values)
+        return writer.close()
+    
+    def readBytes(self, position, length):
+        if self.map is not None:
+            return self.map[position: position + length]
+        self.file.seek(position)
+        return self.file.read(length)
+    
+    def getHourValues(self, count):
+        """Return a list of the values of all the points for one hour of the matrix (0 is the first hour)."""
+        if count < 0 or count >= self.numOfHours:
+            raise IndexError("Hour %d is outside of the %d hours of the matrix." % (count + 1, self.numOfHours))
+        
+        lastCount, lastValues = self.lastRow
+        if lastCount == count: return lastValues
+        
+        values = array.array("f")
+        if self.compressed:
+            position, length = self.rowIndex[count]
+            values.fromstring(zlib.decompress(self.readBytes(position, length)))
+        else:
+            values.fromstring(self.readBytes(self.dataStart + 4 * count * self.numOfPoints, 4 * self.numOfPoints))
+        values = values.tolist()
+        self.lastRow = (count, values)
+        return values
+    
+    def getPointValues(self, ptIndex, startHour = 0, endHour = None):
+        """Return a list of values for one point for a range of hours."""
+        if endHour is None: endHour = self.numOfHours
+        if self.compressed:
+            return [self.getHourValues(count)[ptIndex] for count in range(startHour, endHour)]
+        
+        stride = 4 * self.numOfPoints
+        position = self.dataStart + 4 * (startHour * self.numOfPoints + ptIndex)
+        return [struct.unpack("<f", self.readBytes(position + stride * count, 4))[0] \
+                for count in range(endHour - startHour)]
+    
+    def __len__(self):
+        return self.numOfHours + 1
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[count] for count in range(*index.indices(len(self)))]
+        if index < 0: index += len(self)
+        if index == 0: return self.mtxHeader
+        return self.getHourValues(index - 1)
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+    
+    def toMatrix(self):
+        """Return the whole matrix as a python matrix."""
+        if self.compressed:
+            return [self.mtxHeader] + [self.getHourValues(count) for count in range(self.numOfHours)]
+        
+        values = array.array("f")
+        values.fromstring(self.readBytes(self.dataStart, 4 * self.numOfHours * self.numOfPoints))
+        matrix = [self.mtxHeader]
+        for count in range(self.numOfHours):
+            matrix.append(values[count * self.numOfPoints: (count + 1) * self.numOfPoints].tolist())
+        return matrix
+    
+    def writeCSV(self, csvFile = None):
+        """Convert the matrix into a csv file with the header in the first line and one line for each hour."""
+        if not csvFile: csvFile = os.path.splitext(self.matrixFile)[0] + ".csv"
+        with open(csvFile, "wb") as outf:
+            outf.write(self.mtxHeader + "\n")
+            for count in range(self.numOfHours):
+                outf.write(",".join(["%.7g" % value for value in self.getHourValues(count)]) + "\n")
+        return csvFile
+    
+    def close(self):
+        if self.map is not None: self.map.close()
+        self.file.close()
+    
+
+class hb_ComfortMatrixWriter(object):
+    """Stream the rows of a comfort matrix into a matrix file.
+    
+    The rows are written hour by hour into a temporary file that replaces the matrix
+    file once all of the rows are written.
+    """
+    
+    def __init__(self, matrixFile, mtxHeader, numOfHours, numOfPoints, compress = False):
+        self.matrixFile = matrixFile
+        self.tempFile = matrixFile + ".tmp"
+        self.numOfHours = numOfHours
+        self.numOfPoints = numOfPoints
+        self.compress = compress
+        self.rowIndex = []
+        
+        header = {"version": hb_ComfortMatrix.version,
+                  "header": mtxHeader,
+                  "numOfHours": numOfHours,
+                  "numOfPoints": numOfPoints,
+                  "order": "hours x points",
+                  "dataType": "float32",
+                  "compressed": bool(compress)}
+        
+        magic = hb_ComfortMatrix.magic
+        headerStr = json.dumps(header)
+        # pad the header so the values are aligned to 4 bytes
+        headerStr += " " * (-(len(magic) + 4 + len(headerStr)) % 4)
+        
+        self.file = open(self.tempFile, "wb")
+        self.file.write(magic)
+        self.file.write(struct.pack("<I", len(headerStr)))
+        self.file.write(headerStr)
+        self.dataStart = self.file.tell()
+    
+    def writeRow(self, values):
+        """Write the values of the points for the next hour of the matrix."""
+        count = len(self.rowIndex)
+        if count == self.numOfHours:
+            raise ValueError("%s only has %d hours." % (self.matrixFile, self.numOfHours))
+        values = array.array("f", values)
+        if len(values) != self.numOfPoints:
+            raise ValueError("Number of values for hour %d doesn't match the number of points." % (count + 1))
+        data = values.tostring()
+        if self.compress: data = zlib.compress(data)
+        
+        position = self.file.tell()
+        self.file.write(data)
+        self.rowIndex.append((position, len(data)))
+    
+    def close(self):
+        """Finish the matrix file and return its address."""
+        if len(self.rowIndex) != self.numOfHours:
+            self.file.close()
+            os.remove(self.tempFile)
+            raise ValueError("Hour %d of %s was never written." % (len(self.rowIndex) + 1, self.matrixFile))
+        
+        if self.compress:
+            indexPosition = self.file.tell()
+            self.file.write("".join([struct.pack("<QI", position, length) for position, length in self.rowIndex]))
+            self.file.write(struct.pack("<Q", indexPosition))
+        self.file.close()
+        
+        if os.path.isfile(self.matrixFile): os.remove(self.matrixFile)
+        os.rename(self.tempFile, self.matrixFile)
+        return self.matrixFile
+    
+
+class hb_DCMatrixEngine(object):
+    """Annual illuminance from a daylight coefficient matrix and a sky matrix.
+    
+    rcontrib calculates the contribution of each sky patch to each test point once.
+    The annual illuminance is the product of this matrix and a Reinhart sky matrix
+    that is generated from the weather file by gendaymtx. A new weather file or
+    analysis period only needs a new multiplication and not a new ray-tracing run.
+    
+    The multiplication is done by dctimestep and rmtxop in the batch files. The
+    results are written as Daysim .ill files so they can be used with the other
+    annual components. The matrices are only multiplied in Python if the output of
+    dctimestep is missing and the study is small.
+    
+    Args:
+        skyDensity: Reinhart sky subdivision (1 = 146 patches, 2 = 578 patches).
+        hoursPerChunk: Number of hours that are calculated in each parallel task.
+    
+    Usage:
+        engine = hb_DCMatrixEngine()
+        engine.annualIlluminance(dcMatrixFile, skyMatrixFile, weaFile, illFile)
+    """
+    
+    # weights to convert RGB radiance values to illuminance
+    RGBWeights = (0.265 * 179, 0.670 * 179, 0.065 * 179)
+    
+    skyGlowStr = "#@rfluxmtx h=u u=Y\n" + \
+                 "void glow sky_glow\n0\n0\n4 1 1 1 0\n\n" + \
+                 "sky_glow source sky\n0\n0\n4 0 0 1 180\n\n" + \
+                 "sky_glow source ground\n0\n0\n4 0 0 -1 180\n"
+    
+    # max number of points x patches x hours that is multiplied in Python
+    maxPythonProducts = 20000000
+    
+    def __init__(self, skyDensity = 1, hoursPerChunk = 168):
+        self.skyDensity = max(int(skyDensity or 1), 1)
+        self.hoursPerChunk = hoursPerChunk
+    
+    @property
+    def numOfPatches(self):
+        # Reinhart patches + the ground patch
+        return 144 * self.skyDensity ** 2 + 2
+    
+    def writeSkyGlowFile(self, fileName):
+        with open(fileName, "w") as skyFile:
+            skyFile.write(self.skyGlowStr)
+        return fileName
+    
+    def rcontribLine(self, ptsFile, octFileName, radParameters, outputFile):
+        line = "rcontrib -I+ -faf -ab " + str(radParameters["_ab_"]) + \
+               " -ad " + str(radParameters["_ad_"]) + " -as " + str(radParameters["_as_"]) + \
+               " -lr " + str(radParameters["_lr_"]) + " -lw " + str(radParameters["_lw_"]) + \
+               " -dj " + str(radParameters["_dj_"]) + " -st " + str(radParameters["_st_"])
+        
+        if radParameters.has_key("additional"):
+            for par in radParameters["additional"]:
+                line += " -%s"%par
+        
+        line += " -e MF:%d -f reinhart.cal -b rbin -bn Nrbins -m sky_glow "%self.skyDensity + \
+                octFileName + ".oct < " + ptsFile + " > " + outputFile + "\n"
+        return line
+    
+    def gendaymtxLine(self, weaFile, skyMatrixFile):
+        # use a gray sky so the patches have the same value in all the channels
+        return "gendaymtx -m %d -c 1 1 1 "%self.skyDensity + weaFile + " > " + skyMatrixFile + "\n"
+    
+    def dctimestepLine(self, dcMatrixFile, skyMatrixFile, illMatrixFile):
+        """Multiply the matrices and write the illuminance of each hour (row) for each point (column)."""
+        return "dctimestep " + dcMatrixFile + " " + skyMatrixFile + " | rmtxop -ff -t -c " + \
+               " ".join("%.4f" % weight for weight in self.RGBWeights) + " - > " + illMatrixFile + "\n"
+    
+    @staticmethod
+    def readWeaTimestamps(weaFile):
+        """Return (month, day, hour) for each line of the weather data in a .wea file."""
+        timestamps = []
+        with open(weaFile, "r") as weaf:
+            for line in weaf:
+                values = line.split()
+                if len(values) != 5 or not values[0].isdigit(): continue
+                timestamps.append((int(values[0]), int(values[1]), float(values[2])))
+        return timestamps
+    
+    @staticmethod
+    def readMatrixHeader(inf):
+        """Read the header of a Radiance matrix file and return it as a dictionary."""
+        header = {}
+        firstLine = inf.readline()
+        if not firstLine.startswith("#?RADIANCE"):
+            inf.seek(0)
+            return header
+        
+        for line in iter(inf.readline, ""):
+            line = line.strip()
+            if not line: break
+            if "=" in line:
+                key, value = line.split("=", 1)
+                header[key.strip().upper()] = value.strip()
+        return header
+    
+    @classmethod
+    def readMatrix(cls, fileName, numOfCols = None, numOfRows = None):
+        """Read a Radiance matrix and return a list of rows.
+        
+        The three color channels are combined into one illuminance value so each row is
+        an array of numOfCols values. numOfCols and numOfRows are only used if they are
+        not in the header of the file.
+        """
+        with open(fileName, "rb") as inf:
+            header = cls.readMatrixHeader(inf)
+            data = inf.read()
+        
+        dataFormat = header.get("FORMAT", "ascii").lower()
+        if dataFormat in ("float", "double"):
+            values = array.array("f" if dataFormat == "float" else "d")
+            values.fromstring(data[:len(data) - len(data) % values.itemsize])
+            bigEndian = header.get("BIGENDIAN")
+            if bigEndian is not None and (bigEndian == "1") != (sys.byteorder == "big"):
+                values.byteswap()
+        else:
+            values = array.array("d", map(float, data.split()))
+        
+        numOfComps = int(header.get("NCOMP", 3))
+        if "NROWS" in header: numOfRows = int(header["NROWS"])
+        if "NCOLS" in header: numOfCols = int(header["NCOLS"])
+        elif not numOfCols: numOfCols = len(values) // (numOfComps * (numOfRows or 1))
+        rowLength = numOfCols * numOfComps
+        if not numOfRows: numOfRows = len(values) // rowLength
+        if numOfRows * rowLength > len(values):
+            raise ValueError("%s has %d values instead of %d x %d x %d." % \
+                             (fileName, len(values), numOfRows, numOfCols, numOfComps))
+        
+        rows = []
+        for rowCount in range(numOfRows):
+            start = rowCount * rowLength
+            if numOfComps == 3:
+                rows.append(array.array("d", [r * cls.RGBWeights[0] + g * cls.RGBWeights[1] + b * cls.RGBWeights[2] \
+                                              for r, g, b in itertools.izip(*[iter(values[start:start + rowLength])] * 3)]))
+            else:
+                rows.append(array.array("d", values[start:start + numOfCols]))
+        return rows
+    
+    def readSkyMatrix(self, skyMatrixFile):
+        """Read a sky matrix from gendaymtx and return a list of patch values for each hour.
+        
+        The illuminance weights are applied to the daylight coefficients so the patch
+        values are divided by 179 to keep the sky in radiance.
+        """
+        patches = self.readMatrix(skyMatrixFile, numOfRows = self.numOfPatches)
+        scale = 1.0 / sum(self.RGBWeights)
+        return [array.array("d", [value * scale for value in hourValues]) \
+                for hourValues in itertools.izip(*patches)]
+    
+    @staticmethod
+    def hourValues(dcRows, skyValues):
+        """Multiply the daylight coefficients by the sky patches for one hour."""
+        patches = [(count, value) for count, value in enumerate(skyValues) if value > 0]
+        if not patches: return None
+        return [sum(row[count] * value for count, value in patches) for row in dcRows]
+    
+    def annualIlluminance(self, dcMatrixFile, skyMatrixFile, weaFile, illFileName, hoys = None, skyMatrix = None):
+        """Write the annual illuminance of the test points to a Daysim .ill file.
+        
+        Args:
+            dcMatrixFile: Daylight coefficient matrix from rcontrib.
+            skyMatrixFile: Sky matrix from gendaymtx.
+            weaFile: Weather file that is used to generate the sky matrix.
+            illFileName: Path to the .ill file.
+            hoys: Optional list of hours of the year (1-8760). The values for the other hours
+                will be 0.
+            skyMatrix: Optional sky matrix that is already read by readSkyMatrix.
+        
+        Returns:
+            illFileName
+        """
+        dcRows = self.readMatrix(dcMatrixFile, self.numOfPatches)
+        if skyMatrix is None: skyMatrix = self.readSkyMatrix(skyMatrixFile)
+        timestamps = self.readWeaTimestamps(weaFile)
+        
+        if len(timestamps) != len(skyMatrix):
+            raise ValueError("The sky matrix has %d hours but %s has %d." % (len(skyMatrix), weaFile, len(timestamps)))
+        if dcRows and len(dcRows[0]) != len(skyMatrix[0]):
+            raise ValueError("The daylight coefficients have %d sky patches but the sky matrix has %d." % \
+                             (len(dcRows[0]), len(skyMatrix[0])))
+        
+        if hoys: hoys = set(int(hoy) - 1 for hoy in hoys)
+        
+        numOfPoints = len(dcRows)
+        emptyValues = " 0" * numOfPoints
+        numOfHours = len(timestamps)
+        chunks = [range(st, min(st + self.hoursPerChunk, numOfHours)) \
+                  for st in range(0, numOfHours, self.hoursPerChunk)]
+        
+        def calculateChunk(chunkCount):
+            lines = []
+            for hour in chunks[chunkCount]:
+                month, day, hourOfDay = timestamps[hour]
+                values = None
+                if not hoys or hour in hoys:
+                    values = self.hourValues(dcRows, skyMatrix[hour])
+                
+                if values is None: valuesStr = emptyValues
+                else: valuesStr = "".join(" %.2f" % v for v in values)
+                # Daysim writes two spaces between the time and the values
+                lines.append("%d %d %.3f " % (month, day, hourOfDay) + valuesStr + "\n")
+            chunkResults[chunkCount] = "".join(lines)
+        
+        # calculate a number of chunks in parallel and write them to the file
+        numOfParallelChunks = max(hb_JobScheduler.cpuCount(), 1) * 2
+        with open(illFileName, "w") as illFile:
+            for st in range(0, len(chunks), numOfParallelChunks):
+                chunkResults = {}
+                chunkIds = range(st, min(st + numOfParallelChunks, len(chunks)))
+                try:
+                    tasks.Parallel.ForEach(chunkIds, calculateChunk)
+                except Exception:
+                    for chunkCount in chunkIds:
+                        if chunkCount not in chunkResults: calculateChunk(chunkCount)
+                
+                for chunkCount in chunkIds:
+                    illFile.write(chunkResults[chunkCount])
+        
+        return illFileName
+    
+    def writeIllFile(self, illMatrixFile, weaFile, illFileName, hoys = None):
+        """Write the output of dctimestepLine to a Daysim .ill file.
+        
+        The matrix is read one hour at a time so the file is never loaded at once.
+        """
+        timestamps = self.readWeaTimestamps(weaFile)
+        if hoys: hoys = set(int(hoy) - 1 for hoy in hoys)
+        
+        with open(illMatrixFile, "rb") as inf, open(illFileName, "w") as illFile:
+            header = self.readMatrixHeader(inf)
+            dataFormat = header.get("FORMAT", "ascii").lower()
+            numOfHours = int(header.get("NROWS", len(timestamps)))
+            numOfPoints = int(header["NCOLS"])
+            if numOfHours != len(timestamps):
+                raise ValueError("%s has %d hours but %s has %d." % (illMatrixFile, numOfHours, weaFile, len(timestamps)))
+            
+            emptyValues = " 0" * numOfPoints
+            swap = header.get("BIGENDIAN") is not None and (header["BIGENDIAN"] == "1") != (sys.byteorder == "big")
+            lines = []
+            for hour, (month, day, hourOfDay) in enumerate(timestamps):
+                if dataFormat in ("float", "double"):
+                    values = array.array("f" if dataFormat == "float" else "d")
+                    values.fromfile(inf, numOfPoints)
+                    if swap: values.byteswap()
+                else:
+                    values = map(float, inf.readline().split())
+                
+                if (hoys and hour not in hoys) or not any(values): valuesStr = emptyValues
+                else: valuesStr = "".join(" %.2f" % v for v in values)
+                # Daysim writes two spaces between the time and the values
+                lines.append("%d %d %.3f " % (month, day, hourOfDay) + valuesStr + "\n")
+                if len(lines) == self.hoursPerChunk:
+                    illFile.writelines(lines)
+                    lines = []
+            illFile.writelines(lines)
+        
+        return illFileName
+    
+    def calculate(self, dcMatrixFiles, skyMatrixFile, weaFile, illFileNames = None, hoys = None, illMatrixFiles = None):
+        """Write an .ill file for each daylight coefficient matrix.
+        
+        The .ill files will be next to the .dcm files if illFileNames is not provided.
+        If the output of dctimestep (illMatrixFiles) is missing the matrices are multiplied
+        in Python as long as the study is smaller than maxPythonProducts.
+        """
+        if not illFileNames:
+            illFileNames = [os.path.splitext(dcFile)[0] + ".ill" for dcFile in dcMatrixFiles]
+        if not illMatrixFiles:
+            illMatrixFiles = [None] * len(dcMatrixFiles)
+        
+        skyMatrix = None
+        for dcFile, illFileName, illMatrixFile in zip(dcMatrixFiles, illFileNames, illMatrixFiles):
+            if illMatrixFile and os.path.isfile(illMatrixFile) and os.path.getsize(illMatrixFile) > 0:
+                self.writeIllFile(illMatrixFile, weaFile, illFileName, hoys)
+                continue
+            
+            if skyMatrix is None: skyMatrix = self.readSkyMatrix(skyMatrixFile)
+            numOfPoints = self.countMatrixRows(dcFile)
+            if numOfPoints * len(skyMatrix[0]) * len(skyMatrix) > self.maxPythonProducts:
+                raise ValueError("dctimestep failed to calculate %s and the study is too large to be calculated in Python." % \
+                                 (illMatrixFile or illFileName))
+            self.annualIlluminance(dcFile, skyMatrixFile, weaFile, illFileName, hoys, skyMatrix)
+        
+        return illFileNames
+    
+    @classmethod
+    def countMatrixRows(cls, fileName):
+        """Return the number of rows of a Radiance matrix from its header or by counting the lines."""
+        with open(fileName, "rb") as inf:
+            header = cls.readMatrixHeader(inf)
+            if "NROWS" in header: return int(header["NROWS"])
+            return sum(1 for line in inf if line.strip())
+    
+
+class hb_EnergySimulatioParameters(object):
+    
+    def readEPParams(self, EPParameters):
+        
+        if EPParameters == []:
+            timestep = 6
+            shadowPar = ["AverageOverDaysInFrequency", 30, 3000]
+            solarDistribution = "FullInteriorAndExteriorWithReflections"
+            simulationControl = [True, True, True, False, True, '', '']
+            ddyFile = None
+            terrain = 'City'
+            grndTemps = []
+            holidays = []
+            startDay = None
+            heatSizing = 1.25
+            coolSizing = 1.15
+        
+        else:
+            timestep = int(EPParameters[0])
+            shadowPar = EPParameters[1:4]
+            solarDistribution = EPParameters[4]
+            simulationControl = EPParameters[5:12]
+            ddyFile = EPParameters[12]
+            terrain = EPParameters[13]
+            grndTemps = EPParameters[14]
+            holidays = EPParameters[15]
+            startDay = EPParameters[16]
+            heatSizing = EPParameters[17]
+            coolSizing = EPParameters[18]
+        
+        return timestep, shadowPar, solarDistribution, simulationControl, ddyFile, terrain, grndTemps, holidays, startDay, heatSizing, coolSizing
+    
+    def readSQLOutput(self, EPParameters):
+        """Check if the simulation parameters request the results to be written to an sql file."""
+        try: return bool(EPParameters[19])
+        except IndexError: return False
+
+class hb_EPCSVResultReader(object):
+    """
+    Read EnergyPlus csv result files column by column.
+
+    The header row is parsed once into a list of columns where each column is
+    (keyName, outputName, units, frequency). Data rows are then streamed and only
+    the requested columns are converted to floats and written into preallocated
+    array('d') columns so reading a file scales linearly with its size.
+
+    Usage:
+        reader = hb_EPCSVResultReader(resultFileAddress)
+        colIds = reader.findColumns('Zone Mean Air Temperature')
+        columns = reader.readColumns(colIds)
+    """
+
+    def __init__(self, resultFileAddress):
+        self.resultFileAddress = resultFileAddress
+        self.header = []
+        self.columns = []
+        self.failedColumns = set()
+        self.readHeader()
+
+    @staticmethod
+    def parseHeaderColumn(column):
+        """Split an EnergyPlus csv header like 'ZONE1:Zone Mean Air Temperature [C](Hourly)'.
+
+        Returns:
+            (keyName, outputName, units, frequency)
+        """
+        column = column.strip()
+        frequency = column.split('(')[-1].split(')')[0] if column.endswith(')') else ''
+        units = column.split('[')[-1].split(']')[0] if '[' in column else ''
+        fullName = column.split(' [')[0]
+        if ':' in fullName:
+            keyName = ":".join(fullName.split(":")[:-1])
+            outputName = fullName.split(":")[-1]
+        else:
+            keyName = ''
+            outputName = fullName
+
+        return keyName, outputName, units, frequency
+
+    def readHeader(self):
+        with open(self.resultFileAddress, 'r') as result:
+            headerLine = result.readline()
+
+        self.header = headerLine.split(',')
+        self.columns = [self.parseHeaderColumn(column) for column in self.header]
+        return self.header
+
+    def findColumns(self, outputName, keyNames = None):
+        """Return the index of the columns for an output.
+
+        Args:
+            outputName: Full or partial name of the output (e.g. 'Zone Mean Air Temperature').
+            keyNames: Optional list of key names (e.g. zone names) to limit the columns.
+        """
+        if keyNames is not None:
+            keyNames = set(k.upper().strip() for k in keyNames)
+
+        colIds = []
+        for colCount, column in enumerate(self.columns):
+            if outputName not in column[1]: continue
+            if keyNames is not None and column[0].upper().strip() not in keyNames: continue
+            colIds.append(colCount)
+        return colIds
+
+    def countRows(self):
+        """Count data rows by counting line breaks in large binary blocks."""
+        count = 0
+        lastChar = '\n'
+        with open(self.resultFileAddress, 'rb') as result:
+            while True:
+                block = result.read(1048576)
+                if not block: break
+                count += block.count('\n')
+                lastChar = block[-1]
+
+        # the last line might not end with a line break
+        if lastChar != '\n': count += 1
+
+        # remove header
+        return max(count - 1, 0)
+
+    def readColumns(self, columnIds, divisors = None):
+        """Stream the data rows and collect the values for the requested columns.
+
+        Args:
+            columnIds: List of column indices.
+            divisors: Optional dictionary of {columnId: divisor}. Values for that column
+                will be divided by the divisor (e.g. 3600000 for J to kWh).
+
+        Returns:
+            A dictionary of {columnId: array('d')}. Cells that could not be converted
+            to a number are set to NaN and the column is added to self.failedColumns.
+        """
+        columnIds = sorted(set(columnIds))
+        if not columnIds: return {}
+
+        numOfRows = self.countRows()
+        values = [array.array('d', [0.0]) * numOfRows for colId in columnIds]
+        getCells = operator.itemgetter(*columnIds)
+        singleColumn = len(columnIds) == 1
+        nan = float('nan')
+        rowCount = -1
+
+        with open(self.resultFileAddress, 'r') as result:
+            result.readline()
+            for rowCount, line in enumerate(result):
+                if rowCount >= numOfRows:
+                    break
+                try:
+                    cells = getCells(line.split(','))
+                    if singleColumn: cells = (cells,)
+                except IndexError:
+                    # short row
+                    cells = [''] * len(columnIds)
+                for colCount, cell in enumerate(cells):
+                    try:
+                        values[colCount][rowCount] = float(cell)
+                    except ValueError:
+                        values[colCount][rowCount] = nan
+                        self.failedColumns.add(columnIds[colCount])
+
+        # trim the arrays if the file has empty lines at the end
+        numOfRows = rowCount + 1
+        columns = {}
+        for colCount, colId in enumerate(columnIds):
+            data = values[colCount]
+            if len(data) != numOfRows:
+                del data[numOfRows:]
+            if divisors and colId in divisors and divisors[colId] != 1:
+                divisor = float(divisors[colId])
+                data = array.array('d', [v / divisor for v in data])
+            columns[colId] = data
+
+        return columns
+
+    def readTimes(self):
+        """Return (month, day, hour) for each data row or None if a row has no date (e.g. monthly data)."""
+        times = []
+        with open(self.resultFileAddress, 'r') as result:
+            result.readline()
+            for line in result:
+                if not line.strip(): continue
+                try:
+                    date, time = line.split(',', 1)[0].split()[:2]
+                    month, day = date.split('/')
+                    times.append((int(month), int(day), int(time.split(':')[0])))
+                except ValueError:
+                    times.append(None)
+        return times
+
+    @staticmethod
+    def periodToRange(period):
+        """Convert an analysis period (stMonth, stDay, stHour, endMonth, endDay, endHour) to comparable keys."""
+        stMonth, stDay, stHour, endMonth, endDay, endHour = period
+        return stMonth * 10000 + stDay * 100 + stHour, endMonth * 10000 + endDay * 100 + endHour
+
+    def queryVariable(self, variableName, keyNames = None, period = None):
+        """Get the values of a variable for a number of keys (e.g. zones) over a period.
+
+        Args:
+            variableName: Full or partial name of the output variable.
+            keyNames: Optional list of key names. Default is all the keys.
+            period: Optional (stMonth, stDay, stHour, endMonth, endDay, endHour).
+                Rows with no date information are always returned.
+
+        Returns:
+            A list of ((keyName, outputName, units, frequency), array('d')) for each column.
+        """
+        colIds = self.findColumns(variableName, keyNames)
+        columns = self.readColumns(colIds)
+
+        if period is not None and colIds:
+            st, end = self.periodToRange(period)
+            mask = [t is None or st <= t[0] * 10000 + t[1] * 100 + t[2] <= end \
+                    for t in self.readTimes()]
+            for colId in colIds:
+                columns[colId] = array.array('d', itertools.compress(columns[colId], mask))
+
+        return [(self.columns[colId], columns[colId]) for colId in colIds]
+
+class hb_EPSQLResultReader(hb_EPCSVResultReader):
+    """
+    Read EnergyPlus results from the SQLite output (Output:SQLite).
+
+    The reader exposes the same interface as hb_EPCSVResultReader. The header is
+    generated from the ReportDataDictionary table with the same format as the csv
+    header and the requested columns are read with a single query instead of
+    parsing the whole file. The sql file is only read and never modified.
+
+    sqlite3 is not part of every IronPython distribution. If it is missing the
+    csv file is used instead (see getEPResultReader).
+    """
+
+    # table and field names changed in EnergyPlus 8.2
+    newSchema = {'dict': 'ReportDataDictionary', 'data': 'ReportData',
+                 'index': 'ReportDataDictionaryIndex', 'name': 'Name',
+                 'units': 'Units', 'value': 'Value'}
+    oldSchema = {'dict': 'ReportVariableDataDictionary', 'data': 'ReportVariableData',
+                 'index': 'ReportVariableDataDictionaryIndex', 'name': 'VariableName',
+                 'units': 'VariableUnits', 'value': 'VariableValue'}
+
+    def __init__(self, sqlFileAddress):
+        if sqlite3 is None:
+            raise ImportError("sqlite3 is not available in this version of IronPython.")
+        self.schema = None
+        self.dictIndices = []
+        hb_EPCSVResultReader.__init__(self, sqlFileAddress)
+
+    # the sql file is closed before the csv file is written by ReadVarsESO
+    maxSQLFileAge = 60
+
+    @classmethod
+    def findSQLFile(cls, resultFileAddress):
+        """Find the sql file for an EnergyPlus result file.
+
+        Return None if there is no sql file or if the sql file is left from an older
+        simulation. An sql file is only used if it is not older than the eso and csv
+        files of the result.
+        """
+        if resultFileAddress.lower().endswith('.sql'):
+            return resultFileAddress if os.path.isfile(resultFileAddress) else None
+
+        fileName = os.path.splitext(resultFileAddress)[0]
+        eplusout = os.path.join(os.path.dirname(resultFileAddress), 'eplusout')
+        for sqlFileAddress, esoFileAddress in ((fileName + '.sql', fileName + '.eso'),
+                                               (eplusout + '.sql', eplusout + '.eso')):
+            if not os.path.isfile(sqlFileAddress): continue
+            sqlTime = os.path.getmtime(sqlFileAddress)
+            resultTimes = [os.path.getmtime(f) for f in (esoFileAddress, resultFileAddress) if os.path.isfile(f)]
+            # the ReadVarsESO step of a large model can take a while so only compare to the eso
+            # file if it is there.
+            if len(resultTimes) == 2: resultTimes = resultTimes[:1]
+            if resultTimes and sqlTime + cls.maxSQLFileAge < resultTimes[0]:
+                print "%s is older than the result file and will not be used." % sqlFileAddress
+                continue
+            return sqlFileAddress
+
+        return None
+
+    def connect(self):
+        return sqlite3.connect(self.resultFileAddress)
+
+    def readHeader(self):
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            tables = set(row[0] for row in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type='table'"))
+            if self.newSchema['dict'] in tables:
+                self.schema = self.newSchema
+            elif self.oldSchema['dict'] in tables:
+                self.schema = self.oldSchema
+            else:
+                raise ValueError("%s is not an EnergyPlus sql file." % self.resultFileAddress)
+
+            cursor.execute("SELECT %(index)s, KeyValue, %(name)s, %(units)s, ReportingFrequency " \
+                           "FROM %(dict)s ORDER BY %(index)s" % self.schema)
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        # keep the first column as the csv Date/Time column so column ids match
+        self.dictIndices = [None]
+        self.header = ['Date/Time']
+        self.columns = [('', 'Date/Time', '', '')]
+        for index, keyName, outputName, units, frequency in rows:
+            keyName = keyName or ''
+            frequency = self.csvFrequency(frequency)
+            if keyName:
+                self.header.append('%s:%s [%s](%s)' % (keyName, outputName, units, frequency))
+            else:
+                self.header.append('%s [%s](%s)' % (outputName, units, frequency))
+            self.columns.append((keyName, outputName, units, frequency))
+            self.dictIndices.append(index)
+
+        return self.header
+
+    @staticmethod
+    def csvFrequency(frequency):
+        """Convert sql reporting frequency to the format that is used in csv headers."""
+        if frequency is None: return ''
+        if 'timestep' in frequency.lower(): return 'TimeStep'
+        return frequency.replace(' ', '')
+
+    def timeFilter(self):
+        """SQL filter to exclude warmup days and sizing periods if the file has a run period."""
+        return "(t.WarmupFlag IS NULL OR t.WarmupFlag = 0) AND (t.EnvironmentPeriodIndex IN " \
+               "(SELECT EnvironmentPeriodIndex FROM EnvironmentPeriods WHERE EnvironmentType = 3) " \
+               "OR NOT EXISTS (SELECT 1 FROM EnvironmentPeriods WHERE EnvironmentType = 3))"
+
+    def readColumns(self, columnIds, divisors = None, period = None):
+        """Read the values for the requested columns with one query for all the columns.
+
+        Args:
+            columnIds: List of column indices in self.header.
+            divisors: Optional dictionary of {columnId: divisor}.
+            period: Optional (stMonth, stDay, stHour, endMonth, endDay, endHour).
+
+        Returns:
+            A dictionary of {columnId: array('d')}.
+        """
+        colIdsByIndex = {}
+        for colId in set(columnIds):
+            dictIndex = self.dictIndices[colId]
+            if dictIndex is None: continue
+            colIdsByIndex.setdefault(dictIndex, []).append(colId)
+
+        columns = {}
+        if not colIdsByIndex: return columns
+
+        dictIndices = sorted(colIdsByIndex)
+        query = "SELECT r.%(index)s, r.%(value)s FROM %(data)s r JOIN Time t ON r.TimeIndex = t.TimeIndex " \
+                "WHERE r.%(index)s IN (" % self.schema + ", ".join("?" * len(dictIndices)) + ") AND " + self.timeFilter()
+        if period is not None:
+            query += " AND (t.Month * 10000 + t.Day * 100 + t.Hour) BETWEEN ? AND ?"
+            periodRange = self.periodToRange(period)
+        else:
+            periodRange = ()
+        query += " ORDER BY r.%(index)s, r.TimeIndex" % self.schema
+
+        values = dict((dictIndex, array.array('d')) for dictIndex in dictIndices)
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, tuple(dictIndices) + tuple(periodRange))
+            for dictIndex, rows in itertools.groupby(cursor, key = lambda row: row[0]):
+                values[dictIndex].fromlist([row[1] for row in rows])
+        finally:
+            conn.close()
+
+        for dictIndex, colIds in colIdsByIndex.items():
+            for colId in colIds:
+                data = values[dictIndex]
+                if divisors and colId in divisors and divisors[colId] != 1:
+                    divisor = float(divisors[colId])
+                    data = array.array('d', [v / divisor for v in data])
+                columns[colId] = data
+
+        return columns
+
+    def queryVariable(self, variableName, keyNames = None, period = None):
+        colIds = self.findColumns(variableName, keyNames)
+        columns = self.readColumns(colIds, period = period)
+        return [(self.columns[colId], columns[colId]) for colId in colIds]
+
+def getEPResultReader(resultFileAddress):
+    """Return a result reader for an EnergyPlus result file.
+
+    If there is an sql file for the result (or the address is an sql file) and
+    sqlite3 is available the results are read from the sql file. Otherwise the
+    csv file will be parsed.
+    """
+    sqlFileAddress = hb_EPSQLResultReader.findSQLFile(resultFileAddress)
+    if sqlFileAddress and sqlite3 is None:
+        print "Reading results from %s needs sqlite3 which is not available in this version of IronPython. " \
+              "The csv file will be used instead." % sqlFileAddress
+    elif sqlFileAddress:
+        try:
+            return hb_EPSQLResultReader(sqlFileAddress)
+        except Exception, e:
+            print "Failed to read results from %s. The csv file will be used instead.\n%s" % (sqlFileAddress, e)
+
+    if resultFileAddress.lower().endswith('.sql'):
+        resultFileAddress = resultFileAddress[:-4] + '.csv'
+    return hb_EPCSVResultReader(resultFileAddress)
+
+class hb_Job(object):
+    """A command to be executed by hb_JobScheduler.
+
+    Args:
+        name: A name to identify the job in the reports.
+        args: Command as a list of arguments (e.g. ['energyplus', '-w', 'weather.epw', 'in.idf']).
+            A string will be passed to the shell as is (e.g. a batch file).
+        cwd: Optional working directory for the command.
+        timeout: Optional time out in seconds for each attempt of the job. The running step
+            will be killed once all the steps of the job have taken longer than the time out.
+        retries: Number of times that a failed job will be re-run (default: 0).
+        data: Optional object that will be attached to the result (e.g. the index of the input).
+        stdin: Optional file to be used as the standard input of the command.
+        stdout: Optional file to write the standard output of the command.
+        env: Optional dictionary of environment variables to be added to the environment.
+        steps: Optional list of hb_Job to be executed one after another in the same
+            slot instead of args. The steps stop at the first one that fails.
+        captureOutput: Set to False to let the command write to its own console window
+            instead of capturing stdout and stderr (default: True). On Windows the console
+            window of a job that captures its output is hidden so it runs in the background.
+    """
+    def __init__(self, name, args, cwd = None, timeout = None, retries = 0, data = None,
+                 stdin = None, stdout = None, env = None, steps = None, captureOutput = True):
+        self.name = name
+        self.args = args
+        self.cwd = cwd
+        self.timeout = timeout
+        self.retries = max(int(retries), 0)
+        self.data = data
+        self.stdin = stdin
+        self.stdout = stdout
+        self.env = env
+        self.steps = steps
+        self.captureOutput = captureOutput
+
+    def __repr__(self):
+        return "Job: %s" % self.name
+
+class hb_JobResult(object):
+    """Result of running a hb_Job."""
+    def __init__(self, job):
+        self.job = job
+        self.name = job.name
+        self.data = job.data
+        self.returncode = None
+        self.stdout = ''
+        self.stderr = ''
+        self.elapsed = 0
+        self.attempts = 0
+        self.timedOut = False
+        self.cancelled = False
+        self.error = None
+
+    @property
+    def success(self):
+        return self.returncode == 0 and not self.timedOut and not self.cancelled
+
+    def __repr__(self):
+        if self.success: status = 'done'
+        elif self.cancelled: status = 'cancelled'
+        elif self.timedOut: status = 'timed out'
+        elif self.error: status = 'failed: %s' % self.error
+        else: status = 'failed with exit code %s' % self.returncode
+        return "%s: %s in %.1f seconds (%d attempt%s)" % (self.name, status, self.elapsed,
+                                                          self.attempts, 's' if self.attempts != 1 else '')
+
+class hb_JobScheduler(object):
+    """Run a queue of jobs on a bounded number of processes.
+
+    The number of parallel processes is set by maxWorkers (or the number of cores)
+    and, if memoryPerJob is provided, limited to the available memory. Each worker
+    takes the next job from the queue as soon as its current process exits.
+
+    Args:
+        maxWorkers: Number of processes to run in parallel. Default is the number of cores.
+        memoryPerJob: Optional estimated memory for each job in MB.
+        progressCallback: Optional function that will be called with (result, finishedCount, totalCount)
+            after each job is finished. It can return a follow-up hb_Job (e.g. to merge the
+            finished results) that is run by the next free worker before the rest of the queue.
+            The results of the follow-up jobs are also passed to the callback but they are not
+            counted or returned by run.
+        shell: Set to True to run the commands through the shell.
+        cancelCheck: Optional function that is checked while the jobs are running. The jobs
+            will be cancelled once it returns True (e.g. GH_Document.IsEscapeKeyDown).
+
+    The index of the worker that runs a job is set in the HB_WORKER environment variable
+    of the job so the files that are shared by the jobs of a worker (e.g. ambient files)
+    can be named by it (e.g. file_%HB_WORKER%.amb).
+    """
+    workerVariable = "HB_WORKER"
+
+    def __init__(self, maxWorkers = None, memoryPerJob = None, progressCallback = None, shell = False,
+                 cancelCheck = None):
+        self.maxWorkers = self.workerCount(maxWorkers, memoryPerJob)
+        self.progressCallback = progressCallback
+        self.shell = shell
+        self.cancelCheck = cancelCheck
+        self.cancelled = False
+        self.__lock = threading.Lock()
+        self.__processes = {}
+
+    @staticmethod
+    def cpuCount():
+        try:
+            return System.Environment.ProcessorCount
+        except Exception:
+            try:
+                import multiprocessing
+                return multiprocessing.cpu_count()
+            except Exception:
+                return 1
+
+    @staticmethod
+    def availableMemory():
+        """Available physical memory in MB. Returns None if it can't be calculated."""
+        try:
+            # linux
+            with open('/proc/meminfo', 'r') as meminfo:
+                for line in meminfo:
+                    if line.startswith('MemAvailable:'):
+                        return int(line.split()[1]) / 1024
+        except (IOError, ValueError, IndexError):
+            pass
+
+        try:
+            pc = System.Diagnostics.PerformanceCounter("Memory", "Available MBytes")
+            return int(pc.NextValue())
+        except Exception:
+            return None
+
+    @classmethod
+    def workerCount(cls, maxWorkers = None, memoryPerJob = None):
+        count = int(maxWorkers) if maxWorkers else cls.cpuCount()
+
+        if memoryPerJob:
+            availableMemory = cls.availableMemory()
+            if availableMemory is not None:
+                memoryCount = max(int(availableMemory // memoryPerJob), 1)
+                if memoryCount < count:
+                    print "Only %d MB of memory is available. Running %d jobs in parallel instead of %d." \
+                          % (availableMemory, memoryCount, count)
+                    count = memoryCount
+
+        return max(count, 1)
+
+    @staticmethod
+    def killProcess(process):
+        try:
+            if os.name == 'nt':
+                # kill the child processes of the batch file too
+                subprocess.call(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                                stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+            else:
+                process.kill()
+        except Exception:
+            pass
+
+    def cancel(self):
+        """Stop all the running processes and skip the jobs that are not started yet."""
+        self.cancelled = True
+        with self.__lock:
+            processes = self.__processes.values()
+        for process in processes:
+            self.killProcess(process)
+
+    @classmethod
+    def jobEnvironment(cls, env, workerIndex = 0):
+        environment = dict(os.environ)
+        if env:
+            for key, value in env.items():
+                environment[str(key)] = str(value)
+        environment[cls.workerVariable] = str(workerIndex)
+        return environment
+
+    @staticmethod
+    def expandVariables(args, environment):
+        """Expand %VARIABLE% in the arguments. cmd does it for the batch files on Windows."""
+        def expand(arg):
+            return re.sub(r"%(\w+)%", lambda match: environment.get(match.group(1), match.group(0)), arg)
+        if isinstance(args, str): return expand(args)
+        return [expand(arg) for arg in args]
+
+    def startProcess(self, step, cwd, workerIndex = 0):
+        """Start the process for a job or a step of a job and return (process, openedFiles)."""
+        environment = self.jobEnvironment(step.env, workerIndex)
+        args = step.args
+        if os.name != 'nt': args = self.expandVariables(args, environment)
+        openedFiles = []
+        stdin = stdout = stderr = None
+        if step.stdin:
+            stdin = open(os.path.join(cwd or "", step.stdin), "rb")
+            openedFiles.append(stdin)
+        if step.stdout:
+            stdout = open(os.path.join(cwd or "", step.stdout), "wb")
+            openedFiles.append(stdout)
+        elif step.captureOutput:
+            stdout = subprocess.PIPE
+        if step.captureOutput: stderr = subprocess.PIPE
+
+        startupinfo = None
+        if step.captureOutput and os.name == 'nt' and hasattr(subprocess, 'STARTUPINFO'):
+            # run in the background without opening a console window
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= getattr(subprocess, 'STARTF_USESHOWWINDOW', 1)
+            startupinfo.wShowWindow = getattr(subprocess, 'SW_HIDE', 0)
+
+        try:
+            process = subprocess.Popen(args, cwd = cwd, env = environment,
+                                       shell = self.shell or isinstance(args, str),
+                                       stdin = stdin, stdout = stdout, stderr = stderr,
+                                       startupinfo = startupinfo)
+        except:
+            for openedFile in openedFiles: openedFile.close()
+            raise
+        return process, openedFiles
+
+    def runStep(self, job, step, result, workerIndex = 0, deadline = None):
+        """Run one command and add its output to the result. Returns True if it succeeded.
+
+        The process is killed if it is still running at the deadline (time.time()) of the job.
+        """
+        if deadline is not None and time.time() >= deadline:
+            result.timedOut = True
+            return False
+
+        try:
+            process, openedFiles = self.startProcess(step, step.cwd or job.cwd, workerIndex)
+        except (OSError, ValueError, IOError), e:
+            result.error = "%s: %s" % (step.name, e)
+            return False
+
+        with self.__lock:
+            self.__processes[id(job)] = process
+
+        timer = None
+        if deadline is not None:
+            def timeOut(process = process):
+                result.timedOut = True
+                self.killProcess(process)
+            timer = threading.Timer(max(deadline - time.time(), 0), timeOut)
+            timer.start()
+
+        try:
+            stdout, stderr = process.communicate()
+            result.stdout += stdout or ''
+            result.stderr += stderr or ''
+            result.returncode = process.returncode
+        finally:
+            if timer: timer.cancel()
+            for openedFile in openedFiles: openedFile.close()
+            with self.__lock:
+                del self.__processes[id(job)]
+
+        return result.returncode == 0 and not result.timedOut
+
+    def runJob(self, job, workerIndex = 0):
+        result = hb_JobResult(job)
+        startTime = time.time()
+
+        while result.attempts <= job.retries and not self.cancelled:
+            result.attempts += 1
+            result.timedOut = False
+            result.error = None
+            result.returncode = None
+            result.stdout = result.stderr = ''
+
+            steps = job.steps if job.steps is not None else [job]
+            # the time out is for all the steps of the attempt
+            deadline = time.time() + job.timeout if job.timeout else None
+            # a batch file without any commands
+            if not steps: result.returncode = 0
+            for step in steps:
+                if self.cancelled or not self.runStep(job, step, result, workerIndex, deadline): break
+
+            if result.success: break
+
+        result.cancelled = self.cancelled and not result.success
+        result.elapsed = time.time() - startTime
+        return result
+
+    def run(self, jobs):
+        """Run the jobs and return a list of hb_JobResult in the same order as the jobs."""
+        self.cancelled = False
+        total = len(jobs)
+        results = [None] * total
+        # follow-up jobs (priority 0) are taken before the jobs of the list (priority 1)
+        queue = Queue.PriorityQueue()
+        for count, job in enumerate(jobs):
+            queue.put((1, count, job))
+
+        finished = [0]
+        followUps = itertools.count(total)
+        def worker(workerIndex):
+            while not self.cancelled:
+                try:
+                    priority, count, job = queue.get_nowait()
+                except Queue.Empty:
+                    return
+                result = self.runJob(job, workerIndex)
+                with self.__lock:
+                    if priority:
+                        results[count] = result
+                        finished[0] += 1
+                    finishedCount = finished[0]
+                if self.progressCallback:
+                    try:
+                        followUp = self.progressCallback(result, finishedCount, total)
+                    except Exception, e:
+                        print "Progress callback failed: %s" % e
+                        continue
+                    if followUp is not None:
+                        queue.put((0, followUps.next(), followUp))
+
+        workers = [threading.Thread(target = worker, args = (i,)) for i in range(min(self.maxWorkers, total))]
+        for thread in workers:
+            thread.daemon = True
+            thread.start()
+        for thread in workers:
+            if not self.cancelCheck:
+                thread.join()
+                continue
+            while thread.is_alive():
+                thread.join(0.2)
+                if not self.cancelled and self.cancelCheck():
+                    print "Cancelling the jobs..."
+                    self.cancel()
+
+        # jobs that were never started because of cancellation
+        for count, job in enumerate(jobs):
+            if results[count] is None:
+                results[count] = hb_JobResult(job)
+                results[count].cancelled = True
+
+        return results
+
+    @staticmethod
+    def parseCommandLine(line, cwd = None, env = None):
+        """Convert a command line to a hb_Job with an argument list.
+
+        Input and output redirections (< and >) are converted to stdin and stdout
+        files. Lines with pipes or other shell features are returned as a string
+        that will be executed by the shell.
+        """
+        try:
+            tokens = [token.strip('"') for token in shlex.split(line, posix = False)]
+        except ValueError:
+            return hb_Job(line, line, cwd = cwd, env = env)
+
+        args = []
+        stdin = stdout = None
+        tokens = iter(tokens)
+        for token in tokens:
+            if token in ('<', '>'):
+                try: fileName = tokens.next()
+                except StopIteration: return hb_Job(line, line, cwd = cwd, env = env)
+                if token == '<': stdin = fileName
+                else: stdout = fileName
+            elif token.startswith('<') and len(token) > 1 and token[1] not in '<>':
+                stdin = token[1:]
+            elif token.startswith('>') and len(token) > 1 and token[1] not in '<>&':
+                stdout = token[1:]
+            elif '|' in token or '&' in token or token.startswith('<') or token.startswith('>') \
+                or token.endswith('>'):
+                # pipes, appends and stderr redirections need a shell
+                return hb_Job(line, line, cwd = cwd, env = env)
+            else:
+                args.append(token)
+
+        if not args: return None
+        return hb_Job(args[0], args, cwd = cwd, stdin = stdin, stdout = stdout, env = env)
+
+    @classmethod
+    def parseBatchFile(cls, batchFileName):
+        """Convert a Honeybee batch file to a list of hb_Job steps.
+
+        Environment variables that are set in the file and the changes of directory
+        are applied to the steps that follow them.
+        """
+        cwd = os.path.dirname(batchFileName) or None
+        env = {}
+        steps = []
+        with open(batchFileName, "r") as batchFile:
+            for line in batchFile:
+                line = line.strip()
+                lowerLine = line.lower()
+                if not line or line.startswith("::") or line.startswith("@") or \
+                    lowerLine.startswith("rem ") or lowerLine.startswith("echo "):
+                    continue
+                elif lowerLine.startswith("set ") or lowerLine.startswith("path="):
+                    if lowerLine.startswith("set "): line = line[4:]
+                    key, value = line.split("=", 1)
+                    key = key.strip().upper()
+                    paths = [path for path in value.split(";") if path and path not in ("$PATH", "%PATH%")]
+                    if key == "PATH": paths.append(os.environ.get("PATH", ""))
+                    env = dict(env)
+                    env[key] = os.pathsep.join(paths)
+                elif re.match(r"^[a-z]:$", lowerLine):
+                    # change of drive
+                    continue
+                elif lowerLine.startswith("cd "):
+                    cwd = line[3:].strip().strip('"')
+                else:
+                    step = cls.parseCommandLine(line, cwd, env)
+                    if step: steps.append(step)
+        return steps
+
+    @classmethod
+    def batchFileJob(cls, batchFileName, captureOutput = True):
+        """Create a job to run a batch file.
+
+        On Windows the batch file is executed by cmd. On other systems the commands in
+        the batch file are executed one after another as argument lists.
+        """
+        name = os.path.basename(batchFileName)
+        if os.name == 'nt':
+            return hb_Job(name, ['cmd', '/c', batchFileName], cwd = os.path.dirname(batchFileName) or None,
+                          captureOutput = captureOutput)
+
+        steps = cls.parseBatchFile(batchFileName)
+        for step in steps: step.captureOutput = captureOutput
+        return hb_Job(name, None, steps = steps, captureOutput = captureOutput)
+
+    @classmethod
+    def runBatchFiles(cls, batchFileNames, maxPRuns = None, runInBackground = False, progressCallback = None):
+        """Run a number of batch files in parallel and wait until all of them are done.
+
+        The next batch file starts as soon as one of the running ones is finished. Press
+        Esc to cancel the analysis. The wall-clock time for each file is printed so
+        the number of CPUs can be tuned.
+
+        Args:
+            batchFileNames: List of batch files.
+            maxPRuns: Max number of files to be ran in parallel (default: 1).
+            runInBackground: Set to True to run the files without a cmd window. The
+                output and the errors of each file will be captured and printed if it fails.
+            progressCallback: Optional function that will be called with (result,
+                finishedCount, totalCount) after each file is finished.
+
+        Returns:
+            A list of hb_JobResult for the batch files.
+        """
+        jobs = [cls.batchFileJob(batchFileName, captureOutput = runInBackground) \
+                for batchFileName in batchFileNames]
+
+        try: cancelCheck = gh.GH_Document.IsEscapeKeyDown
+        except AttributeError: cancelCheck = None
+
+        startTime = time.time()
+        scheduler = cls(maxWorkers = maxPRuns or 1, cancelCheck = cancelCheck,
+                        progressCallback = progressCallback)
+        results = scheduler.run(jobs)
+
+        for result in results:
+            if result is None: continue
+            print result
+            if not result.success and result.stderr:
+                print result.stderr.strip()[-2000:]
+
+        if len(results) > 1:
+            print "Total time: %.1f seconds for %d files with up to %d files running in parallel." % \
+                  (time.time() - startTime, len(results), min(scheduler.maxWorkers, len(results)))
+        return results
+
+class hb_SimulationCache(object):
+    """A folder of EnergyPlus outputs keyed by the hash of the simulation inputs.
+
+    The key is generated from the idf text (without comments and white spaces), the
+    content of the weather file and any other input files (e.g. csv schedules) and
+    the EnergyPlus version. When the cache grows larger than maxSize the least
+    recently used results will be removed.
+
+    Args:
+        cacheFolder: Optional path to the cache folder. Default is HBSimulationCache
+            in Honeybee default folder.
+        maxSize: Maximum size of the cache in MB (default: 2048).
+    """
+    excludedExtensions = ('.idf', '.bat', '.epw', '.ddy')
+
+    def __init__(self, cacheFolder = None, maxSize = 2048):
+        if not cacheFolder:
+            cacheFolder = os.path.join(sc.sticky["Honeybee_DefaultFolder"], "HBSimulationCache")
+        self.cacheFolder = cacheFolder
+        self.maxSize = maxSize * 1024 * 1024
+
+    @staticmethod
+    def hashFile(filePath, hashObj):
+        with open(filePath, 'rb') as inf:
+            while True:
+                block = inf.read(1048576)
+                if not block: break
+                hashObj.update(block)
+
+    @staticmethod
+    def canonicalIdf(idfFilePath):
+        """Yield idf lines without comments and white spaces around the fields."""
+        with open(idfFilePath, 'r') as idf:
+            for line in idf:
+                line = ' '.join(line.split('!')[0].split())
+                if line: yield re.sub(r' ?([,;]) ?', r'\1', line)
+
+    def key(self, idfFilePath, epwFileAddress, EPVersion, inputFiles = None):
+        """Calculate the cache key for a simulation."""
+        hashObj = hashlib.sha1()
+        hashObj.update(str(EPVersion))
+        for line in self.canonicalIdf(idfFilePath):
+            hashObj.update(line)
+        self.hashFile(epwFileAddress, hashObj)
+        if inputFiles:
+            for filePath in sorted(inputFiles):
+                self.hashFile(filePath, hashObj)
+        return hashObj.hexdigest()
+
+    def outputFiles(self, workingDir, fileName):
+        """List the output files of a simulation in workingDir."""
+        outputFiles = []
+        for outputFile in os.listdir(workingDir):
+            if not outputFile.startswith(fileName): continue
+            if os.path.splitext(outputFile)[-1].lower() in self.excludedExtensions: continue
+            if not os.path.isfile(os.path.join(workingDir, outputFile)): continue
+            outputFiles.append(outputFile)
+        return outputFiles
+
+    def get(self, key, workingDir, fileName):
+        """Copy the cached outputs to workingDir as fileName.* and return True if found.
+
+        The outputs of an older simulation that are not in the cached results (e.g. an
+        sql file) are removed so the results of two simulations are never mixed.
+        """
+        entryFolder = os.path.join(self.cacheFolder, key)
+        if not os.path.isdir(entryFolder): return False
+
+        try:
+            cachedFiles = os.listdir(entryFolder)
+            cachedOutputs = set(fileName + cachedFile for cachedFile in cachedFiles)
+            for outputFile in self.outputFiles(workingDir, fileName):
+                if outputFile not in cachedOutputs:
+                    os.remove(os.path.join(workingDir, outputFile))
+            for cachedFile in cachedFiles:
+                shutil.copyfile(os.path.join(entryFolder, cachedFile),
+                                os.path.join(workingDir, fileName + cachedFile))
+        except (IOError, OSError), e:
+            print "Failed to load the results from cache: %s" % e
+            return False
+
+        # mark the entry as recently used
+        os.utime(entryFolder, None)
+        return True
+
+    def put(self, key, workingDir, fileName, startTime = 0):
+        """Copy the outputs of a simulation to the cache.
+
+        Only files that start with fileName and are modified after startTime are stored.
+        """
+        entryFolder = os.path.join(self.cacheFolder, key)
+        if os.path.isdir(entryFolder): return
+
+        outputFiles = [outputFile for outputFile in self.outputFiles(workingDir, fileName)
+                       if os.path.getmtime(os.path.join(workingDir, outputFile)) >= startTime]
+        if not outputFiles: return
+
+        # copy to a temporary folder first so a partial copy is never used
+        tempFolder = entryFolder + '_' + str(uuid.uuid4())[:8]
+        try:
+            os.makedirs(tempFolder)
+            for outputFile in outputFiles:
+                shutil.copyfile(os.path.join(workingDir, outputFile),
+                                os.path.join(tempFolder, outputFile[len(fileName):]))
+            os.rename(tempFolder, entryFolder)
+        except (IOError, OSError), e:
+            print "Failed to add the results to cache: %s" % e
+            shutil.rmtree(tempFolder, ignore_errors = True)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache is smaller than maxSize."""
+        entries = []
+        totalSize = 0
+        for entry in os.listdir(self.cacheFolder):
+            entryFolder = os.path.join(self.cacheFolder, entry)
+            if not os.path.isdir(entryFolder): continue
+            size = sum(os.path.getsize(os.path.join(entryFolder, f)) for f in os.listdir(entryFolder))
+            entries.append((os.path.getmtime(entryFolder), size, entryFolder))
+            totalSize += size
+
+        entries.sort()
+        # keep the latest entry even if it is larger than the cache
+        for lastUsed, size, entryFolder in entries[:-1]:
+            if totalSize <= self.maxSize: break
+            shutil.rmtree(entryFolder, ignore_errors = True)
+            totalSize -= size
+
+class hb_OctreeCache(object):
+    """Frozen octrees of the static part of Radiance scenes keyed by the content of the scene.
+
+    The scene is split into layers (e.g. materials, geometry and sky). The static
+    layers are hashed by their content and their frozen octree is kept in the cache
+    folder. The layers that change between the runs (e.g. the sky) are added to the
+    cached octree with oconv -i, so the octree of a large context model is only
+    built once.
+
+    Args:
+        cacheFolder: Optional path to the cache folder. Default is HBOctreeCache
+            in Honeybee default folder.
+        maxSize: Maximum size of the cache in MB (default: 2048).
+    """
+    resolution = 2048
+    folderName = "HBOctreeCache"
+    extension = ".oct"
+
+    def __init__(self, cacheFolder = None, maxSize = 2048):
+        if not cacheFolder:
+            cacheFolder = os.path.join(sc.sticky["Honeybee_DefaultFolder"], self.folderName)
+        self.cacheFolder = cacheFolder
+        self.maxSize = maxSize * 1024 * 1024
+        # octrees that are being written by the batch files {temporary file: cache file}
+        self.pendingOctrees = {}
+
+    # primitives with string arguments that are files (e.g. void mesh name 1 file.msh 0 0)
+    filePrimitives = ("mesh", "instance", "colorpict", "brightfunc", "colorfunc", "brightdata",
+                      "colordata", "brighttext", "colortext", "texfunc", "texdata", "mixfunc",
+                      "mixdata", "mixpict", "mixtext")
+    filePrimitivePattern = re.compile(r"(?<!\S)(?:%s)\s+\S+\s+(\d+)\s" % "|".join(filePrimitives))
+    # set to False for files that are not Radiance scene files
+    hashReferencedFiles = True
+
+    @classmethod
+    def referencedFiles(cls, radFile, radText):
+        """Find the files that are referenced by the primitives of a Radiance file.
+
+        Only the string arguments of the primitives that take a file (e.g. the .msh file
+        of a mesh or the octree of an instance) are checked and only the ones that exist
+        are returned as a list of (argument, file path).
+        """
+        radFolder = os.path.dirname(radFile)
+        files = []
+        for match in cls.filePrimitivePattern.finditer(radText):
+            count = int(match.group(1))
+            args = radText[match.end():match.end() + 4096 * count].split(None, count)[:count]
+            for arg in args:
+                for filePath in (arg, os.path.join(radFolder, arg)):
+                    if os.path.isfile(filePath):
+                        files.append((arg, filePath))
+                        break
+        return files
+
+    def layerHash(self, radFiles):
+        """Hash the content of the files and the files that they reference.
+
+        The text of a mesh or instance primitive doesn't change when the referenced file
+        changes so the referenced files are hashed too.
+        """
+        hashObj = hashlib.sha1()
+        for radFile in radFiles:
+            # octrees (e.g. a ready octree) are binary files
+            if not self.hashReferencedFiles or radFile.lower().endswith('.oct'):
+                hb_SimulationCache.hashFile(radFile, hashObj)
+                continue
+            with open(radFile, 'rb') as inf: radText = inf.read()
+            hashObj.update(radText)
+            for arg, referencedFile in self.referencedFiles(radFile, radText):
+                hashObj.update(arg)
+                hb_SimulationCache.hashFile(referencedFile, hashObj)
+        return hashObj.hexdigest()
+
+    def key(self, staticLayers):
+        """Calculate the cache key for a list of static layers. Each layer is a list of files."""
+        hashObj = hashlib.sha1()
+        hashObj.update("oconv -r %d -f" % self.resolution)
+        for layer in staticLayers:
+            hashObj.update(self.layerHash(layer))
+        return hashObj.hexdigest()
+
+    def octreeFile(self, key):
+        return os.path.join(self.cacheFolder, key + self.extension)
+
+    def oconvLines(self, octFileName, staticLayers, dynamicFiles):
+        """Return the oconv lines to create octFileName.oct from the cached static octree.
+
+        If the static octree is not in the cache the lines will create it first. Call
+        commit after running the lines to add the new octree to the cache.
+        """
+        if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+
+        cachedOctree = self.octreeFile(self.key(staticLayers))
+        lines = ""
+        if os.path.isfile(cachedOctree):
+            # mark the octree as recently used
+            os.utime(cachedOctree, None)
+        else:
+            tempOctree = cachedOctree[:-len(self.extension)] + '_' + str(uuid.uuid4())[:8] + ".tmp"
+            self.pendingOctrees[tempOctree] = cachedOctree
+            staticFiles = [radFile for layer in staticLayers for radFile in layer]
+            lines += "oconv -r " + str(self.resolution) + " -f " + \
+                     " ".join(radFile.replace("\\", "/") for radFile in staticFiles) + \
+                     " > " + tempOctree.replace("\\", "/") + "\n"
+            cachedOctree = tempOctree
+
+        lines += "oconv -f -i " + cachedOctree.replace("\\", "/") + " " + \
+                 " ".join(radFile.replace("\\", "/") for radFile in dynamicFiles) + \
+                 " > " + octFileName + ".oct\n"
+        return lines
+
+    def commit(self, success = True):
+        """Move the octrees that are created by the batch files to the cache.
+
+        If success is False the octrees will be removed since they might be incomplete.
+        """
+        for tempOctree, cachedOctree in self.pendingOctrees.items():
+            try:
+                if success and os.path.isfile(tempOctree) and os.path.getsize(tempOctree) > 0 \
+                    and not os.path.isfile(cachedOctree):
+                    os.rename(tempOctree, cachedOctree)
+                elif os.path.isfile(tempOctree):
+                    os.remove(tempOctree)
+            except (IOError, OSError), e:
+                print "Failed to add the octree to cache: %s" % e
+        self.pendingOctrees = {}
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used octrees until the cache is smaller than maxSize."""
+        if not os.path.isdir(self.cacheFolder): return
+        entries = []
+        totalSize = 0
+        for entry in os.listdir(self.cacheFolder):
+            if not entry.endswith(self.extension): continue
+            octreeFile = os.path.join(self.cacheFolder, entry)
+            size = os.path.getsize(octreeFile)
+            entries.append((os.path.getmtime(octreeFile), size, octreeFile))
+            totalSize += size
+
+        entries.sort()
+        # keep the latest octree even if it is larger than the cache
+        for lastUsed, size, octreeFile in entries[:-1]:
+            if totalSize <= self.maxSize: break
+            try: os.remove(octreeFile)
+            except OSError: continue
+            totalSize -= size
+
+class hb_RADMeshCache(hb_OctreeCache):
+    """Compiled Radiance meshes (obj2mesh) keyed by the content of the .obj and material files.
+
+    Large context meshes are only compiled once. The compiled mesh is copied from the
+    cache to the working folder on the next runs.
+    """
+    folderName = "HBMeshCache"
+    extension = ".rtm"
+    hashReferencedFiles = False
+
+    def __init__(self, cacheFolder = None, maxSize = 2048):
+        hb_OctreeCache.__init__(self, cacheFolder, maxSize)
+        # error message of the last failed compilation
+        self.error = None
+
+    def key(self, sourceFiles):
+        """Calculate the cache key for the .obj and material files."""
+        hashObj = hashlib.sha1()
+        hashObj.update("obj2mesh -a")
+        hashObj.update(self.layerHash(sourceFiles))
+        return hashObj.hexdigest()
+
+    def cachedMeshFile(self, key):
+        return os.path.join(self.cacheFolder, key + self.extension)
+
+    def compile(self, objFile, matFile, meshFile, radPath):
+        """Compile objFile to meshFile with obj2mesh or copy it from the cache.
+
+        Returns True if meshFile is created. Otherwise the reason is set in error.
+        """
+        self.error = None
+        if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+        cachedMesh = self.cachedMeshFile(self.key([objFile, matFile]))
+
+        if not os.path.isfile(cachedMesh):
+            # compile to a temporary file first so a partial mesh is never cached
+            tempMesh = cachedMesh[:-len(self.extension)] + '_' + str(uuid.uuid4())[:8] + ".tmp"
+            job = hb_Job("obj2mesh", [os.path.join(radPath, "obj2mesh"), "-a", matFile, objFile, tempMesh])
+            result = hb_JobScheduler(maxWorkers = 1).run([job])[0]
+            try:
+                if not (result.success and os.path.isfile(tempMesh) and os.path.getsize(tempMesh) > 0):
+                    self.error = str(result)
+                    if result.stderr: self.error += "\n" + result.stderr.strip()
+                    return False
+                if not os.path.isfile(cachedMesh): os.rename(tempMesh, cachedMesh)
+            except (IOError, OSError), e:
+                self.error = "Failed to add the mesh to cache: %s" % e
+                return False
+            finally:
+                if os.path.isfile(tempMesh): os.remove(tempMesh)
+            self.evict()
+        else:
+            # mark the mesh as recently used
+            os.utime(cachedMesh, None)
+
+        try:
+            shutil.copyfile(cachedMesh, meshFile)
+        except (IOError, OSError), e:
+            self.error = "Failed to copy the compiled mesh: %s" % e
+            return False
+        return True
+
+class hb_AmbientCache(hb_OctreeCache):
+    """Radiance ambient files (-af) keyed by the content of the scene and the ambient parameters.
+
+    The indirect irradiance values don't depend on the test points or the views so
+    the ambient file of a study is reused by the next studies of the same scene. Any
+    change in the materials, the geometry, the sky or the ambient parameters changes
+    the key. Parallel workers write to their own copy of the ambient file and the new
+    values are merged back to the cache at the end of a successful study.
+
+    Args:
+        cacheFolder: Optional path to the cache folder. Default is HBAmbientCache
+            in Honeybee default folder.
+        maxSize: Maximum size of the cache in MB (default: 2048).
+    """
+    folderName = "HBAmbientCache"
+    extension = ".amb"
+    ambientParameters = ("_ab_", "_ad_", "_as_", "_ar_", "_aa_", "_lr_", "_lw_", "_av_")
+    lockTimeout = 60
+
+    def __init__(self, cacheFolder = None, maxSize = 2048):
+        hb_OctreeCache.__init__(self, cacheFolder, maxSize)
+        # ambient files of the current study
+        self.study = None
+
+    def ambientKey(self, sceneFiles, radParameters):
+        """Calculate the cache key for the scene files and the Radiance parameters."""
+        hashObj = hashlib.sha1()
+        hashObj.update("ambient")
+        hashObj.update(self.layerHash(sceneFiles))
+        for par in self.ambientParameters:
+            hashObj.update("%s=%s;" % (par, radParameters.get(par)))
+        hashObj.update(str(radParameters.get("additional", "")))
+        return hashObj.hexdigest()
+
+    def prepare(self, ambFile, sceneFiles, radParameters):
+        """Copy the cached ambient file of the scene to ambFile.
+
+        Returns:
+            True if the ambient file is found in the cache.
         """
-        This function sorts a list of *.ill for an annual study
-        and put them in different branches based on shading groups and blind states
-        ---------------------------------------------------------------------------
-        {0}
-        .ill files with no dynamic blinds. When there is no dynamic blinds or when
-        there are advanced dynamic blind these files should look like:
-            workingDir + ProjectName + "_" + CPUCount + ".ill"
-        and should be sorted based on CPUCount.
-        In case of conceptualBlinds the files will look like:
-            workingDir + ProjectName + "_" + CPUCount + "_up.ill"
-            
-        {1,0}
-         Branches with two numbers contain .ill files for shading groups with different
-         states. First number represents the shading group (which starts from 1) and
-         second number represents the state. For instance {1,0} includes .ill files
-         for first shading group and the first state of the blinds which is the most
-         open state. In case of simple blinds the file should look like:
-            workingDir + ProjectName + "_" + CPUCount + "_down.ill"
-         for advanced dynamic blinds the file should looks like:
-             workingDir + ProjectName + "_" shadingGroupName + "_state_" + stateCount+ "_" + CPUCount + ".ill"
+        if not os.path.isdir(self.cacheFolder): os.makedirs(self.cacheFolder)
+        key = self.ambientKey(sceneFiles, radParameters)
+        cachedAmbFile = self.octreeFile(key)
+
+        # an ambient file of a different scene or different parameters can't be reused
+        if os.path.isfile(ambFile): os.remove(ambFile)
+        hit = os.path.isfile(cachedAmbFile)
+        if hit:
+            # mark the file as recently used
+            os.utime(cachedAmbFile, None)
+            shutil.copyfile(cachedAmbFile, ambFile)
+
+        self.study = {"key": key, "ambFile": ambFile, "workerFiles": [], "hit": hit,
+                      "seedSize": 0, "startTime": time.time()}
+        return hit
+
+    def workerFile(self, workerIndex = None):
+        """Return the name of the ambient file for a worker of the current study.
+
+        By default the name has the worker variable of hb_JobScheduler in it so all the
+        batch files that are run by the same worker share one ambient file.
         """
-        
-        # check if there are multiple ill files in the folder for different shading groups
-        illFilesDict = {}
-        
-        for fullPath in illFilesTemp:
-            fileName = os.path.basename(fullPath)
-            
-            if fileName.split("_")[:-1]!= []:
-                if fileName.endswith("_down.ill") or fileName.endswith("_up.ill"):
-                    # conceptual blind
-                    stateName = "_".join(fileName.split("_")[:-2]) + "_" + fileName.split("_")[-1]
-                    if fileName.endswith("_up.ill"):
-                        groupName = -1
-                        stateName = "up"
-                        stateNumber = 0
-                    else:
-                        groupName = "conceptualBlinds"
-                        stateName = "down"
-                        stateNumber = 0
-                        
-                elif fileName.Contains("_state_"):
-                    # dynamic blinds with several states
-                    groupName = "_".join(fileName.split("_")[:-3])
-                    stateName = "_".join(fileName.split("_")[-3:-1])
-                    stateNumber = fileName.split("_")[-2]
-                else:
-                    groupName = -1
-                    stateName = "_".join(fileName.split("_")[:-1])
-                    stateNumber = -1 # no states
-            else:
-                groupName = -1
-                stateName = fileName
-                stateNumber = -1 # no states
-            
-            # create an empty dictionary
-            if groupName not in illFilesDict.keys():
-                illFilesDict[groupName] = {}
-            
-            # create an empty dictionary for each state
-            if stateName not in illFilesDict[groupName].keys():
-                illFilesDict[groupName][stateName] = []
-            
-            # append the file to the list
-            illFilesDict[groupName][stateName].append(fullPath)
-        
-        # sort the keys
-        illFiles = DataTree[System.Object]()
-        shadingGroupCount = 0
-        
-        for key, fileListDict in illFilesDict.items():
-            stateCount = 0
-            shadingGroupCount+=1
-            for state, fileList in fileListDict.items():
-                if key== -1:
-                    p = GH_Path(0)
-                    shadingGroupCount-=1
+        if workerIndex is None: workerIndex = "%" + hb_JobScheduler.workerVariable + "%"
+        workerAmbFile = self.study["ambFile"][:-len(self.extension)] + "_" + str(workerIndex) + self.extension
+        return os.path.basename(workerAmbFile)
+
+    def seedWorkers(self, workerCount):
+        """Copy the ambient file to the files of the workers.
+
+        Call this method after the init batch file which might add the values of an
+        overture run to the ambient file.
+        """
+        ambFile = self.study["ambFile"]
+        ambFolder = os.path.dirname(ambFile)
+        self.study["workerFiles"] = [os.path.join(ambFolder, self.workerFile(workerIndex)) \
+                                     for workerIndex in range(workerCount)]
+        hasAmbFile = os.path.isfile(ambFile) and os.path.getsize(ambFile) > 0
+        self.study["seedSize"] = os.path.getsize(ambFile) if hasAmbFile else 0
+        for workerAmbFile in self.study["workerFiles"]:
+            if hasAmbFile: shutil.copyfile(ambFile, workerAmbFile)
+            elif os.path.isfile(workerAmbFile): os.remove(workerAmbFile)
+
+    @staticmethod
+    def mergeAmbientFiles(ambFile, workerAmbFiles, seedSize = 0):
+        """Append the new values of the workers' ambient files to ambFile.
+
+        Each worker file starts with a copy of the first seedSize bytes of ambFile. If
+        there was no ambient file to start with each worker file has its own header
+        and only the first one is kept.
+        """
+        if not seedSize and os.path.isfile(ambFile): os.remove(ambFile)
+        hasHeader = seedSize > 0
+        with open(ambFile, "ab") as outf:
+            for workerAmbFile in workerAmbFiles:
+                if not os.path.isfile(workerAmbFile) or os.path.getsize(workerAmbFile) <= seedSize:
+                    continue
+                with open(workerAmbFile, "rb") as inf:
+                    if seedSize:
+                        inf.seek(seedSize)
+                    elif hasHeader:
+                        # skip the header and the magic number
+                        while inf.readline() not in ("\n", "\r\n", ""): pass
+                        inf.read(2)
+                    shutil.copyfileobj(inf, outf)
+                hasHeader = True
+
+    def acquireLock(self, key):
+        lockFile = os.path.join(self.cacheFolder, key + ".lock")
+        startTime = time.time()
+        while True:
+            try:
+                os.close(os.open(lockFile, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return lockFile
+            except OSError:
+                if time.time() - startTime > self.lockTimeout:
+                    # the lock is left from a crashed run
+                    try: os.remove(lockFile)
+                    except OSError: pass
+                    startTime = time.time()
+                time.sleep(0.1)
+
+    def commit(self, success = True):
+        """Merge the ambient files of the workers and add the result to the cache.
+
+        If success is False the ambient files are not added to the cache since they
+        might be incomplete.
+        """
+        study, self.study = self.study, None
+        if not study or not success: return
+
+        try:
+            self.mergeAmbientFiles(study["ambFile"], study["workerFiles"], study["seedSize"])
+            if not os.path.isfile(study["ambFile"]) or os.path.getsize(study["ambFile"]) == 0: return
+
+            cachedAmbFile = self.octreeFile(study["key"])
+            infoFile = cachedAmbFile[:-len(self.extension)] + ".json"
+            tempAmbFile = cachedAmbFile[:-len(self.extension)] + '_' + str(uuid.uuid4())[:8] + ".tmp"
+            shutil.copyfile(study["ambFile"], tempAmbFile)
+
+            lockFile = self.acquireLock(study["key"])
+            try:
+                info = {}
+                if study["hit"] and os.path.isfile(infoFile):
+                    with open(infoFile, "r") as inf: info = json.load(inf)
+                if os.path.isfile(cachedAmbFile): os.remove(cachedAmbFile)
+                os.rename(tempAmbFile, cachedAmbFile)
+
+                elapsed = time.time() - study["startTime"]
+                if study["hit"] and "elapsed" in info:
+                    info["hits"] = info.get("hits", 0) + 1
+                    print "Ambient cache: reused %.1f MB of ambient values. The study took %.1f seconds" \
+                          " (%.1f seconds without the cache)." % \
+                          (study["seedSize"] / 1048576.0, elapsed, info["elapsed"])
                 else:
-                    p = GH_Path(shadingGroupCount, stateCount)
-                    stateCount+=1
-                    
-                try:
-                    if fileName.endswith("_down.ill") or fileName.endswith("_up.ill"):
-                        # conceptual blind
-                        if fileList[0].endswith("_down.ill"):
-                            p = GH_Path(1,0)
-                        else:
-                            p = GH_Path(0)
-                        
-                        illFiles.AddRange(sorted(fileList, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-2])), p)
-                    else:
-                        illFiles.AddRange(sorted(fileList, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-1])), p)
-                        
-                except Exception, e:
-                    # failed to sort!
-                    illFiles.AddRange(fileList, p)
-        
-        return illFiles
+                    info = {"elapsed": elapsed, "hits": 0}
+                with open(infoFile, "w") as outf: json.dump(info, outf)
+            finally:
+                os.remove(lockFile)
+        except (IOError, OSError), e:
+            print "Failed to add the ambient file to cache: %s" % e
+        finally:
+            for workerAmbFile in study["workerFiles"]:
+                if os.path.isfile(workerAmbFile): os.remove(workerAmbFile)
 
-class hb_EnergySimulatioParameters(object):
-    
-    def readEPParams(self, EPParameters):
-        
-        if EPParameters == []:
-            timestep = 6
-            shadowPar = ["AverageOverDaysInFrequency", 30, 3000]
-            solarDistribution = "FullInteriorAndExteriorWithReflections"
-            simulationControl = [True, True, True, False, True, '', '']
-            ddyFile = None
-            terrain = 'City'
-            grndTemps = []
-            holidays = []
-            startDay = None
-            heatSizing = 1.25
-            coolSizing = 1.15
-        
-        else:
-            timestep = int(EPParameters[0])
-            shadowPar = EPParameters[1:4]
-            solarDistribution = EPParameters[4]
-            simulationControl = EPParameters[5:12]
-            ddyFile = EPParameters[12]
-            terrain = EPParameters[13]
-            grndTemps = EPParameters[14]
-            holidays = EPParameters[15]
-            startDay = EPParameters[16]
-            heatSizing = EPParameters[17]
-            coolSizing = EPParameters[18]
-        
-        return timestep, shadowPar, solarDistribution, simulationControl, ddyFile, terrain, grndTemps, holidays, startDay, heatSizing, coolSizing
+        self.evict()
+
+    def evict(self):
+        hb_OctreeCache.evict(self)
+        # remove the information of the removed ambient files
+        for entry in os.listdir(self.cacheFolder):
+            if entry.endswith(".json") and \
+                not os.path.isfile(os.path.join(self.cacheFolder, entry[:-5] + self.extension)):
+                try: os.remove(os.path.join(self.cacheFolder, entry))
+                except OSError: pass
 
 class EPMaterialAux(object):
     
@@ -4339,6 +7282,318 @@ class EPObjectsAux(object):
             component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, warningMsg)
             return
 
+class hb_EPScheduleEngine(object):
+    """Compile EnergyPlus schedules once and expand them to packed arrays.
+    
+    Schedules are parsed into a list of day intervals (end minute, value) and
+    the expanded values are memoized for each schedule name, start day of the
+    week, holidays and number of timesteps per hour. The compiled schedules
+    are checked against the Honeybee schedule library on each call so editing
+    a schedule in the library is picked up on the next expansion.
+    
+    Supported types are Schedule:Compact, Schedule:Year, Schedule:Week:Daily,
+    Schedule:Week:Compact, Schedule:Day:Interval, Schedule:Day:Hourly,
+    Schedule:Day:List and Schedule:Constant.
+    """
+    
+    # Sunday to Saturday, Holiday, SummerDesignDay, WinterDesignDay, CustomDay1, CustomDay2
+    dayTypes = ['sunday', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday',
+                'saturday', 'holiday', 'summerdesignday', 'winterdesignday',
+                'customday1', 'customday2']
+    
+    dayTypeGroups = {'weekdays': range(1, 6), 'weekends': [0, 6], 'alldays': range(12),
+                     'holidays': [7], 'holiday': [7]}
+    
+    monthStartDay = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334, 365]
+    
+    def __init__(self):
+        self.compiled = {}
+        self.dayCache = {}
+        self.expanded = {}
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def parseUntilTime(untilTime):
+        """Convert 'Until: hh:mm' or 'hh:mm' to minutes from the start of the day."""
+        hour, minute = untilTime.split(":")[-2:]
+        return 60 * int(hour.strip()) + int(minute.strip())
+    
+    def dayOfYear(self, month, day):
+        return self.monthStartDay[int(month) - 1] + int(day)
+    
+    def getScheduleData(self, schName):
+        values, comments = sc.sticky["honeybee_EPScheduleAUX"]().getScheduleDataByName(schName.upper(), ghenv.Component)
+        if values is None or comments == "csv":
+            raise ValueError("%s is not an EnergyPlus schedule in the Honeybee library." % schName)
+        return values
+    
+    def compileDayIntervals(self, fields, interpolate = "no"):
+        """Compile a list of until times and values into a day schedule."""
+        times = []
+        values = []
+        for i in range(0, len(fields) - 1, 2):
+            endMinute = self.parseUntilTime(fields[i])
+            value = float(fields[i + 1])
+            if times and endMinute <= times[-1]: continue
+            times.append(min(endMinute, 1440))
+            values.append(value)
+        
+        if not times:
+            times, values = [1440], [0.0]
+        elif times[-1] < 1440:
+            # EnergyPlus requires the last until time to be 24:00
+            times.append(1440)
+            values.append(values[-1])
+        
+        return {"type": "day", "times": times, "values": values,
+                "interpolate": interpolate.strip().lower() or "no"}
+    
+    def compileDayList(self, interpolate, minutesPerItem, fields):
+        minutesPerItem = int(float(minutesPerItem))
+        times = [minutesPerItem * (count + 1) for count in range(len(fields))]
+        day = {"type": "day", "times": times, "values": map(float, fields),
+               "interpolate": interpolate.strip().lower() or "no"}
+        if not times or times[-1] < 1440:
+            day["times"].append(1440)
+            day["values"].append(day["values"][-1] if fields else 0.0)
+        return day
+    
+    def parseDayTypes(self, forField):
+        """Return the day type indices for a 'For: ...' field of a compact schedule."""
+        dayTypes = []
+        for word in forField.split(":", 1)[-1].split():
+            word = word.strip().lower()
+            if word in self.dayTypeGroups:
+                dayTypes.extend(self.dayTypeGroups[word])
+            elif word in self.dayTypes:
+                dayTypes.append(self.dayTypes.index(word))
+            elif word == 'allotherdays':
+                dayTypes.append(-1)
+        return dayTypes
+    
+    def assignDayTypes(self, week, dayTypes, schedule):
+        for dayType in dayTypes:
+            if dayType == -1:
+                for count in range(12):
+                    if week[count] is None: week[count] = schedule
+            elif week[dayType] is None:
+                week[dayType] = schedule
+    
+    def compileCompact(self, fields):
+        """Schedule:Compact fields are Through:, For:, Interpolate:, Until: and values."""
+        periods = []
+        week = None
+        dayTypes = []
+        interpolate = "no"
+        dayFields = []
+        
+        def closeDay():
+            if week is not None and dayTypes:
+                self.assignDayTypes(week, dayTypes, self.compileDayIntervals(dayFields, interpolate))
+        
+        for field in fields:
+            keyword = field.split(":", 1)[0].strip().lower()
+            if keyword == "through":
+                closeDay()
+                month, day = field.split(":", 1)[1].strip().split("/")
+                week = [None] * 12
+                periods.append([self.dayOfYear(month, day), week])
+                dayTypes, dayFields, interpolate = [], [], "no"
+            elif keyword == "for":
+                closeDay()
+                dayTypes, dayFields, interpolate = self.parseDayTypes(field), [], "no"
+            elif keyword == "interpolate":
+                interpolate = field.split(":", 1)[1]
+            else:
+                dayFields.append(field)
+        closeDay()
+        
+        if not periods:
+            raise ValueError("Schedule:Compact has no Through: field.")
+        
+        return {"type": "compact", "periods": periods}
+    
+    def compileSchedule(self, values):
+        scheduleType = values[0].lower()
+        if scheduleType == "schedule:day:interval":
+            return self.compileDayIntervals(values[3:], values[2])
+        elif scheduleType == "schedule:day:hourly":
+            fields = []
+            for hour, value in enumerate(values[2:26]):
+                fields.extend(["%d:00" % (hour + 1), value])
+            return self.compileDayIntervals(fields)
+        elif scheduleType == "schedule:day:list":
+            return self.compileDayList(values[2], values[3], values[4:])
+        elif scheduleType == "schedule:week:daily":
+            days = list(values[1:13])
+            return {"type": "week", "days": days + [None] * (12 - len(days))}
+        elif scheduleType == "schedule:week:compact":
+            week = [None] * 12
+            for i in range(1, len(values) - 1, 2):
+                self.assignDayTypes(week, self.parseDayTypes(values[i]), values[i + 1])
+            return {"type": "week", "days": week}
+        elif scheduleType == "schedule:year":
+            periods = []
+            for i in range(2, len(values) - 4, 5):
+                periods.append((self.dayOfYear(values[i + 1], values[i + 2]),
+                                self.dayOfYear(values[i + 3], values[i + 4]), values[i]))
+            return {"type": "year", "periods": periods}
+        elif scheduleType == "schedule:constant":
+            return {"type": "day", "times": [1440], "values": [float(values[2])],
+                    "interpolate": "no"}
+        elif scheduleType == "schedule:compact":
+            return self.compileCompact(values[2:])
+        else:
+            raise ValueError("Honeybee doesn't support %s currently." % values[0])
+    
+    def compile(self, schName):
+        """Return the compiled schedule and recompile it if the library has changed."""
+        key = schName.upper()
+        values = self.getScheduleData(key)
+        signature = tuple(values)
+        
+        if key in self.compiled and self.compiled[key][0] == signature:
+            schedule = self.compiled[key][1]
+        else:
+            schedule = self.compileSchedule(values)
+            if key in self.compiled:
+                # a schedule has been edited. expanded values may depend on it
+                self.expanded.clear()
+                self.dayCache.clear()
+            self.compiled[key] = signature, schedule
+        
+        # check the week and day schedules that this schedule uses
+        if schedule["type"] == "week":
+            for dayName in set(schedule["days"]):
+                if dayName: self.compile(dayName)
+        elif schedule["type"] == "year":
+            for startDay, endDay, weekName in schedule["periods"]:
+                self.compile(weekName)
+        
+        return schedule
+    
+    def stepValues(self, day, timestep):
+        """Return the values of a compiled day schedule for each timestep of the day.
+        
+        With no interpolation the value at the end of each timestep is used, which
+        matches EnergyPlus for until times that are not on a timestep boundary.
+        Average and Linear interpolation use the time weighted average of the step.
+        """
+        key = id(day), timestep
+        if key in self.dayCache: return self.dayCache[key][1]
+        
+        times, values = day["times"], day["values"]
+        stepLength = 60.0 / timestep
+        stepValues = array.array('d')
+        interval = 0
+        for step in range(24 * timestep):
+            start = step * stepLength
+            end = start + stepLength
+            while times[interval] < end - 1e-9: interval += 1
+            
+            if day["interpolate"] == "no" or interval == 0 or times[interval - 1] <= start:
+                stepValues.append(values[interval])
+                continue
+            
+            # average the intervals that change within this timestep
+            total = 0
+            segmentStart = start
+            for count in range(interval + 1):
+                if times[count] <= start: continue
+                segmentEnd = min(times[count], end)
+                total += values[count] * (segmentEnd - segmentStart)
+                segmentStart = segmentEnd
+            stepValues.append(total / stepLength)
+        
+        # keep a reference to day so its id is not reused while cached
+        self.dayCache[key] = day, stepValues
+        return stepValues
+    
+    def getWeekDays(self, schName):
+        """Return the 12 compiled day schedules of a week schedule."""
+        week = self.compile(schName)
+        if week["type"] == "day": return [week] * 12
+        return [self.compile(dayName) if dayName else None for dayName in week["days"]]
+    
+    def dayValues(self, schName, timestep = 1):
+        """Return a list of values for each timestep of a day schedule."""
+        day = self.compile(schName)
+        if day["type"] != "day":
+            raise ValueError("%s is not a day schedule." % schName)
+        return list(self.stepValues(day, timestep))
+    
+    def weekValues(self, schName, timestep = 1):
+        """Return a list of 7 lists for the values of Sunday to Saturday."""
+        week = self.getWeekDays(schName)
+        return [list(self.stepValues(day, timestep)) if day else [0.0] * (24 * timestep) \
+                for day in week[:7]]
+    
+    def yearDays(self, schedule):
+        """Return the compiled week schedules for each day of the year."""
+        weeks = [None] * 365
+        if schedule["type"] == "compact":
+            startDay = 1
+            for endDay, week in schedule["periods"]:
+                for day in range(startDay - 1, min(endDay, 365)):
+                    weeks[day] = week
+                startDay = endDay + 1
+        elif schedule["type"] == "year":
+            for startDay, endDay, weekName in schedule["periods"]:
+                week = self.getWeekDays(weekName)
+                for day in range(startDay - 1, min(endDay, 365)):
+                    weeks[day] = week
+        return weeks
+    
+    def expand(self, schName, startDayOfTheWeek = 0, holidays = None, timestep = 1):
+        """Expand a schedule to a packed array of values for 365 days.
+        
+        Args:
+            schName: Name of the schedule in Honeybee schedule library.
+            startDayOfTheWeek: Day of the week for January 1st. 0 is Sunday.
+            holidays: A list of days of the year (1-365) that use the holiday schedule.
+            timestep: Number of timesteps per hour (1-60).
+        
+        Returns:
+            An array of 8760 * timestep values. The array is shared between calls
+            so copy it before changing the values.
+        """
+        timestep = int(timestep)
+        if 60 % timestep != 0:
+            raise ValueError("Timestep should be a divisor of 60 between 1 and 60.")
+        
+        holidays = tuple(sorted(set(int(day) for day in holidays or [])))
+        startDayOfTheWeek = int(startDayOfTheWeek) % 7
+        schedule = self.compile(schName)
+        key = schName.upper(), startDayOfTheWeek, holidays, timestep
+        
+        if key in self.expanded:
+            self.hits += 1
+            return self.expanded[key]
+        self.misses += 1
+        
+        if schedule["type"] == "day":
+            weeks = [[schedule] * 12] * 365
+        elif schedule["type"] == "week":
+            weeks = [self.getWeekDays(schName)] * 365
+        else:
+            weeks = self.yearDays(schedule)
+        
+        holidays = set(holidays)
+        emptyDay = array.array('d', [0.0]) * (24 * timestep)
+        values = array.array('d')
+        for day, week in enumerate(weeks):
+            if week is None:
+                values.extend(emptyDay)
+                continue
+            dayType = 7 if day + 1 in holidays else (day + startDayOfTheWeek) % 7
+            daySchedule = week[dayType] or week[(day + startDayOfTheWeek) % 7]
+            values.extend(self.stepValues(daySchedule, timestep) if daySchedule else emptyDay)
+        
+        self.expanded[key] = values
+        return values
+
+
 class ReadEPSchedules(object):
     
     def __init__(self, schName, startDayOfTheWeek):
@@ -4347,6 +7602,7 @@ class ReadEPSchedules(object):
         self.lb_preparation = sc.sticky["ladybug_Preparation"]()
         self.schName = schName
         self.startDayOfTheWeek = startDayOfTheWeek
+        self.engine = sc.sticky["honeybee_EPScheduleEngine"]
         self.count = 0
         self.startHOY = 1
         self.endHOY = 24
@@ -4380,19 +7636,8 @@ class ReadEPSchedules(object):
         typeLimitName = values[1]
         lowerLimit, upperLimit, numericType, unitType = \
                 self.getScheduleTypeLimitsData(typeLimitName)
-                
-        numberOfDaySch = int((len(values) - 3) /2)
         
-        hourlyValues = range(24)
-        startHour = 0
-        for i in range(numberOfDaySch):
-            value = float(values[2 * i + 4])
-            untilTime = map(int, values[2 * i + 3].split(":"))
-            endHour = int(untilTime[0] +  untilTime[1]/60)
-            for hour in range(startHour, endHour):
-                hourlyValues[hour] = value
-            
-            startHour = endHour
+        hourlyValues = self.engine.dayValues(schName)
         
         if numericType.strip().lower() == "district":
             hourlyValues = map(int, hourlyValues)
@@ -4412,30 +7657,12 @@ class ReadEPSchedules(object):
         
         if schName == None:
             schName = self.schName
-            
-        values, comments = self.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), ghenv.Component)
         
         if self.count == 1:
             # set the last date of the schedule to one week
             self.endHOY = 24 * 7
         
-        sundaySchedule = self.getScheduleValues(values[1])
-        mondaySchedule = self.getScheduleValues(values[2])
-        tuesdaySchedule = self.getScheduleValues(values[3])
-        wednesdaySchedule = self.getScheduleValues(values[4])
-        thursdaySchedule = self.getScheduleValues(values[5])
-        fridaySchedule = self.getScheduleValues(values[6])
-        saturdaySchedule = self.getScheduleValues(values[7])
-        
-        holidaySchedule = self.getScheduleValues(values[8])
-        summerDesignDaySchedule = self.getScheduleValues(values[9])
-        winterDesignDaySchedule = self.getScheduleValues(values[10])
-        customDay1Schedule = self.getScheduleValues(values[11])
-        customDay2Schedule = self.getScheduleValues(values[12])
-        
-        hourlyValues = [sundaySchedule, mondaySchedule, tuesdaySchedule, \
-                       wednesdaySchedule, thursdaySchedule, fridaySchedule, \
-                       saturdaySchedule]
+        hourlyValues = self.engine.weekValues(schName)
         
         hourlyValues = hourlyValues[self.startDayOfTheWeek:] + \
                        hourlyValues[:self.startDayOfTheWeek]
@@ -4457,11 +7684,11 @@ class ReadEPSchedules(object):
         lowerLimit, upperLimit, numericType, unitType = \
                 self.getScheduleTypeLimitsData(typeLimitName)
         
-        hourlyValues = [float(values[2])]
+        hourlyValues = self.engine.dayValues(schName)
         
         if numericType.strip().lower() == "district":
             hourlyValues = map(int, hourlyValues)
-        return scheduleConstant
+        return hourlyValues
     
     
     def getCompactEPScheduleValues(self, schName):
@@ -4473,112 +7700,41 @@ class ReadEPSchedules(object):
         lowerLimit, upperLimit, numericType, unitType = \
                 self.getScheduleTypeLimitsData(typeLimitName)
         
-        #Separate out the different periods.
-        totalValues = []
-        periodValues = []
-        headerDone = False
-        for val in values:
-            newPeriod = False
-            for word in self.comapctKeywords:
-                if word in val: newPeriod = True
-            if newPeriod == True:
-                if headerDone == True:
-                    totalValues.append(periodValues)
-                periodValues = [val]
-                headerDone = True
-            elif headerDone == True:
-                periodValues.append(val)
-        totalValues.append(periodValues)
-        
-        #For each day period, construct a day schedule.
-        dayType = []
-        dayValues = []
-        for dayVals in totalValues:
-            dayType.append(dayVals[0].title().split('For: ')[-1])
-            numberOfDaySch = int((len(dayVals) - 1) /2)
-            
-            hourlyValues = range(24)
-            startHour = 0
-            for i in range(numberOfDaySch):
-                value = float(dayVals[2 * i + 2])
-                untilTime = map(int, dayVals[2 * i + 1].split(":")[1:])
-                endHour = int(untilTime[0] +  untilTime[1]/60)
-                for hour in range(startHour, endHour):
-                    hourlyValues[hour] = value
-                
-                startHour = endHour
-            dayValues.append(hourlyValues)
-        
-        #Construct a week schedule from the day schedules.
-        #Map the dayTypes to the days of the week.
-        ['Weekdays', 'Weekends', 'Alldays', 'AllOtherDays', 'Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        weekVals = [-1, -1, -1, -1, -1, -1, -1]
-        for typeCount, type in enumerate(dayType):
-            if type == 'Alldays':
-                for count, val in enumerate(weekVals):
-                    weekVals[count] = typeCount
-            elif type == 'Weekdays':
-                for count, val in enumerate(weekVals):
-                    if count < 6 and count != 0: weekVals[count] = typeCount
-            elif type == 'Weekends':
-                weekVals[0] = typeCount
-                weekVals[-1] = typeCount
-            elif type == 'Sunday': weekVals[0] = typeCount
-            elif type == 'Monday': weekVals[1] = typeCount
-            elif type == 'Tuesday': weekVals[2] = typeCount
-            elif type == 'Wednesday': weekVals[3] = typeCount
-            elif type == 'Thursday': weekVals[4] = typeCount
-            elif type == 'Friday': weekVals[5] = typeCount
-            elif type == 'Saturday': weekVals[6] = typeCount
-            elif type == 'Allotherdays':
-                for count, val in enumerate(weekVals):
-                    if val == -1: weekVals[count] = typeCount
-        
-        #Turn the week schedule into a year schedule.
-        hourlyValues = []
-        dayVals = []
-        dayofWeek = -1
-        for day in range(365):
-            if dayofWeek == 6: dayofWeek = 0
-            else: dayofWeek += 1
-            dayVals.append(weekVals[dayofWeek])
-        for day in dayVals:
-            hourlyValues.extend(dayValues[day])
-        
-        print hourlyValues
-        return hourlyValues
+        # update last day of schedule
+        self.endHOY = 8760
+        
+        return list(self.engine.expand(schName, self.startDayOfTheWeek))
     
     
     def getYearlyEPScheduleValues(self, schName = None):
-        # place holder for 365 days
-        hourlyValues = range(365)
-        
         # update last day of schedule
         self.endHOY = 8760
         
         if schName == None:
             schName = self.schName
         
-        values, comments = self.hb_EPScheduleAUX.getScheduleDataByName(schName.upper(), ghenv.Component)
-        
-        # generate weekly schedules
-        numOfWeeklySchedules = int((len(values)-2)/5)
+        # a list of 24 values for each day of the year
+        values = self.engine.expand(schName, self.startDayOfTheWeek)
+        hourlyValues = [list(values[24 * day: 24 * (day + 1)]) for day in range(365)]
         
-        for i in range(numOfWeeklySchedules):
-            weekDayScheduleName = values[5 * i + 2]
-            
-            startDay = int(self.lb_preparation.getJD(int(values[5 * i + 3]), int(values[5 * i + 4])))
-            endDay = int(self.lb_preparation.getJD(int(values[5 * i + 5]), int(values[5 * i + 6])))
-            
-            # 7 list for 7 days of the week
-            hourlyValuesForTheWeek = self.getScheduleValues(weekDayScheduleName)
-            
-            for day in range(startDay-1, endDay):
-                hourlyValues[day] = hourlyValuesForTheWeek[day%7]
-            
         return hourlyValues
     
     
+    def getScheduleArray(self, schName = None, holidays = None, timestep = 1):
+        """Return the values of the schedule for a year as an array.
+        
+        Args:
+            holidays: A list of days of the year (1-365) that use the holiday schedule.
+            timestep: Number of timesteps per hour (1-60).
+        """
+        if schName == None:
+            schName = self.schName
+        
+        self.startHOY = 1
+        self.endHOY = 8760
+        return self.engine.expand(schName, self.startDayOfTheWeek, holidays, timestep)
+    
+    
     def getScheduleValues(self, schName = None):
         if schName == None:
             schName = self.schName
@@ -4593,9 +7749,9 @@ class ReadEPSchedules(object):
             
             if scheduleType == "schedule:year":
                 hourlyValues = self.getYearlyEPScheduleValues(schName)
-            elif scheduleType == "schedule:day:interval":
+            elif scheduleType in ("schedule:day:interval", "schedule:day:hourly", "schedule:day:list"):
                 hourlyValues = self.getDayEPScheduleValues(schName)
-            elif scheduleType == "schedule:week:daily":
+            elif scheduleType in ("schedule:week:daily", "schedule:week:compact"):
                 hourlyValues = self.getWeeklyEPScheduleValues(schName)
             elif scheduleType == "schedule:constant":
                 hourlyValues = self.getConstantEPScheduleValues(schName)
@@ -8561,31 +11717,50 @@ class CalculateGridBasedDLAnalysisResults(object):
         
         return resultValues
     
+    @staticmethod
+    def readRGBResult(resultFile):
+        """Read an rtrace result file and return the R, G and B values as three arrays.
+        
+        The file is read at once. Binary results (rtrace -faf or -fff with the header)
+        are loaded directly into an array.
+        """
+        with open(resultFile, "rb") as inf:
+            header = hb_DCMatrixEngine.readMatrixHeader(inf)
+            data = inf.read()
+        
+        numOfComps = int(header.get("NCOMP", 3))
+        dataFormat = header.get("FORMAT", "ascii").lower()
+        if dataFormat in ("float", "double"):
+            values = array.array("f" if dataFormat == "float" else "d")
+            values.fromstring(data[:len(data) - len(data) % values.itemsize])
+            bigEndian = header.get("BIGENDIAN")
+            if bigEndian is not None and (bigEndian == "1") != (sys.byteorder == "big"):
+                values.byteswap()
+        else:
+            tokens = data.split()
+            lines = [line for line in data.splitlines() if line.strip()]
+            if len(tokens) == numOfComps * len(lines):
+                values = array.array("d", map(float, tokens))
+            else:
+                # lines with extra values
+                values = array.array("d", [float(v) for line in lines for v in line.split()[:numOfComps]])
+        
+        if numOfComps == 1: return values, values, values
+        return values[0::numOfComps], values[1::numOfComps], values[2::numOfComps]
+    
+    @staticmethod
+    def illuminance(R, G, B):
+        return [179 * (.265 * r + .67 * g + .065 * b) for r, g, b in itertools.izip(R, G, B)]
+    
     def readRadiationResult(self, resultFile):
-        result = []
-        resultFile = open(resultFile,"r")
-        for line in resultFile:
-            result.append(float(line.split('	')[0]))
-        return result
+        return list(self.readRGBResult(resultFile)[0])
     
     def readDLResult(self, resultFile):
-        result = []
-        resultFile = open(resultFile,"r")
-        for line in resultFile:
-            R, G, B = line.split('	')[0:3]
-            result.append(179*(.265 * float(R) + .67 * float(G) + .065 * float(B)))
-        return result
+        return self.illuminance(*self.readRGBResult(resultFile))
     
     def readDFResult(self, resultFile):
-        result = []
-        resultFile = open(resultFile,"r")
-        for line in resultFile:
-            R, G, B = line.split('	')[0:3]
-            # divide by the sky horizontal illuminance = 1000
-            res = 17900*(.265 * float(R) + .67 * float(G) + .065 * float(B))/1000
-            if res > 100: res = 100
-            result.append(res)
-        return result
+        # divide by the sky horizontal illuminance = 1000
+        return [min(value / 10, 100) for value in self.illuminance(*self.readRGBResult(resultFile))]
 
 class SerializeObjects(object):
     
@@ -9386,6 +12561,7 @@ class hb_NonConvexChecking(object):
         return (check, faultyGeometry)
 
 
+startupTimer = hb_StartupTimer()
 checkIn = CheckIn(defaultFolder_)
 
 letItFly = True
@@ -9403,6 +12579,8 @@ except:
     # no internet connection
     downloadTemplate = False
 
+startupTimer.step("Checking for updates")
+
 GHPythonTargetVersion = "0.6.0.3"
 
 try:
@@ -9670,6 +12848,8 @@ if checkIn.letItFly:
         sc.sticky["honeybee_folders"]["THERMPath"] = folders.THERMPath
         sc.sticky["honeybee_folders"]["ThermSettings"] = THERMSettingsFile
         
+        startupTimer.step("Finding Radiance, Daysim, EnergyPlus, OpenStudio and THERM")
+        
         
         # initiate an empty library in case this is the first time honeybee is flying in this document
         # otherwise it has been already created/
@@ -9678,45 +12858,92 @@ if checkIn.letItFly:
             sc.sticky["honeybee_RADMaterialLib"] = dict()
         
         # set up radiance materials
-        RADMaterialAux = RADMaterialAux(True, sc.sticky["honeybee_RADMaterialLib"], sc.sticky["Honeybee_DefaultFolder"])
+        # the library files are parsed the first time that a component uses the library
+        RADLibLoader = hb_LazyLoader("Radiance materials", None, startupTimer)
+        sc.sticky["honeybee_RADMaterialLib"] = hb_LazyLibrary(RADLibLoader, sc.sticky["honeybee_RADMaterialLib"])
+        RADMaterialAux = RADMaterialAux(False, sc.sticky["honeybee_RADMaterialLib"], sc.sticky["Honeybee_DefaultFolder"])
+        RADLibLoader.loadFunc = RADMaterialAux.loadRADMaterials
         sc.sticky["honeybee_RADMaterialAUX"] = RADMaterialAux
         
         # Download EP libraries
+        # Template files are checked and EP and THERM libraries are parsed the first time
+        # that a component uses one of the libraries.
         templateFilesPrep = PrepareTemplateEPLibFiles(downloadTemplate)
-        libFilePaths = templateFilesPrep.downloadTemplates()
         msg = "Failed to load EP constructions! You won't be able to run analysis with Honeybee!\n" + \
                   "Download the files from address below and copy them to: " + sc.sticky["Honeybee_DefaultFolder"] + \
                   "\nhttps://github.com/mostaphaRoudsari/Honeybee/tree/master/resources\n"
-        if libFilePaths != -1:
-            EPLibs = HB_GetEPLibraries()
+        
+        EPLibraries = {"honeybee_materialLib": "getEPMaterials",
+                       "honeybee_windowMaterialLib": "getEPWindowMaterial",
+                       "honeybee_constructionLib": "getEPConstructions",
+                       "honeybee_ScheduleLib": "getEPSchedule",
+                       "honeybee_ScheduleTypeLimitsLib": "getEPScheduleTypeLimits",
+                       "honeybee_WindowPropLib": "getEPWindowProp",
+                       "honeybee_SpectralDataLib": "getEPSpectralData",
+                       "honeybee_thermMaterialLib": "getTHERMMaterials"}
+        lazyLibraries = {}
+        libFilePaths = []
+        
+        def downloadTemplates():
+            paths = templateFilesPrep.downloadTemplates()
+            if paths != -1: libFilePaths.extend(paths)
+            
+            # put back the lazy libraries if a new template is downloaded and the libraries are cleaned
+            for libName, lib in lazyLibraries.items():
+                if sc.sticky.get(libName) is lib: continue
+                if libName == "honeybee_OpenStudioStandardsFile":
+                    lib.library.update(sc.sticky.get(libName, {}))
+                else:
+                    lib.library.clear()
+                sc.sticky[libName] = lib
+        
+        # This is first time loading so the library should be cleaned before the first file is loaded
+        firstTimeLoading = "honeybee_Hive" not in sc.sticky
+        
+        def importLibraryFiles(isMatFile):
+            templateLoader.load()
+            if not libFilePaths:
+                print msg
+                ghenv.Component.AddRuntimeMessage(w, msg)
+                return None
             
+            EPLibs = HB_GetEPLibraries()
             try:
-                for pathCount, path in enumerate(libFilePaths):
-                    if "honeybee_Hive" not in sc.sticky:
-                        # This is first time loading so clean the library
-                        cleanLibs = True if pathCount == 0 else False
-                    else:
-                        cleanLibs = False
-                    if path.endswith('.csv'): isMatFile = True
-                    else: isMatFile = False
-                    
-                    EPLibs.importEPLibrariesFromFile(path, isMatFile, cleanLibs, False)                
-                
-                EPLibs.report()
-                sc.sticky["honeybee_materialLib"].update(EPLibs.getEPMaterials())
-                sc.sticky["honeybee_windowMaterialLib"].update(EPLibs.getEPWindowMaterial())
-                sc.sticky ["honeybee_constructionLib"].update(EPLibs.getEPConstructions())
-                sc.sticky["honeybee_ScheduleLib"].update(EPLibs.getEPSchedule())
-                sc.sticky["honeybee_ScheduleTypeLimitsLib"].update(EPLibs.getEPScheduleTypeLimits())
-                sc.sticky["honeybee_thermMaterialLib"].update(EPLibs.getTHERMMaterials())
-                sc.sticky["honeybee_WindowPropLib"].update(EPLibs.getEPWindowProp())
-                sc.sticky["honeybee_SpectralDataLib"].update(EPLibs.getEPSpectralData())
+                paths = [path for path in libFilePaths if path.endswith('.csv') == isMatFile]
+                for pathCount, path in enumerate(paths):
+                    cleanLibs = firstTimeLoading and pathCount == 0
+                    EPLibs.importEPLibrariesFromFile(path, isMatFile, cleanLibs, False, useCache = True)
             except:
                 print msg
-                ghenv.Component.AddRuntimeMessage(w, msg)
-        else:
-            print msg
-            ghenv.Component.AddRuntimeMessage(w, msg)
+                raise
+            return EPLibs
+        
+        def loadEPLibraries():
+            EPLibs = importLibraryFiles(False)
+            if EPLibs is None: return
+            EPLibs.report()
+            for libName, getLib in EPLibraries.items():
+                if libName != "honeybee_thermMaterialLib":
+                    lazyLibraries[libName].update(getattr(EPLibs, getLib)())
+        
+        def loadTHERMLibraries():
+            EPLibs = importLibraryFiles(True)
+            if EPLibs is None: return
+            lazyLibraries["honeybee_thermMaterialLib"].update(EPLibs.getTHERMMaterials())
+            print "%s THERM materials are now loaded in Honeybee library" % len(EPLibs.getTHERMMaterials())
+        
+        templateLoader = hb_LazyLoader("Honeybee template files", downloadTemplates, startupTimer)
+        EPLibLoader = hb_LazyLoader("EnergyPlus libraries", loadEPLibraries, startupTimer)
+        THERMLibLoader = hb_LazyLoader("THERM materials", loadTHERMLibraries, startupTimer)
+        
+        for libName in EPLibraries.keys():
+            loader = THERMLibLoader if libName == "honeybee_thermMaterialLib" else EPLibLoader
+            lazyLibraries[libName] = hb_LazyLibrary(loader, sc.sticky[libName])
+        # the standards file is loaded with the templates
+        lazyLibraries["honeybee_OpenStudioStandardsFile"] = hb_LazyLibrary(templateLoader)
+        sc.sticky.update(lazyLibraries)
+        
+        startupTimer.step("Setting up libraries")
         
         
         sc.sticky["honeybee_Hive"] = hb_Hive
@@ -9728,6 +12955,7 @@ if checkIn.letItFly:
         sc.sticky["honeybee_EPScheduleAUX"] = EPScheduleAux
         sc.sticky["honeybee_EPObjectsAUX"] = EPObjectsAux
         sc.sticky["honeybee_ReadSchedules"] = ReadEPSchedules
+        sc.sticky["honeybee_EPScheduleEngine"] = hb_EPScheduleEngine()
         sc.sticky["honeybee_BuildingProgramsLib"] = BuildingProgramsLib
         sc.sticky["honeybee_EPTypes"] = EPTypes()
         sc.sticky["honeybee_EPZone"] = EPZone
@@ -9763,7 +12991,19 @@ if checkIn.letItFly:
         sc.sticky["honeybee_RADParameters"] = hb_RADParameters
         sc.sticky["honeybee_DSParameters"] = hb_DSParameters
         sc.sticky["honeybee_ReadAnnualResultsAux"] = hb_ReadAnnualResultsAux
+        sc.sticky["honeybee_AnnualIlluminanceMatrix"] = hb_AnnualIlluminanceMatrix
+        sc.sticky["honeybee_ComfortMatrix"] = hb_ComfortMatrix
+        sc.sticky["honeybee_DCMatrixEngine"] = hb_DCMatrixEngine
         sc.sticky["honeybee_EPParameters"] = hb_EnergySimulatioParameters
+        sc.sticky["honeybee_EPCSVResultReader"] = hb_EPCSVResultReader
+        sc.sticky["honeybee_EPSQLResultReader"] = hb_EPSQLResultReader
+        sc.sticky["honeybee_EPResultReader"] = getEPResultReader
+        sc.sticky["honeybee_Job"] = hb_Job
+        sc.sticky["honeybee_JobScheduler"] = hb_JobScheduler
+        sc.sticky["honeybee_SimulationCache"] = hb_SimulationCache
+        sc.sticky["honeybee_OctreeCache"] = hb_OctreeCache
+        sc.sticky["honeybee_RADMeshCache"] = hb_RADMeshCache
+        sc.sticky["honeybee_AmbientCache"] = hb_AmbientCache
         sc.sticky["honeybee_SerializeObjects"] = SerializeObjects
         sc.sticky["honeybee_GridBasedDLResults"] = CalculateGridBasedDLAnalysisResults
         sc.sticky["honeybee_DLAnalaysisTypes"] = {0: ["0: illuminance" , "lux"],
@@ -9776,6 +13016,10 @@ if checkIn.letItFly:
         sc.sticky["honeybee_NonConvexChecking"] = hb_NonConvexChecking
         sc.sticky["honeybee_ConversionFactor"] = checkUnits()
         
+        startupTimer.step("Registering Honeybee classes")
+        sc.sticky["honeybee_startupTimer"] = startupTimer
+        print "\nLoading times (libraries are loaded the first time they are used):\n" + startupTimer.report() + "\n"
+        
         # done! sharing the happiness.
         print "Hooohooho...Flying!!\nVviiiiiiizzz..."
         
@@ -35,6 +35,7 @@ Provided by Honeybee 0.0.63
         _imageHeight_: Optional input for image height in pixels
         _radParameters_: Radiance parameters
         backupImages_: [0] No backup, [1] Backup in the same folder, [2] Backup in separate folders. Default is 0.
+        progressive_: Set to True to render a quick low-quality preview of the views first and then render the final images in smaller tiles. The preview is saved as *_preview.HDR and the *_progress.HDR files are updated as the tiles are rendered. Default is False.
         
     Returns:
         analysisRecipe: Recipe for image-based simulation
@@ -83,8 +84,14 @@ def main():
                               _cameraType_, _simulationType_, _imageWidth_,
                               _imageHeight_, sectionPlane_, backupImages_, ghenv.Component)
     
+    recipe.progressive = bool(progressive_)
+    
     return recipe
 
+#progressive_ is a new input that older versions of the userObject don't have.
+try: progressive_
+except NameError: progressive_ = False
+
 if _skyFile:
     
     try: int(_simulationType_)
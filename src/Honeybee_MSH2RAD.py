@@ -31,6 +31,7 @@ Provided by Honeybee 0.0.63
         HDRTexture_: Optional file path to HDR file to be used as a texture. Use Human plugin to map HDR image on mesh
         _workingDir_: Working directory
         _radFileName_: Radiance file name
+        meshPrimitive_: Set to True to export the mesh as a Radiance mesh with shared vertices (obj2mesh) instead of a polygon for each face. Use this option for large context meshes. The compiled meshes are cached so the same mesh is only compiled once. Meshes with HDRTexture_ are always exported as Radiance meshes. Default is False.
         _writeRad: Set to True to convert mesh to rad
     Returns:
         materialFile: Path to material file
@@ -56,7 +57,7 @@ import scriptcontext as sc
 import time
 
 
-def main(mesh, radFileName, workingDir, RADMaterial, HDRTexture = None):
+def main(mesh, radFileName, workingDir, RADMaterial, HDRTexture = None, meshPrimitive = False):
     
     if not sc.sticky.has_key('honeybee_release'):
         print "You should first let Honeybee to fly..."
@@ -79,12 +80,21 @@ def main(mesh, radFileName, workingDir, RADMaterial, HDRTexture = None):
     MSHToRAD = sc.sticky["honeybee_MeshToRAD"]
     meshToRadiance = MSHToRAD(mesh, radFileName, workingDir, HDRTexture, RADMaterial)
     objFile = meshToRadiance.meshToObj()
-    materialFile, radianceFile = meshToRadiance.objToRAD(objFile)
+    materialFile, radianceFile = meshToRadiance.objToRAD(objFile, meshPrimitive)
+    
+    for warning in meshToRadiance.warnings:
+        w = gh.GH_RuntimeMessageLevel.Warning
+        ghenv.Component.AddRuntimeMessage(w, warning)
     
     return materialFile, radianceFile
 
 
+#meshPrimitive_ is a new input that older versions of the userObject don't have.
+try: meshPrimitive_
+except NameError: meshPrimitive_ = False
+
 if _writeRAD and _mesh and _mesh[0]!=None and _RADMaterial:
     
-    materialFile, radianceFile = main(_mesh, _radFileName_, _workingDir_, _RADMaterial)
+    materialFile, radianceFile = main(_mesh, _radFileName_, _workingDir_, _RADMaterial, \
+                                      meshPrimitive = bool(meshPrimitive_))
     
\ No newline at end of file
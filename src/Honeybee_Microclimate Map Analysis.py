@@ -22,7 +22,7 @@
 
 
 """
-Use this component runs an annual comfort assessment off of EnergyPlus results and write all values into csv files.
+Use this component runs an annual comfort assessment off of EnergyPlus results and write all values into result files.
 The results in these files can be used for creating indoor comfort maps.
 -
 Provided by Honeybee 0.0.63
@@ -35,7 +35,8 @@ Provided by Honeybee 0.0.63
         =============: ...
         analysisPeriodOrHOY_: An analysis period from the 'Ladybug Analysis Period' component or an hour of the analysis between 1 and 8760 for which you want to conduct the analysis. If no value is connected here, the component will run for only noon on the winter solstice.  A single HOY is used by default as longer analysis periods can take a very long time.
         =============: ...
-        writeResultFile_: Set to 1 or 'True' to have the component write all results into CSV result files and set to 0 or 'False' to not have the component write these files.  The default is set to 'True' as these simulations can be long and you usually want a copy of your results.  You may want to set it to 'False' if you are just scrolling through key hours and want the fastest run possible.  Set to 2 if you want the component to only write the results of the last two matrices (comfort results and degFromTarget).
+        writeResultFile_: Set to 1 or 'True' to have the component write all results into result files and set to 0 or 'False' to not have the component write these files.  The default is set to 'True' as these simulations can be long and you usually want a copy of your results.  You may want to set it to 'False' if you are just scrolling through key hours and want the fastest run possible.  Set to 2 if you want the component to only write the results of the last two matrices (comfort results and degFromTarget).
+        resultFormat_: An integer to set the format of the result files.  0 = binary float32 matrices (.hbmtx) that the 'Honeybee_Read Microclimate Matrix', 'Honeybee_Visualize Microclimate Map' and 'Honeybee_Thermal Autonomy Analysis' components can read hour by hour.  1 = compressed binary matrices, which are smaller but slower to read.  2 = CSV files with one line for each hour, as written by the previous versions of this component.  The default is set to 2.
         parallel_: Set to "True" to run the component using multiple CPUs.  This can dramatically decrease calculation time but can interfere with other intense computational processes that might be running on your machine.  For this reason, the default is set to 'False.'
         _runIt: Set boolean to "True" to run the component and generate files for an annual indoor comfort assessment.
     Returns:
@@ -47,11 +48,11 @@ Provided by Honeybee 0.0.63
         adaptComfMtx: A python matrix containing adaptive comfort data for every hour of the analysis to be plugged into the 'Honeybee_Visualize Annual Comfort Results' component.
         degFromTargetMtx: A python matrix containing degrees from tartget temperature data for every hour of the analysis to be plugged into the 'Honeybee_Visualize Annual Comfort Results' component.
         ===============: ...
-        radTempResult: A csv file address containing the radiant temperature resultsfor each point for every hour of the analysis.
-        airTempResult: A csv file address containing the air temperature results for each point for every hour of the analysis.
-        operativeTempResult: A csv file address containing the operative temperature results for each point for every hour of the analysis.
-        adaptComfResult: A csv file address containing the a series of 0's and 1's indicating whether a certain point is comfortable for every hour of the analysis.
-        degFromTargetResult: A csv file address containing the a series of numbers indicating the degrees that a certain point is from the neutral temperature for every hour of the analysis.
+        radTempResult: A result file address containing the radiant temperature resultsfor each point for every hour of the analysis.
+        airTempResult: A result file address containing the air temperature results for each point for every hour of the analysis.
+        operativeTempResult: A result file address containing the operative temperature results for each point for every hour of the analysis.
+        adaptComfResult: A result file address containing the a series of 0's and 1's indicating whether a certain point is comfortable for every hour of the analysis.
+        degFromTargetResult: A result file address containing the a series of numbers indicating the degrees that a certain point is from the neutral temperature for every hour of the analysis.
 
 """
 
@@ -77,6 +78,9 @@ import Rhino as rc
 import scriptcontext as sc
 import math
 import os
+import itertools
+import operator
+import threading
 import System.Threading.Tasks as tasks
 
 
@@ -94,11 +98,11 @@ outputsDictAdapt = {
 5: ["adaptComfMtx", "A python matrix containing adaptive comfort data for every hour of the analysis to be plugged into the 'Honeybee_Visualize Annual Comfort Results' component."],
 6: ["degFromTargetMtx", "A python matrix containing degrees from tartget temperature data for every hour of the analysis to be plugged into the 'Honeybee_Visualize Annual Comfort Results' component."],
 7: ["===============", "..."],
-8: ["radTempResult", "A csv file address containing the radiant temperature resultsfor each point for every hour of the analysis."],
-9: ["airTempResult", "A csv file address containing the air temperature results for each point for every hour of the analysis."],
-10: ["operativeTempResult", "A csv file address containing the operative temperature results for each point for every hour of the analysis."],
-11: ["adaptComfResult", "A csv file address containing the a series of 0's and 1's indicating whether a certain point is comfortable for every hour of the analysis."],
-12: ["degFromTargetResult", "A csv file address containing the a series of numbers indicating the degrees that a certain point is from the neutral temperature for every hour of the analysis."]
+8: ["radTempResult", "A result file address containing the radiant temperature resultsfor each point for every hour of the analysis."],
+9: ["airTempResult", "A result file address containing the air temperature results for each point for every hour of the analysis."],
+10: ["operativeTempResult", "A result file address containing the operative temperature results for each point for every hour of the analysis."],
+11: ["adaptComfResult", "A result file address containing the a series of 0's and 1's indicating whether a certain point is comfortable for every hour of the analysis."],
+12: ["degFromTargetResult", "A result file address containing the a series of numbers indicating the degrees that a certain point is from the neutral temperature for every hour of the analysis."]
 }
 
 outputsDictPMV = {
@@ -111,11 +115,11 @@ outputsDictPMV = {
 5: ["PMVComfMtx", "A python matrix containing PMV comfort data for every hour of the analysis to be plugged into the 'Honeybee_Visualize Annual Comfort Results' component."],
 6: ["PMV_Mtx", "A python matrix containing predicted mean vote (PMV) data for every hour of the analysis to be plugged into the 'Honeybee_Visualize Annual Comfort Results' component."],
 7: ["===============", "..."],
-8: ["radTempResult", "A csv file address containing the radiant temperature resultsfor each point for every hour of the analysis."],
-9: ["airTempResult", "A csv file address containing the air temperature results for each point for every hour of the analysis."],
-10: ["SET_Result", "A csv file address containing the standard effective temperature (SET) results for each point for every hour of the analysis."],
-11: ["PMVComfResult", "A csv file address containing the a series of 0's and 1's indicating whether a certain point is comfortable for every hour of the analysis."],
-12: ["PMV_Result", "A csv file address containing predicted mean vote (PMV) results indicating the distance that a certain point is from the neutral temperature for every hour of the analysis."]
+8: ["radTempResult", "A result file address containing the radiant temperature resultsfor each point for every hour of the analysis."],
+9: ["airTempResult", "A result file address containing the air temperature results for each point for every hour of the analysis."],
+10: ["SET_Result", "A result file address containing the standard effective temperature (SET) results for each point for every hour of the analysis."],
+11: ["PMVComfResult", "A result file address containing the a series of 0's and 1's indicating whether a certain point is comfortable for every hour of the analysis."],
+12: ["PMV_Result", "A result file address containing predicted mean vote (PMV) results indicating the distance that a certain point is from the neutral temperature for every hour of the analysis."]
 }
 
 outputsDictUTCI = {
@@ -128,11 +132,11 @@ outputsDictUTCI = {
 5: ["OutdoorComfMtx", "A python matrix containing outdoor (UTCI) comfort data for every hour of the analysis to be plugged into the 'Honeybee_Visualize Annual Comfort Results' component."],
 6: ["DegFromNeutralMtx", "A python matrix containing the degrees from the neutral UTCI value of 20 C for every hour of the analysis to be plugged into the 'Honeybee_Visualize Annual Comfort Results' component."],
 7: ["===============", "..."],
-8: ["radTempResult", "A csv file address containing the radiant temperature resultsfor each point for every hour of the analysis."],
-9: ["airTempResult", "A csv file address containing the air temperature results for each point for every hour of the analysis."],
-10: ["UTCI_Result", "A csv file address containing universal thermal climate index (UTCI) results for each point for every hour of the analysis."],
-11: ["OutdoorComfResult", "A csv file address containing the a series of 0's and 1's indicating whether a certain point is comfortable for every hour of the analysis."],
-12: ["DegFromNeutralResult", "A csv file address containing the degrees from the neutral UTCI value of 20 C indicating the distance that a certain point is from the neutral temperature for every hour of the analysis."]
+8: ["radTempResult", "A result file address containing the radiant temperature resultsfor each point for every hour of the analysis."],
+9: ["airTempResult", "A result file address containing the air temperature results for each point for every hour of the analysis."],
+10: ["UTCI_Result", "A result file address containing universal thermal climate index (UTCI) results for each point for every hour of the analysis."],
+11: ["OutdoorComfResult", "A result file address containing the a series of 0's and 1's indicating whether a certain point is comfortable for every hour of the analysis."],
+12: ["DegFromNeutralResult", "A result file address containing the degrees from the neutral UTCI value of 20 C indicating the distance that a certain point is from the neutral temperature for every hour of the analysis."]
 }
 
 outputsDictPET = {
@@ -145,11 +149,11 @@ outputsDictPET = {
 5: ["PET_ComfMtx", "A python matrix containing PET comfort data for every hour of the analysis to be plugged into the 'Honeybee_Visualize Annual Comfort Results' component."],
 6: ["PET_CategoryMtx", "A python matrix containing the categories of PET. These are either: -4 = Very Cold, -3 = Cold, -2 = Cool, -1 = Slightly Cool, 0 = Comfortable, 1 = Slightly Warm, 2 = Warm, 3 = Hot, 4 = Very Hot"],
 7: ["===============", "..."],
-8: ["radTempResult", "A csv file address containing the radiant temperature resultsfor each point for every hour of the analysis."],
-9: ["airTempResult", "A csv file address containing the air temperature results for each point for every hour of the analysis."],
-10: ["PET_Result", "A csv file address containing physiological equivalent temperature (PET) results for each point for every hour of the analysis."],
-11: ["PETComfResult", "A csv file address containing the a series of 0's and 1's indicating whether a certain point is comfortable for every hour of the analysis."],
-12: ["PETCategoryResult", "A csv file address containing the categories of PET.   These are either: -4 = Very Cold, -3 = Cold, -2 = Cool, -1 = Slightly Cool, 0 = Comfortable, 1 = Slightly Warm, 2 = Warm, 3 = Hot, 4 = Very Hot"]
+8: ["radTempResult", "A result file address containing the radiant temperature resultsfor each point for every hour of the analysis."],
+9: ["airTempResult", "A result file address containing the air temperature results for each point for every hour of the analysis."],
+10: ["PET_Result", "A result file address containing physiological equivalent temperature (PET) results for each point for every hour of the analysis."],
+11: ["PETComfResult", "A result file address containing the a series of 0's and 1's indicating whether a certain point is comfortable for every hour of the analysis."],
+12: ["PETCategoryResult", "A result file address containing the categories of PET.   These are either: -4 = Very Cold, -3 = Cold, -2 = Cool, -1 = Slightly Cool, 0 = Comfortable, 1 = Slightly Warm, 2 = Warm, 3 = Hot, 4 = Very Hot"]
 }
 
 
@@ -282,60 +286,238 @@ def processPrevailOutdoorTemp(prevailingOutdoorTemp, avgMonthOrRunMean):
     return prevailTemp, coldTimes
 
 
-def calculatePointMRT(srfTempDict, testPtsViewFactor, hour, originalHour, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp):
-    #Calculate the MRT for each point.
-    pointMRTValues = []
-    for zoneCount, pointList in enumerate(testPtsViewFactor):
-        if outdoorClac == False or zoneCount != len(testPtsViewFactor)-1:
-            pointMRTValues.append([])
-            for pointViewFactor in pointList:
-                pointMRT = 0
-                for srfCount, srfView in enumerate(pointViewFactor):
-                    path  = str([zoneCount,srfCount])
-                    weightedSrfTemp = srfView*(math.pow((srfTempDict[path]["srfTemp"][hour] + 273.15),4))
-                    pointMRT = pointMRT+weightedSrfTemp
-                pointMRT = math.pow(pointMRT,0.25) - 273.15
-                pointMRTValues[zoneCount].append(round(pointMRT, 3))
-        else:
-            pointMRTValues.append([])
-            for ptCount, pointViewFactor in enumerate(pointList):
-                pointMRT = 0
-                for srfCount, srfView in enumerate(pointViewFactor):
-                    path  = str([zoneCount,srfCount])
-                    weightedSrfTemp = srfView*(math.pow((outSrfTempDict[path]["srfTemp"][hour]+273.15),4))
-                    pointMRT = pointMRT+weightedSrfTemp
-                
-                weightedSrfTemp = outdoorNonSrfViewFac[ptCount]*(math.pow((prevailingOutdoorTemp[originalHour]+273.15),4))
-                pointMRT = pointMRT+weightedSrfTemp
-                pointMRT = pointMRT / (sum(pointViewFactor) + outdoorNonSrfViewFac[ptCount])
-                pointMRT = math.pow(pointMRT,0.25) - 273.15
-                pointMRTValues[zoneCount].append(round(pointMRT, 3))
+def hourBlocks(numOfHours, numOfBlocks):
+    #Split the hours of the analysis into contiguous blocks of almost the same size.
+    numOfBlocks = max(1, min(numOfBlocks, numOfHours))
+    blockSize, remainder = divmod(numOfHours, numOfBlocks)
+    blocks = []
+    start = 0
+    for blockCount in range(numOfBlocks):
+        end = start + blockSize + (1 if blockCount < remainder else 0)
+        blocks.append((start, end))
+        start = end
+    return blocks
+
+def runHourlyLoop(climateMap, numOfHours, parallel = False, blocksPerCPU = 4):
+    #Run climateMap for every hour of the analysis.
+    #In parallel the hours are split into blocks that are picked up by the CPUs. The hours of each block are calculated in order by one thread and each hour only writes to its own row of the result matrices so the results don't depend on the number of CPUs.
+    def runBlock(block):
+        for count in range(block[0], block[1]): climateMap(count)
+    
+    if parallel == True and numOfHours != 1:
+        tasks.Parallel.ForEach(hourBlocks(numOfHours, System.Environment.ProcessorCount*blocksPerCPU), runBlock)
+    else:
+        runBlock((0, numOfHours))
+
+class MRTEngine(object):
+    """Calculate the radiant temperature of the test points from the surface temperatures.
+    
+    The view factors of each zone are used as a points x surfaces matrix and the fourth
+    power of the surface temperatures is calculated once for each surface and hour. The
+    radiant temperatures of all the points for a block of hours are the product of the
+    two matrices.
+    """
+    def __init__(self, srfTempDict, testPtsViewFactor, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp):
+        self.testPtsViewFactor = testPtsViewFactor
+        self.outdoorClac = outdoorClac
+        self.outdoorNonSrfViewFac = outdoorNonSrfViewFac
+        self.prevailingOutdoorTemp = prevailingOutdoorTemp
+        
+        #Collect the surface temperatures of each zone in the order of the view factors.
+        self.zoneSrfTemps = []
+        self.outdoorViewFacSums = []
+        for zoneCount, pointList in enumerate(testPtsViewFactor):
+            if self.isIndoorZone(zoneCount): srfDict = srfTempDict
+            else:
+                srfDict = outSrfTempDict
+                self.outdoorViewFacSums = [sum(pointViewFactor)+outdoorNonSrfViewFac[ptCount] for ptCount, pointViewFactor in enumerate(pointList)]
+            numOfSrfs = max([len(pointViewFactor) for pointViewFactor in pointList] + [0])
+            self.zoneSrfTemps.append([srfDict[str([zoneCount,srfCount])]["srfTemp"] for srfCount in range(numOfSrfs)])
+    
+    def isIndoorZone(self, zoneCount):
+        return self.outdoorClac == False or zoneCount != len(self.testPtsViewFactor)-1
+    
+    def srfTemp4(self, zoneCount, hours):
+        #Absolute surface temperatures to the power of 4 as a hours x surfaces matrix.
+        return [[math.pow((srfTemps[hour]+273.15),4) for srfTemps in self.zoneSrfTemps[zoneCount]] for hour in hours]
+    
+    def calculate(self, hours, originalHours):
+        #Calculate the MRT of each point for a list of hours. The result for each hour is a list of point values for each zone.
+        pointMRTValues = [[] for hour in hours]
+        for zoneCount, pointList in enumerate(self.testPtsViewFactor):
+            srfTemp4 = self.srfTemp4(zoneCount, hours)
+            if self.isIndoorZone(zoneCount):
+                for hourCount, hourSrfTemp4 in enumerate(srfTemp4):
+                    pointMRTValues[hourCount].append([round(math.pow(sum(itertools.imap(operator.mul, pointViewFactor, hourSrfTemp4)),0.25) - 273.15, 3) for pointViewFactor in pointList])
+            else:
+                for hourCount, hourSrfTemp4 in enumerate(srfTemp4):
+                    outdoorTemp4 = math.pow((self.prevailingOutdoorTemp[originalHours[hourCount]]+273.15),4)
+                    zoneMRTValues = []
+                    for ptCount, pointViewFactor in enumerate(pointList):
+                        pointMRT = sum(itertools.imap(operator.mul, pointViewFactor, hourSrfTemp4))
+                        pointMRT = pointMRT+self.outdoorNonSrfViewFac[ptCount]*outdoorTemp4
+                        pointMRT = pointMRT / self.outdoorViewFacSums[ptCount]
+                        zoneMRTValues.append(round(math.pow(pointMRT,0.25) - 273.15, 3))
+                    pointMRTValues[hourCount].append(zoneMRTValues)
+        
+        return pointMRTValues
     
-    return pointMRTValues
+    def pointMRT(self, hour, originalHour):
+        #Calculate the MRT for each point.
+        return self.calculate([hour], [originalHour])[0]
 
-def computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac):
-    #Build a new testPtBlockedVec that checks with the window transmissivity status.
-    newTestPtBlockedVec = []
-    newTestPtSkyView = []
-    for zoneCount, zone in enumerate(testPtBlockedVec):
-        newTestPtBlockedVec.append([])
-        newTestPtSkyView.append([])
-        for ptCount, vecList in enumerate(zone):
-            newVecList = []
-            for vecCount, transmiss in enumerate(vecList):
-                if transmiss == 0: newVecList.append(transmiss)
-                else:
-                    newTransmissWinList = testPtBlockName[zoneCount][ptCount][vecCount]
+class ComfortKernel(object):
+    """Evaluate the Ladybug comfort models for all the points of an hour at once.
+    
+    Each method takes lists of point values for an hour (or any slice of the points x hours
+    matrix) and returns lists of results. The values that are the same for every point of
+    the hour are passed once instead of being looked up for each point.
+    """
+    
+    def __init__(self, lb_comfortModels):
+        self.lb_comfortModels = lb_comfortModels
+    
+    def evaluate(self, comfFunction, inputs):
+        #Run the comfort function for each tuple of inputs.
+        return [comfFunction(*args) for args in inputs]
+    
+    def adaptive(self, airTemps, radTemps, windSpeeds, prevailTemp, ASHRAEorEN, comfClass, levelOfConditioning):
+        #Returns the comfort (0 or 1) and the degrees from target for each point.
+        if ASHRAEorEN == True: comfModel = self.lb_comfortModels.comfAdaptiveComfortASH55
+        else: comfModel = self.lb_comfortModels.comfAdaptiveComfortEN15251
+        
+        def adaptComf(airTemp, radTemp, windSpeed):
+            comfTemp, distFromTarget, lowTemp, upTemp, comf, condition = comfModel(airTemp, radTemp, prevailTemp, windSpeed, comfClass, levelOfConditioning)
+            return int(comf), distFromTarget
+        
+        results = self.evaluate(adaptComf, itertools.izip(airTemps, radTemps, windSpeeds))
+        return [result[0] for result in results], [result[1] for result in results]
+    
+    def pmv(self, airTemps, radTemps, windSpeeds, relHumids, metabolicRate, clothingLevel, PPDComfortThresh, humidRatioUp, humidRatioLow):
+        #Returns the SET, comfort (0 or 1) and PMV for each point.
+        lb_comfortModels = self.lb_comfortModels
+        checkHumidRatio = humidRatioUp != 0.03 or humidRatioLow != 0.0
+        
+        def pmvComf(airTemp, radTemp, windSpeed, relHumid):
+            try:
+                pmv, ppd, set, taAdj, coolingEffect = lb_comfortModels.comfPMVElevatedAirspeed(airTemp, radTemp, windSpeed, relHumid, metabolicRate, clothingLevel, 0.0)
+            except:
+                print 'These conditions caused a failure of the PMV model convergence: Ta = ' + str(airTemp) + "; Tr = " + str(radTemp) + "; Vel = " + str(windSpeed) + "; RH = " + str(relHumid) + "; met = " + str(metabolicRate) + "; clo= " + str(clothingLevel)
+                pmv, ppd, set, taAdj, coolingEffect = 0.0, 5.0, 21.0, 0.0, 0.0
+            
+            if checkHumidRatio:
+                HR, EN, vapPress, satPress = lb_comfortModels.calcHumidRatio(airTemp, relHumid, 101325)
+                comf = int(ppd < PPDComfortThresh and HR < humidRatioUp and HR > humidRatioLow)
+            else:
+                comf = int(ppd < PPDComfortThresh)
+            return set, comf, pmv
+        
+        results = self.evaluate(pmvComf, itertools.izip(airTemps, radTemps, windSpeeds, relHumids))
+        return [result[0] for result in results], [result[1] for result in results], [result[2] for result in results]
+    
+    def utci(self, airTemps, radTemps, windSpeeds, relHumids):
+        #Returns the UTCI, comfort and degrees from neutral for each point.
+        comfUTCI = self.lb_comfortModels.comfUTCI
+        
+        def utciComf(airTemp, radTemp, windSpeed, relHumid):
+            utci, comf, condition, stressVal = comfUTCI(airTemp, radTemp, windSpeed, relHumid)
+            return utci, comf, utci-20
+        
+        results = self.evaluate(utciComf, itertools.izip(airTemps, radTemps, windSpeeds, relHumids))
+        return [result[0] for result in results], [result[1] for result in results], [result[2] for result in results]
+    
+    def pet(self, airTemps, radTemps, relHumids, windSpeeds, bodyCharacteristics, clothingLevel, climate):
+        #Returns the PET, comfort and PET category for each point.
+        lb_comfortModels = self.lb_comfortModels
+        
+        def petComf(airTemp, radTemp, relHumid, windSpeed):
+            petObj = lb_comfortModels.physiologicalEquivalentTemperature(airTemp, radTemp, relHumid, windSpeed, bodyCharacteristics['age'], bodyCharacteristics['sex'], bodyCharacteristics['heightM'], bodyCharacteristics['weight'], bodyCharacteristics['bodyPosition'], bodyCharacteristics['Mmets'], clothingLevel)
+            respiration = petObj.inkoerp()
+            coreTemperature, radiationBalance, convection, waterVaporDiffusion = petObj.berech()
+            petObj.pet()
+            effectPET, comfortablePET = petObj.thermalCategories(climate)
+            return petObj.tx, comfortablePET, effectPET
+        
+        results = self.evaluate(petComf, itertools.izip(airTemps, radTemps, relHumids, windSpeeds))
+        return [result[0] for result in results], [result[1] for result in results], [result[2] for result in results]
+
+class SolarMRTLookup(object):
+    """Sky patch visibility of the test points for the solar-adjusted MRT.
+    
+    The sky patch of the sun is found once for every hour of the analysis and the
+    visible sky patches of each point are kept as a sparse list of (patch, transmissivity).
+    The sky view and the sun transmissivity of the points are calculated once for each
+    sun patch and state of the window shades and are reused for the other hours.
+    """
+    maxCacheSize = 200
+    
+    def __init__(self, testPtSkyView, testPtBlockedVec, skyPatchMeshes, sunVecs, winShdDict = None, testPtBlockName = None):
+        self.testPtSkyView = testPtSkyView
+        self.testPtBlockedVec = testPtBlockedVec
+        self.winShdDict = winShdDict
+        self.testPtBlockName = testPtBlockName
+        if winShdDict != None: self.windowNames = sorted(winShdDict.keys())
+        
+        self.sunPatches = [self.findSunPatch(sunVec, skyPatchMeshes) for sunVec in sunVecs]
+        self.visiblePatches = []
+        for zone in testPtBlockedVec:
+            self.visiblePatches.append([[(vecCount, transmiss) for vecCount, transmiss in enumerate(vecList) if transmiss != 0] for vecList in zone])
+        
+        self.cache = {}
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def findSunPatch(sunVec, skyPatchMeshes):
+        #Assign the sun vector to a sky patch that aligns with the testPtBlockedVec list.
+        if sunVec == None: return None
+        ray = rc.Geometry.Ray3d(rc.Geometry.Point3d.Origin, sunVec)
+        for patchCount, patch in enumerate(skyPatchMeshes):
+            if rc.Geometry.Intersect.Intersection.MeshRay(patch, ray) >= 0: return patchCount
+        return None
+    
+    def hourVisibility(self, count, hour):
+        #Return the sky view and the sun transmissivity of each point for an hour of the analysis.
+        #The sun transmissivity is None if the sun is not in any of the sky patches.
+        sunPatch = self.sunPatches[count]
+        if self.winShdDict != None: key = (sunPatch,) + tuple(self.winShdDict[window][hour-1] for window in self.windowNames)
+        else: key = (sunPatch,)
+        
+        try: return self.cache[key]
+        except KeyError: pass
+        
+        if self.winShdDict != None: result = self.shadedVisibility(sunPatch, hour)
+        elif sunPatch == None: result = self.testPtSkyView, None
+        else: result = self.testPtSkyView, [[vecList[sunPatch] for vecList in zone] for zone in self.testPtBlockedVec]
+        
+        with self.lock:
+            if len(self.cache) >= self.maxCacheSize: self.cache.clear()
+            self.cache[key] = result
+        return result
+    
+    def shadedVisibility(self, sunPatch, hour):
+        #Factor in the transmissivity of the window shades for the given hour.
+        newTestPtSkyView = []
+        sunTransmiss = []
+        for zoneCount, zone in enumerate(self.visiblePatches):
+            newTestPtSkyView.append([])
+            sunTransmiss.append([])
+            for ptCount, visiblePatches in enumerate(zone):
+                transFactors = []
+                ptSunTransmiss = 0
+                for vecCount, transmiss in visiblePatches:
+                    newTransmissWinList = self.testPtBlockName[zoneCount][ptCount][vecCount]
                     transFactor = 1
                     try:
                         for window in newTransmissWinList:
-                            transFactor = transFactor * winShdDict[window][hour-1]
+                            transFactor = transFactor * self.winShdDict[window][hour-1]
                     except: pass
-                    newVecList.append(transFactor)
-            newTestPtBlockedVec[zoneCount].append(newVecList)
-            newTestPtSkyView[zoneCount].append(sum(newVecList)/len(newVecList))
-    
-    return newTestPtSkyView, newTestPtBlockedVec
+                    transFactors.append(transFactor)
+                    if vecCount == sunPatch: ptSunTransmiss = transFactor
+                newTestPtSkyView[zoneCount].append(sum(transFactors)/len(self.testPtBlockedVec[zoneCount][ptCount]))
+                sunTransmiss[zoneCount].append(ptSunTransmiss)
+        
+        if sunPatch == None: sunTransmiss = None
+        return newTestPtSkyView, sunTransmiss
 
 def computeSkyTemp(La):
     # formula by Man-ENvironment heat EXchange model (MENEX_2005)
@@ -343,27 +525,12 @@ def computeSkyTemp(La):
     
     return skyTemp
 
-def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, diffSolarRad, directSolarRad, globHorizRadList, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels):
+def calculateSolarAdjustedMRT(pointMRTValues, originalHour, diffSolarRad, directSolarRad, globHorizRadList, count, sunVecInfo, testPtSkyView, sunTransmiss, winTrans, cloA, floorR, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels):
     #Pull out the correct sun vector.
     sunVec = sunVecInfo[0][count]
     altitude = sunVecInfo[1][count]
     azimuth = sunVecInfo[2][count]
     
-    #Assign the sun vector to a sky patch that aligns with the testPtBlockedVec list.
-    vectorskyPatches = []
-    
-    if sunVec != None:
-        intersected = False
-        ray = rc.Geometry.Ray3d(rc.Geometry.Point3d.Origin, sunVec)
-        for patchCount, patch in enumerate(skyPatchMeshes):
-            if rc.Geometry.Intersect.Intersection.MeshRay(patch, ray) >= 0:
-                vectorskyPatches.append(patchCount)
-                intersected = True
-        if intersected == False:
-            vectorskyPatches.append(None)
-    else:
-        vectorskyPatches.append(None)
-    
     
     ##Calculate the diffuse, direct, and global horizontal components of the solar radiation at the hour.
     diffRad = diffSolarRad[originalHour-1]
@@ -404,8 +571,8 @@ def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, di
                 solarAdjustedPointMRTValues.append([])
                 for pointCount, pointMRT in enumerate(zonePtsList):
                     #Check if the sunray is blocked.
-                    if vectorskyPatches[0] != None:
-                        if testPtBlockedVec[zoneCount][pointCount][vectorskyPatches[0]] == 0: sunBlocked = True
+                    if sunTransmiss != None:
+                        if sunTransmiss[zoneCount][pointCount] == 0: sunBlocked = True
                         else: sunBlocked = False
                     else: sunBlocked = True
                     
@@ -415,7 +582,7 @@ def calculateSolarAdjustedMRT(pointMRTValues, stepOfSimulation, originalHour, di
                         dirRadFinal = 0.0
                         globHorizRadFinal = diffRad
                     else:
-                        dirRadFinal = dirNormRad*(testPtBlockedVec[zoneCount][pointCount][vectorskyPatches[0]])
+                        dirRadFinal = dirNormRad*(sunTransmiss[zoneCount][pointCount])
                         globHorizRadFinal = globHorizRad
                     
                     if outdoorClac == False or zoneCount != len(pointMRTValues)-1:
@@ -852,6 +1019,10 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
             sunVecInfo = [sunVecs, altitudes, azimuths]
+            
+            #Precompute the sun patches of the hours and the visible sky patches of the points.
+            if allWindowShadesSame == True: solarLookup = SolarMRTLookup(testPtSkyView, testPtBlockedVec, skyPatchMeshes, sunVecs)
+            else: solarLookup = SolarMRTLookup(testPtSkyView, testPtBlockedVec, skyPatchMeshes, sunVecs, winShdDict, testPtBlockName)
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -870,6 +1041,9 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
         #Run through every hour of the analysis to fill up the matrices.
         calcCancelled = False
         try:
+            comfortKernel = ComfortKernel(lb_comfortModels)
+            mrtEngine = MRTEngine(srfTempDict, testPtsViewFactor, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp)
+            
             def climateMap(count):
                 #Ability to cancel with Esc
                 if gh.GH_Document.IsEscapeKeyDown(): assert False
@@ -885,13 +1059,13 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, prevailingOutdoorTemp)
+                pointMRTValues = mrtEngine.pointMRT(hour-1, originalHour-1)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
-                    else:
-                        #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
-                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
+                    #Get the sky view and the sun transmissivity of the points for the sun position and the window shades of the hour.
+                    hourTestPtSkyView, hourSunTransmiss = solarLookup.hourVisibility(count, hour)
+                    if allWindowShadesSame == True: hourWinTrans = winTrans
+                    else: hourWinTrans = neutralWinTransList
+                    pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourSunTransmiss, hourWinTrans, cloA, floorR, zoneHasWindows, outdoorClac, outHorizInfrared, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
                 radTempMtx[count+1] = pointMRTValues
                 
@@ -930,26 +1104,13 @@ def mainAdapt(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataN
                                 pointWindSpeedValues.append(windFlowVal)
                 
                 #Compute the adaptive comfort and deg from target.
-                adaptComfPointValues = []
-                degFromTargetPointValues = []
-                
-                for ptCount, airTemp in enumerate(pointAirTempValues):
-                    if ASHRAEorEN == True: comfTemp, distFromTarget, lowTemp, upTemp, comf, condition = lb_comfortModels.comfAdaptiveComfortASH55(airTemp, pointMRTValues[ptCount], prevailTemp[originalHour-1], pointWindSpeedValues[ptCount], comfClass, levelOfConditioning)
-                    else: comfTemp, distFromTarget, lowTemp, upTemp, comf, condition = lb_comfortModels.comfAdaptiveComfortEN15251(airTemp, pointMRTValues[ptCount], prevailTemp[originalHour-1], pointWindSpeedValues[ptCount], comfClass, levelOfConditioning)
-                    adaptComfPointValues.append(int(comf))
-                    degFromTargetPointValues.append(distFromTarget)
+                adaptComfPointValues, degFromTargetPointValues = comfortKernel.adaptive(pointAirTempValues, pointMRTValues, pointWindSpeedValues, prevailTemp[originalHour-1], ASHRAEorEN, comfClass, levelOfConditioning)
                 
                 adaptComfMtx[count+1] = adaptComfPointValues
                 degFromTargetMtx[count+1] = degFromTargetPointValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMap)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    #if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMap(hour)
+            runHourlyLoop(climateMap, len(HOYs), parallel_ == True)
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
@@ -1047,6 +1208,10 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
             sunVecInfo = [sunVecs, altitudes, azimuths]
+            
+            #Precompute the sun patches of the hours and the visible sky patches of the points.
+            if allWindowShadesSame == True: solarLookup = SolarMRTLookup(testPtSkyView, testPtBlockedVec, skyPatchMeshes, sunVecs)
+            else: solarLookup = SolarMRTLookup(testPtSkyView, testPtBlockedVec, skyPatchMeshes, sunVecs, winShdDict, testPtBlockName)
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -1066,6 +1231,9 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
         #Run through every hour of the analysis to fill up the matrices.
         calcCancelled = False
         try:
+            comfortKernel = ComfortKernel(lb_comfortModels)
+            mrtEngine = MRTEngine(srfTempDict, testPtsViewFactor, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+            
             def climateMapPMV(count):
                 #Ability to cancel with Esc
                 if gh.GH_Document.IsEscapeKeyDown(): assert False
@@ -1081,13 +1249,13 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = mrtEngine.pointMRT(hour-1, originalHour-1)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
-                    else:
-                        #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
-                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                    #Get the sky view and the sun transmissivity of the points for the sun position and the window shades of the hour.
+                    hourTestPtSkyView, hourSunTransmiss = solarLookup.hourVisibility(count, hour)
+                    if allWindowShadesSame == True: hourWinTrans = winTrans
+                    else: hourWinTrans = neutralWinTransList
+                    pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourSunTransmiss, hourWinTrans, cloA, floorR, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
                 radTempMtx[count+1] = pointMRTValues
                 
@@ -1124,39 +1292,14 @@ def mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                                 pointWindSpeedValues.append(windFlowVal)
                 
                 #Compute the SET and PMV comfort.
-                setPointValues = []
-                pmvComfPointValues = []
-                pmvPointValues = []
-                
-                for ptCount, airTemp in enumerate(pointAirTempValues):
-                    try:
-                        pmv, ppd, set, taAdj, coolingEffect = lb_comfortModels.comfPMVElevatedAirspeed(airTemp, pointMRTValues[ptCount], pointWindSpeedValues[ptCount], pointRelHumidValues[ptCount], metabolicRate[originalHour-1], clothingLevel[originalHour-1], 0.0)
-                    except:
-                        print 'These conditions caused a failure of the PMV model convergence: Ta = ' + str(airTemp) + "; Tr = " + str(pointMRTValues[ptCount]) + "; Vel = " + str(pointWindSpeedValues[ptCount]) + "; RH = " + str(pointRelHumidValues[ptCount]) + "; met = " + str(metabolicRate[originalHour-1]) + "; clo= " + str(clothingLevel[originalHour-1])
-                        pmv, ppd, set, taAdj, coolingEffect = 0.0, 5.0, 21.0, 0.0, 0.0
-                    
-                    setPointValues.append(set)
-                    if humidRatioUp != 0.03 or humidRatioLow != 0.0:
-                        HR, EN, vapPress, satPress = lb_comfortModels.calcHumidRatio(airTemp, pointRelHumidValues[ptCount], 101325)
-                        if ppd < PPDComfortThresh and HR < humidRatioUp and HR > humidRatioLow: comfortableOrNot.append(1)
-                        else: comfortableOrNot.append(0)
-                    else:
-                        if ppd < PPDComfortThresh: pmvComfPointValues.append(1)
-                        else: pmvComfPointValues.append(0)
-                    pmvPointValues.append(pmv)
+                setPointValues, pmvComfPointValues, pmvPointValues = comfortKernel.pmv(pointAirTempValues, pointMRTValues, pointWindSpeedValues, pointRelHumidValues, metabolicRate[originalHour-1], clothingLevel[originalHour-1], PPDComfortThresh, humidRatioUp, humidRatioLow)
                 
                 SET_Mtx[count+1] = setPointValues
                 PMVComfMtx[count+1] = pmvComfPointValues
                 PMV_Mtx[count+1] = pmvPointValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMapPMV)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMapPMV(hour)
+            runHourlyLoop(climateMapPMV, len(HOYs), parallel_ == True)
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
@@ -1254,6 +1397,10 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
             sunVecInfo = [sunVecs, altitudes, azimuths]
+            
+            #Precompute the sun patches of the hours and the visible sky patches of the points.
+            if allWindowShadesSame == True: solarLookup = SolarMRTLookup(testPtSkyView, testPtBlockedVec, skyPatchMeshes, sunVecs)
+            else: solarLookup = SolarMRTLookup(testPtSkyView, testPtBlockedVec, skyPatchMeshes, sunVecs, winShdDict, testPtBlockName)
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         try: airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -1275,6 +1422,9 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
         #Run through every hour of the analysis to fill up the matrices.
         calcCancelled = False
         try:
+            comfortKernel = ComfortKernel(lb_comfortModels)
+            mrtEngine = MRTEngine(srfTempDict, testPtsViewFactor, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+            
             def climateMapUTCI(count):
                 #Ability to cancel with Esc
                 if gh.GH_Document.IsEscapeKeyDown(): assert False
@@ -1290,13 +1440,13 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = mrtEngine.pointMRT(hour-1, originalHour-1)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
-                    else:
-                        #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
-                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                    #Get the sky view and the sun transmissivity of the points for the sun position and the window shades of the hour.
+                    hourTestPtSkyView, hourSunTransmiss = solarLookup.hourVisibility(count, hour)
+                    if allWindowShadesSame == True: hourWinTrans = winTrans
+                    else: hourWinTrans = neutralWinTransList
+                    pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourSunTransmiss, hourWinTrans, cloA, floorR, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
                 radTempMtx[count+1] = pointMRTValues
                 
@@ -1340,28 +1490,14 @@ def mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNu
                 pointWindSpeedValues = [x * 1.5 for x in pointWindSpeedValues]
                 
                 #Compute the UTCI and comfort.
-                utciPointValues = []
-                outdoorComfPointValues = []
-                degNeutralPointValues = []
-                
-                for ptCount, airTemp in enumerate(pointAirTempValues):
-                    utci, comf, condition, stressVal = lb_comfortModels.comfUTCI(airTemp, pointMRTValues[ptCount], pointWindSpeedValues[ptCount], pointRelHumidValues[ptCount])
-                    utciPointValues.append(utci)
-                    outdoorComfPointValues.append(comf)
-                    degNeutralPointValues.append(utci-20)
+                utciPointValues, outdoorComfPointValues, degNeutralPointValues = comfortKernel.utci(pointAirTempValues, pointMRTValues, pointWindSpeedValues, pointRelHumidValues)
                 
                 UTCI_Mtx[count+1] = utciPointValues
                 OutdoorComfMtx[count+1] = outdoorComfPointValues
                 DegFromNeutralMtx[count+1] = degNeutralPointValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMapUTCI)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMapUTCI(hour)
+            runHourlyLoop(climateMapUTCI, len(HOYs), parallel_ == True)
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
@@ -1459,6 +1595,10 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 altitudes.append(altitude)
                 azimuths.append(azimuth)
             sunVecInfo = [sunVecs, altitudes, azimuths]
+            
+            #Precompute the sun patches of the hours and the visible sky patches of the points.
+            if allWindowShadesSame == True: solarLookup = SolarMRTLookup(testPtSkyView, testPtBlockedVec, skyPatchMeshes, sunVecs)
+            else: solarLookup = SolarMRTLookup(testPtSkyView, testPtBlockedVec, skyPatchMeshes, sunVecs, winShdDict, testPtBlockName)
         
         #Make a dictionary that will relate the testPtZoneNames to the air temperatures.
         try: airTempDict = createZoneDict(testPtZoneNames, "zoneName", "airTemp", airTempDataHeaders, airTempDataNumbers)
@@ -1480,6 +1620,9 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
         #Run through every hour of the analysis to fill up the matrices.
         calcCancelled = False
         try:
+            comfortKernel = ComfortKernel(lb_comfortModels)
+            mrtEngine = MRTEngine(srfTempDict, testPtsViewFactor, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+            
             def climateMapPET(count):
                 #Ability to cancel with Esc
                 if gh.GH_Document.IsEscapeKeyDown(): assert False
@@ -1495,13 +1638,13 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                 for zoneVal in heatGainDataNumbers: heatGainValues.append(zoneVal[hour-1])
                 
                 #Compute the radiant temperature.
-                pointMRTValues = calculatePointMRT(srfTempDict, testPtsViewFactor, hour-1, originalHour-1, outdoorClac, outSrfTempDict, outdoorNonSrfViewFac, outDryBulbTemp)
+                pointMRTValues = mrtEngine.pointMRT(hour-1, originalHour-1)
                 if sum(zoneHasWindows) != 0:
-                    if allWindowShadesSame == True: pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, testPtSkyView, testPtBlockedVec, winTrans, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
-                    else:
-                        #To factor in the effect of blocked sunlight, I have to re-make the testPtSkyView and the testPtBlockedVec to reflect the conditions for the given hour.
-                        hourTestPtSkyView, hourTestPtBlockedVec = computeHourShadeDrawing(hour, testPtSkyView, testPtBlockedVec, winShdDict, testPtBlockName, outdoorClac)
-                        pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, hour, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourTestPtBlockedVec, neutralWinTransList, cloA, floorR, skyPatchMeshes, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
+                    #Get the sky view and the sun transmissivity of the points for the sun position and the window shades of the hour.
+                    hourTestPtSkyView, hourSunTransmiss = solarLookup.hourVisibility(count, hour)
+                    if allWindowShadesSame == True: hourWinTrans = winTrans
+                    else: hourWinTrans = neutralWinTransList
+                    pointMRTValues = calculateSolarAdjustedMRT(pointMRTValues, originalHour, diffSolarRad, directSolarRad, globHorizRad, count, sunVecInfo, hourTestPtSkyView, hourSunTransmiss, hourWinTrans, cloA, floorR, zoneHasWindows, outdoorClac, horizInfraredRadiation, lb_comfortModels)
                 pointMRTValues = lb_preparation.flattenList(pointMRTValues)
                 radTempMtx[count+1] = pointMRTValues
                 
@@ -1537,35 +1680,15 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
                                 windFlowVal = lb_wind.powerLawWind(outWindSpeed[originalHour-1], outdoorPtHeightWeights[valCount], d, a, 270, 0.14)
                                 pointWindSpeedValues.append(windFlowVal)
                 
-                #Compute the UTCI and comfort.
-                petPointValues = []
-                petComfPointValues = []
-                petCategoryValues = []
-                
-                for ptCount, airTemp in enumerate(pointAirTempValues):
-                    petObj = lb_comfortModels.physiologicalEquivalentTemperature(airTemp, pointMRTValues[ptCount], pointRelHumidValues[ptCount], pointWindSpeedValues[ptCount], bodyCharacteristics['age'], bodyCharacteristics['sex'], bodyCharacteristics['heightM'], bodyCharacteristics['weight'], bodyCharacteristics['bodyPosition'], bodyCharacteristics['Mmets'], bodyCharacteristics['Icl'][originalHour])
-                    respiration = petObj.inkoerp()
-                    coreTemperature, radiationBalance, convection, waterVaporDiffusion = petObj.berech()
-                    petObj.pet()
-                    skinTemperature, totalHeatLoss, skinSweating, internalHeat, sweatEvaporation, PET = petObj.tsk, petObj.wsum, petObj.wetsk, petObj.h, petObj.esw, petObj.tx
-                    effectPET, comfortablePET = petObj.thermalCategories(climate)
-                    
-                    petPointValues.append(PET)
-                    petComfPointValues.append(comfortablePET)
-                    petCategoryValues.append(effectPET)
+                #Compute the PET and comfort.
+                petPointValues, petComfPointValues, petCategoryValues = comfortKernel.pet(pointAirTempValues, pointMRTValues, pointRelHumidValues, pointWindSpeedValues, bodyCharacteristics, bodyCharacteristics['Icl'][originalHour], climate)
                 
                 PET_Mtx[count+1] = petPointValues
                 PET_ComfMtx[count+1] = petComfPointValues
                 PET_CategoryMtx[count+1] = petCategoryValues
             
             #Run through every hour of the analysis to fill up the matrices.
-            if parallel_ == True and len(HOYs) != 1:
-                tasks.Parallel.ForEach(range(len(HOYs)), climateMapPET)
-            else:
-                for hour in range(len(HOYs)):
-                    #Ability to cancel with Esc
-                    if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    climateMapPET(hour)
+            runHourlyLoop(climateMapPET, len(HOYs), parallel_ == True)
         except:
             print "The calculation has been terminated by the user!"
             e = gh.GH_RuntimeMessageLevel.Warning
@@ -1579,386 +1702,50 @@ def mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNum
             return -1
 
 
-def writeCSVAdapt(lb_preparation, directory, fileName, radTempMtx, airTempMtx, operativeTempMtx, adaptComfMtx, degFromTargetMtx):
-    #Find out the number of values in each hour.
-    valLen = len(radTempMtx[-1])-1
-    
-    #Set up a working directory.
-    workingDir = lb_preparation.makeWorkingDir(os.path.join(directory)) 
-    
-    #Create a csv Files.
-    radTempFile = fileName + "RadiantTemp.csv"
-    airTempFile = fileName + "AirTemp.csv"
-    opTempFile = fileName + "OperativeTemp.csv"
-    adaptComfFile = fileName + "AdaptComf.csv"
-    degFromTargetFile = fileName + "DegFromTarget.csv"
-    
-    #Write the radiant temperature result file.
-    if writeResultFile_ != 2:
-        radTempResult = os.path.join(workingDir, radTempFile)
-        radCSVfile = open(radTempResult, 'wb')
-        for lineCount, line in enumerate(radTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                radCSVfile.write(lineStr)
-            else: radCSVfile.write(line + "\n")
-        radCSVfile.close()
-    else:
-        radTempResult = None
-    
-    #Write the air temperature result file.
-    if writeResultFile_ != 2:
-        airTempResult = os.path.join(workingDir, airTempFile)
-        airCSVfile = open(airTempResult, 'wb')
-        for lineCount, line in enumerate(airTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                airCSVfile.write(lineStr)
-            else: airCSVfile.write(line + "\n")
-        airCSVfile.close()
-    else:
-        airTempResult = None
-    
-    #Write the operative temperature result file.
-    if writeResultFile_ != 2:
-        operativeTempResult = os.path.join(workingDir, opTempFile)
-        opCSVfile = open(operativeTempResult, 'wb')
-        for lineCount, line in enumerate(operativeTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                opCSVfile.write(lineStr)
-            else: opCSVfile.write(line + "\n")
-        opCSVfile.close()
-    else:
-        operativeTempResult = None
-    
-    #Write the adaptive comfort result file.
-    adaptComfResult = os.path.join(workingDir, adaptComfFile)
-    comfCSVfile = open(adaptComfResult, 'wb')
-    for lineCount, line in enumerate(adaptComfMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            comfCSVfile.write(lineStr)
-        else: comfCSVfile.write(line + "\n")
-    comfCSVfile.close()
-    
-    #Write the deg from target result file.
-    degFromTargetResult = os.path.join(workingDir, degFromTargetFile)
-    degCSVfile = open(degFromTargetResult, 'wb')
-    for lineCount, line in enumerate(degFromTargetMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            degCSVfile.write(lineStr)
-        else: degCSVfile.write(line + "\n")
-    degCSVfile.close()
-    
-    
-    return radTempResult, airTempResult, operativeTempResult, adaptComfResult, degFromTargetResult
-
-
-def writeCSVPMV(lb_preparation, directory, fileName, radTempMtx, airTempMtx, SET_Mtx, PMVComfMtx, PMV_Mtx):
-    #Find out the number of values in each hour.
-    valLen = len(radTempMtx[-1])-1
-    
-    #Set up a working directory.
-    workingDir = lb_preparation.makeWorkingDir(os.path.join(directory)) 
-    
-    #Create a csv Files.
-    radTempFile = fileName + "RadiantTemp.csv"
-    airTempFile = fileName + "AirTemp.csv"
-    SETFile = fileName + "SET.csv"
-    PPDFile = fileName + "PPD.csv"
-    PMVFile = fileName + "PMV.csv"
-    
-    #Write the radiant temperature result file.
-    if writeResultFile_ != 2:
-        radTempResult = os.path.join(workingDir, radTempFile)
-        radCSVfile = open(radTempResult, 'wb')
-        for lineCount, line in enumerate(radTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                radCSVfile.write(lineStr)
-            else: radCSVfile.write(line + "\n")
-        radCSVfile.close()
-    else:
-        radTempResult = None
-    
-    #Write the air temperature result file.
-    if writeResultFile_ != 2:
-        airTempResult = os.path.join(workingDir, airTempFile)
-        airCSVfile = open(airTempResult, 'wb')
-        for lineCount, line in enumerate(airTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                airCSVfile.write(lineStr)
-            else: airCSVfile.write(line + "\n")
-        airCSVfile.close()
-    else:
-        airTempResult = None
-    
-    #Write the operative temperature result file.
-    if writeResultFile_ != 2:
-        SET_Result = os.path.join(workingDir, SETFile)
-        opCSVfile = open(SET_Result, 'wb')
-        for lineCount, line in enumerate(SET_Mtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                opCSVfile.write(lineStr)
-            else: opCSVfile.write(line + "\n")
-        opCSVfile.close()
-    else:
-        SET_Result = None
-    
-    #Write the adaptive comfort result file.
-    PPD_Result = os.path.join(workingDir, PPDFile)
-    comfCSVfile = open(PPD_Result, 'wb')
-    for lineCount, line in enumerate(PMVComfMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            comfCSVfile.write(lineStr)
-        else: comfCSVfile.write(line + "\n")
-    comfCSVfile.close()
-    
-    #Write the deg from target result file.
-    PMV_Result = os.path.join(workingDir, PMVFile)
-    degCSVfile = open(PMV_Result, 'wb')
-    for lineCount, line in enumerate(PMV_Mtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            degCSVfile.write(lineStr)
-        else: degCSVfile.write(line + "\n")
-    degCSVfile.close()
-    
-    
-    return radTempResult, airTempResult, SET_Result, PPD_Result, PMV_Result
-
-def writeCSVUTCI(lb_preparation, directory, fileName, radTempMtx, airTempMtx, UTCI_Mtx, OutdoorComfMtx, DegFromNeutralMtx):
-    #Find out the number of values in each hour.
-    valLen = len(radTempMtx[-1])-1
-    
+def writeResultFiles(hb_comfortMatrix, lb_preparation, directory, fileName, fileTypes, matrices):
     #Set up a working directory.
     workingDir = lb_preparation.makeWorkingDir(os.path.join(directory)) 
     
-    #Create a csv Files.
-    radTempFile = fileName + "RadiantTemp.csv"
-    airTempFile = fileName + "AirTemp.csv"
-    UTCIFile = fileName + "UTCI.csv"
-    OutdoorComfFile = fileName + "OutdoorComf.csv"
-    DegFromNeutralFile = fileName + "DegFromTarget.csv"
-    
-    #Write the radiant temperature result file.
-    if writeResultFile_ != 2:
-        radTempResult = os.path.join(workingDir, radTempFile)
-        radCSVfile = open(radTempResult, 'wb')
-        for lineCount, line in enumerate(radTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                radCSVfile.write(lineStr)
-            else: radCSVfile.write(line + "\n")
-        radCSVfile.close()
-    else:
-        radTempResult = None
-    
-    #Write the air temperature result file.
-    if writeResultFile_ != 2:
-        airTempResult = os.path.join(workingDir, airTempFile)
-        airCSVfile = open(airTempResult, 'wb')
-        for lineCount, line in enumerate(airTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                airCSVfile.write(lineStr)
-            else: airCSVfile.write(line + "\n")
-        airCSVfile.close()
-    else:
-        airTempResult = None
-    
-    #Write the operative temperature result file.
-    if writeResultFile_ != 2:
-        UTCI_Result = os.path.join(workingDir, UTCIFile)
-        opCSVfile = open(UTCI_Result, 'wb')
-        for lineCount, line in enumerate(UTCI_Mtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                opCSVfile.write(lineStr)
-            else: opCSVfile.write(line + "\n")
-        opCSVfile.close()
-    else:
-        UTCI_Result = None
-    
-    #Write the adaptive comfort result file.
-    OutdoorComfResult = os.path.join(workingDir, OutdoorComfFile)
-    comfCSVfile = open(OutdoorComfResult, 'wb')
-    for lineCount, line in enumerate(OutdoorComfMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            comfCSVfile.write(lineStr)
-        else: comfCSVfile.write(line + "\n")
-    comfCSVfile.close()
-    
-    #Write the deg from target result file.
-    DegFromNeutralResult = os.path.join(workingDir, DegFromNeutralFile)
-    degCSVfile = open(DegFromNeutralResult, 'wb')
-    for lineCount, line in enumerate(DegFromNeutralMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            degCSVfile.write(lineStr)
-        else: degCSVfile.write(line + "\n")
-    degCSVfile.close()
-    
-    
-    return radTempResult, airTempResult, UTCI_Result, OutdoorComfResult, DegFromNeutralResult
-
-def writeCSVPET(lb_preparation, directory, fileName, radTempMtx, airTempMtx, PET_Mtx, PETComfMtx, PETCategoryMtx):
-    #Find out the number of values in each hour.
-    valLen = len(radTempMtx[-1])-1
-    
-    #Set up a working directory.
-    workingDir = lb_preparation.makeWorkingDir(os.path.join(directory)) 
-    
-    #Create a csv Files.
-    radTempFile = fileName + "RadiantTemp.csv"
-    airTempFile = fileName + "AirTemp.csv"
-    PETFile = fileName + "PET.csv"
-    PETComfFile = fileName + "PETComf.csv"
-    PETCategoryFile = fileName + "PETCategory.csv"
-    
-    #Write the radiant temperature result file.
-    if writeResultFile_ != 2:
-        radTempResult = os.path.join(workingDir, radTempFile)
-        radCSVfile = open(radTempResult, 'wb')
-        for lineCount, line in enumerate(radTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                radCSVfile.write(lineStr)
-            else: radCSVfile.write(line + "\n")
-        radCSVfile.close()
-    else:
-        radTempResult = None
-    
-    #Write the air temperature result file.
-    if writeResultFile_ != 2:
-        airTempResult = os.path.join(workingDir, airTempFile)
-        airCSVfile = open(airTempResult, 'wb')
-        for lineCount, line in enumerate(airTempMtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                airCSVfile.write(lineStr)
-            else: airCSVfile.write(line + "\n")
-        airCSVfile.close()
-    else:
-        airTempResult = None
-    
-    #Write the operative temperature result file.
-    if writeResultFile_ != 2:
-        PET_Result = os.path.join(workingDir, PETFile)
-        opCSVfile = open(PET_Result, 'wb')
-        for lineCount, line in enumerate(PET_Mtx):
-            lineStr = ''
-            if lineCount != 0:
-                for valCt, val in enumerate(line):
-                    if valCt != valLen: lineStr = lineStr + str(val) + ','
-                    else: lineStr = lineStr + str(val) + "\n"
-                opCSVfile.write(lineStr)
-            else: opCSVfile.write(line + "\n")
-        opCSVfile.close()
-    else:
-        PET_Result = None
-    
-    #Write the adaptive comfort result file.
-    PET_ComfResult = os.path.join(workingDir, PETComfFile)
-    comfCSVfile = open(PET_ComfResult, 'wb')
-    for lineCount, line in enumerate(PETComfMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            comfCSVfile.write(lineStr)
-        else: comfCSVfile.write(line + "\n")
-    comfCSVfile.close()
-    
-    #Write the deg from target result file.
-    PET_CategoryResult = os.path.join(workingDir, PETCategoryFile)
-    degCSVfile = open(PET_CategoryResult, 'wb')
-    for lineCount, line in enumerate(PETCategoryMtx):
-        lineStr = ''
-        if lineCount != 0:
-            for valCt, val in enumerate(line):
-                if valCt != valLen: lineStr = lineStr + str(val) + ','
-                else: lineStr = lineStr + str(val) + "\n"
-            degCSVfile.write(lineStr)
-        else: degCSVfile.write(line + "\n")
-    degCSVfile.close()
-    
-    
-    return radTempResult, airTempResult, PET_Result, PET_ComfResult, PET_CategoryResult
+    resultFiles = []
+    for mtxCount, matrix in enumerate(matrices):
+        #Only the last two matrices are written if writeResultFile_ is set to 2.
+        if writeResultFile_ == 2 and mtxCount < 3:
+            resultFiles.append(None)
+            continue
+        
+        matrixFile = os.path.join(workingDir, fileName + fileTypes[mtxCount] + hb_comfortMatrix.extension)
+        if resultFormat_ == 0 or resultFormat_ == 1:
+            #Stream the matrix into a binary result file.
+            resultFiles.append(hb_comfortMatrix.write(matrixFile, matrix, resultFormat_ == 1))
+            continue
+        
+        #Write the matrix into a csv file and remove the binary matrix of a previous run.
+        resultFile = os.path.join(workingDir, fileName + fileTypes[mtxCount] + ".csv")
+        with open(resultFile, 'wb') as csvFile:
+            csvFile.write(matrix[0] + "\n")
+            for values in matrix[1:]:
+                csvFile.write(",".join([str(val) for val in values]) + "\n")
+        if os.path.isfile(matrixFile): os.remove(matrixFile)
+        resultFiles.append(resultFile)
+    
+    return resultFiles
 
 
 #Import the classes, check the inputs, and generate default values for grid size if the user has given none.
 checkLB = True
-if sc.sticky.has_key('ladybug_release'):
+if sc.sticky.has_key('ladybug_release') and sc.sticky.has_key('honeybee_release'):
     lb_defaultFolder = sc.sticky["Ladybug_DefaultFolder"]
     lb_preparation = sc.sticky["ladybug_Preparation"]()
     lb_visualization = sc.sticky["ladybug_ResultVisualization"]()
     lb_sunpath = sc.sticky["ladybug_SunPath"]()
     lb_comfortModels = sc.sticky["ladybug_ComfortModels"]()
     lb_wind = sc.sticky["ladybug_WindSpeed"]()
+    hb_comfortMatrix = sc.sticky["honeybee_ComfortMatrix"]
 else:
     checkLB = False
-    print "You should let the Ladybug fly first..."
+    print "You should let the Ladybug and Honeybee fly first..."
     w = gh.GH_RuntimeMessageLevel.Warning
-    ghenv.Component.AddRuntimeMessage(w, "You should let the Ladybug fly first...")
+    ghenv.Component.AddRuntimeMessage(w, "You should let the Ladybug and Honeybee fly first...")
 
 
 #Check the type of comfort analysis recipe connected.
@@ -1985,6 +1772,11 @@ if len(_comfAnalysisRecipe) > 0:
 #Manage the input and output.
 manageOutput(comfortModel)
 
+#resultFormat_ is a new input that older versions of the userObject don't have.
+try: resultFormat_
+except NameError: resultFormat_ = None
+if resultFormat_ is None: resultFormat_ = 2
+
 #Check the data input.
 checkData = False
 if recipeRecognized == True and checkLB == True:
@@ -1996,22 +1788,22 @@ if checkData == True and _runIt == True:
         if result != -1:
             radTempMtx, airTempMtx, operativeTempMtx, adaptComfMtx, degFromTargetMtx = result
             if writeResultFile_ != 0:
-                radTempResult, airTempResult, operativeTempResult, adaptComfResult, degFromTargetResult = writeCSVAdapt(lb_preparation, directory, fileName, radTempMtx, airTempMtx, operativeTempMtx, adaptComfMtx, degFromTargetMtx)
+                radTempResult, airTempResult, operativeTempResult, adaptComfResult, degFromTargetResult = writeResultFiles(hb_comfortMatrix, lb_preparation, directory, fileName, ["RadiantTemp", "AirTemp", "OperativeTemp", "AdaptComf", "DegFromTarget"], [radTempMtx, airTempMtx, operativeTempMtx, adaptComfMtx, degFromTargetMtx])
     elif comfortModel == "PMV":
         result = mainPMV(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNumbers, airTempDataHeaders, flowVolDataHeaders, flowVolDataNumbers, heatGainDataHeaders, heatGainDataNumbers, relHumidDataHeaders, relHumidDataNumbers, clothingLevel, metabolicRate, zoneSrfNames, testPtViewFactor, viewFactorMesh, latitude, longitude, timeZone, diffSolarRad, directSolarRad, globHorizRad, testPtSkyView, testPtBlockedVec, numSkyPatchDivs, winTrans, cloA, floorR, testPtZoneNames, testPtZoneWeights, ptHeightWeights, zoneInletInfo, inletHeightOverride, PPDComfortThresh, humidRatioUp, humidRatioLow, mixedAirOverride, zoneHasWindows, outdoorClac, outSrfTempHeaders, outSrfTempNumbers, outdoorNonSrfViewFac, outDryBulbTemp, outRelHumid, outWindSpeed, d, a, outdoorPtHeightWeights, allWindowShadesSame, winStatusHeaders, testPtBlockName, zoneWindowTransmiss, zoneWindowNames, allWindSpeedsSame, winSpeedNumbers, dataAnalysisPeriod, northAngle, horizInfraredRadiation, lb_preparation, lb_sunpath, lb_comfortModels, lb_wind)
         if result != -1:
             radTempMtx, airTempMtx, SET_Mtx, PMVComfMtx, PMV_Mtx = result
             if writeResultFile_ != 0:
-                radTempResult, airTempResult, SET_Result, PMVComfResult, PMV_Result = writeCSVPMV(lb_preparation, directory, fileName, radTempMtx, airTempMtx, SET_Mtx, PMVComfMtx, PMV_Mtx)
+                radTempResult, airTempResult, SET_Result, PMVComfResult, PMV_Result = writeResultFiles(hb_comfortMatrix, lb_preparation, directory, fileName, ["RadiantTemp", "AirTemp", "SET", "PPD", "PMV"], [radTempMtx, airTempMtx, SET_Mtx, PMVComfMtx, PMV_Mtx])
     elif comfortModel == "UTCI":
         result = mainUTCI(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNumbers, airTempDataHeaders, flowVolDataHeaders, flowVolDataNumbers, heatGainDataHeaders, heatGainDataNumbers, relHumidDataHeaders, relHumidDataNumbers, zoneSrfNames, testPtViewFactor, viewFactorMesh, latitude, longitude, timeZone, diffSolarRad, directSolarRad, globHorizRad, testPtSkyView, testPtBlockedVec, numSkyPatchDivs, winTrans, cloA, floorR, testPtZoneNames, testPtZoneWeights, ptHeightWeights, zoneInletInfo, inletHeightOverride, mixedAirOverride, zoneHasWindows, outdoorClac, outSrfTempHeaders, outSrfTempNumbers, outdoorNonSrfViewFac, outDryBulbTemp, outRelHumid, outWindSpeed, d, a, outdoorPtHeightWeights, allWindowShadesSame, winStatusHeaders, testPtBlockName, zoneWindowTransmiss, zoneWindowNames, allWindSpeedsSame, winSpeedNumbers, dataAnalysisPeriod, northAngle, horizInfraredRadiation, lb_preparation, lb_sunpath, lb_comfortModels, lb_wind)
         if result != -1:
             radTempMtx, airTempMtx, UTCI_Mtx, OutdoorComfMtx, DegFromNeutralMtx = result
             if writeResultFile_ != 0:
-                radTempResult, airTempResult, UTCI_Result, OutdoorComfResult, DegFromNeutralResult = writeCSVUTCI(lb_preparation, directory, fileName, radTempMtx, airTempMtx, UTCI_Mtx, OutdoorComfMtx, DegFromNeutralMtx)
+                radTempResult, airTempResult, UTCI_Result, OutdoorComfResult, DegFromNeutralResult = writeResultFiles(hb_comfortMatrix, lb_preparation, directory, fileName, ["RadiantTemp", "AirTemp", "UTCI", "OutdoorComf", "DegFromTarget"], [radTempMtx, airTempMtx, UTCI_Mtx, OutdoorComfMtx, DegFromNeutralMtx])
     elif comfortModel == "PET":
         result = mainPET(HOYs, analysisPeriod, srfTempNumbers, srfTempHeaders, airTempDataNumbers, airTempDataHeaders, flowVolDataHeaders, flowVolDataNumbers, heatGainDataHeaders, heatGainDataNumbers, relHumidDataHeaders, relHumidDataNumbers, zoneSrfNames, testPtViewFactor, viewFactorMesh, latitude, longitude, timeZone, diffSolarRad, directSolarRad, globHorizRad, testPtSkyView, testPtBlockedVec, numSkyPatchDivs, winTrans, cloA, floorR, testPtZoneNames, testPtZoneWeights, ptHeightWeights, zoneInletInfo, inletHeightOverride, mixedAirOverride, zoneHasWindows, outdoorClac, outSrfTempHeaders, outSrfTempNumbers, outdoorNonSrfViewFac, outDryBulbTemp, outRelHumid, outWindSpeed, d, a, outdoorPtHeightWeights, allWindowShadesSame, winStatusHeaders, testPtBlockName, zoneWindowTransmiss, zoneWindowNames, allWindSpeedsSame, winSpeedNumbers, dataAnalysisPeriod, northAngle, bodyCharacteristics, climate, horizInfraredRadiation, lb_preparation, lb_sunpath, lb_comfortModels, lb_wind)
         if result != -1:
             radTempMtx, airTempMtx, PET_Mtx, PET_ComfMtx, PET_CategoryMtx = result
             if writeResultFile_ != 0:
-                radTempResult, airTempResult, PET_Result, PET_ComfResult, PET_CategoryResult = writeCSVPET(lb_preparation, directory, fileName, radTempMtx, airTempMtx, PET_Mtx, PET_ComfMtx, PET_CategoryMtx)
+                radTempResult, airTempResult, PET_Result, PET_ComfResult, PET_CategoryResult = writeResultFiles(hb_comfortMatrix, lb_preparation, directory, fileName, ["RadiantTemp", "AirTemp", "PET", "PETComf", "PETCategory"], [radTempMtx, airTempMtx, PET_Mtx, PET_ComfMtx, PET_CategoryMtx])
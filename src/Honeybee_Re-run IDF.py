@@ -30,8 +30,10 @@ Provided by Ladybug 0.0.45
     Args:
         _idfFilePath: The full file path to the idf file on your system that you would like to run (e.g. C:\ladybug\sample1.idf).
         _epwFileAddress: The full file path to epw weather file that you would like the simulation to run with.
-        parallel_: Set to "True" to run multiple IDFs using multiple CPUs.  Note that this input is only relevant when you have plugged in a list of IDF file addresses.
+        parallel_: Set to "True" to run multiple IDFs using multiple CPUs.  The number of simultaneous simulations is limited to the number of cores and the available memory of your machine.  Note that this input is only relevant when you have plugged in a list of IDF file addresses.
         runIt_: Set to 'True' to run the simulation.  You can also connect a 2 to run the simulation in the background.
+        timeout_: An optional number of minutes after which a simulation will be stopped.  This input is only relevant when you have plugged in a list of IDF file addresses.  The default is set to run the simulations without a time limit.
+        retries_: An optional number of times that a failed simulation will be run again.  This input is only relevant when you have plugged in a list of IDF file addresses.  The default is set to 0.
     Returns:
         report: Report!
         resultFileAddress: The address of the EnergyPlus result file.
@@ -56,7 +58,6 @@ import shutil
 import Grasshopper.Kernel as gh
 import time
 import subprocess
-import System.Threading.Tasks as tasks
 
 def checkTheInputs(idfFileName, epwWeatherFile):
     w = gh.GH_RuntimeMessageLevel.Warning
@@ -151,37 +152,99 @@ def runBatchFile(batchFileAddress, runInBackground):
     else:
         os.system(batchFileAddress)
 
-def runParallelIDFs(idfFilePaths, epwFileAddress, runIt, parallel):
+def energyPlusCommand(workingDir, idfFilePath, epwFileAddress, EPDirectory):
+    """Return the arguments to run an idf file directly with the EnergyPlus command line interface."""
+    shIdfFileName = os.path.splitext(os.path.basename(idfFilePath))[0]
+    EPExe = os.path.join(EPDirectory, 'energyplus')
+    return [EPExe, '-x', '-r', '-s', 'L', '-p', shIdfFileName, '-d', workingDir, \
+            '-w', epwFileAddress, idfFilePath]
+
+def renameEnergyPlusOutputs(workingDir, shIdfFileName):
+    """Rename the outputs of the command line interface to match the names from Epl-run.
+    
+    The outputs are named <name>out.eso, <name>out.mtr, <name>mtr.csv, etc. with the -p option
+    and eplusout.eso, eplusout.mtr, eplusmtr.csv, etc. without it.
+    """
+    suffixes = {'out': '', 'tbl': 'Table', 'map': 'Map', 'mtr': 'Meter', 'zsz': 'Zsz', 'ssz': 'Ssz'}
+    prefixes = [(name + suffix + '.', suffix) for name in (shIdfFileName, 'eplus') for suffix in suffixes]
+    for fileName in os.listdir(workingDir):
+        for prefix, suffix in prefixes:
+            if not fileName.startswith(prefix): continue
+            ext = fileName[len(prefix):]
+            if suffix == 'tbl' and ext == 'htm': ext = 'html'
+            newFileName = os.path.join(workingDir, shIdfFileName + suffixes[suffix] + '.' + ext)
+            try:
+                if os.path.isfile(newFileName): os.remove(newFileName)
+                os.rename(os.path.join(workingDir, fileName), newFileName)
+            except OSError:
+                pass
+            break
+
+def runParallelIDFs(idfFilePaths, epwFileAddress, runIt, parallel, timeout = None, retries = None):
     # placeholders for final lists.
     resultFileAddress = [None for x in idfFilePaths]
     eioFileAddress = [None for x in idfFilePaths]
     rddFileAddress = [None for x in idfFilePaths]
     
-    reunInBackground = runIt
-    if parallel == True:
-        runInBackground = 2
+    hb_Job = sc.sticky["honeybee_Job"]
+    hb_JobScheduler = sc.sticky["honeybee_JobScheduler"]
     
-    def runEP(i):
-        epPath = checkTheInputs(idfFilePaths[i], _epwFileAddress)
-        if epPath != -1:
-            workingDir = "\\".join(idfFilePaths[i].split('\\')[:-1])
-            batchFileAddress, newIDFPath, idfFileName = writeBatchFile(workingDir, idfFilePaths[i], _epwFileAddress, epPath)
-            runBatchFile(batchFileAddress, runInBackground)
+    # the console windows are only opened if the simulations don't run in the background
+    runInBackground = runIt > 1
+    if timeout: timeout = float(timeout) * 60
+    else: timeout = None
+    if not retries: retries = 0
+    
+    # write the jobs
+    jobs = []
+    for i, idfFilePath in enumerate(idfFilePaths):
+        epPath = checkTheInputs(idfFilePath, epwFileAddress)
+        if epPath == -1: continue
+        workingDir = os.path.dirname(idfFilePath)
+        shIdfFileName = os.path.splitext(os.path.basename(idfFilePath))[0]
+        if os.name == 'nt':
+            batchFileAddress, newIDFPath, idfFileName = writeBatchFile(workingDir, idfFilePath, epwFileAddress, epPath)
+            args = ['cmd', '/c', batchFileAddress]
+        else:
+            newIDFPath = None
+            args = energyPlusCommand(workingDir, idfFilePath, epwFileAddress, epPath)
+        jobs.append(hb_Job(shIdfFileName, args, cwd = workingDir, timeout = timeout, retries = retries,
+                           data = (i, workingDir, newIDFPath), captureOutput = runInBackground))
+    
+    if not jobs:
+        return resultFileAddress, eioFileAddress, rddFileAddress
+    
+    def reportProgress(result, finishedCount, totalCount):
+        print "[%d of %d] %s" % (finishedCount, totalCount, result)
+    
+    # run as many simulations as the cores and memory allow.
+    # EnergyPlus runs are mostly cpu-bound so one job per core saturates the machine.
+    if parallel == True: maxWorkers = None
+    else: maxWorkers = 1
+    scheduler = hb_JobScheduler(maxWorkers, memoryPerJob = 512, progressCallback = reportProgress)
+    print "Running %d simulations on %d processes..." % (len(jobs), min(scheduler.maxWorkers, len(jobs)))
+    results = scheduler.run(jobs)
+    
+    w = gh.GH_RuntimeMessageLevel.Warning
+    for result in results:
+        i, workingDir, newIDFPath = result.data
+        if newIDFPath:
             try:
                 os.remove(newIDFPath)
             except:
                 pass
-            
-            shIdfFileName = idfFileName.replace('.idf', '')
-            resultFileAddress[i] = str(workingDir) + '\\' + str(shIdfFileName) + '.csv'
-            eioFileAddress[i] = resultFileAddress[i].replace('.csv', '.eio')
-            rddFileAddress[i] = resultFileAddress[i].replace('.csv', '.rdd')
-    
-    if parallel == True:
-        tasks.Parallel.ForEach(range(len(idfFilePaths)), runEP)
-    else:
-        for x in range(len(idfFilePaths)):
-            runEP(x)
+        elif result.returncode is not None:
+            renameEnergyPlusOutputs(workingDir, result.name)
+        
+        if not result.success:
+            msg = str(result)
+            if result.stderr.strip(): msg += "\n" + result.stderr.strip().split("\n")[-1]
+            print msg
+            ghenv.Component.AddRuntimeMessage(w, msg)
+        
+        resultFileAddress[i] = os.path.join(workingDir, result.name + '.csv')
+        eioFileAddress[i] = resultFileAddress[i].replace('.csv', '.eio')
+        rddFileAddress[i] = resultFileAddress[i].replace('.csv', '.rdd')
     
     return resultFileAddress, eioFileAddress, rddFileAddress
 
@@ -209,6 +272,12 @@ else:
         ghenv.Component.AddRuntimeMessage(w, warning)
 
 
+#timeout_ and retries_ are new inputs that older versions of the userObject don't have.
+try: timeout_
+except NameError: timeout_ = None
+try: retries_
+except NameError: retries_ = None
+
 if initCheck and _runIt > 0:
     if len(_idfFilePath) == 1:
         epPath = checkTheInputs(_idfFilePath[0], _epwFileAddress)
@@ -250,4 +319,4 @@ if initCheck and _runIt > 0:
             rddFileAddress = resultFileAddress[0].replace('.csv', '.rdd')
             print 'EnergyPlus file '+ str(shIdfFileName)+'.idf ' + 're-run successful!'
     else:
-        resultFileAddress, eioFileAddress, rddFileAddress = runParallelIDFs(_idfFilePath, _epwFileAddress, _runIt, parallel_)
\ No newline at end of file
+        resultFileAddress, eioFileAddress, rddFileAddress = runParallelIDFs(_idfFilePath, _epwFileAddress, _runIt, parallel_, timeout_, retries_)
\ No newline at end of file
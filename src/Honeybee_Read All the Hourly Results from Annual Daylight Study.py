@@ -51,6 +51,7 @@ except: pass
 
 
 import os
+import scriptcontext as sc
 from System import Object
 import Grasshopper.Kernel as gh
 from Grasshopper import DataTree
@@ -96,6 +97,10 @@ def convertIllFileDaraTreeIntoSortedDictionary(illFilesAddress):
 def main(illFilesAddress, testPoints, annualProfiles):
     msg = str.Empty
     
+    if not sc.sticky.has_key("honeybee_AnnualIlluminanceMatrix"):
+        msg = "You should first let Honeybee fly..."
+        return msg, None, None
+    
     shadingProfiles = []
     shadingGroupsCount = 0 # assume there in no shading groups
     
@@ -186,18 +191,16 @@ def main(illFilesAddress, testPoints, annualProfiles):
                 # add an empty list for each state
                 illuminanceValues[shadingGroupCount][HOY].append([])
     
-    totalPtCount = 0
-    ptsCountSoFar = 0
-    for shadingGroupCount in range(len(illFileSets.keys())):
-        for shadingState, resultFiles in enumerate(illFileSets[shadingGroupCount]):
-            for resultFile in resultFiles:
-                result = open(resultFile, 'r')
-                for HOY, line in enumerate(result):
-                   line = line.replace('\n', '', 10)
-                   lineSeg = line.Split(' ')
-                   for hourLuxValue in lineSeg[4:]:
-                      illuminanceValues[shadingGroupCount][HOY][shadingState].append(float(hourLuxValue))
-                result.close()
+    # the .ill files are converted to a binary matrix the first time that they are read
+    illMatrix = sc.sticky["honeybee_AnnualIlluminanceMatrix"].fromIllFiles(illFileSets)
+    try:
+        for shadingGroupCount in range(len(illFileSets.keys())):
+            for shadingState in range(len(illFileSets[shadingGroupCount])):
+                stateIndex = illMatrix.getStateIndex(shadingGroupCount, shadingState)
+                for HOY in range(min(8760, illMatrix.numOfHours)):
+                    illuminanceValues[shadingGroupCount][HOY][shadingState] = list(illMatrix.getHourValues(HOY, stateIndex))
+    finally:
+        illMatrix.close()
 
     return msg, illuminanceValues, shadingProfiles
 
@@ -34,6 +34,7 @@ Provided by Honeybee 0.0.63
         _DLAIllumThresholds_: Illuminance threshold for Daylight Autonomy calculation in lux. Default is set to 300 lux.
         SHDGroupI_Sensors_: Senors for dhading group I. Use shadingGroupSensors component to prepare the inputs
         SHDGroupII_Sensors_: Senors for dhading group II. Use shadingGroupSensors component to prepare the inputs
+        writeBinary_: Set to True to also write the results of each space to a binary file (*_space_n.bil) next to the .ill files. The file has a 12 byte header ('HBIL', number of points and number of hours as int32) followed by float32 values for each point for all the hours. The .ill files of the study are also written to a binary matrix (*.ilm) that is used by the components that read the hourly results.
         _runIt: set to True to run the analysis
     Returns:
         DLA: Daylight Autonomy > Percentage of the time during the active occupancy hours that the test point receives more daylight than the illuminance threshold.
@@ -64,9 +65,10 @@ from Grasshopper.Kernel.Data import GH_Path
 import Rhino as rc
 import scriptcontext as sc
 import os
-import subprocess
-import time
 import shutil
+import itertools
+import struct
+import array
 
 """
     def testPtsStr(self, testPoint, ptsNormal):
@@ -84,6 +86,143 @@ def getFilelength(fileName):
             pass
     return i + 1
 
+def getOffsets(numOfPts):
+    """Return the start index of each group of points and the total number of points."""
+    offsets = [0]
+    for count in numOfPts: offsets.append(offsets[-1] + count)
+    return offsets
+
+def groupSpacesBySourceFiles(spaceOffsets, fileOffsets):
+    """Group the spaces so each group only needs the source files that it overlaps.
+    
+    Returns a list of (first space, last space, first file, last file) with the last
+    indices excluded.
+    """
+    fileBoundaries = set(fileOffsets)
+    groups = []
+    firstSpace = 0
+    for spaceCount in range(len(spaceOffsets) - 1):
+        # a group ends where a space ends at the end of a source file
+        if spaceOffsets[spaceCount + 1] not in fileBoundaries: continue
+        firstFile = fileOffsets.index(spaceOffsets[firstSpace])
+        lastFile = fileOffsets.index(spaceOffsets[spaceCount + 1])
+        groups.append((firstSpace, spaceCount + 1, firstFile, lastFile))
+        firstSpace = spaceCount + 1
+    return groups
+
+def countDataLines(fileName):
+    with open(fileName, "r") as inf:
+        return sum(1 for line in inf if not line.startswith("#"))
+
+def writeBinaryBlock(binaryFiles, spaceBounds, block, width, numOfHours, firstHour):
+    """Write a block of hour-major values to point-major binary files."""
+    numOfBlockHours = len(block) // width
+    for binaryFile, (start, end) in zip(binaryFiles, spaceBounds):
+        for ptCount in range(end - start):
+            binaryFile.seek(12 + 4 * (ptCount * numOfHours + firstHour))
+            block[start + ptCount::width].tofile(binaryFile)
+    return firstHour + numOfBlockHours
+
+def splitIllFiles(illFiles, numOfPtsInEachFile, newIllFileNames, numOfPtsInEachSpace, binaryFileNames = None, blockSize = 4194304):
+    """Split the .ill files of each cpu into one .ill file for each space.
+    
+    Source files are read line by line and only the files that a group of spaces
+    overlaps are open at the same time. If binaryFileNames is provided the values
+    are also written as float32 for each point for all the hours.
+    """
+    fileOffsets = getOffsets(numOfPtsInEachFile)
+    spaceOffsets = getOffsets(numOfPtsInEachSpace)
+    if binaryFileNames: numOfHours = countDataLines(illFiles[0])
+    
+    for firstSpace, lastSpace, firstFile, lastFile in groupSpacesBySourceFiles(spaceOffsets, fileOffsets):
+        base = fileOffsets[firstFile]
+        width = fileOffsets[lastFile] - base
+        spaceBounds = [(spaceOffsets[spaceCount] - base, spaceOffsets[spaceCount + 1] - base) \
+                       for spaceCount in range(firstSpace, lastSpace)]
+        
+        sourceFiles = [open(illFiles[fileCount], "r") for fileCount in range(firstFile, lastFile)]
+        newIllFiles = [open(newIllFileNames[spaceCount], "w") for spaceCount in range(firstSpace, lastSpace)]
+        buffers = [[] for newIllFile in newIllFiles]
+        if binaryFileNames:
+            binaryFiles = [open(binaryFileNames[spaceCount], "wb") for spaceCount in range(firstSpace, lastSpace)]
+            for binaryFile, (start, end) in zip(binaryFiles, spaceBounds):
+                binaryFile.write(struct.pack("<4sii", "HBIL", end - start, numOfHours))
+            block = array.array("f")
+            blockHours = max(1, blockSize // max(width, 1))
+            hour = 0
+        
+        try:
+            for lines in itertools.izip(*sourceFiles):
+                if lines[0].startswith("#"): continue
+                # merge the line from all the source files
+                # the date is followed by two spaces so the values start from the 5th item
+                values = lines[0].strip().split(" ")
+                dateInfo = " ".join(values[:4]) + " "
+                values = values[4:]
+                for line in lines[1:]: values.extend(line.strip().split(" ")[4:])
+                
+                for buffer, (start, end) in zip(buffers, spaceBounds):
+                    buffer.append(dateInfo + " ".join(values[start:end]) + "\n")
+                
+                if binaryFileNames:
+                    block.extend(map(float, values))
+                    if len(block) >= blockHours * width:
+                        hour = writeBinaryBlock(binaryFiles, spaceBounds, block, width, numOfHours, hour)
+                        block = array.array("f")
+                
+                if len(buffers[0]) == 168:
+                    for newIllFile, buffer in zip(newIllFiles, buffers):
+                        newIllFile.writelines(buffer)
+                        del buffer[:]
+            
+            for newIllFile, buffer in zip(newIllFiles, buffers):
+                newIllFile.writelines(buffer)
+            if binaryFileNames and block:
+                writeBinaryBlock(binaryFiles, spaceBounds, block, width, numOfHours, hour)
+        finally:
+            # close all the opened files
+            for openedFile in sourceFiles + newIllFiles: openedFile.close()
+            if binaryFileNames:
+                for binaryFile in binaryFiles: binaryFile.close()
+
+def splitDcFiles(dcFiles, newDcFileNames, numOfPtsInEachSpace):
+    """Split the .dc files of each cpu into one .dc file for each space."""
+    heading = ""
+    with open(dcFiles[0], "r") as dcf:
+        for line in dcf:
+            if not line.startswith("#"): break
+            #make one instance of heading
+            heading += line
+    
+    spaceOffsets = getOffsets(numOfPtsInEachSpace)
+    spaceCount = 0
+    pointCount = 0
+    buffer = []
+    newDcFile = open(newDcFileNames[spaceCount], "w")
+    newDcFile.write(heading)
+    try:
+        for dcFile in dcFiles:
+            with open(dcFile, "r") as dcf:
+                for line in dcf:
+                    if line.startswith("#"): continue
+                    while pointCount == spaceOffsets[spaceCount + 1] and spaceCount < len(newDcFileNames) - 1:
+                        # end of the space, start a new file
+                        newDcFile.writelines(buffer)
+                        newDcFile.close()
+                        buffer = []
+                        spaceCount += 1
+                        newDcFile = open(newDcFileNames[spaceCount], "w")
+                        newDcFile.write(heading)
+                    
+                    buffer.append(line)
+                    pointCount += 1
+                    if len(buffer) == 100:
+                        newDcFile.writelines(buffer)
+                        buffer = []
+        newDcFile.writelines(buffer)
+    finally:
+        newDcFile.close()
+
 def executeBatchFiles(batchFileNames, maxPRuns = None, shell = False, waitingTime = 0.2):
 
     """Run a number of batch files in parallel and
@@ -93,48 +232,10 @@ def executeBatchFiles(batchFileNames, maxPRuns = None, shell = False, waitingTim
             batchFileNames: List of batch files
             maxPRuns: max number of files to be ran in parallel (default = 0)
             shell: set to True if you do NOT want to see the cmd window while the analysis is runnig
+            waitingTime: Not used. The next file starts as soon as one of the files is finished.
     """
-
-    if not maxPRuns : maxPRuns = 1
-    maxPRuns = int(maxPRuns)
-    total = len(batchFileNames)
-    
-    if maxPRuns < 1: maxPRuns = 1
-    if maxPRuns > total: maxPRuns = total
-    
-    running = 0
-    done = False
-    jobs = []
-    pid = 0
-    
-    try:
-        while not done:
-            if running < maxPRuns and pid < total:
-                # execute the files
-                jobs.append(subprocess.Popen(batchFileNames[pid].replace("\\", "/") , shell = shell))
-                pid+=1
-                time.sleep(waitingTime)
-            
-            # count how many jobs are running and how many are done
-            running = 0
-            finished = 0
-            for job in jobs:
-                if job.poll() is None:
-                    #one job is still running
-                    running += 1
-                else:
-                    finished += 1
-    
-            if running == maxPRuns:
-                # wait for half a second
-                #print "waiting..."
-                time.sleep(waitingTime)
-    
-            if finished ==  total:
-                done = True
     
-    except Exception, e:
-        print "Something went wrong: %s"%str(e) 
+    return sc.sticky["honeybee_JobScheduler"].runBatchFiles(batchFileNames, maxPRuns, shell)
 
 
 def convertIllFileDaraTreeIntoSortedDictionary(illFilesAddress):
@@ -222,7 +323,7 @@ def convertEPScheduleToDSSchedule(scheduleName, folder):
     
     return fullPath
 
-def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SHDGroupI_Sensors, SHDGroupII_Sensors, DLAIllumThresholds, runInBackground=False):
+def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SHDGroupI_Sensors, SHDGroupII_Sensors, DLAIllumThresholds, runInBackground=False, writeBinary=False):
     
     if sc.sticky.has_key('honeybee_release'):
 
@@ -423,10 +524,17 @@ def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SH
     try: heaFiles = sorted(heaFiles, key=lambda fileName: int(fileName.split(".")[-2].split("_")[-1]))
     except: pass
     
+    # studies that are calculated from a daylight coefficient matrix (useDCMatrix_)
+    # have no heading and .dc files so only the .ill files can be split
+    dcMatrixStudy = len(heaFiles) == 0
+    
     # copy one of the heading files to be modified
-    heaFile = heaFiles[0]
-    with open(os.path.join(filePath, heaFile), "r") as heainf:
-        baseHea = heainf.readlines()
+    if not dcMatrixStudy:
+        heaFile = heaFiles[0]
+        with open(os.path.join(filePath, heaFile), "r") as heainf:
+            baseHea = heainf.readlines()
+    else:
+        baseHea = []
     
     modifiedHeaBase = str.Empty
     keywordsToBeRemoved = ["daylight_autonomy_active_RGB", "electric_lighting", "direct_sunlight_file", "thermal_simulation", "occupancy_profile",
@@ -528,16 +636,13 @@ def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SH
         for shadingStateCount in range(len(illFileList)):
             for spaceCount in range(numOfSpaces):
                 newIllFileName  = illFileList[shadingStateCount][0].split(".ill")[0] + "_space_" + str(spaceCount) + ".ill"
-                newDcFileName  = illFileList[shadingStateCount][0].split(".ill")[0] + "_space_" + str(spaceCount) + ".dc"
                 newIllFileNamesDict[shdGroupCounter].append(newIllFileName) #collect ill files to calculate sDA
                 #if not (os.path.isfile(newIllFileName) and os.path.isfile(newDcFileName)):
                 #   firstRun = True
                 #   break
     
 
-    # open all the available ill files and put them in the dictionary
-    illFilesDict = {}
-    newIllFilesDict = {}
+    # split the ill and dc files for each space
     if firstRun:
         
         for shdGroupCounter, illFileList in originalIllFilesSorted.items():
@@ -545,100 +650,40 @@ def main(illFilesAddress, testPts, testVecs, occFiles, lightingControlGroups, SH
             for shadingStateCount, shadingStateFiles in enumerate(illFileList):
                 # create a place holder for new .ill files for each shading group
                 newIllFileNamesDict[shdGroupCounter] = []
+                newDcFileNames = []
+                binaryFileNames = []
+                dcFiles = []
                 
-                # open all the files for this shading state into memory
-                for counter, illFile in enumerate(illFileList[shadingStateCount]):
-                    illfile = open(illFile, "r")
-                    illFilesDict[counter] = illfile #put each ill file from each cpu separate/ I don't know why I have done this
-                
-                # open new ill files for each space and put them in the same directory
                 for spaceCount in range(numOfSpaces):
-                    newIllFileName  = illFileList[shadingStateCount][0].split(".ill")[0] + "_space_" + str(spaceCount) + ".ill"
-                    newIllFileNamesDict[shdGroupCounter].append(newIllFileName) #collect new ill file names to calculate sDA
-                    
-                    newIllFile = open(newIllFileName, "w")
-                    newIllFilesDict[spaceCount] = newIllFile
-                
-                # all the files will have the same length of 8760 lines for the hours of the year
-                for line in range(8760):
-                    # merge the line from all the source file
-                    mergedLine = []
-                    for illFileKey in illFilesDict.keys():
-                        line = illFilesDict[illFileKey].readline()
-                        
-                        if illFileKey==0:
-                            dateInfo = line.strip().split(" ")[:4]
-                        mergedLine.extend(line.strip().split(" ")[4:])
-                
+                    spaceFileName = shadingStateFiles[0].split(".ill")[0] + "_space_" + str(spaceCount)
+                    newIllFileNamesDict[shdGroupCounter].append(spaceFileName + ".ill") #collect new ill file names to calculate sDA
+                    newDcFileNames.append(spaceFileName + ".dc")
+                    binaryFileNames.append(spaceFileName + ".bil")
                 
-                    # write the values to the target files
-                    for illFileKey in newIllFilesDict.keys():
-                        line = " ".join(dateInfo + mergedLine[sum(numOfPtsInEachSpace[:illFileKey]):sum(numOfPtsInEachSpace[:illFileKey+1])])
-                        newIllFilesDict[illFileKey].write(line + "\n")
-                
-                # close all the opened files
-                for illFileKey in illFilesDict.keys(): illFilesDict[illFileKey].close()
-                for illFileKey in newIllFilesDict.keys(): newIllFilesDict[illFileKey].close()
-        
-        
-        # print numOfPtsInEachSpace
-        # write the new .dc files for 
-        dcFilesDict = {}
-        newDcFilesDict = {}
-        
-        for shdGroupCounter, illFileList in originalIllFilesSorted.items():
-            
-            for shadingStateCount, shadingStateFiles in enumerate(illFileList):
-                #illFileDict[shaidngGroupCounter]
-                lenOfDCFiles = []
-                for counter, illFile in enumerate(shadingStateFiles):
+                for illFile in shadingStateFiles:
                     if illFile.endswith("_up.ill"):
-                        dcFile = illFile.replace("_up.ill", ".dc")
-                        
+                        dcFiles.append(illFile.replace("_up.ill", ".dc"))
                     elif illFile.endswith("_down.ill"):
-                        dcFile = illFile.replace("_down.ill", ".dc")
-                        
+                        dcFiles.append(illFile.replace("_down.ill", ".dc"))
                     else:
-                        dcFile = illFile.replace(".ill", ".dc")
-
-                    lenOfDCFile = getFilelength(dcFile) - 6 #Daysim files has 6 lines as header
-                    lenOfDCFiles.append(lenOfDCFile)
-                    dcfile = open(dcFile, "r")
-                    dcFilesDict[counter] = dcfile
+                        dcFiles.append(illFile.replace(".ill", ".dc"))
                 
-                # open new ill files for each space and put them in the same directory
-                for spaceCount in range(numOfSpaces):
-                    newDcFileName  = illFileList[shadingStateCount][0].split(".ill")[0] + "_space_" + str(spaceCount) + ".dc"
-                    newDcFile = open(newDcFileName, "w")
-                    newDcFilesDict[spaceCount] = newDcFile
-                
-                heading = str.Empty
-                for line in dcFilesDict[0]:
-                    if line.startswith("#"):
-                        #make one instance of heading
-                        heading += line
-                    else:
-                        newDcFilesDict[0].write(heading)
-                        newDcFilesDict[0].write(line)
-                        break
-                
-                pointCount = 1
-                spaceCount = 0
-                for dcFileKey in dcFilesDict.keys():
-                    for line in dcFilesDict[dcFileKey]:
-                        if not line.startswith("#"):
-                            # write the line
-                            newDcFilesDict[spaceCount].write(line)
-                            pointCount+=1
-                            if pointCount == sum(numOfPtsInEachSpace[:spaceCount + 1]):
-                                # end of the file, start a new file
-                                spaceCount += 1
-                                try: newDcFilesDict[spaceCount].write(heading)
-                                except: pass
-                    
-                # close all the opened files
-                for dcFileKey in dcFilesDict.keys(): dcFilesDict[dcFileKey].close()
-                for dcFileKey in newDcFilesDict.keys(): newDcFilesDict[dcFileKey].close()
+                if not writeBinary: binaryFileNames = None
+                splitIllFiles(shadingStateFiles, numOfPtsInEachFile, newIllFileNamesDict[shdGroupCounter],
+                              numOfPtsInEachSpace, binaryFileNames)
+                if not dcMatrixStudy:
+                    splitDcFiles(dcFiles, newDcFileNames, numOfPtsInEachSpace)
+        
+        if writeBinary:
+            # write the annual matrix for all the points that the hourly result readers share
+            illMatrix = sc.sticky["honeybee_AnnualIlluminanceMatrix"].fromIllFiles(originalIllFilesSorted, pointGroups = numOfPtsInEachSpace)
+            illMatrix.close()
+    
+    if dcMatrixStudy:
+        msg = "The .ill files are calculated from a daylight coefficient matrix and there is no Daysim heading file " + \
+              "to calculate the annual metrics. The results are split for each space next to the .ill files " + \
+              "and can be read by the components that read the hourly results."
+        return msg, None
         
 
     heaFileNames = []
@@ -902,13 +947,17 @@ if isAllNone(_illFilesAddress) == True or isAllNone(_testPoints) == True:
     w = gh.GH_RuntimeMessageLevel.Warning
     ghenv.Component.AddRuntimeMessage(w, msg)
     
+#writeBinary_ is a new input that older versions of the userObject don't have.
+try: writeBinary_
+except NameError: writeBinary_ = False
+
 if _runIt and not isAllNone(_illFilesAddress) and not isAllNone(_testPoints):
    
     _testPoints.SimplifyPaths()
     lightingControlGroups_.SimplifyPaths()
     _illFilesAddress.SimplifyPaths()
     
-    res = main(_illFilesAddress, _testPoints, ptsVectors_, occupancyFiles_, lightingControlGroups_, SHDGroupI_Sensors_, SHDGroupII_Sensors_, _DLAIllumThresholds_, _runIt > 1)
+    res = main(_illFilesAddress, _testPoints, ptsVectors_, occupancyFiles_, lightingControlGroups_, SHDGroupI_Sensors_, SHDGroupII_Sensors_, _DLAIllumThresholds_, _runIt > 1, writeBinary_ == True)
     if res!= -1:
         msg, results = res
         
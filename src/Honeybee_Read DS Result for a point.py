@@ -102,6 +102,10 @@ def convertIllFileDaraTreeIntoSortedDictionary(illFilesAddress):
 def main(illFilesAddress, testPoints, targetPoint, annualProfiles):
     msg = str.Empty
     
+    if not sc.sticky.has_key("honeybee_AnnualIlluminanceMatrix"):
+        msg = "You should first let Honeybee fly..."
+        return msg, None, None
+    
     shadingProfiles = []
     shadingGroupsCount = 0 # assume there in no shading groups
     
@@ -238,14 +242,16 @@ def main(illFilesAddress, testPoints, targetPoint, annualProfiles):
             illuminanceValues[shadingGroupCount].append([])
     
     
-    for shadingGroupCount in illFileSets.keys():
-        for stateCount, targetIllFiles in enumerate(illFileSets[shadingGroupCount]):
-            targetIllFile = targetIllFiles[targetListNumber]
-            result = open(targetIllFile, 'r')
-            for lineCount, line in enumerate(result):
-                hourLuxValue = line.strip().split(" ")[targetIndexNumber + 4]
-                illuminanceValues[shadingGroupCount][stateCount].append(float(hourLuxValue))
-            result.close()
+    # the .ill files are converted to a binary matrix the first time that they are read
+    # after that only the values of the target point are read from the matrix
+    illMatrix = sc.sticky["honeybee_AnnualIlluminanceMatrix"].fromIllFiles(illFileSets)
+    try:
+        for shadingGroupCount in illFileSets.keys():
+            for stateCount in range(len(illFileSets[shadingGroupCount])):
+                stateIndex = illMatrix.getStateIndex(shadingGroupCount, stateCount)
+                illuminanceValues[shadingGroupCount][stateCount] = illMatrix.getPointValues(targetPtIndex, stateIndex)
+    finally:
+        illMatrix.close()
             
                 
     return msg, illuminanceValues, shadingProfiles[branch]
@@ -29,7 +29,7 @@ The component is built to bring in any result that you desire from the csv using
 Provided by Honeybee 0.0.63
     
     Args:
-        _resultFileAddress: The result file address that comes out of the "Export to OpenStudio" component.
+        _resultFileAddress: The result file address that comes out of the "Export to OpenStudio" component.  If an .sql file was written next to the .csv file (see writeSQL_ on the Energy Simulation Par component) the results will be read from the .sql file.
         _keywords: keywords that will be used to bring in the results that you are interested in.  These words should be the name of the output that you are requesting or should correspond to words in the top row of the csv file.
     Returns:
         results: The result data from the csv file (formatted with a Ladybug header on it).
@@ -153,44 +153,32 @@ if hbCheck and _resultFileAddress and _keywords and _resultFileAddress != None:
             keywords.append(word)
     
     try:
-        result = open(_resultFileAddress, 'r')
+        resultReader = sc.sticky["honeybee_EPResultReader"](_resultFileAddress)
         
-        for lineCount, line in enumerate(result):
-            if lineCount == 0:
-                # PARSE THE FILE HEADING
-                colHeaders = []
-                for column in line.split(','):
-                    colHeaders.append(column)
-                # SEARCH THROUGH THE FILE HEADING
-                simOutputs = hb_EPMaterialAUX.searchListByKeyword(colHeaders, keywords)
-                simOutLower = []
-                for outp in simOutputs:
-                    simOutLower.append(outp.lower())
-                key = []
-                path = []
-                for outp in colHeaders:
-                    if outp.lower() in simOutLower:
-                        outpName = outp.split(' [')[0]
-                        timestep = outp.split('(')[-1].split(')')[0]
-                        units = outp.split('[')[-1].split(']')[0]
-                        makeHeader(results, resultCount, timestep, outpName, units)
-                        key.append(0)
-                        path.append(resultCount)
-                        resultCount += 1
-                    else:
-                        key.append(-1)
-                        path.append(-1)
-            else:
-                for columnCount, column in enumerate(line.split(',')):
-                    p = GH_Path(int(path[columnCount]))
-                    
-                    if key[columnCount] != -1:
-                        results.Add(float(column), p)
-        result.close()
+        # SEARCH THROUGH THE FILE HEADING
+        colHeaders = resultReader.header
+        simOutputs = hb_EPMaterialAUX.searchListByKeyword(colHeaders, keywords)
+        simOutLower = []
+        for outp in simOutputs:
+            simOutLower.append(outp.lower())
+        dataColumns = []
+        for columnCount, outp in enumerate(colHeaders):
+            if outp.lower() in simOutLower:
+                outpName = outp.split(' [')[0]
+                timestep = outp.split('(')[-1].split(')')[0]
+                units = outp.split('[')[-1].split(']')[0]
+                makeHeader(results, resultCount, timestep, outpName, units)
+                dataColumns.append((columnCount, resultCount))
+                resultCount += 1
+        
+        # READ ONLY THE COLUMNS THAT MATCH THE KEYWORDS
+        columnData = resultReader.readColumns([columnCount for columnCount, pathCount in dataColumns])
+        if resultReader.failedColumns:
+            raise ValueError('Failed to convert the values in the result file to numbers.')
+        for columnCount, pathCount in dataColumns:
+            results.AddRange([v for v in columnData[columnCount]], GH_Path(pathCount))
         parseSuccess = True
     except:
-        try: result.close()
-        except: pass
         parseSuccess = False
         warn = 'Failed to parse the result file.'
         print warn
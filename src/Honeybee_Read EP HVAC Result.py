@@ -29,7 +29,7 @@ This component reads only the results related to zone ideal air and earth tube H
 Provided by Honeybee 0.0.63
     
     Args:
-        _resultFileAddress: The result file address that comes out of the WriteIDF component.
+        _resultFileAddress: The result file address that comes out of the WriteIDF component.  If an .sql file was written next to the .csv file (see writeSQL_ on the Energy Simulation Par component) the results will be read from the .sql file.
     Returns:
         sensibleCooling: The sensible energy removed by the ideal air cooling system for each zone in kWh.
         latentCooling: The latent energy removed by the ideal air cooling system for each zone in kWh.
@@ -61,6 +61,25 @@ import scriptcontext as sc
 import copy
 import os
 
+w = gh.GH_RuntimeMessageLevel.Warning
+
+#Honeybee check.
+hbCheck = True
+if not sc.sticky.has_key('honeybee_release') == True:
+    hbCheck = False
+    print "You should first let Honeybee fly..."
+    ghenv.Component.AddRuntimeMessage(w, "You should first let Honeybee fly...")
+else:
+    try:
+        if not sc.sticky['honeybee_release'].isCompatible(ghenv.Component): hbCheck = False
+    except:
+        hbCheck = False
+        warning = "You need a newer version of Honeybee to use this compoent." + \
+        "Use updateHoneybee component to update userObjects.\n" + \
+        "If you have already updated userObjects drag Honeybee_Honeybee component " + \
+        "into canvas and try again."
+        ghenv.Component.AddRuntimeMessage(w, warning)
+
 #Read the location and the analysis period info from the eio file, if there is one.
 #Also try to read the floor areas from this file to be used in EUI calculations.
 location = "NoLocation"
@@ -175,160 +194,144 @@ def checkCentralSys(sysInt, sysType):
 
 
 # PARSE THE RESULT FILE.
-if _resultFileAddress and gotData == True:
+if hbCheck and _resultFileAddress and gotData == True:
     try:
-        result = open(_resultFileAddress, 'r')
+        resultReader = sc.sticky["honeybee_EPResultReader"](_resultFileAddress)
         
-        for lineCount, line in enumerate(result):
-            if lineCount == 0:
-                #ANALYZE THE FILE HEADING
-                key = []; path = []
-                for columnCount, column in enumerate(line.split(',')):
-                    """
-                    if 'Zone Ideal Loads Supply Air Sensible Cooling Energy' in column:
-                        key.append(0)
-                        if 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                        else:
-                            zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
-                        makeHeader(sensibleCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Sensible Cooling Energy", "kWh", True)
+        #ANALYZE THE FILE HEADING
+        key = []; path = []
+        for columnCount, column in enumerate(resultReader.header):
+            """
+            if 'Zone Ideal Loads Supply Air Sensible Cooling Energy' in column:
+                key.append(0)
+                if 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                else:
+                    zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
+                makeHeader(sensibleCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Sensible Cooling Energy", "kWh", True)
+                dataTypeList[0] = True
+            
+            elif 'Zone Ideal Loads Supply Air Latent Cooling Energy' in column:
+                key.append(1)
+                if 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                else:
+                    zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
+                makeHeader(latentCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Latent Cooling Energy", "kWh", True)
+                dataTypeList[1] = True
+            
+            elif 'Zone Ideal Loads Supply Air Sensible Heating Energy' in column:
+                key.append(2)
+                if 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                else:
+                    zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
+                makeHeader(sensibleHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Sensible Heating Energy", "kWh", True)
+                dataTypeList[2] = True
+            
+            elif 'Zone Ideal Loads Supply Air Latent Heating Energy' in column:
+                key.append(3)
+                if 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                else:
+                    zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
+                makeHeader(latentHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Latent Heating Energy", "kWh", True)
+                dataTypeList[3] = True
+            """
+            if 'System Node Standard Density Volume Flow Rate' in column:
+                if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+                    key.append(-1)
+                    path.append(-1)
+                else:
+                    if ' IDEAL LOADS SUPPLY INLET' in column:
+                        key.append(4)
+                        zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
+                        makeHeader(supplyVolFlow, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Standard Density Volume Flow Rate", "m3/s", True)
                         dataTypeList[0] = True
-                    
-                    elif 'Zone Ideal Loads Supply Air Latent Cooling Energy' in column:
-                        key.append(1)
-                        if 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                        else:
-                            zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
-                        makeHeader(latentCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Latent Cooling Energy", "kWh", True)
-                        dataTypeList[1] = True
-                    
-                    elif 'Zone Ideal Loads Supply Air Sensible Heating Energy' in column:
-                        key.append(2)
-                        if 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                        else:
-                            zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
-                        makeHeader(sensibleHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Sensible Heating Energy", "kWh", True)
-                        dataTypeList[2] = True
-                    
-                    elif 'Zone Ideal Loads Supply Air Latent Heating Energy' in column:
-                        key.append(3)
-                        if 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                        else:
-                            zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS AIR SYSTEM')[0])
-                        makeHeader(latentHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Latent Heating Energy", "kWh", True)
-                        dataTypeList[3] = True
-                    """
-                    if 'System Node Standard Density Volume Flow Rate' in column:
-                        if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+                    else:
+                        try:
+                            zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 0)
+                            centralSys = True
+                            makeHeader(supplyVolFlow, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Standard Density Volume Flow Rate", "m3/s", True)
+                            dataTypeList[0] = True
+                            key.append(4)
+                            print zoneName
+                        except:
                             key.append(-1)
                             path.append(-1)
-                        else:
-                            if ' IDEAL LOADS SUPPLY INLET' in column:
-                                key.append(4)
-                                zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
-                                makeHeader(supplyVolFlow, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Standard Density Volume Flow Rate", "m3/s", True)
-                                dataTypeList[0] = True
-                            else:
-                                try:
-                                    zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 0)
-                                    centralSys = True
-                                    makeHeader(supplyVolFlow, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Standard Density Volume Flow Rate", "m3/s", True)
-                                    dataTypeList[0] = True
-                                    key.append(4)
-                                    print zoneName
-                                except:
-                                    key.append(-1)
-                                    path.append(-1)
-                    
-                    elif 'System Node Temperature' in column:
-                        if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+            
+            elif 'System Node Temperature' in column:
+                if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+                    key.append(-1)
+                    path.append(-1)
+                else:
+                    if ' IDEAL LOADS SUPPLY INLET' in column:
+                        key.append(5)
+                        zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
+                        makeHeader(supplyAirTemp, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Temperature", "C", False)
+                        dataTypeList[1] = True
+                    else:
+                        try:
+                            zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 1)
+                            centralSys = True
+                            makeHeader(supplyAirTemp, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Temperature", "C", False)
+                            dataTypeList[1] = True
+                            key.append(5)
+                        except:
                             key.append(-1)
                             path.append(-1)
-                        else:
-                            if ' IDEAL LOADS SUPPLY INLET' in column:
-                                key.append(5)
-                                zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
-                                makeHeader(supplyAirTemp, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Temperature", "C", False)
-                                dataTypeList[1] = True
-                            else:
-                                try:
-                                    zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 1)
-                                    centralSys = True
-                                    makeHeader(supplyAirTemp, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Temperature", "C", False)
-                                    dataTypeList[1] = True
-                                    key.append(5)
-                                except:
-                                    key.append(-1)
-                                    path.append(-1)
-                    
-                    elif 'System Node Relative Humidity' in column:
-                        if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+            
+            elif 'System Node Relative Humidity' in column:
+                if "RETURN" in column or "OUTDOOR AIR" in column or "ZONE AIR NODE" in column:
+                    key.append(-1)
+                    path.append(-1)
+                else:
+                    if ' IDEAL LOADS SUPPLY INLET' in column:
+                        key.append(6)
+                        zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
+                        makeHeader(supplyAirHumidity, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Relative Humidity", "%", False)
+                        dataTypeList[2] = True
+                    else:
+                        try:
+                            zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 2)
+                            centralSys = True
+                            makeHeader(supplyAirHumidity, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Relative Humidity", "%", False)
+                            dataTypeList[2] = True
+                            key.append(6)
+                        except:
                             key.append(-1)
                             path.append(-1)
-                        else:
-                            if ' IDEAL LOADS SUPPLY INLET' in column:
-                                key.append(6)
-                                zoneName = checkZone(" " + column.split(':')[0].split(' IDEAL LOADS SUPPLY INLET')[0])
-                                makeHeader(supplyAirHumidity, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Relative Humidity", "%", False)
-                                dataTypeList[2] = True
-                            else:
-                                try:
-                                    zoneName = checkCentralSys((" " + column.split(":")[0].split('NODE')[-1]), 2)
-                                    centralSys = True
-                                    makeHeader(supplyAirHumidity, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Supply Air Relative Humidity", "%", False)
-                                    dataTypeList[2] = True
-                                    key.append(6)
-                                except:
-                                    key.append(-1)
-                                    path.append(-1)
-                    
-                    elif 'Zone Cooling Setpoint Not Met Time' in column:
-                        key.append(7)
-                        zoneName = checkZone(" " + column.split(':')[0])
-                        makeHeader(unmetHoursCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Unmet Cooling hours", "hours", True)
-                        dataTypeList[3] = True
-                    
-                    elif 'Zone Heating Setpoint Not Met Time' in column:
-                        key.append(8)
-                        zoneName = checkZone(" " + column.split(':')[0])
-                        makeHeader(unmetHoursHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Unmet Heating hours", "hours", True)
-                        dataTypeList[4] = True
-                    
-                    else:
-                        key.append(-1)
-                        path.append(-1)
-                    
+            
+            elif 'Zone Cooling Setpoint Not Met Time' in column:
+                key.append(7)
+                zoneName = checkZone(" " + column.split(':')[0])
+                makeHeader(unmetHoursCooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Unmet Cooling hours", "hours", True)
+                dataTypeList[3] = True
+            
+            elif 'Zone Heating Setpoint Not Met Time' in column:
+                key.append(8)
+                zoneName = checkZone(" " + column.split(':')[0])
+                makeHeader(unmetHoursHeating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Unmet Heating hours", "hours", True)
+                dataTypeList[4] = True
+            
             else:
-                for columnCount, column in enumerate(line.split(',')):
-                    p = GH_Path(int(path[columnCount]))
-                    
-                    if key[columnCount] == 0:
-                        sensibleCooling.Add((float(column)/3600000), p)
-                    elif key[columnCount] == 1:
-                        latentCooling.Add((float(column)/3600000), p)
-                    elif key[columnCount] == 2:
-                        sensibleHeating.Add((float(column)/3600000), p)
-                    elif key[columnCount] == 3:
-                        latentHeating.Add((float(column)/3600000), p)
-                    elif key[columnCount] == 4:
-                        supplyVolFlow.Add((float(column)), p)
-                    elif key[columnCount] == 5:
-                        supplyAirTemp.Add(float(column), p)
-                    elif key[columnCount] == 6:
-                        supplyAirHumidity.Add(float(column), p)
-                    elif key[columnCount] == 7:
-                        unmetHoursCooling.Add(float(column),p)
-                    elif key[columnCount] == 8:
-                        unmetHoursHeating.Add(float(column),p)
-                    
-        result.close()
+                key.append(-1)
+                path.append(-1)
+        
+        # STREAM THE DATA COLUMNS.
+        outputs = {0: sensibleCooling, 1: latentCooling, 2: sensibleHeating, 3: latentHeating, 4: supplyVolFlow, \
+            5: supplyAirTemp, 6: supplyAirHumidity, 7: unmetHoursCooling, 8: unmetHoursHeating}
+        dataColumns = [columnCount for columnCount, k in enumerate(key) if k in outputs]
+        divisors = dict((columnCount, 3600000) for columnCount in dataColumns if key[columnCount] < 4)
+        columnData = resultReader.readColumns(dataColumns, divisors)
+        if resultReader.failedColumns:
+            raise ValueError('Failed to convert the values in the result file to numbers.')
+        
+        for columnCount in dataColumns:
+            outputs[key[columnCount]].AddRange([v for v in columnData[columnCount]], GH_Path(int(path[columnCount])))
+        
         parseSuccess = True
     except:
-        try: result.close()
-        except: pass
         parseSuccess = False
         warn = 'Failed to parse the result file.  Check the folder of the file address you are plugging into this component and make sure that there is a .csv file in the folder. \n'+ \
                   'If there is no csv file or there is a file with no data in it (it is 0 kB), your simulation probably did not run correctly. \n' + \
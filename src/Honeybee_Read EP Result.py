@@ -29,7 +29,7 @@ This component reads only the results related to zones.  For results related to
 Provided by Honeybee 0.0.63
     
     Args:
-        _resultFileAddress: The result file address that comes out of the WriteIDF component.
+        _resultFileAddress: The result file address that comes out of the WriteIDF component.  If an .sql file was written next to the .csv file (see writeSQL_ on the Energy Simulation Par component) the results will be read from the .sql file.
     Returns:
         totalThermalLoad: The total thermal energy used by each zone in kWh.  This includes cooling and heating.
         thermalLoadBalance: The thermal energy used by each zone in kWh.  Heating values are positive while cooling values are negative.
@@ -68,9 +68,29 @@ import Grasshopper.Kernel as gh
 from Grasshopper import DataTree
 from Grasshopper.Kernel.Data import GH_Path
 import scriptcontext as sc
+import itertools
 import copy
 import os
 
+w = gh.GH_RuntimeMessageLevel.Warning
+
+#Honeybee check.
+hbCheck = True
+if not sc.sticky.has_key('honeybee_release') == True:
+    hbCheck = False
+    print "You should first let Honeybee fly..."
+    ghenv.Component.AddRuntimeMessage(w, "You should first let Honeybee fly...")
+else:
+    try:
+        if not sc.sticky['honeybee_release'].isCompatible(ghenv.Component): hbCheck = False
+    except:
+        hbCheck = False
+        warning = "You need a newer version of Honeybee to use this compoent." + \
+        "Use updateHoneybee component to update userObjects.\n" + \
+        "If you have already updated userObjects drag Honeybee_Honeybee component " + \
+        "into canvas and try again."
+        ghenv.Component.AddRuntimeMessage(w, warning)
+
 #Check to be sure that the files exist.
 csvExists = True
 if _resultFileAddress and _resultFileAddress != None:
@@ -298,321 +318,296 @@ for name in zoneNameList:
 
 
 # PARSE THE RESULT FILE.
-if _resultFileAddress and gotData == True and csvExists == True:
+if hbCheck and _resultFileAddress and gotData == True and csvExists == True:
     try:
-        result = open(_resultFileAddress, 'r')
+        resultReader = sc.sticky["honeybee_EPResultReader"](_resultFileAddress)
         
-        for lineCount, line in enumerate(result):
-            if lineCount == 0:
-                #ANALYZE THE FILE HEADING
-                key = []; path = []
-                for columnCount, column in enumerate(line.split(',')):
-                    
-                    if 'Zone Ideal Loads Supply Air Total Cooling Energy' in column or 'Zone Ideal Loads Supply Air Sensible Cooling Energy' in column or 'Zone Ideal Loads Supply Air Latent Cooling Energy' in column or 'Chiller Electric Energy' in column or 'Cooling Coil Electric Energy' in column or 'Zone VRF Air Terminal Cooling Electric Energy' in column or 'VRF Heat Pump Cooling Electric Energy' in column:
-                        
-                        if 'Zone Ideal Loads Supply Air Total Cooling Energy' in column and 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                            idealAirTrigger = True
-                        elif 'Zone Ideal Loads Supply Air Sensible Cooling Energy' in column and 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                            idealAirTrigger = True
-                        elif 'IDEAL LOADS AIR SYSTEM' in column:
-                            zoneName = checkZone(" " + ":".join(column.split(":")[:-1]).split(' IDEAL LOADS AIR SYSTEM')[0])
-                            idealAirTrigger = True
-                        else:
-                            zoneName = " " +column.split(":")[0]
-                            checkCustomName(coolingC)
-                        
-                        try:
-                            if idealAirTrigger == True:
-                                makeHeader(cooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Cooling Load", energyUnit, True)
-                            else:
-                                makeHeader(cooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Cooling Electric Energy", energyUnit, True)
-                            dataTypeList[2] = True
-                            key.append(0)
-                            coolingC += 1
-                        except:
-                            key.append(-1)
-                    
-                    elif 'Zone Ideal Loads Supply Air Total Heating Energy' in column or 'Zone Ideal Loads Supply Air Sensible Heating Energy' in column or 'Zone Ideal Loads Supply Air Latent Heating Energy' in column or 'Boiler Heating Energy' in column or 'Heating Coil Total Heating Energy' in column or 'Heating Coil Gas Energy' in column or 'Heating Coil Electric Energy' in column or 'Humidifier Electric Energy' in column or 'Zone VRF Air Terminal Heating Electric Energy' in column or 'VRF Heat Pump Heating Electric Energy' in column:
-                        idealAirTrigger = 2
-                        if 'Zone Ideal Loads Supply Air Total Heating Energy' in column and 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                            idealAirTrigger = True
-                        elif 'IDEAL LOADS AIR SYSTEM' in column:
-                            zoneName = checkZone(" " + ":".join(column.split(":")[:-1]).split(' IDEAL LOADS AIR SYSTEM')[0])
-                            idealAirTrigger = True
-                        elif 'Heating Coil Total Heating Energy' not in column:
-                            zoneName = " " +column.split(":")[0]
-                            checkCustomName(heatingC)
-                        else:
-                            zoneName = None
-                            path.append(0)
-                        
-                        if 'COIL HEATING GAS' in column and not 'Heating Coil Electric Energy' in column:
-                            idealAirTrigger = False
-                        elif 'Boiler Heating Energy' in column:
-                            idealAirTrigger = False
-                        
-                        try:
-                            if zoneName != None:
-                                if idealAirTrigger == True:
-                                    makeHeader(heating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Heating Load", energyUnit, True)
-                                elif idealAirTrigger == False:
-                                    makeHeader(heating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Heating Fuel Energy", energyUnit, False)
-                                else:
-                                    makeHeader(heating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Heating Electric Energy", energyUnit, False)
-                                dataTypeList[3] = True
-                                key.append(1)
-                                heatingC += 1
-                            else:
-                                key.append(-1)
-                        except:
-                            key.append(-1)
-                    
-                    elif 'Zone Lights Electric Energy' in column:
-                        key.append(2)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        makeHeader(electricLight, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Electric Lighting Energy", energyUnit, True)
-                        dataTypeList[4] = True
-                    
-                    elif 'Zone Electric Equipment Electric Energy' in column:
-                        key.append(3)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        makeHeader(electricEquip, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Electric Equipment Energy", energyUnit, True)
-                        dataTypeList[5] = True
-                    
-                    elif 'Fan Electric Energy' in column:
-                        key.append(15)
-                        if 'FAN ON OFF' in column:
-                            zoneName = checkZoneSys(" " + ":".join(column.split(":")[:-1]).split('FAN ON OFF ')[-1], fanC)
-                            makeHeader(fanElectric, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Fan Electric Energy", energyUnit, False)
-                        else:
-                            zoneName = " " +column.split(":")[0]
-                            checkCustomName(fanC)
-                            makeHeader(fanElectric, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Fan Electric Energy", energyUnit, False)
-                        fanC += 1
-                        dataTypeList[6] = True
-                    
-                    elif 'Pump Electric Energy' in column:
-                        key.append(25)
-                        if 'PUMP CONSTANT SPEED' in column:
-                            zoneName = checkZoneSys(" " + ":".join(column.split(":")[:-1]).split('PUMP CONSTANT SPEED ')[-1])
-                            makeHeader(pumpElectric, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Pump Electric Energy", energyUnit, True)
-                        else:
-                            zoneName = " " + column.split(":")[0]
-                            checkCustomName(pumpC)
-                            makeHeader(pumpElectric, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Pump Electric Energy", energyUnit, True)
-                        pumpC += 1
-                        dataTypeList[7] = True
-                    
-                    elif 'Zone People Total Heating Energy' in column or 'Zone People Sensible Heating Energy' in column or 'Zone People Latent Gain Energy' in column:
-                        key.append(4)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        makeHeader(peopleGains, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "People Energy", energyUnit, True)
-                        dataTypeList[8] = True
-                    
-                    elif 'Zone Windows Total Transmitted Solar Radiation Energy' in column:
-                        key.append(5)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        makeHeader(totalSolarGain, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Total Solar Gain", energyUnit, True)
-                        dataTypeList[9] = True
-                    
-                    elif 'Zone Ventilation Sensible Heat Loss Energy ' in column:
-                        key.append(6)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        makeHeader(natVentEnergy, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Natural Ventilation Energy", energyUnit, True)
-                        dataTypeList[12] = True
-                    
-                    elif 'Zone Ventilation Sensible Heat Gain Energy' in column:
-                        key.append(7)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                    
-                    elif 'Zone Ideal Loads Zone Total Heating Energy' in column or 'Zone Ideal Loads Zone Sensible Heating Energy' in column or 'Zone Ideal Loads Zone Latent Heating Energy' in column:
-                        key.append(23)
-                        if 'Zone Ideal Loads Zone Total Heating Energy' in column and 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
-                        else:
-                            zoneName = checkZone(" " + ":".join(column.split(":")[:-1]).split(' IDEAL LOADS')[0])
-                        zoneHeatingEnergy[int(path[-1])].append(zoneName)
-                        zoneHeatingEnergy[int(path[-1])].append(column.split('(')[-1].split(')')[0])
-                    
-                    elif 'Zone Ideal Loads Zone Total Cooling Energy' in column or 'Zone Ideal Loads Zone Sensible Cooling Energy' in column or 'Zone Ideal Loads Zone Latent Cooling Energy' in column:
-                        key.append(24)
-                        if 'Zone Ideal Loads Zone Total Cooling Energy' in column and 'ZONE HVAC' in column:
-                            zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+        #ANALYZE THE FILE HEADING
+        key = []; path = []
+        for columnCount, column in enumerate(resultReader.header):
+            
+            if 'Zone Ideal Loads Supply Air Total Cooling Energy' in column or 'Zone Ideal Loads Supply Air Sensible Cooling Energy' in column or 'Zone Ideal Loads Supply Air Latent Cooling Energy' in column or 'Chiller Electric Energy' in column or 'Cooling Coil Electric Energy' in column or 'Zone VRF Air Terminal Cooling Electric Energy' in column or 'VRF Heat Pump Cooling Electric Energy' in column:
+                
+                if 'Zone Ideal Loads Supply Air Total Cooling Energy' in column and 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                    idealAirTrigger = True
+                elif 'Zone Ideal Loads Supply Air Sensible Cooling Energy' in column and 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                    idealAirTrigger = True
+                elif 'IDEAL LOADS AIR SYSTEM' in column:
+                    zoneName = checkZone(" " + ":".join(column.split(":")[:-1]).split(' IDEAL LOADS AIR SYSTEM')[0])
+                    idealAirTrigger = True
+                else:
+                    zoneName = " " +column.split(":")[0]
+                    checkCustomName(coolingC)
+                
+                try:
+                    if idealAirTrigger == True:
+                        makeHeader(cooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Cooling Load", energyUnit, True)
+                    else:
+                        makeHeader(cooling, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Cooling Electric Energy", energyUnit, True)
+                    dataTypeList[2] = True
+                    key.append(0)
+                    coolingC += 1
+                except:
+                    key.append(-1)
+            
+            elif 'Zone Ideal Loads Supply Air Total Heating Energy' in column or 'Zone Ideal Loads Supply Air Sensible Heating Energy' in column or 'Zone Ideal Loads Supply Air Latent Heating Energy' in column or 'Boiler Heating Energy' in column or 'Heating Coil Total Heating Energy' in column or 'Heating Coil Gas Energy' in column or 'Heating Coil Electric Energy' in column or 'Humidifier Electric Energy' in column or 'Zone VRF Air Terminal Heating Electric Energy' in column or 'VRF Heat Pump Heating Electric Energy' in column:
+                idealAirTrigger = 2
+                if 'Zone Ideal Loads Supply Air Total Heating Energy' in column and 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                    idealAirTrigger = True
+                elif 'IDEAL LOADS AIR SYSTEM' in column:
+                    zoneName = checkZone(" " + ":".join(column.split(":")[:-1]).split(' IDEAL LOADS AIR SYSTEM')[0])
+                    idealAirTrigger = True
+                elif 'Heating Coil Total Heating Energy' not in column:
+                    zoneName = " " +column.split(":")[0]
+                    checkCustomName(heatingC)
+                else:
+                    zoneName = None
+                    path.append(0)
+                
+                if 'COIL HEATING GAS' in column and not 'Heating Coil Electric Energy' in column:
+                    idealAirTrigger = False
+                elif 'Boiler Heating Energy' in column:
+                    idealAirTrigger = False
+                
+                try:
+                    if zoneName != None:
+                        if idealAirTrigger == True:
+                            makeHeader(heating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Heating Load", energyUnit, True)
+                        elif idealAirTrigger == False:
+                            makeHeader(heating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Heating Fuel Energy", energyUnit, False)
                         else:
-                            zoneName = checkZone(" " + ":".join(column.split(":")[:-1]).split(' IDEAL LOADS')[0])
-                        zoneCoolingEnergy[int(path[-1])].append(zoneName)
-                        zoneCoolingEnergy[int(path[-1])].append(column.split('(')[-1].split(')')[0])
-                    
-                    elif 'Zone Infiltration Total Heat Loss Energy' in column or 'Zone Infiltration Sensible Heat Loss Energy' in column or 'Zone Infiltration Latent Heat Loss Energy' in column:
-                        key.append(8)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        makeHeader(infiltrationEnergy, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Infiltration Energy", energyUnit, True)
-                        dataTypeList[10] = True
-                    
-                    elif 'Zone Infiltration Total Heat Gain Energy' in column or 'Zone Infiltration Sensible Heat Gain Energy' in column or 'Zone Infiltration Latent Heat Gain Energy' in column:
-                        key.append(9)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                    
-                    elif 'Zone Operative Temperature' in column:
-                        key.append(10)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        makeHeader(operativeTemperature, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Operative Temperature", "C", False)
-                        dataTypeList[13] = True
-                    
-                    elif 'Zone Mean Air Temperature' in column:
-                        key.append(11)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        makeHeader(airTemperature, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Air Temperature", "C", False)
-                        dataTypeList[14] = True
-                    
-                    elif 'Zone Mean Radiant Temperature' in column:
-                        key.append(12)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        makeHeader(meanRadTemperature, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Radiant Temperature", "C", False)
-                        dataTypeList[15] = True
-                    
-                    elif 'Zone Air Relative Humidity' in column:
-                        key.append(13)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        makeHeader(relativeHumidity, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Relative Humidity", "%", False)
-                        dataTypeList[16] = True
-                    
-                    elif 'Zone Ventilation Standard Density Volume Flow Rate' in column:
-                        key.append(16)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        natVentFlow[int(path[-1])].append(zoneName)
-                        natVentFlow[int(path[-1])].append(column.split('(')[-1].split(')')[0])
-                    
-                    elif 'Zone Infiltration Standard Density Volume Flow Rate' in column:
-                        key.append(17)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        infiltrationFlow[int(path[-1])].append(zoneName)
-                        infiltrationFlow[int(path[-1])].append(column.split('(')[-1].split(')')[0])
-                    
-                    elif 'Zone Mechanical Ventilation Standard Density Volume Flow Rate' in column:
-                        key.append(22)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        mechSysAirFlow[int(path[-1])].append(zoneName)
-                        mechSysAirFlow[int(path[-1])].append(column.split('(')[-1].split(')')[0])
-                    
-                    elif 'Earth Tube Air Flow Volume' in column:
-                        key.append(21)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        earthTubeFlow[int(path[-1])].append(zoneName)
-                        earthTubeFlow[int(path[-1])].append(column.split('(')[-1].split(')')[0])
-                    
-                    elif 'Zone Air Heat Balance Internal Convective Heat Gain Rate' in column:
-                        key.append(18)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        internalAirGain[int(path[-1])].append(zoneName)
-                        internalAirGain[int(path[-1])].append(column.split('(')[-1].split(')')[0])
-                    
-                    elif 'Zone Air Heat Balance Surface Convection Rate' in column:
-                        key.append(19)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        surfaceAirGain[int(path[-1])].append(zoneName)
-                        surfaceAirGain[int(path[-1])].append(column.split('(')[-1].split(')')[0])
-                    
-                    elif 'Zone Air Heat Balance System Air Transfer Rate' in column:
-                        key.append(20)
-                        zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
-                        systemAirGain[int(path[-1])].append(zoneName)
-                        systemAirGain[int(path[-1])].append(column.split('(')[-1].split(')')[0])
-                    
+                            makeHeader(heating, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Heating Electric Energy", energyUnit, False)
+                        dataTypeList[3] = True
+                        key.append(1)
+                        heatingC += 1
                     else:
                         key.append(-1)
-                        path.append(-1)
+                except:
+                    key.append(-1)
+            
+            elif 'Zone Lights Electric Energy' in column:
+                key.append(2)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                makeHeader(electricLight, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Electric Lighting Energy", energyUnit, True)
+                dataTypeList[4] = True
+            
+            elif 'Zone Electric Equipment Electric Energy' in column:
+                key.append(3)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                makeHeader(electricEquip, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Electric Equipment Energy", energyUnit, True)
+                dataTypeList[5] = True
+            
+            elif 'Fan Electric Energy' in column:
+                key.append(15)
+                if 'FAN ON OFF' in column:
+                    zoneName = checkZoneSys(" " + ":".join(column.split(":")[:-1]).split('FAN ON OFF ')[-1], fanC)
+                    makeHeader(fanElectric, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Fan Electric Energy", energyUnit, False)
+                else:
+                    zoneName = " " +column.split(":")[0]
+                    checkCustomName(fanC)
+                    makeHeader(fanElectric, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Fan Electric Energy", energyUnit, False)
+                fanC += 1
+                dataTypeList[6] = True
+            
+            elif 'Pump Electric Energy' in column:
+                key.append(25)
+                if 'PUMP CONSTANT SPEED' in column:
+                    zoneName = checkZoneSys(" " + ":".join(column.split(":")[:-1]).split('PUMP CONSTANT SPEED ')[-1])
+                    makeHeader(pumpElectric, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Pump Electric Energy", energyUnit, True)
+                else:
+                    zoneName = " " + column.split(":")[0]
+                    checkCustomName(pumpC)
+                    makeHeader(pumpElectric, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Pump Electric Energy", energyUnit, True)
+                pumpC += 1
+                dataTypeList[7] = True
+            
+            elif 'Zone People Total Heating Energy' in column or 'Zone People Sensible Heating Energy' in column or 'Zone People Latent Gain Energy' in column:
+                key.append(4)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                makeHeader(peopleGains, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "People Energy", energyUnit, True)
+                dataTypeList[8] = True
+            
+            elif 'Zone Windows Total Transmitted Solar Radiation Energy' in column:
+                key.append(5)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                makeHeader(totalSolarGain, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Total Solar Gain", energyUnit, True)
+                dataTypeList[9] = True
+            
+            elif 'Zone Ventilation Sensible Heat Loss Energy ' in column:
+                key.append(6)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                makeHeader(natVentEnergy, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Natural Ventilation Energy", energyUnit, True)
+                dataTypeList[12] = True
+            
+            elif 'Zone Ventilation Sensible Heat Gain Energy' in column:
+                key.append(7)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+            
+            elif 'Zone Ideal Loads Zone Total Heating Energy' in column or 'Zone Ideal Loads Zone Sensible Heating Energy' in column or 'Zone Ideal Loads Zone Latent Heating Energy' in column:
+                key.append(23)
+                if 'Zone Ideal Loads Zone Total Heating Energy' in column and 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                else:
+                    zoneName = checkZone(" " + ":".join(column.split(":")[:-1]).split(' IDEAL LOADS')[0])
+                zoneHeatingEnergy[int(path[-1])].append(zoneName)
+                zoneHeatingEnergy[int(path[-1])].append(column.split('(')[-1].split(')')[0])
+            
+            elif 'Zone Ideal Loads Zone Total Cooling Energy' in column or 'Zone Ideal Loads Zone Sensible Cooling Energy' in column or 'Zone Ideal Loads Zone Latent Cooling Energy' in column:
+                key.append(24)
+                if 'Zone Ideal Loads Zone Total Cooling Energy' in column and 'ZONE HVAC' in column:
+                    zoneName = checkZoneSys(" " + (":".join(column.split(":")[:-1])).split('ZONE HVAC IDEAL LOADS AIR SYSTEM ')[-1])
+                else:
+                    zoneName = checkZone(" " + ":".join(column.split(":")[:-1]).split(' IDEAL LOADS')[0])
+                zoneCoolingEnergy[int(path[-1])].append(zoneName)
+                zoneCoolingEnergy[int(path[-1])].append(column.split('(')[-1].split(')')[0])
+            
+            elif 'Zone Infiltration Total Heat Loss Energy' in column or 'Zone Infiltration Sensible Heat Loss Energy' in column or 'Zone Infiltration Latent Heat Loss Energy' in column:
+                key.append(8)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                makeHeader(infiltrationEnergy, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Infiltration Energy", energyUnit, True)
+                dataTypeList[10] = True
+            
+            elif 'Zone Infiltration Total Heat Gain Energy' in column or 'Zone Infiltration Sensible Heat Gain Energy' in column or 'Zone Infiltration Latent Heat Gain Energy' in column:
+                key.append(9)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+            
+            elif 'Zone Operative Temperature' in column:
+                key.append(10)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                makeHeader(operativeTemperature, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Operative Temperature", "C", False)
+                dataTypeList[13] = True
+            
+            elif 'Zone Mean Air Temperature' in column:
+                key.append(11)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                makeHeader(airTemperature, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Air Temperature", "C", False)
+                dataTypeList[14] = True
+            
+            elif 'Zone Mean Radiant Temperature' in column:
+                key.append(12)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                makeHeader(meanRadTemperature, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Radiant Temperature", "C", False)
+                dataTypeList[15] = True
+            
+            elif 'Zone Air Relative Humidity' in column:
+                key.append(13)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                makeHeader(relativeHumidity, int(path[columnCount]), zoneName, column.split('(')[-1].split(')')[0], "Relative Humidity", "%", False)
+                dataTypeList[16] = True
+            
+            elif 'Zone Ventilation Standard Density Volume Flow Rate' in column:
+                key.append(16)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                natVentFlow[int(path[-1])].append(zoneName)
+                natVentFlow[int(path[-1])].append(column.split('(')[-1].split(')')[0])
+            
+            elif 'Zone Infiltration Standard Density Volume Flow Rate' in column:
+                key.append(17)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                infiltrationFlow[int(path[-1])].append(zoneName)
+                infiltrationFlow[int(path[-1])].append(column.split('(')[-1].split(')')[0])
+            
+            elif 'Zone Mechanical Ventilation Standard Density Volume Flow Rate' in column:
+                key.append(22)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                mechSysAirFlow[int(path[-1])].append(zoneName)
+                mechSysAirFlow[int(path[-1])].append(column.split('(')[-1].split(')')[0])
+            
+            elif 'Earth Tube Air Flow Volume' in column:
+                key.append(21)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                earthTubeFlow[int(path[-1])].append(zoneName)
+                earthTubeFlow[int(path[-1])].append(column.split('(')[-1].split(')')[0])
+            
+            elif 'Zone Air Heat Balance Internal Convective Heat Gain Rate' in column:
+                key.append(18)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                internalAirGain[int(path[-1])].append(zoneName)
+                internalAirGain[int(path[-1])].append(column.split('(')[-1].split(')')[0])
+            
+            elif 'Zone Air Heat Balance Surface Convection Rate' in column:
+                key.append(19)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                surfaceAirGain[int(path[-1])].append(zoneName)
+                surfaceAirGain[int(path[-1])].append(column.split('(')[-1].split(')')[0])
+            
+            elif 'Zone Air Heat Balance System Air Transfer Rate' in column:
+                key.append(20)
+                zoneName = checkZone(" " + ":".join(column.split(":")[:-1]))
+                systemAirGain[int(path[-1])].append(zoneName)
+                systemAirGain[int(path[-1])].append(column.split('(')[-1].split(')')[0])
             
             else:
-                for columnCount, column in enumerate(line.split(',')):
-                    if key[columnCount] != 14:
-                        try: p = GH_Path(int(path[columnCount]))
-                        except: p = GH_Path(int(path[columnCount][0]), int(path[columnCount][1]))
-                    else:
-                        p = GH_Path(int(path[columnCount][0]), int(path[columnCount][1]))
-                    
-                    if key[columnCount] == 0:
-                        try: cooling.Add((float(column)/3600000), p)
-                        except: dataTypeList[2] = False
-                    elif key[columnCount] == 1:
-                        try: heating.Add((float(column)/3600000), p)
-                        except: dataTypeList[3] = False
-                    elif key[columnCount] == 2:
-                        try: electricLight.Add((float(column)/3600000), p)
-                        except: dataTypeList[4] = False
-                    elif key[columnCount] == 3:
-                        try: electricEquip.Add((float(column)/3600000), p)
-                        except: dataTypeList[5] = False
-                    elif key[columnCount] == 4:
-                        try: peopleGains.Add((float(column)/3600000), p)
-                        except: dataTypeList[6] = False
-                    elif key[columnCount] == 5:
-                        try: totalSolarGain.Add((float(column)/3600000), p)
-                        except: dataTypeList[7] = False
-                    elif key[columnCount] == 6:
-                        try: natVentEnergy.Add((((float(column))*(-1)/3600000) + ((float( line.split(',')[columnCount+1] ))/3600000)), p)
-                        except: dataTypeList[11] = False
-                    elif key[columnCount] == 7:
-                        pass
-                    elif key[columnCount] == 23:
-                        try: zoneHeatingEnergy[int(path[columnCount])].append(float(column))
-                        except: pass
-                    elif key[columnCount] == 24:
-                        try: zoneCoolingEnergy[int(path[columnCount])].append(float(column))
-                        except: pass
-                    elif key[columnCount] == 8:
-                        try: infiltrationEnergy.Add((((float(column))*(-1)/3600000) + ((float( line.split(',')[columnCount+1] ))/3600000)), p)
-                        except: dataTypeList[9] = False
-                    elif key[columnCount] == 9:
-                        pass
-                    elif key[columnCount] == 10:
-                        try: operativeTemperature.Add(float(column), p)
-                        except: dataTypeList[12] = False
-                    elif key[columnCount] == 11:
-                        try: airTemperature.Add(float(column), p)
-                        except: dataTypeList[13] = False
-                    elif key[columnCount] == 12:
-                        try: meanRadTemperature.Add(float(column), p)
-                        except: dataTypeList[14] = False
-                    elif key[columnCount] == 13:
-                        try: relativeHumidity.Add(float(column), p)
-                        except: dataTypeList[15] = False
-                    elif key[columnCount] == 15:
-                        try: fanElectric.Add((float(column)/3600000), p)
-                        except: pass
-                    elif key[columnCount] == 25:
-                        try: pumpElectric.Add((float(column)/3600000), p)
-                        except: pass
-                    elif key[columnCount] == 16:
-                        try: natVentFlow[int(path[columnCount])].append(float(column))
-                        except: pass
-                    elif key[columnCount] == 17:
-                        try: infiltrationFlow[int(path[columnCount])].append(float(column))
-                        except: pass
-                    elif key[columnCount] == 22:
-                        try: mechSysAirFlow[int(path[columnCount])].append(float(column))
-                        except: pass
-                    elif key[columnCount] == 21:
-                        try: earthTubeFlow[int(path[columnCount])].append(float(column))
-                        except: pass
-                    elif key[columnCount] == 18:
-                        try: internalAirGain[int(path[columnCount])].append(float(column))
-                        except: pass
-                    elif key[columnCount] == 19:
-                        try: surfaceAirGain[int(path[columnCount])].append(float(column))
-                        except: pass
-                    elif key[columnCount] == 20:
-                        try: systemAirGain[int(path[columnCount])].append(float(column))
-                        except: pass
-                    
-        result.close()
+                key.append(-1)
+                path.append(-1)
+        
+        # BUILD THE COLUMN DISPATCH TABLE.
+        # Each column maps to its output and a divisor so every cell is only touched once.
+        treeOutputs = {0: cooling, 1: heating, 2: electricLight, 3: electricEquip, 4: peopleGains, \
+            5: totalSolarGain, 6: natVentEnergy, 8: infiltrationEnergy, 10: operativeTemperature, \
+            11: airTemperature, 12: meanRadTemperature, 13: relativeHumidity, 15: fanElectric, 25: pumpElectric}
+        listOutputs = {16: natVentFlow, 17: infiltrationFlow, 18: internalAirGain, 19: surfaceAirGain, \
+            20: systemAirGain, 21: earthTubeFlow, 22: mechSysAirFlow, 23: zoneHeatingEnergy, 24: zoneCoolingEnergy}
+        dataTypeIndex = {0: 2, 1: 3, 2: 4, 3: 5, 4: 8, 5: 9, 6: 12, 8: 10, 10: 13, 11: 14, 12: 15, 13: 16}
+        energyKeys = (0, 1, 2, 3, 4, 5, 15, 25)
+        # loss and gain columns that are combined into a single balance (gain is the next column)
+        balanceKeys = (6, 8)
+        
+        dispatchTable = {}
+        divisors = {}
+        for columnCount, k in enumerate(key):
+            if k in treeOutputs:
+                dispatchTable[columnCount] = (treeOutputs[k], None)
+            elif k in listOutputs:
+                dispatchTable[columnCount] = (None, listOutputs[k])
+            else:
+                continue
+            
+            if k in energyKeys or k in balanceKeys:
+                divisors[columnCount] = 3600000
+            if k in balanceKeys:
+                if columnCount + 1 < len(key):
+                    divisors[columnCount + 1] = 3600000
+                else:
+                    del dispatchTable[columnCount]
+                    dataTypeList[dataTypeIndex[k]] = False
+        
+        requestedColumns = set(dispatchTable.keys())
+        for columnCount in dispatchTable.keys():
+            if key[columnCount] in balanceKeys: requestedColumns.add(columnCount + 1)
+        
+        # STREAM THE DATA INTO COLUMNS.
+        columnData = resultReader.readColumns(requestedColumns, divisors)
+        
+        for columnCount in sorted(dispatchTable.keys()):
+            treeOutput, listOutput = dispatchTable[columnCount]
+            k = key[columnCount]
+            values = columnData[columnCount]
+            failed = columnCount in resultReader.failedColumns
+            
+            if k in balanceKeys:
+                gainValues = columnData[columnCount + 1]
+                failed = failed or (columnCount + 1) in resultReader.failedColumns
+                values = [gain - loss for loss, gain in itertools.izip(values, gainValues)]
+            
+            if failed:
+                # drop the cells that are not numbers
+                values = [v for v in values if v == v]
+                if k in dataTypeIndex: dataTypeList[dataTypeIndex[k]] = False
+            
+            if treeOutput is not None:
+                try: p = GH_Path(int(path[columnCount]))
+                except: p = GH_Path(int(path[columnCount][0]), int(path[columnCount][1]))
+                treeOutput.AddRange([v for v in values], p)
+            else:
+                try: listOutput[int(path[columnCount])].extend(values)
+                except: pass
+        
         parseSuccess = True
     except:
-        try: result.close()
-        except: pass
         parseSuccess = False
         warn = 'Failed to parse the result file.  Check the folder of the file address you are plugging into this component and make sure that there is a .csv file in the folder. \n'+ \
                   'If there is a file with no data in it (it is 0 kB), your simulation probably did not run correctly. \n' + \
@@ -52,6 +52,7 @@ except: pass
 
 
 import os
+import scriptcontext as sc
 from System import Object
 import Grasshopper.Kernel as gh
 from Grasshopper import DataTree
@@ -97,6 +98,10 @@ def convertIllFileDaraTreeIntoSortedDictionary(illFilesAddress):
 def main(illFilesAddress, testPoints, HOY, annualProfiles):
     msg = str.Empty
     
+    if not sc.sticky.has_key("honeybee_AnnualIlluminanceMatrix"):
+        msg = "You should first let Honeybee fly..."
+        return msg, None, None
+    
     shadingProfiles = []
     shadingGroupsCount = 0 # assume there in no shading groups
     
@@ -184,22 +189,16 @@ def main(illFilesAddress, testPoints, HOY, annualProfiles):
             # add an empty list for each state
             illuminanceValues[shadingGroupCount].append([])
     
-    totalPtCount = 0
-    ptsCountSoFar = 0
-    for shadingGroupCount in range(len(illFileSets.keys())):
-        # each file represnts one state of shading
-        for stateCount, resultFiles in enumerate(illFileSets[shadingGroupCount]):
-            
-            for resultFile in resultFiles:
-                result = open(resultFile, 'r')
-                for lineCount, line in enumerate(result):
-                    if lineCount == int(HOY-1):
-                       line = line.replace('\n', '', 10)
-                       lineSeg = line.Split(' ')
-                       for hourLuxValue in lineSeg[4:]:
-                           illuminanceValues[shadingGroupCount][stateCount].append(float(hourLuxValue))
-                           
-                result.close()
+    # the .ill files are converted to a binary matrix the first time that they are read
+    illMatrix = sc.sticky["honeybee_AnnualIlluminanceMatrix"].fromIllFiles(illFileSets)
+    try:
+        for shadingGroupCount in range(len(illFileSets.keys())):
+            # each file represnts one state of shading
+            for stateCount in range(len(illFileSets[shadingGroupCount])):
+                stateIndex = illMatrix.getStateIndex(shadingGroupCount, stateCount)
+                illuminanceValues[shadingGroupCount][stateCount] = list(illMatrix.getHourValues(int(HOY-1), stateIndex))
+    finally:
+        illMatrix.close()
     
     return msg, illuminanceValues, shadingProfiles
 
@@ -26,7 +26,7 @@ This component reads the results of an Adaptive Indoor Comfort Analysis.  Note t
 Provided by Honeybee 0.0.63
     
     Args:
-        _comfResultFileAddress: Any one of the result file addresses that comes out of the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Thermal Comfort Autonomy Analysis' component.
+        _comfResultFileAddress: Any one of the result file addresses that comes out of the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Thermal Comfort Autonomy Analysis' component.  This can be either a binary matrix file (.hbmtx) or a csv file.  Honeybee should fly to read binary matrix files.
     Returns:
         comfResultsMtx: A matrix of comfort data that can be plugged into the "Visualize Comfort Results" component.
 """
@@ -41,11 +41,23 @@ ghenv.Component.AdditionalHelpFromDocStrings = "6"
 
 
 import Grasshopper.Kernel as gh
+import scriptcontext as sc
 
 
 comfResultsMtx = []
 
-if _comfResultFileAddress:
+if _comfResultFileAddress and sc.sticky.has_key('honeybee_release') and sc.sticky["honeybee_ComfortMatrix"].isMatrixFile(_comfResultFileAddress):
+    #Read the binary matrix file in one go.
+    try:
+        resultMtx = sc.sticky["honeybee_ComfortMatrix"](_comfResultFileAddress)
+        try: comfResultsMtx = resultMtx.toMatrix()
+        finally: resultMtx.close()
+    except:
+        warn = 'Failed to parse the result file.  The simulation might not have run correctly.'+ \
+                  'Try reconnecting the _resultfileAddress to this component or re-running your simulation.'
+        print warn
+        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, warn)
+elif _comfResultFileAddress:
     try:
         result = open(_comfResultFileAddress, 'r')
         
@@ -172,6 +172,9 @@ def main(octFile, analysisRecipe, numOfCPUs, thisRunName, runIt):
     # except image-based simulation
     testPtsEachCPU, lenOfPts = hb_writeRAD.writeTestPtFile(subWorkingDir, \
                                     radFileName, numOfCPUs, analysisRecipe)
+    
+    if len(testPtsEachCPU)!=0: # make sure it is a grid based analysis
+        numOfCPUs = len(testPtsEachCPU) # number of chunks of test points
             
     ######################## WRITE BATCH FILES #######################
     # if analysis type is annual this function will write hea files too
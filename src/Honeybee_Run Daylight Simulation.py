@@ -39,6 +39,7 @@ Provided by Honeybee 0.0.63
         additionalRadFiles_: A list of fullpath to valid radiance files which will be added to the scene
         exportAirWalls_: Set to True if you want to export air walls as surfaces and False if you don't want air walls be exported.  The default is set to False.
         overwriteResults_: Set to False if you want the component create a copy of all the results. Default is True
+        binaryFiles_: Set to True to write the test points and the results of grid-based studies as binary float32 files (the test points are written to .bpts files).  These files are smaller and faster to write and read but they can't be opened in a text editor.  The default is set to False.
         
     Returns:
         readMe!: ...
@@ -80,7 +81,7 @@ ghenv.Component.Params.Output[3].NickName = "results"
 ghenv.Component.Params.Output[3].Name = "results"
 results = []
 
-def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir, radFileName, meshParameters, waitingTime, additionalRadFiles, overwriteResults, exportAirWalls):
+def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir, radFileName, meshParameters, waitingTime, additionalRadFiles, overwriteResults, exportAirWalls, binaryFiles = False):
     # import the classes
     w = gh.GH_RuntimeMessageLevel.Warning
     
@@ -114,6 +115,7 @@ def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir
     
     lb_preparation = sc.sticky["ladybug_Preparation"]()
     hb_writeRAD = sc.sticky["honeybee_WriteRAD"](ghenv.Component)
+    hb_writeRAD.binaryResults = hb_writeRAD.binaryTestPoints = binaryFiles == True
     hb_writeRADAUX = sc.sticky["honeybee_WriteRADAUX"]()
     hb_materilaLib = sc.sticky["honeybee_materialLib"]
     hb_scheduleLib = sc.sticky["honeybee_ScheduleLib"]
@@ -231,6 +233,10 @@ def main(north, originalHBObjects, analysisRecipe, runRad, numOfCPUs, workingDir
                 
 
 
+#binaryFiles_ is a new input that older versions of the userObject don't have.
+try: binaryFiles_
+except NameError: binaryFiles_ = False
+
 if _writeRad == True and _analysisRecipe!=None and ((len(_HBObjects)!=0 and _HBObjects[0]!=None) or  additionalRadFiles_!=[]):
     north_ = 0 # place holder for now until I implement it to the code.
     
@@ -252,7 +258,7 @@ if _writeRad == True and _analysisRecipe!=None and ((len(_HBObjects)!=0 and _HBO
     
     result = main(north_, _HBObjects, _analysisRecipe, runRad_, numOfCPUs, \
                   _workingDir_, _radFileName_, meshSettings_, waitingTime, \
-                  additionalRadFiles_, overwriteResults_, exportAirWalls_)
+                  additionalRadFiles_, overwriteResults_, exportAirWalls_, binaryFiles_)
     
     if result!= -1:
         
@@ -35,8 +35,8 @@ Levitt, B.; Ubbelohde, M.; Loisos, G.; Brown, N.  Thermal Autonomy as Metric and
 Provided by Honeybee 0.0.63
     
     Args:
-        _comfResultsMtx: A comfort matrix (adaptive, PMV or Outdoor) output from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.
-        _degOrPMVMtx: The degreeFromTargetMtx, PMV_Mtx, or DegFromNeutralMtx from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.
+        _comfResultsMtx: A comfort matrix (adaptive, PMV or Outdoor) output from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.  This can also be the matching binary result file address (.hbmtx) from the 'Honeybee_Microclimate Map Analysis' component.
+        _degOrPMVMtx: The degreeFromTargetMtx, PMV_Mtx, or DegFromNeutralMtx from either the 'Honeybee_Microclimate Map Analysis' component or the 'Honeybee_Read Microclimate Matrix' component.  This can also be the matching binary result file address (.hbmtx) from the 'Honeybee_Microclimate Map Analysis' component.
         _viewFactorMesh: The list of view factor meshes that comes out of the  "Honeybee_Indoor View Factor Calculator".
         _HBZones: The HBZones out of any of the HB components that generate or alter zones.  Note that these should ideally be the zones that are fed into the Run Energy Simulation component as surfaces may not align otherwise.  Zones read back into Grasshopper from the Import idf component will not align correctly with the EP Result data.
         _totalThermalEnergy_: The totalThermalEnergy output from the "Honeybee_Read EP Result" component.  If no data tree is connected here, it will be assumed that all zones are completely passive and only occupancy will be taken into accout for the Thermal Autonomy calculation.
@@ -481,14 +481,19 @@ def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zon
         TA = []
         OverHeated = []
         UnderHeated = []
+        #Get the values of the hour once so that matrix files are only read once for each hour.
+        try: comfRow = _comfResultsMtx[count + 1]
+        except: comfRow = []
+        try: degOrPMVRow = _degOrPMVMtx[count + 1]
+        except: degOrPMVRow = []
         for pointCount, pointZone in enumerate(pointZoneList):
             try:
-                _comfResultsMtx[count + 1][pointCount]
+                comfRow[pointCount]
                 #Check to see if the point's zone is occupied.  Otheriswe, it does not count for anything.
                 if occupancySchList[pointZone][count] > occupancyThreshold:
                     occHrsNum[pointCount] += 1
                     #Check to see if the point is comfortable.
-                    if _comfResultsMtx[count + 1][pointCount] > 0:
+                    if comfRow[pointCount] > 0:
                         occTCP.append(1)
                         OverHeated.append(0)
                         UnderHeated.append(0)
@@ -498,7 +503,7 @@ def main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zon
                     else:
                         occTCP.append(0)
                         TA.append(0)
-                        if _degOrPMVMtx[count + 1][pointCount] > 0:
+                        if degOrPMVRow[pointCount] > 0:
                             OverHeated.append(1)
                             UnderHeated.append(0)
                         else:
@@ -638,6 +643,17 @@ else:
     w = gh.GH_RuntimeMessageLevel.Warning
     ghenv.Component.AddRuntimeMessage(w, "You should let the Ladybug and Honeybee fly first...")
 
+#If binary result files have been connected, open them so that the hours are read from the files one at a time.
+mtxFiles = []
+if checkLB == True:
+    hb_comfortMatrix = sc.sticky["honeybee_ComfortMatrix"]
+    if len(_comfResultsMtx) == 1 and hb_comfortMatrix.isMatrixFile(_comfResultsMtx[0]):
+        _comfResultsMtx = hb_comfortMatrix(_comfResultsMtx[0])
+        mtxFiles.append(_comfResultsMtx)
+    if len(_degOrPMVMtx) == 1 and hb_comfortMatrix.isMatrixFile(_degOrPMVMtx[0]):
+        _degOrPMVMtx = hb_comfortMatrix(_degOrPMVMtx[0])
+        mtxFiles.append(_degOrPMVMtx)
+
 #Manage the input and output.
 manageOutput()
 
@@ -651,4 +667,6 @@ if len(_comfResultsMtx) > 0 and len(_degOrPMVMtx) >0 and len(_viewFactorMesh) >
     if checkData == True and _runIt == True:
         occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx = main(viewFactorMesh, analysisPeriod, totEnergyHeaders, totEnergyNumbers, zoneNames, occupancySchList, comfortType, occupancyThreshold)
         if writeResultFile_ != 0: 
-            occTCP_Result, TA_Result, OverHeatedResult, UnderHeatedResult = writeCSV(comfortType, fileName, workingDir, occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx)
\ No newline at end of file
+            occTCP_Result, TA_Result, OverHeatedResult, UnderHeatedResult = writeCSV(comfortType, fileName, workingDir, occTCP_Mtx, TA_Mtx, OverHeatedMtx, UnderHeatedMtx)
+
+for mtxFile in mtxFiles: mtxFile.close()
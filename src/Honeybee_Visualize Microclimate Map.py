@@ -27,7 +27,7 @@ Use this component to produce a colored mesh from a comfResultsMtx.
 Provided by Honeybee 0.0.63
     
     Args:
-        _comfResultsMtx: Any matrix output from the 'Honeybee_Microclimate Map Analysis' component, the 'Honeybee_Thermal Comfort Autonomy Analysis' component, or the 'Honeybee_Read Microclimate Matrix' component.
+        _comfResultsMtx: Any matrix output from the 'Honeybee_Microclimate Map Analysis' component, the 'Honeybee_Thermal Comfort Autonomy Analysis' component, or the 'Honeybee_Read Microclimate Matrix' component.  This can also be a binary result file address (.hbmtx) from the 'Honeybee_Microclimate Map Analysis' component, in which case only the hours that are needed are read from the file.
         _viewFactorMesh: The list of view factor meshes that comes out of the  "Honeybee_Indoor View Factor Calculator".  These will be colored with result data.
         ===========: ...
         analysisPeriod_: Note that that connecting a value to 'stepOfSimulation_' will override this input.
@@ -75,7 +75,7 @@ w = gh.GH_RuntimeMessageLevel.Warning
 
 inputsDict = {
     
-0: ["_comfResultsMtx", "Any matrix output from the 'Honeybee_Microclimate Map Analysis' component, the 'Honeybee_Thermal Comfort Autonomy Analysis' component, or the 'Honeybee_Read Microclimate Matrix' component."],
+0: ["_comfResultsMtx", "Any matrix output from the 'Honeybee_Microclimate Map Analysis' component, the 'Honeybee_Thermal Comfort Autonomy Analysis' component, or the 'Honeybee_Read Microclimate Matrix' component.  This can also be a binary result file address (.hbmtx) from the 'Honeybee_Microclimate Map Analysis' component, in which case only the hours that are needed are read from the file."],
 1: ["_viewFactorMesh", "The list of view factor meshes that comes out of the  'Honeybee_Indoor View Factor Calculator'.  These will be colored with result data."],
 2: ["===========", "..."],
 3: ["analysisPeriod_", "Optional analysisPeriod_ to take a slice out of the data stream.  Note that that connecting a value to 'stepOfSimulation_' will override this input."],
@@ -122,7 +122,7 @@ def checkTheInputs():
         analysisPeriod = []
     if _comfResultsMtx[0].split(";")[-2] == "(1, 1, 1)" and _comfResultsMtx[0].split(";")[-1] == "(12, 31, 24)": annualData = True
     else: annualData = False
-    if len(_comfResultsMtx[1:]) == 1: simStepPossible = False
+    if len(_comfResultsMtx) == 2: simStepPossible = False
     else: simStepPossible = True
     
     #Check the HOY to be sure that it is in the counds of the matrix.
@@ -190,8 +190,8 @@ def computeComfValues(comfResultsMtx, analysisP, comfMtxAnalysisP, stepOfSimulat
         
         #Pick out just the hours that are in the analysis period.
         newcomfResultsMtx = []
-        for lineCount, line in enumerate(comfResultsMtx):
-            if lineCount in HOYS: newcomfResultsMtx.append(line)
+        for hour in sorted(set(HOYS)):
+            if 0 < hour < len(comfResultsMtx): newcomfResultsMtx.append(comfResultsMtx[hour])
         
         #Transpose the matrix
         newcomfResultsMtx2 = zip(*newcomfResultsMtx)
@@ -239,9 +239,8 @@ def computeComfValues(comfResultsMtx, analysisP, comfMtxAnalysisP, stepOfSimulat
             
             #Pick out just the hours that are in the analysis period.
             newcomfResultsMtx = []
-            for lineCount, line in enumerate(comfResultsMtx):
-                if lineCount in HOYS:
-                    newcomfResultsMtx.append(line)
+            for hour in sorted(set(HOYS)):
+                if 0 < hour < len(comfResultsMtx): newcomfResultsMtx.append(comfResultsMtx[hour])
             
             #Transpose the matrix
             newcomfResultsMtx2 = zip(*newcomfResultsMtx)
@@ -471,6 +470,12 @@ else:
     w = gh.GH_RuntimeMessageLevel.Warning
     ghenv.Component.AddRuntimeMessage(w, "You should let the Ladybug fly first...")
 
+#If a binary result file has been connected, open it so that only the hours that are needed are read.
+comfResultsMtxFile = None
+if len(_comfResultsMtx) == 1 and sc.sticky.has_key('honeybee_release') and sc.sticky["honeybee_ComfortMatrix"].isMatrixFile(_comfResultsMtx[0]):
+    comfResultsMtxFile = sc.sticky["honeybee_ComfortMatrix"](_comfResultsMtx[0])
+    _comfResultsMtx = comfResultsMtxFile
+
 checkData = False
 annualData = True
 simStepPossible = True
@@ -521,3 +526,5 @@ if checkData == True and runIt == True:
             resultMesh.Add(mesh, GH_Path(meshCt))
         
         ghenv.Component.Params.Output[4].Hidden = True
+
+if comfResultsMtxFile != None: comfResultsMtxFile.close()